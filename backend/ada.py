@@ -1,9 +1,10 @@
 import asyncio
 import base64
+import concurrent.futures
+import functools
 import io
 import os
 import sys
-import traceback
 from typing import Optional
 from dotenv import load_dotenv
 import cv2
@@ -24,7 +25,9 @@ from audio_processor import (
     EnhancedAudioProcessor,
     WakeWordDetector,
     AudioRecorder,
-    AudioMetrics
+    AudioMetrics,
+    ChunkAnalysis,
+    SpeechSegmenter
 )
 
 if sys.version_info < (3, 11, 0):
@@ -32,8 +35,22 @@ if sys.version_info < (3, 11, 0):
     asyncio.TaskGroup = taskgroup.TaskGroup
     asyncio.ExceptionGroup = exceptiongroup.ExceptionGroup
 
+from audio_capture import CallbackCapture
+from audio_playback import JitterBufferPlayer
+from frame_pipeline import FramePipeline, ScreenPipeline, ScreenGrabber, LatestFrameSlot
+from session_scheduler import OutboundScheduler
+from tool_dispatch import ToolDispatcher, ToolSpec
+from transcript import TranscriptAssembler
+from chat_journal import ChatJournal
+from memory_index import format_results
 from tools import tools_list
 from json_sanitizer import sanitize_for_json
+from log_config import get_logger
+
+audio_log = get_logger("audio")
+vad_log = get_logger("vad")
+tool_log = get_logger("tools")
+session_log = get_logger("session")
 
 FORMAT = pyaudio.paInt16
 CHANNELS = 1
@@ -272,7 +289,7 @@ from hue_agent import HueAgent
 from printer_agent import PrinterAgent
 
 class AudioLoop:
-    def __init__(self, video_mode=DEFAULT_MODE, on_audio_data=None, on_video_frame=None, on_cad_data=None, on_web_data=None, on_transcription=None, on_tool_confirmation=None, on_cad_status=None, on_cad_thought=None, on_project_update=None, on_device_update=None, on_error=None, on_audio_metrics=None, input_device_index=None, input_device_name=None, output_device_index=None, kasa_agent=None, hue_agent=None, voice_name="Kore", enable_noise_gate=True, enable_wake_word=False, wake_word_key=None, enable_recording=False):
+    def __init__(self, video_mode=DEFAULT_MODE, on_audio_data=None, on_video_frame=None, on_cad_data=None, on_web_data=None, on_transcription=None, on_tool_confirmation=None, on_cad_status=None, on_cad_thought=None, on_project_update=None, on_device_update=None, on_error=None, on_audio_metrics=None, input_device_index=None, input_device_name=None, output_device_index=None, kasa_agent=None, hue_agent=None, voice_name="Kore", enable_noise_gate=True, noise_gate_mode="block", capture_mode="blocking", audio_batch_ms=0, enable_wake_word=False, wake_word_key=None, enable_recording=False, recording_format="wav", recording_rotate_minutes=None, recording_dual_channel=False, chat_fsync="never", chat_segment_mb=None, context_budget_tokens=None):
         self.video_mode = video_mode
         self.on_audio_data = on_audio_data
         self.on_video_frame = on_video_frame
@@ -290,16 +307,16 @@ class AudioLoop:
         self.input_device_name = input_device_name
         self.output_device_index = output_device_index
         self.voice_name = voice_name
+        self.capture_mode = capture_mode
+        self.audio_batch_ms = audio_batch_ms
+        self.mic_capture = None
 
         self.audio_in_queue = None
         self.out_queue = None
         self.paused = False
 
-        self.chat_buffer = {"sender": None, "text": ""} # For aggregating chunks
-
-        # Track last transcription text to calculate deltas (Gemini sends cumulative text)
-        self._last_input_transcription = ""
-        self._last_output_transcription = ""
+        # Transcription deltas -> one chat message per speaker run -> batched chat log writes
+        self.transcript = TranscriptAssembler(self.log_chat)
 
         self.audio_in_queue = None
         self.out_queue = None
@@ -311,9 +328,10 @@ class AudioLoop:
         self.audio_processor = EnhancedAudioProcessor(
             sample_rate=SEND_SAMPLE_RATE,
             enable_noise_gate=enable_noise_gate,
+            noise_gate_mode=noise_gate_mode,
             vad_aggressiveness=1  # Low aggressiveness to reduce false positives from echo
         )
-        print(f"[ADA] Enhanced audio processor initialized (noise_gate={enable_noise_gate})")
+        print(f"[ADA] Enhanced audio processor initialized (noise_gate={enable_noise_gate}, mode={noise_gate_mode})")
 
         # Wake word detection
         self.wake_word_detector = None
@@ -328,9 +346,13 @@ class AudioLoop:
         if enable_recording:
             self.audio_recorder = AudioRecorder(
                 sample_rate=SEND_SAMPLE_RATE,
-                output_dir="recordings"
+                output_dir="recordings",
+                format=recording_format,
+                max_file_seconds=recording_rotate_minutes * 60 if recording_rotate_minutes else None,
+                dual_channel=recording_dual_channel,
+                output_sample_rate=RECEIVE_SAMPLE_RATE
             )
-            print("[ADA] Audio recorder initialized")
+            print(f"[ADA] Audio recorder initialized (format={self.audio_recorder.extension})")
 
         # Build config with selected voice
         global config
@@ -359,15 +381,23 @@ class AudioLoop:
         
         self.permissions = {} # Default Empty (Will treat unset as True)
         self._pending_confirmations = {}
-
-        # Video buffering state
-        self._latest_image_payload = None
-        # VAD State
-        self._is_speaking = False
-        self._silence_start_time = None
-        # AI speaking state (to prevent self-interruption)
-        self._ai_is_speaking = False
-        self._last_ai_audio_time = 0
+        self.tool_dispatcher = ToolDispatcher(
+            send_responses=self._send_tool_responses,
+            request_confirmation=self._request_tool_confirmation if self.on_tool_confirmation else None,
+            permissions=self.permissions
+        )
+        self._register_tools()
+
+        # Video buffering state: latest browser frame, base64-encoded only when it is sent
+        self.latest_frame = LatestFrameSlot()
+        # Camera frames: change detection + cv2 JPEG encode, unchanged frames are skipped
+        self.frame_pipeline = FramePipeline(max_size=1024)
+        # Screen frames: dirty-tile diffing, FPS cap backs off when out_queue is behind
+        self.screen_pipeline = ScreenPipeline(max_size=1024, max_fps=2.0, min_fps=0.2)
+        # VAD State (utterance onset/offset from per-chunk decisions)
+        self.speech_segmenter = SpeechSegmenter(silence_duration=0.5)
+        # Playback engine; its `speaking` event is the AI speaking state
+        self.audio_player = None
         
         # Initialize ProjectManager
         from project_manager import ProjectManager
@@ -376,7 +406,10 @@ class AudioLoop:
         current_dir = os.path.dirname(os.path.abspath(__file__))
         # If ada.py is in backend/, project root is one up
         project_root = os.path.dirname(current_dir)
-        self.project_manager = ProjectManager(project_root)
+        self.project_manager = ProjectManager(project_root, chat_segment_mb=chat_segment_mb, context_budget_tokens=context_budget_tokens)
+        # Chat logs are group-committed from a worker thread through one open handle per project
+        self.chat_log = ChatJournal(self.project_manager.chat_history, fsync=chat_fsync,
+                                   on_written=self.project_manager.index_chat_entries)
         
         # Sync Initial Project State
         if self.on_project_update:
@@ -385,14 +418,13 @@ class AudioLoop:
             # We will handle this by calling it in run() or just print for now.
             pass
 
+    def log_chat(self, sender, text):
+        """Queues a chat message for the current project's history (written off the event loop)."""
+        self.chat_log.log(*self.project_manager.chat_log_entry(sender, text))
+
     def flush_chat(self):
-        """Forces the current chat buffer to be written to log."""
-        if self.chat_buffer["sender"] and self.chat_buffer["text"].strip():
-            self.project_manager.log_chat(self.chat_buffer["sender"], self.chat_buffer["text"])
-            self.chat_buffer = {"sender": None, "text": ""}
-        # Reset transcription tracking for new turn
-        self._last_input_transcription = ""
-        self._last_output_transcription = ""
+        """Ends the current turn: the buffered message goes to the chat log and delta tracking resets."""
+        self.transcript.flush()
 
     def update_permissions(self, new_perms):
         print(f"[ADA DEBUG] [CONFIG] Updating tool permissions: {new_perms}")
@@ -432,19 +464,37 @@ class AudioLoop:
 
     def get_audio_stats(self) -> dict:
         """Get audio processing statistics"""
-        return self.audio_processor.get_statistics()
+        stats = self.audio_processor.get_statistics()
+        if self.audio_player:
+            stats["playback"] = self.audio_player.get_metrics()
+        if self.mic_capture:
+            stats["capture"] = self.mic_capture.get_metrics()
+        if self.audio_recorder:
+            stats["recording"] = self.audio_recorder.get_stats()
+        if self.out_queue:
+            stats["outbound"] = self.out_queue.get_metrics()
+        if self.frame_pipeline.frames_in:
+            stats["video"] = self.frame_pipeline.get_metrics()
+        if self.screen_pipeline.frames_in:
+            stats["screen"] = self.screen_pipeline.get_metrics()
+        if self.latest_frame.frames_in:
+            stats["browser_video"] = self.latest_frame.get_metrics()
+        stats["tools"] = self.tool_dispatcher.get_metrics()
+        stats["chat_log"] = self.chat_log.get_metrics()
+        stats["chat_log"]["messages"] = self.transcript.messages
+        return stats
         
-    def resolve_tool_confirmation(self, request_id, confirmed):
-        print(f"[ADA DEBUG] [RESOLVE] resolve_tool_confirmation called. ID: {request_id}, Confirmed: {confirmed}")
-        if request_id in self._pending_confirmations:
-            future = self._pending_confirmations[request_id]
-            if not future.done():
-                print(f"[ADA DEBUG] [RESOLVE] Future found and pending. Setting result to: {confirmed}")
-                future.set_result(confirmed)
-            else:
-                 print(f"[ADA DEBUG] [WARN] Request {request_id} future already done. Result: {future.result()}")
+    def resolve_tool_confirmation(self, request_id, confirmed, decisions=None):
+        """decisions optionally maps call_id -> bool for per-call answers in a batch prompt"""
+        future = self._pending_confirmations.get(request_id)
+        if future is None:
+            tool_log.warning("Confirmation request %s not found (%d pending)", request_id, len(self._pending_confirmations))
+        elif future.done():
+            tool_log.warning("Confirmation request %s already resolved", request_id)
         else:
-            print(f"[ADA DEBUG] [WARN] Confirmation Request {request_id} not found in pending dict. Keys: {list(self._pending_confirmations.keys())}")
+            result = decisions if confirmed and decisions else confirmed
+            tool_log.debug("Resolving confirmation request %s: %s", request_id, result)
+            future.set_result(result)
 
     def clear_audio_queue(self):
         """Clears the queue of pending audio chunks to stop playback immediately."""
@@ -461,21 +511,28 @@ class AudioLoop:
             while not self.audio_in_queue.empty():
                 self.audio_in_queue.get_nowait()
                 count += 1
+            if self.audio_player:
+                count += self.audio_player.clear()
             if count > 0:
-                print(f"[ADA DEBUG] [AUDIO] Cleared {count} chunks from playback queue due to interruption.")
+                audio_log.debug("Cleared %d chunks from playback queue due to interruption", count)
         except Exception as e:
-            print(f"[ADA DEBUG] [ERR] Failed to clear audio queue: {e}")
+            audio_log.error("Failed to clear audio queue: %s", e)
+
+    def update_frame(self, frame_data):
+        """Store the latest browser frame as-is; listen_audio / user_input encode it when they send it"""
+        self.latest_frame.set(frame_data)
 
     async def send_frame(self, frame_data):
-        # Update the latest frame payload
-        if isinstance(frame_data, bytes):
-            b64_data = base64.b64encode(frame_data).decode('utf-8')
-        else:
-            b64_data = frame_data 
+        self.update_frame(frame_data)
 
-        # Store as the designated "next frame to send"
-        self._latest_image_payload = {"mime_type": "image/jpeg", "data": b64_data}
-        # No event signal needed - listen_audio pulls it
+    @property
+    def _latest_image_payload(self):
+        """The latest frame as a realtime payload (base64 built once per frame), or None"""
+        return self.latest_frame.payload()
+
+    @_latest_image_payload.setter
+    def _latest_image_payload(self, payload):
+        self.latest_frame.set_payload(payload)
 
     async def send_realtime(self):
         while True:
@@ -525,16 +582,25 @@ class AudioLoop:
         if resolved_input_device_index is None:
              print("[ADA] Using Default Input Device")
 
+        open_stream = functools.partial(
+            pya.open,
+            format=FORMAT,
+            channels=CHANNELS,
+            rate=SEND_SAMPLE_RATE,
+            input=True,
+            input_device_index=resolved_input_device_index if resolved_input_device_index is not None else mic_info["index"],
+            frames_per_buffer=CHUNK_SIZE,
+        )
+
         try:
-            self.audio_stream = await asyncio.to_thread(
-                pya.open,
-                format=FORMAT,
-                channels=CHANNELS,
-                rate=SEND_SAMPLE_RATE,
-                input=True,
-                input_device_index=resolved_input_device_index if resolved_input_device_index is not None else mic_info["index"],
-                frames_per_buffer=CHUNK_SIZE,
-            )
+            if self.capture_mode == "callback":
+                # PortAudio pushes blocks into a ring buffer; reads below need no executor hop
+                self.mic_capture = CallbackCapture(open_stream, chunk_size=CHUNK_SIZE)
+                await asyncio.to_thread(self.mic_capture.start, asyncio.get_running_loop())
+                self.audio_stream = self.mic_capture.stream
+                print("[ADA] Microphone capture mode: callback")
+            else:
+                self.audio_stream = await asyncio.to_thread(open_stream)
         except OSError as e:
             print(f"[ADA] [ERR] Failed to open audio input stream: {e}")
             print("[ADA] [WARN] Audio features will be disabled. Please check microphone permissions.")
@@ -545,40 +611,36 @@ class AudioLoop:
         else:
             kwargs = {}
         
-        # VAD Constants
-        VAD_THRESHOLD = 800 # Adj based on mic sensitivity (800 is conservative for 16-bit)
-        SILENCE_DURATION = 0.5 # Seconds of silence to consider "done speaking"
-        
         while True:
             if self.paused:
+                if self.mic_capture:
+                    # Don't resume on stale audio
+                    self.mic_capture.clear()
                 await asyncio.sleep(0.1)
                 continue
 
             try:
-                data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE, **kwargs)
-
-                # 1. Preprocess audio (noise gate)
-                processed_data = self.audio_processor.preprocess_audio(data)
+                if self.mic_capture:
+                    data = await self.mic_capture.read()
+                    if data is None:
+                        break
+                else:
+                    data = await asyncio.to_thread(self.audio_stream.read, CHUNK_SIZE, **kwargs)
 
-                # 2. Enhanced VAD with webrtcvad
-                is_speech, vad_confidence = self.audio_processor.detect_speech(processed_data)
+                # 1-2. Fused pass: noise gate, levels and VAD from a single decode
+                analysis = self.audio_processor.analyze(data)
+                processed_data = analysis.data
+                is_speech = analysis.is_speech
+                vad_confidence = analysis.vad_confidence
 
-                # 3. Calculate audio metrics periodically (every 10 frames to reduce overhead)
+                # 3. Report audio metrics periodically (every 10 frames to reduce overhead)
                 if hasattr(self, '_metrics_counter'):
                     self._metrics_counter += 1
                 else:
                     self._metrics_counter = 0
 
                 if self._metrics_counter % 10 == 0 and self.on_audio_metrics:
-                    metrics = self.audio_processor.calculate_metrics(processed_data)
-                    self.on_audio_metrics({
-                        'rms': metrics.rms_level,
-                        'peak': metrics.peak_level,
-                        'latency_ms': metrics.latency_ms,
-                        'vad_confidence': vad_confidence,
-                        'clipping': metrics.clipping_detected,
-                        'is_speech': is_speech
-                    })
+                    self.on_audio_metrics(analysis.to_metrics())
 
                 # 4. Send Audio (use processed data)
                 if self.out_queue:
@@ -593,38 +655,31 @@ class AudioLoop:
                     wake_detected = self.wake_word_detector.process(processed_data)
                     if wake_detected:
                         # Could trigger something here - for now just log
-                        print("[ADA] [WAKE] Wake word detected!")
+                        vad_log.info("Wake word detected")
 
                 # 7. VAD Logic for Video with enhanced detection
-                if is_speech:
-                    # Speech Detected
-                    self._silence_start_time = None
-
-                    if not self._is_speaking:
-                        # NEW Speech Utterance Started
-                        self._is_speaking = True
-                        print(f"[ADA DEBUG] [VAD] Speech Detected (Confidence: {vad_confidence:.2f}). Sending Video Frame.")
-
-                        # Send ONE frame
-                        if self._latest_image_payload and self.out_queue:
-                            await self.out_queue.put(self._latest_image_payload)
-                        else:
-                            print(f"[ADA DEBUG] [VAD] No video frame available to send.")
-
-                else:
-                    # Silence
-                    if self._is_speaking:
-                        if self._silence_start_time is None:
-                            self._silence_start_time = time.time()
+                vad_event = self.speech_segmenter.update(is_speech, time.time())
+                if vad_event and self.out_queue:
+                    # Don't hold utterance edges back for the coalescing window
+                    self.out_queue.flush_audio()
+
+                if vad_event == SpeechSegmenter.ONSET:
+                    # NEW Speech Utterance Started
+                    vad_log.debug("Speech detected (confidence %.2f), sending video frame", vad_confidence)
+
+                    # Send ONE frame
+                    frame_payload = self._latest_image_payload
+                    if frame_payload and self.out_queue:
+                        await self.out_queue.put(frame_payload)
+                    else:
+                        vad_log.debug("No video frame available to send")
 
-                        elif time.time() - self._silence_start_time > SILENCE_DURATION:
-                            # Silence confirmed, reset state
-                            print(f"[ADA DEBUG] [VAD] Silence detected. Resetting speech state.")
-                            self._is_speaking = False
-                            self._silence_start_time = None
+                elif vad_event == SpeechSegmenter.OFFSET:
+                    # Silence confirmed, reset state
+                    vad_log.debug("Silence detected, resetting speech state")
 
             except Exception as e:
-                print(f"Error reading audio: {e}")
+                audio_log.error("Error reading audio: %s", e)
                 await asyncio.sleep(0.1)
 
     async def handle_cad_request(self, prompt):
@@ -737,6 +792,12 @@ class AudioLoop:
             result = f"File '{final_path.name}' written successfully to project '{self.project_manager.current_project}'."
         except Exception as e:
             result = f"Failed to write file '{path}': {str(e)}"
+        else:
+            # Keep search_project_memory current without waiting for the next search to notice
+            try:
+                await asyncio.to_thread(self.project_manager.index_file, final_path)
+            except Exception as e:
+                tool_log.warning("Failed to index %s: %s", final_path, e)
 
         print(f"[ADA DEBUG] [FS] Result: {result}")
         try:
@@ -796,6 +857,296 @@ class AudioLoop:
         except Exception as e:
              print(f"[ADA DEBUG] [ERR] Failed to send web agent result to model: {e}")
 
+    def _register_tools(self):
+        """Tool registry: blocking tools answer inline, the rest run as tracked background tasks"""
+        specs = [
+            # Reports back through System Notifications, so no FunctionResponse
+            ToolSpec("generate_cad", self._tool_generate_cad, blocking=False, timeout=None, group="cad"),
+            # Acknowledge now, result follows as a System Notification
+            ToolSpec("run_web_agent", self._tool_run_web_agent),
+            ToolSpec("write_file", self._tool_write_file, group="project"),
+            ToolSpec("read_directory", self._tool_read_directory),
+            ToolSpec("read_file", self._tool_read_file),
+            # Local and fast; project changes keep the order the model asked for
+            ToolSpec("create_project", self._tool_create_project, group="project"),
+            ToolSpec("switch_project", self._tool_switch_project, group="project"),
+            ToolSpec("list_projects", self._tool_list_projects),
+            ToolSpec("search_project_memory", self._tool_search_project_memory),
+            ToolSpec("list_smart_devices", self._tool_list_smart_devices),
+            # Network, slicer or LLM round trips
+            ToolSpec("control_light", self._tool_control_light, blocking=False, timeout=15.0),
+            ToolSpec("discover_printers", self._tool_discover_printers, blocking=False, timeout=20.0),
+            ToolSpec("print_stl", self._tool_print_stl, blocking=False, timeout=900.0, group="cad"),
+            ToolSpec("get_print_status", self._tool_get_print_status, blocking=False, timeout=15.0),
+            ToolSpec("iterate_cad", self._tool_iterate_cad, blocking=False, timeout=600.0, group="cad"),
+        ]
+        for spec in specs:
+            self.tool_dispatcher.register(spec)
+
+    async def _send_tool_responses(self, function_responses):
+        tool_log.debug("Sending %d function response(s)", len(function_responses))
+        await self.session.send_tool_response(function_responses=function_responses)
+
+    async def _request_tool_confirmation(self, calls):
+        """
+        Ask the frontend to confirm every call in a tool_call batch with one
+        prompt; resolved by resolve_tool_confirmation. Returns one bool per call.
+        """
+        import uuid
+        request_id = str(uuid.uuid4())
+        tool_log.info("Requesting confirmation for %s (ID: %s)", [c["tool"] for c in calls], request_id)
+
+        future = asyncio.get_running_loop().create_future()
+        self._pending_confirmations[request_id] = future
+        self.on_tool_confirmation({
+            "id": request_id,
+            # tool/args describe the first call, for single-call prompts
+            "tool": calls[0]["tool"],
+            "args": calls[0]["args"],
+            "calls": calls
+        })
+
+        try:
+            # Wait for user response: True/False for the whole batch, or {call_id: bool}
+            decision = await future
+        finally:
+            self._pending_confirmations.pop(request_id, None)
+
+        tool_log.info("Request %s resolved. Decision: %s", request_id, decision)
+        if isinstance(decision, dict):
+            return [bool(decision.get(c["call_id"], False)) for c in calls]
+        return [bool(decision)] * len(calls)
+
+    def _kasa_device_list(self):
+        """Cached Kasa devices in the shape the frontend expects"""
+        devices = []
+        for ip, dev in self.kasa_agent.devices.items():
+            dev_type = "unknown"
+            if dev.is_bulb: dev_type = "bulb"
+            elif dev.is_plug: dev_type = "plug"
+            elif dev.is_strip: dev_type = "strip"
+            elif dev.is_dimmer: dev_type = "dimmer"
+
+            devices.append({
+                "ip": ip,
+                "alias": dev.alias,
+                "model": dev.model,
+                "type": dev_type,
+                "is_on": dev.is_on,
+                "brightness": dev.brightness if dev.is_bulb or dev.is_dimmer else None,
+                "hsv": dev.hsv if dev.is_bulb and dev.is_color else None,
+                "has_color": dev.is_color if dev.is_bulb else False,
+                "has_brightness": dev.is_dimmable if dev.is_bulb or dev.is_dimmer else False
+            })
+        return devices
+
+    async def _tool_generate_cad(self, args):
+        prompt = args.get("prompt", "")
+        # No function response needed - model already acknowledged when user asked
+        await self.handle_cad_request(prompt)
+        return None
+
+    async def _tool_run_web_agent(self, args):
+        prompt = args.get("prompt", "")
+        self.tool_dispatcher.spawn(self.handle_web_agent_request(prompt), name="web_agent")
+        return "Web Navigation started. Do not reply to this message."
+
+    async def _tool_write_file(self, args):
+        path = args["path"]
+        self.tool_dispatcher.spawn(self.handle_write_file(path, args["content"]), name="write_file")
+        return "Writing file..."
+
+    async def _tool_read_directory(self, args):
+        path = args["path"]
+        self.tool_dispatcher.spawn(self.handle_read_directory(path), name="read_directory")
+        return "Reading directory..."
+
+    async def _tool_read_file(self, args):
+        path = args["path"]
+        self.tool_dispatcher.spawn(self.handle_read_file(path), name="read_file")
+        return "Reading file..."
+
+    async def _tool_create_project(self, args):
+        name = args["name"]
+        success, msg = self.project_manager.create_project(name)
+        if success:
+            # Auto-switch to the newly created project
+            self.project_manager.switch_project(name)
+            msg += f" Switched to '{name}'."
+            if self.on_project_update:
+                self.on_project_update(name)
+        return msg
+
+    async def _tool_switch_project(self, args):
+        name = args["name"]
+        success, msg = self.project_manager.switch_project(name)
+        if success:
+            if self.on_project_update:
+                self.on_project_update(name)
+            # Gather project context and send to AI (silently, no response expected)
+            # Only files changed since the last switch are read, off the event loop
+            context = await asyncio.to_thread(self.project_manager.get_project_context)
+            tool_log.debug("Sending project context to AI (%d chars)", len(context))
+            try:
+                await self.session.send(input=f"System Notification: {msg}\n\n{context}", end_of_turn=False)
+            except Exception as e:
+                tool_log.error("Failed to send project context: %s", e)
+        return msg
+
+    async def _tool_list_projects(self, args):
+        projects = self.project_manager.list_projects()
+        return f"Available projects: {', '.join(projects)}"
+
+    async def _tool_search_project_memory(self, args):
+        query = args["query"]
+        limit = max(1, min(int(args.get("limit", 5)), 20))
+        results = await asyncio.to_thread(self.project_manager.search_memory, query, limit)
+        tool_log.debug("Memory search %r: %d result(s)", query, len(results))
+        return format_results(results)
+
+    async def _tool_list_smart_devices(self, args):
+        # Use cached devices directly for speed
+        frontend_list = self._kasa_device_list()
+        dev_summaries = [
+            f"{d['alias']} (IP: {d['ip']}, Type: {d['type']})" + (" [ON]" if d["is_on"] else " [OFF]")
+            for d in frontend_list
+        ]
+
+        # Trigger frontend update
+        if self.on_device_update:
+            self.on_device_update(frontend_list)
+
+        if dev_summaries:
+            return "Found Devices (Cached):\n" + "\n".join(dev_summaries)
+        return "No devices found in cache."
+
+    async def _tool_control_light(self, args):
+        target = args["target"]
+        action = args["action"]
+        brightness = args.get("brightness")
+        color = args.get("color")
+
+
+        result_msg = f"Action '{action}' on '{target}' failed."
+        success = False
+
+        if action == "turn_on":
+            success = await self.kasa_agent.turn_on(target)
+            if success:
+                result_msg = f"Turned ON '{target}'."
+        elif action == "turn_off":
+            success = await self.kasa_agent.turn_off(target)
+            if success:
+                result_msg = f"Turned OFF '{target}'."
+        elif action == "set":
+            success = True
+            result_msg = f"Updated '{target}':"
+
+        # Apply extra attributes if 'set' or if we just turned it on and want to set them too
+        if success or action == "set":
+            if brightness is not None:
+                sb = await self.kasa_agent.set_brightness(target, brightness)
+                if sb:
+                    result_msg += f" Set brightness to {brightness}."
+            if color is not None:
+                sc = await self.kasa_agent.set_color(target, color)
+                if sc:
+                    result_msg += f" Set color to {color}."
+
+        # Notify Frontend of State Change
+        if success:
+            # KasaAgent updates its internal state on control, so we can rebuild the list
+            if self.on_device_update:
+                self.on_device_update(self._kasa_device_list())
+        else:
+            # Report Error
+            if self.on_error:
+                self.on_error(result_msg)
+        return result_msg
+
+    async def _tool_discover_printers(self, args):
+        printers = await self.printer_agent.discover_printers()
+        # Format for model
+        if printers:
+            printer_list = []
+            for p in printers:
+                printer_list.append(f"{p['name']} ({p['host']}:{p['port']}, type: {p['printer_type']})")
+            return "Found Printers:\n" + "\n".join(printer_list)
+        return "No printers found on network. Ensure printers are on and running OctoPrint/Moonraker."
+
+    async def _tool_print_stl(self, args):
+        stl_path = args["stl_path"]
+        printer = args["printer"]
+        profile = args.get("profile")
+
+
+        # Resolve 'current' to project STL
+        if stl_path.lower() == "current":
+            stl_path = "output.stl" # Let printer agent resolve it in root_path
+
+        # Get current project path
+        project_path = str(self.project_manager.get_current_project_path())
+
+        result = await self.printer_agent.print_stl(
+            stl_path,
+            printer,
+            profile,
+            root_path=project_path
+        )
+        return result.get("message", "Unknown result")
+
+    async def _tool_get_print_status(self, args):
+        printer = args["printer"]
+
+        status = await self.printer_agent.get_print_status(printer)
+        if not status:
+            return f"Could not get status for printer '{printer}'. Ensure it is discovered first."
+
+        result_str = f"Printer: {status.printer}\n"
+        result_str += f"State: {status.state}\n"
+        result_str += f"Progress: {status.progress_percent:.1f}%\n"
+        if status.time_remaining:
+            result_str += f"Time Remaining: {status.time_remaining}\n"
+        if status.time_elapsed:
+            result_str += f"Time Elapsed: {status.time_elapsed}\n"
+        if status.filename:
+            result_str += f"File: {status.filename}\n"
+        if status.temperatures:
+            temps = status.temperatures
+            if "hotend" in temps:
+                result_str += f"Hotend: {temps['hotend']['current']:.0f}°C / {temps['hotend']['target']:.0f}°C\n"
+            if "bed" in temps:
+                result_str += f"Bed: {temps['bed']['current']:.0f}°C / {temps['bed']['target']:.0f}°C"
+        return result_str
+
+    async def _tool_iterate_cad(self, args):
+        prompt = args["prompt"]
+
+        # Emit status
+        if self.on_cad_status:
+            self.on_cad_status("generating")
+
+        # Get project cad folder path
+        cad_output_dir = str(self.project_manager.get_current_project_path() / "cad")
+
+        # Call CadAgent to iterate on the design
+        cad_data = await self.cad_agent.iterate_prototype(prompt, output_dir=cad_output_dir)
+
+        if not cad_data:
+            tool_log.warning("CadAgent iteration returned None")
+            return f"Failed to iterate design with prompt: {prompt}"
+
+        tool_log.debug("CadAgent iteration returned data")
+
+        # Dispatch to frontend
+        if self.on_cad_data:
+            self.on_cad_data(cad_data)
+
+        # Save to Project
+        self.project_manager.save_cad_artifact("output.stl", f"Iteration: {prompt}")
+
+        return f"Successfully iterated design: {prompt}. The updated 3D model is now displayed."
+
     async def receive_audio(self):
         "Background task to reads from the websocket and write pcm chunks to the output queue"
         try:
@@ -812,483 +1163,53 @@ class AudioLoop:
                         if response.server_content.input_transcription:
                             transcript = response.server_content.input_transcription.text
                             if transcript:
-                                # Skip if this is an exact duplicate event
-                                if transcript != self._last_input_transcription:
-                                    # Calculate delta (Gemini may send cumulative or chunk-based text)
-                                    delta = transcript
-                                    if transcript.startswith(self._last_input_transcription):
-                                        delta = transcript[len(self._last_input_transcription):]
-                                    self._last_input_transcription = transcript
-                                    
-                                    # Only send if there's new text
-                                    if delta:
-                                        # INTERRUPTION DISABLED WHILE AI IS SPEAKING
-                                        # Don't clear audio queue at all during user transcription
-                                        # The AI's own voice gets picked up by the mic (echo) and triggers false interruptions
-                                        # Users can manually interrupt by stopping/pausing if needed
-                                        pass  # Interruption disabled
-
-                                        # Send to frontend (Streaming) - sanitize for JSON
-                                        if self.on_transcription:
-                                            self.on_transcription(sanitize_for_json({"sender": "User", "text": delta}))
-                                        
-                                        # Buffer for Logging
-                                        if self.chat_buffer["sender"] != "User":
-                                            # Flush previous if exists
-                                            if self.chat_buffer["sender"] and self.chat_buffer["text"].strip():
-                                                self.project_manager.log_chat(self.chat_buffer["sender"], self.chat_buffer["text"])
-                                            # Start new
-                                            self.chat_buffer = {"sender": "User", "text": delta}
-                                        else:
-                                            # Append
-                                            self.chat_buffer["text"] += delta
-                        
+                                # Gemini may send cumulative or chunk-based text; exact repeats give no delta
+                                delta = self.transcript.input.delta(transcript)
+                                if delta:
+                                    # INTERRUPTION DISABLED WHILE AI IS SPEAKING
+                                    # Don't clear audio queue at all during user transcription
+                                    # The AI's own voice gets picked up by the mic (echo) and triggers false interruptions
+                                    # Users can manually interrupt by stopping/pausing if needed
+
+                                    # Send to frontend (Streaming) - sanitize for JSON
+                                    if self.on_transcription:
+                                        self.on_transcription(sanitize_for_json({"sender": "User", "text": delta}))
+
+                                    # Buffer for Logging (a sender switch logs the previous message)
+                                    self.transcript.add("User", delta)
+
                         if response.server_content.output_transcription:
                             transcript = response.server_content.output_transcription.text
                             if transcript:
-                                # Skip if this is an exact duplicate event
-                                if transcript != self._last_output_transcription:
-                                    # Calculate delta (Gemini may send cumulative or chunk-based text)
-                                    delta = transcript
-                                    if transcript.startswith(self._last_output_transcription):
-                                        delta = transcript[len(self._last_output_transcription):]
-                                    self._last_output_transcription = transcript
-                                    
-                                    # Only send if there's new text
-                                    if delta:
-                                        # Send to frontend (Streaming) - sanitize for JSON
-                                        if self.on_transcription:
-                                            self.on_transcription(sanitize_for_json({"sender": "JARVIS", "text": delta}))
-
-                                        # Buffer for Logging
-                                        if self.chat_buffer["sender"] != "JARVIS":
-                                            # Flush previous
-                                            if self.chat_buffer["sender"] and self.chat_buffer["text"].strip():
-                                                self.project_manager.log_chat(self.chat_buffer["sender"], self.chat_buffer["text"])
-                                            # Start new
-                                            self.chat_buffer = {"sender": "JARVIS", "text": delta}
-                                        else:
-                                            # Append
-                                            self.chat_buffer["text"] += delta
-                        
+                                delta = self.transcript.output.delta(transcript)
+                                if delta:
+                                    # Send to frontend (Streaming) - sanitize for JSON
+                                    if self.on_transcription:
+                                        self.on_transcription(sanitize_for_json({"sender": "JARVIS", "text": delta}))
+
+                                    # Buffer for Logging
+                                    self.transcript.add("JARVIS", delta)
+
                         # Flush buffer on turn completion if needed, 
                         # but usually better to wait for sender switch or explicit end.
                         # We can also check turn_complete signal if available in response.server_content.model_turn etc
 
-                    # 3. Handle Tool Calls
+                    # 3. Handle Tool Calls (slow tools and confirmations run in the background)
                     if response.tool_call:
-                        print("The tool was called")
-                        function_responses = []
-                        for fc in response.tool_call.function_calls:
-                            if fc.name in ["generate_cad", "run_web_agent", "write_file", "read_directory", "read_file", "create_project", "switch_project", "list_projects", "list_smart_devices", "control_light", "discover_printers", "print_stl", "get_print_status", "iterate_cad"]:
-                                prompt = fc.args.get("prompt", "") # Prompt is not present for all tools
-                                
-                                # Check Permissions (Default to True if not set)
-                                confirmation_required = self.permissions.get(fc.name, True)
-                                
-                                if not confirmation_required:
-                                    print(f"[ADA DEBUG] [TOOL] Permission check: '{fc.name}' -> AUTO-ALLOW")
-                                    # Skip confirmation block and jump to execution
-                                    pass
-                                else:
-                                    # Confirmation Logic
-                                    if self.on_tool_confirmation:
-                                        import uuid
-                                        request_id = str(uuid.uuid4())
-                                    print(f"[ADA DEBUG] [STOP] Requesting confirmation for '{fc.name}' (ID: {request_id})")
-                                    
-                                    future = asyncio.Future()
-                                    self._pending_confirmations[request_id] = future
-                                    
-                                    self.on_tool_confirmation({
-                                        "id": request_id, 
-                                        "tool": fc.name, 
-                                        "args": fc.args
-                                    })
-                                    
-                                    try:
-                                        # Wait for user response
-                                        confirmed = await future
-
-                                    finally:
-                                        self._pending_confirmations.pop(request_id, None)
-
-                                    print(f"[ADA DEBUG] [CONFIRM] Request {request_id} resolved. Confirmed: {confirmed}")
-
-                                    if not confirmed:
-                                        print(f"[ADA DEBUG] [DENY] Tool call '{fc.name}' denied by user.")
-                                        function_response = types.FunctionResponse(
-                                            id=fc.id,
-                                            name=fc.name,
-                                            response={
-                                                "result": "User denied the request to use this tool.",
-                                            }
-                                        )
-                                        function_responses.append(function_response)
-                                        continue
-
-                                    if not confirmed:
-                                        print(f"[ADA DEBUG] [DENY] Tool call '{fc.name}' denied by user.")
-                                        function_response = types.FunctionResponse(
-                                            id=fc.id,
-                                            name=fc.name,
-                                            response={
-                                                "result": "User denied the request to use this tool.",
-                                            }
-                                        )
-                                        function_responses.append(function_response)
-                                        continue
-
-                                # If confirmed (or no callback configured, or auto-allowed), proceed
-                                if fc.name == "generate_cad":
-                                    print(f"\n[ADA DEBUG] --------------------------------------------------")
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call Detected: 'generate_cad'")
-                                    print(f"[ADA DEBUG] [IN] Arguments: prompt='{prompt}'")
-                                    
-                                    asyncio.create_task(self.handle_cad_request(prompt))
-                                    # No function response needed - model already acknowledged when user asked
-                                
-                                elif fc.name == "run_web_agent":
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'run_web_agent' with prompt='{prompt}'")
-                                    asyncio.create_task(self.handle_web_agent_request(prompt))
-                                    
-                                    result_text = "Web Navigation started. Do not reply to this message."
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id,
-                                        name=fc.name,
-                                        response={
-                                            "result": result_text,
-                                        }
-                                    )
-                                    print(f"[ADA DEBUG] [RESPONSE] Sending function response: {function_response}")
-                                    function_responses.append(function_response)
-
-
-
-                                elif fc.name == "write_file":
-                                    path = fc.args["path"]
-                                    content = fc.args["content"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'write_file' path='{path}'")
-                                    asyncio.create_task(self.handle_write_file(path, content))
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": "Writing file..."}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "read_directory":
-                                    path = fc.args["path"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'read_directory' path='{path}'")
-                                    asyncio.create_task(self.handle_read_directory(path))
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": "Reading directory..."}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "read_file":
-                                    path = fc.args["path"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'read_file' path='{path}'")
-                                    asyncio.create_task(self.handle_read_file(path))
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": "Reading file..."}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "create_project":
-                                    name = fc.args["name"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'create_project' name='{name}'")
-                                    success, msg = self.project_manager.create_project(name)
-                                    if success:
-                                        # Auto-switch to the newly created project
-                                        self.project_manager.switch_project(name)
-                                        msg += f" Switched to '{name}'."
-                                        if self.on_project_update:
-                                            self.on_project_update(name)
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "switch_project":
-                                    name = fc.args["name"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'switch_project' name='{name}'")
-                                    success, msg = self.project_manager.switch_project(name)
-                                    if success:
-                                        if self.on_project_update:
-                                            self.on_project_update(name)
-                                        # Gather project context and send to AI (silently, no response expected)
-                                        context = self.project_manager.get_project_context()
-                                        print(f"[ADA DEBUG] [PROJECT] Sending project context to AI ({len(context)} chars)")
-                                        try:
-                                            await self.session.send(input=f"System Notification: {msg}\n\n{context}", end_of_turn=False)
-                                        except Exception as e:
-                                            print(f"[ADA DEBUG] [ERR] Failed to send project context: {e}")
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": msg}
-                                    )
-                                    function_responses.append(function_response)
-                                
-                                elif fc.name == "list_projects":
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'list_projects'")
-                                    projects = self.project_manager.list_projects()
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": f"Available projects: {', '.join(projects)}"}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "list_smart_devices":
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'list_smart_devices'")
-                                    # Use cached devices directly for speed
-                                    # devices_dict is {ip: SmartDevice}
-                                    
-                                    dev_summaries = []
-                                    frontend_list = []
-                                    
-                                    for ip, d in self.kasa_agent.devices.items():
-                                        dev_type = "unknown"
-                                        if d.is_bulb: dev_type = "bulb"
-                                        elif d.is_plug: dev_type = "plug"
-                                        elif d.is_strip: dev_type = "strip"
-                                        elif d.is_dimmer: dev_type = "dimmer"
-                                        
-                                        # Format for Model
-                                        info = f"{d.alias} (IP: {ip}, Type: {dev_type})"
-                                        if d.is_on:
-                                            info += " [ON]"
-                                        else:
-                                            info += " [OFF]"
-                                        dev_summaries.append(info)
-                                        
-                                        # Format for Frontend
-                                        frontend_list.append({
-                                            "ip": ip,
-                                            "alias": d.alias,
-                                            "model": d.model,
-                                            "type": dev_type,
-                                            "is_on": d.is_on,
-                                            "brightness": d.brightness if d.is_bulb or d.is_dimmer else None,
-                                            "hsv": d.hsv if d.is_bulb and d.is_color else None,
-                                            "has_color": d.is_color if d.is_bulb else False,
-                                            "has_brightness": d.is_dimmable if d.is_bulb or d.is_dimmer else False
-                                        })
-                                    
-                                    result_str = "No devices found in cache."
-                                    if dev_summaries:
-                                        result_str = "Found Devices (Cached):\n" + "\n".join(dev_summaries)
-                                    
-                                    # Trigger frontend update
-                                    if self.on_device_update:
-                                        self.on_device_update(frontend_list)
-
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_str}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "control_light":
-                                    target = fc.args["target"]
-                                    action = fc.args["action"]
-                                    brightness = fc.args.get("brightness")
-                                    color = fc.args.get("color")
-                                    
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'control_light' Target='{target}' Action='{action}'")
-                                    
-                                    result_msg = f"Action '{action}' on '{target}' failed."
-                                    success = False
-                                    
-                                    if action == "turn_on":
-                                        success = await self.kasa_agent.turn_on(target)
-                                        if success:
-                                            result_msg = f"Turned ON '{target}'."
-                                    elif action == "turn_off":
-                                        success = await self.kasa_agent.turn_off(target)
-                                        if success:
-                                            result_msg = f"Turned OFF '{target}'."
-                                    elif action == "set":
-                                        success = True
-                                        result_msg = f"Updated '{target}':"
-                                    
-                                    # Apply extra attributes if 'set' or if we just turned it on and want to set them too
-                                    if success or action == "set":
-                                        if brightness is not None:
-                                            sb = await self.kasa_agent.set_brightness(target, brightness)
-                                            if sb:
-                                                result_msg += f" Set brightness to {brightness}."
-                                        if color is not None:
-                                            sc = await self.kasa_agent.set_color(target, color)
-                                            if sc:
-                                                result_msg += f" Set color to {color}."
-
-                                    # Notify Frontend of State Change
-                                    if success:
-                                        # We don't need full discovery, just refresh known state or push update
-                                        # But for simplicity, let's get the standard list representation
-                                        # KasaAgent updates its internal state on control, so we can rebuild the list
-                                        
-                                        # Quick rebuild of list from internal dict
-                                        updated_list = []
-                                        for ip, dev in self.kasa_agent.devices.items():
-                                            # We need to ensure we have the correct dict structure expected by frontend
-                                            # We duplicate logic from KasaAgent.discover_devices a bit, but that's okay for now or we can add a helper
-                                            # Ideally KasaAgent has a 'get_devices_list()' method.
-                                            # Use the cached objects in self.kasa_agent.devices
-                                            
-                                            dev_type = "unknown"
-                                            if dev.is_bulb: dev_type = "bulb"
-                                            elif dev.is_plug: dev_type = "plug"
-                                            elif dev.is_strip: dev_type = "strip"
-                                            elif dev.is_dimmer: dev_type = "dimmer"
-
-                                            d_info = {
-                                                "ip": ip,
-                                                "alias": dev.alias,
-                                                "model": dev.model,
-                                                "type": dev_type,
-                                                "is_on": dev.is_on,
-                                                "brightness": dev.brightness if dev.is_bulb or dev.is_dimmer else None,
-                                                "hsv": dev.hsv if dev.is_bulb and dev.is_color else None,
-                                                "has_color": dev.is_color if dev.is_bulb else False,
-                                                "has_brightness": dev.is_dimmable if dev.is_bulb or dev.is_dimmer else False
-                                            }
-                                            updated_list.append(d_info)
-                                            
-                                        if self.on_device_update:
-                                            self.on_device_update(updated_list)
-                                    else:
-                                        # Report Error
-                                        if self.on_error:
-                                            self.on_error(result_msg)
-
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_msg}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "discover_printers":
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'discover_printers'")
-                                    printers = await self.printer_agent.discover_printers()
-                                    # Format for model
-                                    if printers:
-                                        printer_list = []
-                                        for p in printers:
-                                            printer_list.append(f"{p['name']} ({p['host']}:{p['port']}, type: {p['printer_type']})")
-                                        result_str = "Found Printers:\n" + "\n".join(printer_list)
-                                    else:
-                                        result_str = "No printers found on network. Ensure printers are on and running OctoPrint/Moonraker."
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_str}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "print_stl":
-                                    stl_path = fc.args["stl_path"]
-                                    printer = fc.args["printer"]
-                                    profile = fc.args.get("profile")
-                                    
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'print_stl' STL='{stl_path}' Printer='{printer}'")
-                                    
-                                    # Resolve 'current' to project STL
-                                    if stl_path.lower() == "current":
-                                        stl_path = "output.stl" # Let printer agent resolve it in root_path
-
-                                    # Get current project path
-                                    project_path = str(self.project_manager.get_current_project_path())
-                                    
-                                    result = await self.printer_agent.print_stl(
-                                        stl_path, 
-                                        printer, 
-                                        profile, 
-                                        root_path=project_path
-                                    )
-                                    result_str = result.get("message", "Unknown result")
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_str}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "get_print_status":
-                                    printer = fc.args["printer"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'get_print_status' Printer='{printer}'")
-                                    
-                                    status = await self.printer_agent.get_print_status(printer)
-                                    if status:
-                                        result_str = f"Printer: {status.printer}\n"
-                                        result_str += f"State: {status.state}\n"
-                                        result_str += f"Progress: {status.progress_percent:.1f}%\n"
-                                        if status.time_remaining:
-                                            result_str += f"Time Remaining: {status.time_remaining}\n"
-                                        if status.time_elapsed:
-                                            result_str += f"Time Elapsed: {status.time_elapsed}\n"
-                                        if status.filename:
-                                            result_str += f"File: {status.filename}\n"
-                                        if status.temperatures:
-                                            temps = status.temperatures
-                                            if "hotend" in temps:
-                                                result_str += f"Hotend: {temps['hotend']['current']:.0f}°C / {temps['hotend']['target']:.0f}°C\n"
-                                            if "bed" in temps:
-                                                result_str += f"Bed: {temps['bed']['current']:.0f}°C / {temps['bed']['target']:.0f}°C"
-                                    else:
-                                        result_str = f"Could not get status for printer '{printer}'. Ensure it is discovered first."
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_str}
-                                    )
-                                    function_responses.append(function_response)
-
-                                elif fc.name == "iterate_cad":
-                                    prompt = fc.args["prompt"]
-                                    print(f"[ADA DEBUG] [TOOL] Tool Call: 'iterate_cad' Prompt='{prompt}'")
-                                    
-                                    # Emit status
-                                    if self.on_cad_status:
-                                        self.on_cad_status("generating")
-                                    
-                                    # Get project cad folder path
-                                    cad_output_dir = str(self.project_manager.get_current_project_path() / "cad")
-                                    
-                                    # Call CadAgent to iterate on the design
-                                    cad_data = await self.cad_agent.iterate_prototype(prompt, output_dir=cad_output_dir)
-                                    
-                                    if cad_data:
-                                        print(f"[ADA DEBUG] [OK] CadAgent iteration returned data successfully.")
-                                        
-                                        # Dispatch to frontend
-                                        if self.on_cad_data:
-                                            print(f"[ADA DEBUG] [SEND] Dispatching iterated CAD data to frontend...")
-                                            self.on_cad_data(cad_data)
-                                            print(f"[ADA DEBUG] [SENT] Dispatch complete.")
-                                        
-                                        # Save to Project
-                                        self.project_manager.save_cad_artifact("output.stl", f"Iteration: {prompt}")
-                                        
-                                        result_str = f"Successfully iterated design: {prompt}. The updated 3D model is now displayed."
-                                    else:
-                                        print(f"[ADA DEBUG] [ERR] CadAgent iteration returned None.")
-                                        result_str = f"Failed to iterate design with prompt: {prompt}"
-                                    
-                                    function_response = types.FunctionResponse(
-                                        id=fc.id, name=fc.name, response={"result": result_str}
-                                    )
-                                    function_responses.append(function_response)
-                        if function_responses:
-                            await self.session.send_tool_response(function_responses=function_responses)
+                        await self.tool_dispatcher.dispatch(response.tool_call.function_calls)
                 
                 # Turn/Response Loop Finished
                 self.flush_chat()
+                if self.audio_player:
+                    self.audio_player.end_of_turn()
                 
                 # DON'T clear the audio queue here - let it play out naturally
         except websockets.exceptions.ConnectionClosedError as e:
-            print(f"[ADA DEBUG] [ERR] WebSocket connection closed: {e}")
-            # This is expected during reconnection - re-raise to trigger reconnect
-            raise e
-        except websockets.exceptions.ConnectionClosedError as e:
-            print(f"[ADA DEBUG] [ERR] WebSocket connection closed: {e}")
+            session_log.warning("WebSocket connection closed: %s", e)
             # This is expected during reconnection - re-raise to trigger reconnect
             raise e
         except Exception as e:
-            print(f"Error in receive_audio: {e}")
-            traceback.print_exc()
+            session_log.error("Error in receive_audio: %s", e, exc_info=True)
             # CRITICAL: Re-raise to crash the TaskGroup and trigger outer loop reconnect
             raise e
 
@@ -1303,63 +1224,45 @@ class AudioLoop:
             frames_per_buffer=8192,  # Increased buffer to prevent audio underruns
         )
 
-        chunk_count = 0
-        last_log_time = time.time()
-        MIN_BUFFER = 10  # Wait for 10 chunks before starting playback (more tolerance for network lag)
-        prebuffer_complete = False
-
-        while True:
-            # Pre-buffer on first start to prevent stuttering
-            if not prebuffer_complete:
-                if self.audio_in_queue.qsize() < MIN_BUFFER:
-                    await asyncio.sleep(0.1)
-                    continue
-                prebuffer_complete = True
-                print(f"[ADA DEBUG] [AUDIO] Pre-buffer complete, starting playback")
-            
-            bytestream = await self.audio_in_queue.get()
-            
-            chunk_count += 1
-            current_time = time.time()
-            
-            # Log every 50 chunks or if there's a big gap
-            if chunk_count % 50 == 0 or (current_time - last_log_time > 2.0):
-                queue_size = self.audio_in_queue.qsize()
-                print(f"[ADA DEBUG] [AUDIO] Playing chunk #{chunk_count}, queue size: {queue_size}")
-                last_log_time = current_time
-                
-                # Warn if queue is getting empty (might cause skipping)
-                if queue_size < 3:
-                    print(f"[ADA DEBUG] [WARN] Audio queue running low: {queue_size} chunks")
-
-            # Mark that AI is speaking and update timestamp
-            self._ai_is_speaking = True
-            self._last_ai_audio_time = time.time()
+        # Adaptive jitter buffer: one writer thread owns stream.write and the
+        # prebuffer is sized from measured arrival jitter
+        self.audio_player = JitterBufferPlayer(
+            stream,
+            sample_rate=RECEIVE_SAMPLE_RATE,
+            on_speaking_change=self._on_ai_speaking_change,
+            on_write=self._on_audio_played,
+            loop=asyncio.get_running_loop()
+        )
+        self.audio_player.start()
 
-            if self.on_audio_data:
-                self.on_audio_data(bytestream)
+        try:
+            while True:
+                bytestream = await self.audio_in_queue.get()
+                self.audio_player.put(bytestream)
+
+                if self.on_audio_data:
+                    self.on_audio_data(bytestream)
+        finally:
+            player, self.audio_player = self.audio_player, None
+            metrics = player.get_metrics()
+            audio_log.info("Playback stopped. Underruns: %s, avg time-to-first-audio: %s ms", metrics["underruns"], metrics["avg_ttfa_ms"])
+            # Joining the writer thread blocks, so it happens off the loop
+            if await asyncio.to_thread(player.stop):
+                try:
+                    stream.close()
+                except Exception:
+                    pass
+            else:
+                audio_log.warning("Playback thread did not exit; leaving the output stream open")
 
-            # Play audio immediately - no buffering delays
-            try:
-                await asyncio.to_thread(stream.write, bytestream)
-            except Exception as e:
-                print(f"[ADA DEBUG] [ERR] Audio playback error: {e}")
-            
-            # If queue is empty and AI stopped, reset pre-buffer for next playback
-            if self.audio_in_queue.empty() and not self._ai_is_speaking:
-                prebuffer_complete = False
-                chunk_count = 0
+    def _on_ai_speaking_change(self, speaking):
+        """Called on the event loop when playback starts or finishes"""
+        audio_log.debug("AI %s speaking", "started" if speaking else "stopped")
 
-    async def monitor_ai_speaking_state(self):
-        """Background task to reset AI speaking state after silence"""
-        while True:
-            await asyncio.sleep(0.1)  # Check every 100ms
-            if self._ai_is_speaking:
-                # If no audio received for 1.5 seconds, consider AI stopped speaking
-                # Using longer timeout to account for natural speech pauses
-                if time.time() - self._last_ai_audio_time > 1.5:
-                    self._ai_is_speaking = False
-                    print("[ADA DEBUG] AI stopped speaking (1.5s silence)")
+    def _on_audio_played(self, chunk):
+        """Called from the playback thread as each chunk reaches the device"""
+        if self.audio_recorder and self.audio_recorder.is_recording():
+            self.audio_recorder.add_output_frame(chunk)
 
     async def get_frames(self):
         cap = await asyncio.to_thread(cv2.VideoCapture, 0, cv2.CAP_AVFOUNDATION)
@@ -1367,31 +1270,49 @@ class AudioLoop:
             if self.paused:
                 await asyncio.sleep(0.1)
                 continue
-            frame = await asyncio.to_thread(self._get_frame, cap)
-            if frame is None:
+            ret, frame = await asyncio.to_thread(self._get_frame, cap)
+            if not ret:
                 break
             await asyncio.sleep(1.0)
-            if self.out_queue:
+            # frame is None when nothing in view changed since the last one sent
+            if frame is not None and self.out_queue:
                 await self.out_queue.put(frame)
         cap.release()
 
     def _get_frame(self, cap):
+        """Returns (ok, message or None if the frame was unchanged)"""
         ret, frame = cap.read()
         if not ret:
-            return None
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        img = PIL.Image.fromarray(frame_rgb)
-        img.thumbnail([1024, 1024])
-        image_io = io.BytesIO()
-        img.save(image_io, format="jpeg")
-        image_io.seek(0)
-        image_bytes = image_io.read()
-        return {"mime_type": "image/jpeg", "data": base64.b64encode(image_bytes).decode()}
-
-    async def _get_screen(self):
-        pass 
+            return False, None
+        return True, self.frame_pipeline.process(frame)
+
+    def _get_screen(self, grabber):
+        """Grab and diff one screen frame; returns a message or None if nothing meaningful changed"""
+        return self.screen_pipeline.process(grabber.grab())
+
     async def get_screen(self):
-         pass
+        # mss handles are bound to the thread that opened them, so every grab runs on one worker
+        loop = asyncio.get_running_loop()
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix="screen")
+        grabber = None
+        try:
+            grabber = await loop.run_in_executor(executor, lambda: ScreenGrabber(mss.mss()))
+            interval = self.screen_pipeline.rate.interval
+            while True:
+                if self.paused:
+                    await asyncio.sleep(0.1)
+                    continue
+                started = time.monotonic()
+                frame = await loop.run_in_executor(executor, self._get_screen, grabber)
+                if frame is not None and self.out_queue:
+                    await self.out_queue.put(frame)
+                await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+                # Checked a full interval after the put: a frame still queued means the session is behind
+                interval = self.screen_pipeline.next_interval(self.out_queue.get_metrics() if self.out_queue else None)
+        finally:
+            if grabber:
+                executor.submit(grabber.close)
+            executor.shutdown(wait=False)
 
     async def run(self, start_message=None):
         retry_delay = 1
@@ -1404,66 +1325,77 @@ class AudioLoop:
                     client.aio.live.connect(model=MODEL, config=config) as session,
                     asyncio.TaskGroup() as tg,
                 ):
-                    self.session = session
-
-                    self.audio_in_queue = asyncio.Queue()
-                    self.out_queue = asyncio.Queue(maxsize=10)
-
-                    tg.create_task(self.send_realtime())
-                    tg.create_task(self.listen_audio())
-                    # tg.create_task(self._process_video_queue()) # Removed in favor of VAD
-
-                    if self.video_mode == "camera":
-                        tg.create_task(self.get_frames())
-                    elif self.video_mode == "screen":
-                        tg.create_task(self.get_screen())
-
-                    tg.create_task(self.receive_audio())
-                    tg.create_task(self.play_audio())
-                    tg.create_task(self.monitor_ai_speaking_state())  # Monitor AI speech state
-
-                    # Handle Startup vs Reconnect Logic
-                    if not is_reconnect:
-                        if start_message:
-                            print(f"[ADA DEBUG] [INFO] Sending start message: {start_message}")
-                            await self.session.send(input=start_message, end_of_turn=True)
+                    try:
+                        self.session = session
+
+                        self.audio_in_queue = asyncio.Queue()
+                        # Priority lanes: mic audio first, latest-only video, control text
+                        self.out_queue = OutboundScheduler(
+                            audio_window_ms=self.audio_batch_ms,
+                            audio_bytes_per_ms=SEND_SAMPLE_RATE * 2 / 1000
+                        )
+
+                        tg.create_task(self.send_realtime())
+                        tg.create_task(self.listen_audio())
+                        # tg.create_task(self._process_video_queue()) # Removed in favor of VAD
+
+                        if self.video_mode == "camera":
+                            tg.create_task(self.get_frames())
+                        elif self.video_mode == "screen":
+                            tg.create_task(self.get_screen())
+
+                        tg.create_task(self.receive_audio())
+                        tg.create_task(self.play_audio())
+
+                        # Handle Startup vs Reconnect Logic
+                        if not is_reconnect:
+                            if start_message:
+                                print(f"[ADA DEBUG] [INFO] Sending start message: {start_message}")
+                                await self.session.send(input=start_message, end_of_turn=True)
                         
-                        # Sync Project State
-                        if self.on_project_update and self.project_manager:
-                            self.on_project_update(self.project_manager.current_project)
+                            # Sync Project State
+                            if self.on_project_update and self.project_manager:
+                                self.on_project_update(self.project_manager.current_project)
                     
-                    else:
-                        print(f"[ADA DEBUG] [RECONNECT] Connection restored.")
-                        # Restore Context
-                        print(f"[ADA DEBUG] [RECONNECT] Fetching recent chat history to restore context...")
-                        history = self.project_manager.get_recent_chat_history(limit=10)
+                        else:
+                            print(f"[ADA DEBUG] [RECONNECT] Connection restored.")
+                            # Restore Context
+                            print(f"[ADA DEBUG] [RECONNECT] Fetching recent chat history to restore context...")
+                            # The interrupted turn and whatever the journal still queues belong in it too
+                            self.flush_chat()
+                            await self.chat_log.flush()
+                            history = await asyncio.to_thread(self.project_manager.get_recent_chat_history, 10)
                         
-                        context_msg = "System Notification: Connection was lost and just re-established. Here is the recent chat history to help you resume seamlessly:\n\n"
-                        for entry in history:
-                            sender = entry.get('sender', 'Unknown')
-                            text = entry.get('text', '')
-                            context_msg += f"[{sender}]: {text}\n"
+                            context_msg = "System Notification: Connection was lost and just re-established. Here is the recent chat history to help you resume seamlessly:\n\n"
+                            for entry in history:
+                                sender = entry.get('sender', 'Unknown')
+                                text = entry.get('text', '')
+                                context_msg += f"[{sender}]: {text}\n"
                         
-                        context_msg += "\nPlease acknowledge the reconnection to the user (e.g. 'I lost connection for a moment, but I'm back...') and resume what you were doing."
+                            context_msg += "\nPlease acknowledge the reconnection to the user (e.g. 'I lost connection for a moment, but I'm back...') and resume what you were doing."
                         
-                        print(f"[ADA DEBUG] [RECONNECT] Sending restoration context to model...")
-                        await self.session.send(input=context_msg, end_of_turn=True)
+                            print(f"[ADA DEBUG] [RECONNECT] Sending restoration context to model...")
+                            await self.session.send(input=context_msg, end_of_turn=True)
 
-                    # Reset retry delay on successful connection
-                    retry_delay = 1
+                        # Reset retry delay on successful connection
+                        retry_delay = 1
                     
-                    # Wait until stop event, or until the session task group exits (which happens on error)
-                    # Actually, the TaskGroup context manager will exit if any tasks fail/cancel.
-                    # We need to keep this block alive.
-                    # The original code just waited on stop_event, but that doesn't account for session death.
-                    # We should rely on the TaskGroup raising an exception when subtasks fail (like receive_audio).
+                        # Wait until stop event, or until the session task group exits (which happens on error)
+                        # Actually, the TaskGroup context manager will exit if any tasks fail/cancel.
+                        # We need to keep this block alive.
+                        # The original code just waited on stop_event, but that doesn't account for session death.
+                        # We should rely on the TaskGroup raising an exception when subtasks fail (like receive_audio).
                     
-                    # However, since receive_audio is a task in the group, if it crashes (connection closed), 
-                    # the group will cancel others and exit. We catch that exit below.
+                        # However, since receive_audio is a task in the group, if it crashes (connection closed), 
+                        # the group will cancel others and exit. We catch that exit below.
                     
-                    # We can await stop_event, but if the connection dies, receive_audio crashes -> group closes -> we exit `async with` -> restart loop.
-                    # To ensure we don't block indefinitely if connection dies silently (unlikely with receive_audio), we just wait.
-                    await self.stop_event.wait()
+                        # We can await stop_event, but if the connection dies, receive_audio crashes -> group closes -> we exit `async with` -> restart loop.
+                        # To ensure we don't block indefinitely if connection dies silently (unlikely with receive_audio), we just wait.
+                        await self.stop_event.wait()
+                    finally:
+                        # Background tool calls belong to this session: stop them before it
+                        # is closed or replaced so their responses never reach the next one
+                        await self.tool_dispatcher.cancel_all()
 
             except asyncio.CancelledError:
                 print(f"[ADA DEBUG] [STOP] Main loop cancelled.")
@@ -1483,12 +1415,20 @@ class AudioLoop:
                 
             finally:
                 # Cleanup before retry
+                if self.mic_capture:
+                    self.mic_capture.stop()
+                    self.mic_capture = None
+                    self.audio_stream = None
                 if hasattr(self, 'audio_stream') and self.audio_stream:
                     try:
                         self.audio_stream.close()
                     except: 
                         pass
 
+        # Session over: log the last message and write out anything still queued
+        self.flush_chat()
+        await self.chat_log.close()
+
 def get_input_devices():
     p = pyaudio.PyAudio()
     info = p.get_host_api_info_by_index(0)
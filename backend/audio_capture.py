@@ -0,0 +1,298 @@
+"""
+Microphone Capture for ADA V2
+Callback-mode capture into a preallocated ring buffer, plus a WAV replay stream for tests and benchmarks.
+"""
+
+import asyncio
+import collections
+import threading
+import time
+import wave
+from typing import Callable, Optional
+
+# pyaudio.paContinue / paComplete, duplicated so this module imports without PortAudio
+PA_CONTINUE = 0
+PA_COMPLETE = 1
+
+
+class RingBuffer:
+    """
+    Single-producer / single-consumer byte ring buffer.
+
+    The producer (audio callback thread) only advances `write_pos` and the
+    consumer (event loop) only advances `read_pos`, so no lock is needed:
+    each side publishes its position after touching the data. Positions are
+    absolute byte counts; the buffer index is `pos % capacity`.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._buf = bytearray(capacity)
+        self._view = memoryview(self._buf)
+        self.write_pos = 0
+        self.read_pos = 0
+        self.overflows = 0
+        self.dropped_bytes = 0
+
+    @property
+    def available(self) -> int:
+        return self.write_pos - self.read_pos
+
+    def write(self, data) -> bool:
+        """Producer side. Drops the whole block if it does not fit."""
+        size = len(data)
+        if size > self.capacity - self.available:
+            self.overflows += 1
+            self.dropped_bytes += size
+            return False
+
+        start = self.write_pos % self.capacity
+        first = min(size, self.capacity - start)
+        self._view[start:start + first] = data[:first]
+        if first < size:
+            self._view[:size - first] = data[first:]
+        self.write_pos += size
+        return True
+
+    def read(self, size: int) -> bytes:
+        """Consumer side. Caller must check `available` first."""
+        start = self.read_pos % self.capacity
+        end = start + size
+        if end <= self.capacity:
+            data = self._buf[start:end]
+        else:
+            data = self._buf[start:] + self._buf[:end - self.capacity]
+        self.read_pos += size
+        return bytes(data)
+
+    def skip(self, size: Optional[int] = None):
+        """Consumer side. Discard `size` bytes, or everything buffered."""
+        self.read_pos += self.available if size is None else min(size, self.available)
+
+
+class CallbackCapture:
+    """
+    Reads the microphone through a PyAudio stream callback.
+
+    The PortAudio thread copies each block into a RingBuffer and, only when
+    the consumer is parked waiting, schedules a wakeup with
+    loop.call_soon_threadsafe(). read() therefore costs no thread-pool
+    submission, unlike asyncio.to_thread(stream.read, ...).
+
+    `open_stream` is called as open_stream(stream_callback=...) and must
+    return a started stream, e.g. functools.partial(pya.open, ...).
+    """
+
+    def __init__(
+        self,
+        open_stream: Callable,
+        chunk_size: int = 1024,
+        sample_width: int = 2,
+        channels: int = 1,
+        capacity_chunks: int = 32
+    ):
+        self.open_stream = open_stream
+        self.chunk_bytes = chunk_size * sample_width * channels
+        self.ring = RingBuffer(self.chunk_bytes * capacity_chunks)
+        self.stream = None
+        self.loop = None
+        self.closed = False
+
+        self._waiter = None
+        # (ring end position, arrival time) per callback, for latency tracking
+        self._stamps = collections.deque()
+
+        # Metrics
+        self.callbacks = 0
+        self.wakeups = 0
+        self.chunks_read = 0
+        self.max_fill = 0
+        self.last_latency_ms = 0.0
+        self._latency_total = 0.0
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Open the stream; call from the event loop or pass `loop`"""
+        self.loop = loop or asyncio.get_running_loop()
+        self.closed = False
+        self.stream = self.open_stream(stream_callback=self._callback)
+
+    def stop(self):
+        """Stop and close the stream, releasing any pending read()"""
+        self.closed = True
+        stream, self.stream = self.stream, None
+        if stream is not None:
+            try:
+                stream.stop_stream()
+                stream.close()
+            except Exception as e:
+                print(f"[CAPTURE] Error closing stream: {e}")
+        self._wake()
+
+    def clear(self):
+        """Discard buffered audio (e.g. while paused)"""
+        self.ring.skip()
+        self._stamps.clear()
+
+    async def read(self) -> Optional[bytes]:
+        """Return the next chunk, or None once stopped"""
+        ring = self.ring
+        while ring.available < self.chunk_bytes:
+            if self.closed:
+                return None
+            self._waiter = self.loop.create_future()
+            # Re-check after publishing the waiter so a block that landed in
+            # between is not missed
+            if ring.available >= self.chunk_bytes or self.closed:
+                self._waiter = None
+                continue
+            await self._waiter
+
+        data = ring.read(self.chunk_bytes)
+        self.chunks_read += 1
+        self._record_latency(ring.read_pos)
+        return data
+
+    def get_metrics(self) -> dict:
+        """Capture statistics"""
+        return {
+            "callbacks": self.callbacks,
+            "wakeups": self.wakeups,
+            "chunks_read": self.chunks_read,
+            "buffered_bytes": self.ring.available,
+            "max_fill_bytes": self.max_fill,
+            "overflows": self.ring.overflows,
+            "dropped_bytes": self.ring.dropped_bytes,
+            "last_latency_ms": self.last_latency_ms,
+            "avg_latency_ms": self._latency_total / self.chunks_read if self.chunks_read else 0.0
+        }
+
+    def _callback(self, in_data, frame_count, time_info, status):
+        """PortAudio thread: copy into the ring and wake the consumer if parked"""
+        self.callbacks += 1
+        if in_data and self.ring.write(in_data):
+            self._stamps.append((self.ring.write_pos, time.monotonic()))
+            fill = self.ring.available
+            if fill > self.max_fill:
+                self.max_fill = fill
+            if self._waiter is not None:
+                self._wake()
+        return (None, PA_COMPLETE if self.closed else PA_CONTINUE)
+
+    def _wake(self):
+        waiter, self._waiter = self._waiter, None
+        if waiter is None or self.loop is None or self.loop.is_closed():
+            return
+        self.wakeups += 1
+        self.loop.call_soon_threadsafe(self._resolve, waiter)
+
+    @staticmethod
+    def _resolve(waiter):
+        if not waiter.done():
+            waiter.set_result(None)
+
+    def _record_latency(self, read_end: int):
+        # Latency of a chunk = time since the callback that completed it
+        arrived = None
+        stamps = self._stamps
+        while stamps and stamps[0][0] <= read_end:
+            arrived = stamps.popleft()[1]
+        if arrived is None and stamps:
+            arrived = stamps[0][1]
+        if arrived is not None:
+            self.last_latency_ms = (time.monotonic() - arrived) * 1000.0
+            self._latency_total += self.last_latency_ms
+
+
+class WavReplayStream:
+    """
+    Stand-in for a PyAudio input stream that plays a WAV file.
+
+    With `stream_callback` it behaves like a callback-mode stream and
+    delivers one block per `frames_per_buffer` from its own thread, paced at
+    `speed` times real time (0 = as fast as possible). Without a callback it
+    serves blocking read() calls.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        frames_per_buffer: int = 1024,
+        stream_callback: Optional[Callable] = None,
+        speed: float = 1.0,
+        loop_file: bool = False
+    ):
+        with wave.open(str(path), 'rb') as wf:
+            self.sample_rate = wf.getframerate()
+            self.channels = wf.getnchannels()
+            self.sample_width = wf.getsampwidth()
+            self._pcm = wf.readframes(wf.getnframes())
+
+        self.frames_per_buffer = frames_per_buffer
+        self.block_bytes = frames_per_buffer * self.sample_width * self.channels
+        self.stream_callback = stream_callback
+        self.speed = speed
+        self.loop_file = loop_file
+        self.position = 0
+        self.blocks_delivered = 0
+        self.finished = threading.Event()
+
+        self._active = False
+        self._wake = threading.Event()
+        self._thread = None
+        self.start_stream()
+
+    def read(self, num_frames: int, exception_on_overflow: bool = True) -> bytes:
+        """Blocking-mode read; pads with silence past the end of the file"""
+        data = self._next_block(num_frames * self.sample_width * self.channels)
+        if self.speed > 0:
+            time.sleep(num_frames / self.sample_rate / self.speed)
+        return data
+
+    def start_stream(self):
+        self._active = True
+        self._wake.clear()
+        if self.stream_callback is not None and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="wav-replay", daemon=True)
+            self._thread.start()
+
+    def stop_stream(self):
+        self._active = False
+        self._wake.set()
+        thread, self._thread = self._thread, None
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=2.0)
+
+    def close(self):
+        self.stop_stream()
+
+    def is_active(self) -> bool:
+        return self._active
+
+    def _next_block(self, size: int) -> bytes:
+        block = self._pcm[self.position:self.position + size]
+        self.position += len(block)
+        if len(block) < size:
+            if self.loop_file and self._pcm:
+                self.position = 0
+                return block + self._next_block(size - len(block))
+            block += bytes(size - len(block))
+        return block
+
+    def _run(self):
+        period = self.frames_per_buffer / self.sample_rate
+        next_time = time.monotonic()
+        while self._active:
+            if not self.loop_file and self.position >= len(self._pcm):
+                break
+            block = self._next_block(self.block_bytes)
+            self.blocks_delivered += 1
+            _, flag = self.stream_callback(block, self.frames_per_buffer, {}, 0)
+            if flag != PA_CONTINUE:
+                break
+            if self.speed > 0:
+                next_time += period / self.speed
+                delay = next_time - time.monotonic()
+                if delay > 0:
+                    self._wake.wait(delay)
+        self._active = False
+        self.finished.set()
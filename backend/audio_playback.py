@@ -0,0 +1,267 @@
+"""
+Audio Playback Engine for ADA V2
+Adaptive jitter buffer that feeds the output stream from one long-lived writer thread.
+"""
+
+import asyncio
+import collections
+import threading
+import time
+from typing import Callable, Optional
+
+
+class JitterBufferPlayer:
+    """
+    Plays model audio through a blocking output stream.
+
+    - The prebuffer target is sized from the measured arrival jitter of the
+      incoming chunks (RFC 3550 style running estimate) instead of a fixed
+      chunk count.
+    - A single writer thread owns stream.write(), so there is no thread-pool
+      hop per chunk; it sleeps on a condition variable and is woken by put().
+    - The speaking state is published as an asyncio.Event (plus an optional
+      callback) instead of being polled.
+    - Time-to-first-audio and underruns are tracked for get_metrics().
+    """
+
+    def __init__(
+        self,
+        stream,
+        sample_rate: int = 24000,
+        sample_width: int = 2,
+        min_prebuffer_ms: float = 80.0,
+        max_prebuffer_ms: float = 600.0,
+        initial_jitter_ms: float = 40.0,
+        jitter_multiplier: float = 3.0,
+        speaking_hangover_s: float = 1.5,
+        on_speaking_change: Optional[Callable[[bool], None]] = None,
+        on_write: Optional[Callable[[bytes], None]] = None,
+        loop: Optional[asyncio.AbstractEventLoop] = None
+    ):
+        self.stream = stream
+        self.bytes_per_ms = sample_rate * sample_width / 1000.0
+        self.min_prebuffer_ms = min_prebuffer_ms
+        self.max_prebuffer_ms = max_prebuffer_ms
+        self.jitter_multiplier = jitter_multiplier
+        self.speaking_hangover_s = speaking_hangover_s
+        self.on_speaking_change = on_speaking_change
+        # Called from the writer thread with each chunk as it goes to the device
+        self.on_write = on_write
+        self.loop = loop
+
+        self.speaking = asyncio.Event()
+
+        self._chunks = collections.deque()
+        self._buffered_bytes = 0
+        self._cond = threading.Condition()
+        self._thread = None
+        self._running = False
+
+        # Playback state (guarded by _cond): idle -> prebuffering -> playing -> drained
+        self._state = "idle"
+        self._burst_start = None
+        self._burst_from_idle = False
+        self._turn_ended = False
+        self._is_speaking = False
+        self._last_write_end = 0.0
+
+        # Arrival jitter estimate
+        self.jitter_ms = initial_jitter_ms
+        self._last_arrival = None
+        self._last_duration_ms = 0.0
+
+        # Metrics
+        self.underruns = 0
+        self.chunks_played = 0
+        self.chunks_dropped = 0
+        self.last_ttfa_ms = None
+        self._ttfa_total = 0.0
+        self._ttfa_count = 0
+
+    @property
+    def prebuffer_target_ms(self) -> float:
+        """Current prebuffer target derived from the jitter estimate"""
+        target = self.min_prebuffer_ms + self.jitter_multiplier * self.jitter_ms
+        return min(max(target, self.min_prebuffer_ms), self.max_prebuffer_ms)
+
+    @property
+    def buffered_ms(self) -> float:
+        return self._buffered_bytes / self.bytes_per_ms
+
+    def start(self):
+        """Start the writer thread"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._writer, name="ada-playback", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 2.0) -> bool:
+        """
+        Stop the writer thread and drop anything still queued. Blocks for up
+        to `timeout`; returns False if the thread is still inside
+        stream.write, in which case the stream must not be closed yet.
+        """
+        with self._cond:
+            self._running = False
+            self._chunks.clear()
+            self._buffered_bytes = 0
+            self._cond.notify_all()
+        stopped = True
+        if self._thread:
+            self._thread.join(timeout)
+            stopped = not self._thread.is_alive()
+            if stopped:
+                self._thread = None
+        self._set_speaking(False)
+        return stopped
+
+    def put(self, data: bytes):
+        """Queue one chunk of PCM; called from the event loop"""
+        if not data:
+            return
+        now = time.monotonic()
+        duration_ms = len(data) / self.bytes_per_ms
+
+        with self._cond:
+            # Interarrival deviation from the previous chunk's duration
+            # (skipped across turn boundaries, where the gap is not network jitter)
+            if self._last_arrival is not None and self._state != "idle":
+                # Early arrivals count as zero lateness so the estimate can decay
+                lateness = max((now - self._last_arrival) * 1000.0 - self._last_duration_ms, 0.0)
+                self.jitter_ms += (lateness - self.jitter_ms) / 16.0
+            self._last_arrival = now
+            self._last_duration_ms = duration_ms
+
+            if self._state in ("idle", "drained"):
+                if self._state == "drained" and not self._turn_ended:
+                    # Data resumed after the buffer ran dry mid-turn
+                    self.underruns += 1
+                self._burst_from_idle = self._state == "idle"
+                self._burst_start = now
+                self._state = "prebuffering"
+            self._turn_ended = False
+
+            self._chunks.append(data)
+            self._buffered_bytes += len(data)
+            self._cond.notify()
+
+    def end_of_turn(self):
+        """Mark that the model finished its turn, so draining is not an underrun"""
+        with self._cond:
+            self._turn_ended = True
+            self._cond.notify()
+
+    def clear(self) -> int:
+        """Drop queued audio (interruption); returns the number of chunks dropped"""
+        with self._cond:
+            count = len(self._chunks)
+            self._chunks.clear()
+            self._buffered_bytes = 0
+            self.chunks_dropped += count
+            if self._state in ("prebuffering", "playing"):
+                self._state = "drained"
+            self._turn_ended = True
+            self._cond.notify()
+        return count
+
+    def get_metrics(self) -> dict:
+        """Playback statistics"""
+        with self._cond:
+            return {
+                "buffered_ms": self.buffered_ms,
+                "prebuffer_target_ms": self.prebuffer_target_ms,
+                "jitter_ms": self.jitter_ms,
+                "underruns": self.underruns,
+                "chunks_played": self.chunks_played,
+                "chunks_dropped": self.chunks_dropped,
+                "last_ttfa_ms": self.last_ttfa_ms,
+                "avg_ttfa_ms": self._ttfa_total / self._ttfa_count if self._ttfa_count else None,
+                "is_speaking": self._is_speaking
+            }
+
+    def _writer(self):
+        """Writer thread: prebuffer, then write chunks back to back"""
+        while True:
+            with self._cond:
+                chunk = self._next_chunk()
+                if chunk is None:
+                    return
+
+            if self.on_write:
+                try:
+                    self.on_write(chunk)
+                except Exception as e:
+                    print(f"[PLAYBACK] on_write callback error: {e}")
+
+            try:
+                self.stream.write(chunk)
+            except Exception as e:
+                print(f"[PLAYBACK] Audio playback error: {e}")
+
+            with self._cond:
+                self.chunks_played += 1
+                self._last_write_end = time.monotonic()
+
+    def _next_chunk(self) -> Optional[bytes]:
+        """Block (holding _cond) until a chunk should be played; None on stop"""
+        while self._running:
+            now = time.monotonic()
+
+            if self._state == "playing":
+                if self._chunks:
+                    return self._pop()
+                self._state = "drained"
+                continue
+
+            if self._state == "prebuffering":
+                # Start once enough audio is queued, or once the burst has
+                # waited as long as the target (short replies)
+                target_ms = self.prebuffer_target_ms
+                waited_ms = (now - self._burst_start) * 1000.0
+                if self._turn_ended or self.buffered_ms >= target_ms or waited_ms >= target_ms:
+                    self._state = "playing"
+                    if self._burst_from_idle:
+                        self.last_ttfa_ms = waited_ms
+                        self._ttfa_total += waited_ms
+                        self._ttfa_count += 1
+                    self._set_speaking(True)
+                    continue
+                self._cond.wait((target_ms - waited_ms) / 1000.0)
+                continue
+
+            if self._state == "drained":
+                # Wait for more audio, the end of the turn, or the speaking hangover
+                remaining = self.speaking_hangover_s - (now - self._last_write_end)
+                if self._turn_ended or remaining <= 0:
+                    self._state = "idle"
+                    self._set_speaking(False)
+                    continue
+                self._cond.wait(remaining)
+                continue
+
+            self._cond.wait()
+        return None
+
+    def _pop(self) -> bytes:
+        chunk = self._chunks.popleft()
+        self._buffered_bytes -= len(chunk)
+        return chunk
+
+    def _set_speaking(self, value: bool):
+        """Publish the speaking state to the event loop"""
+        if value == self._is_speaking:
+            return
+        self._is_speaking = value
+        if self.loop is not None and not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self._apply_speaking, value)
+        else:
+            self._apply_speaking(value)
+
+    def _apply_speaking(self, value: bool):
+        if value:
+            self.speaking.set()
+        else:
+            self.speaking.clear()
+        if self.on_speaking_change:
+            self.on_speaking_change(value)
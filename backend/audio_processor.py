@@ -4,9 +4,8 @@ Provides advanced voice activity detection, noise suppression, and audio quality
 """
 
 import numpy as np
-import struct
 import time
-from typing import Optional, Tuple
+from typing import Iterator, Optional, Tuple
 from dataclasses import dataclass
 
 try:
@@ -34,25 +33,214 @@ class AudioMetrics:
     clipping_detected: bool
 
 
+@dataclass
+class ChunkAnalysis:
+    """Result of one fused pass over a mic chunk"""
+    data: bytes  # Gated PCM to send/record
+    gain: float
+    rms_level: float
+    peak_level: float
+    clipping_detected: bool
+    is_speech: bool
+    vad_confidence: float
+    latency_ms: float
+
+    def to_metrics(self) -> dict:
+        """Payload for the on_audio_metrics callback"""
+        return {
+            'rms': self.rms_level,
+            'peak': self.peak_level,
+            'latency_ms': self.latency_ms,
+            'vad_confidence': self.vad_confidence,
+            'clipping': self.clipping_detected,
+            'is_speech': self.is_speech
+        }
+
+
+class OnePoleSmoother:
+    """
+    Vectorized one-pole low-pass y[n] = a*y[n-1] + (1-a)*x[n].
+
+    The recursion is evaluated in closed form per block,
+    y = a^(n+1) * (y[-1] + (1-a) * cumsum(a^-(k+1) * x[k])),
+    using precomputed power tables and caller-provided output buffers,
+    so filtering allocates nothing. Time constants shorter than one sample
+    are clamped to one sample, which keeps a^-BLOCK (at most e^256) finite.
+    """
+
+    BLOCK = 256
+
+    def __init__(self, time_constant_ms: float, sample_rate: int = 16000):
+        samples = max(time_constant_ms * sample_rate / 1000.0, 1.0)
+        self.coeff = float(np.exp(-1.0 / samples))
+        k = np.arange(1, self.BLOCK + 1, dtype=np.float64)
+        self._growth = self.coeff ** -k  # a^-(k+1)
+        self._decay = self.coeff ** k    # a^(n+1)
+        self._scratch = np.empty(self.BLOCK, dtype=np.float64)
+        self.state = 0.0
+
+    def filter(self, x: np.ndarray, out: np.ndarray) -> np.ndarray:
+        """Filter x into out (same length, float64) and carry the state"""
+        gain = 1.0 - self.coeff
+        for start in range(0, x.shape[0], self.BLOCK):
+            stop = min(start + self.BLOCK, x.shape[0])
+            m = stop - start
+            tmp = self._scratch[:m]
+            np.multiply(self._growth[:m], x[start:stop], out=tmp)
+            tmp.cumsum(out=tmp)
+            np.multiply(tmp, gain, out=tmp)
+            np.add(tmp, self.state, out=tmp)
+            np.multiply(tmp, self._decay[:m], out=out[start:stop])
+            self.state = float(out[stop - 1])
+        return out
+
+
+def visualizer_peaks(audio_data: bytes, bins: int = 64) -> bytes:
+    """
+    Reduce int16 PCM to `bins` peak magnitudes scaled to 0-255.
+
+    Used as the compact playback stream for the frontend visualizer.
+    """
+    samples = np.frombuffer(audio_data, dtype=np.int16)
+    per_bin = samples.shape[0] // bins
+    if per_bin == 0:
+        return bytes(bins)
+
+    blocks = samples[:per_bin * bins].reshape(bins, per_bin)
+    peaks = np.maximum(blocks.max(axis=1).astype(np.int32), -blocks.min(axis=1).astype(np.int32))
+    return np.minimum(peaks >> 7, 255).astype(np.uint8).tobytes()
+
+
 class NoiseGate:
-    """Simple noise gate to reduce background noise"""
+    """
+    Noise gate to reduce background noise.
+
+    mode="block" applies one envelope value per chunk (original behaviour).
+    mode="sample" tracks the signal level per sample and smooths the gate
+    gain with separate attack and release time constants, writing into
+    persistent buffers so no arrays are allocated per chunk.
+    """
+
+    MODES = ("block", "sample")
+
+    def __init__(self, threshold_db: float = -45.0, attack_ms: float = 5.0, release_ms: float = 150.0, sample_rate: int = 16000, mode: str = "block", detector_ms: float = 10.0):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown noise gate mode '{mode}', expected one of {self.MODES}")
 
-    def __init__(self, threshold_db: float = -45.0, attack_ms: float = 5.0, release_ms: float = 150.0, sample_rate: int = 16000):
         self.threshold = 10 ** (threshold_db / 20.0)  # Convert dB to linear
         self.attack_samples = int(sample_rate * attack_ms / 1000.0)
         self.release_samples = int(sample_rate * release_ms / 1000.0)
         self.envelope = 0.0
         self.is_open = False
+        self.mode = mode
+
+        if mode == "sample":
+            # Mean-square level detector and gain smoothers
+            self._level = OnePoleSmoother(detector_ms, sample_rate)
+            self._attack = OnePoleSmoother(attack_ms, sample_rate)
+            self._release = OnePoleSmoother(release_ms, sample_rate)
+            self._threshold_sq = self.threshold ** 2
+            self._alloc(4096)
+
+    def _alloc(self, count: int):
+        """(Re)size the persistent per-sample buffers"""
+        self._capacity = count
+        self._work = np.empty(count, dtype=np.float32)
+        self._level_buf = np.empty(count, dtype=np.float64)
+        self._target = np.empty(count, dtype=np.float64)
+        self._open = np.empty(count, dtype=np.bool_)
+        self._gain_a = np.empty(count, dtype=np.float64)
+        self._gain_r = np.empty(count, dtype=np.float64)
+        self._gain32 = np.empty(count, dtype=np.float32)
+        self._pcm = np.empty(count, dtype=np.int16)
 
     def process(self, audio_data: bytes) -> bytes:
         """Apply noise gate to audio data"""
+        if self.mode == "sample":
+            return self.process_into(audio_data).tobytes()
+
         # Convert bytes to numpy array
         samples = np.frombuffer(audio_data, dtype=np.int16).astype(np.float32) / 32768.0
 
         # Calculate envelope
         rms = np.sqrt(np.mean(samples ** 2))
+        self.update_envelope(rms)
+
+        # Apply envelope
+        processed = samples * self.envelope
+
+        # Convert back to int16
+        processed = np.clip(processed * 32768.0, -32768, 32767).astype(np.int16)
+
+        return processed.tobytes()
+
+    def process_into(self, audio_data: bytes) -> np.ndarray:
+        """
+        Per-sample gate without allocations (sample mode).
+
+        Returns a view of an internal int16 buffer that is overwritten by the next call.
+        """
+        samples = np.frombuffer(audio_data, dtype=np.int16)
+        count = samples.shape[0]
+        if count > self._capacity:
+            self._alloc(count)
+
+        work = self._work[:count]
+        np.copyto(work, samples, casting='unsafe')
+        np.multiply(work, np.float32(1.0 / 32768.0), out=work)
+        self.apply(work)
+
+        pcm = self._pcm[:count]
+        np.multiply(work, np.float32(32768.0), out=work)
+        work.clip(np.float32(-32768), np.float32(32767), out=work)
+        np.copyto(pcm, work, casting='unsafe')
+        return pcm
+
+    def apply(self, work: np.ndarray) -> float:
+        """
+        Gate normalized float samples in place (sample mode).
 
-        # Update gate state
+        Returns the last gain value, which is also stored in self.envelope.
+        """
+        count = work.shape[0]
+        if count == 0:
+            return self.envelope
+        if count > self._capacity:
+            self._alloc(count)
+
+        level = self._level_buf[:count]
+        target = self._target[:count]
+        is_open = self._open[:count]
+        gain_a = self._gain_a[:count]
+        gain_r = self._gain_r[:count]
+        gain32 = self._gain32[:count]
+
+        # Smoothed mean-square level, compared against threshold^2.
+        # Dtype changes go through copyto so ufuncs never need cast buffers.
+        np.copyto(target, work, casting='unsafe')
+        np.multiply(target, target, out=target)
+        self._level.filter(target, level)
+        np.greater(level, self._threshold_sq, out=is_open)
+        np.copyto(target, is_open, casting='unsafe')
+
+        # Fast attack and slow release: the larger of the two smoothed targets
+        # follows the attack curve when opening and the release curve when closing
+        self._attack.filter(target, gain_a)
+        self._release.filter(target, gain_r)
+        np.maximum(gain_a, gain_r, out=gain_a)
+
+        np.copyto(gain32, gain_a, casting='unsafe')
+        np.multiply(work, gain32, out=work)
+
+        self.envelope = float(gain_a[-1])
+        if is_open[-1]:
+            self.is_open = True
+        elif self.envelope < 0.01:
+            self.is_open = False
+        return self.envelope
+
+    def update_envelope(self, rms: float) -> float:
+        """Advance the gate envelope for one chunk with the given normalized RMS (block mode)"""
         if rms > self.threshold:
             # Attack phase
             target = 1.0
@@ -64,14 +252,195 @@ class NoiseGate:
             self.envelope += (target - self.envelope) / max(1, self.release_samples)
             if self.envelope < 0.01:
                 self.is_open = False
+        return self.envelope
 
-        # Apply envelope
-        processed = samples * self.envelope
 
-        # Convert back to int16
-        processed = np.clip(processed * 32768.0, -32768, 32767).astype(np.int16)
+class RMSVoiceDetector:
+    """
+    Energy-based voice activity detector with an adaptive noise floor.
 
-        return processed.tobytes()
+    Works on zero-copy int16 views of the incoming bytes and a preallocated
+    float32 scratch buffer, so a detection costs one cast and one dot product.
+    """
+
+    def __init__(
+        self,
+        base_threshold: float = 800.0,
+        noise_margin: float = 3.0,
+        min_threshold_ratio: float = 0.5,
+        max_threshold_ratio: float = 4.0,
+        floor_rise: float = 0.02,
+        floor_fall: float = 0.2,
+        max_frame_samples: int = 4096
+    ):
+        self.base_threshold = float(base_threshold)
+        self.noise_margin = noise_margin
+        self.min_threshold = self.base_threshold * min_threshold_ratio
+        self.max_threshold = self.base_threshold * max_threshold_ratio
+        self.floor_rise = floor_rise
+        self.floor_fall = floor_fall
+
+        # Start with a floor that reproduces the fixed threshold
+        self.noise_floor = self.base_threshold / noise_margin
+        self.threshold = self.base_threshold
+        self.last_rms = 0.0
+
+        self._scratch = np.empty(max_frame_samples, dtype=np.float32)
+
+    def frame_rms(self, audio_data: bytes) -> float:
+        """RMS of an int16 PCM buffer (bytes, bytearray or memoryview)"""
+        samples = np.frombuffer(audio_data, dtype=np.int16)
+        count = samples.shape[0]
+        if count == 0:
+            return 0.0
+
+        if count > self._scratch.shape[0]:
+            self._scratch = np.empty(count, dtype=np.float32)
+        work = self._scratch[:count]
+        np.copyto(work, samples, casting='unsafe')
+        return float(np.sqrt(np.dot(work, work) / count))
+
+    def process(self, audio_data: bytes) -> Tuple[bool, float]:
+        """
+        Classify one frame and update the noise floor
+
+        Returns:
+            Tuple of (is_speech: bool, rms: float)
+        """
+        return self.classify(self.frame_rms(audio_data))
+
+    def classify(self, rms: float) -> Tuple[bool, float]:
+        """Classify a frame from an already computed int16-scale RMS"""
+        self.last_rms = rms
+        is_speech = rms > self.threshold
+        self.update_noise_floor(rms, is_speech)
+        return is_speech, rms
+
+    def update_noise_floor(self, rms: float, is_speech: bool):
+        """Track background level: fall quickly, rise slowly and only on silence"""
+        if rms < self.noise_floor:
+            self.noise_floor += (rms - self.noise_floor) * self.floor_fall
+        elif not is_speech:
+            self.noise_floor += (rms - self.noise_floor) * self.floor_rise
+
+        self.threshold = min(max(self.noise_floor * self.noise_margin, self.min_threshold), self.max_threshold)
+
+    def reset(self):
+        """Forget the learned noise floor"""
+        self.noise_floor = self.base_threshold / self.noise_margin
+        self.threshold = self.base_threshold
+        self.last_rms = 0.0
+
+
+class VADFrameBuffer:
+    """
+    Re-frames arbitrary-length PCM chunks into fixed 10/20/30 ms frames for WebRTC VAD.
+
+    Whole frames are yielded as memoryview slices of the incoming chunk. Only the
+    partial frame left at the end of a chunk is copied into a small staging buffer
+    and completed with the head of the next chunk.
+    """
+
+    def __init__(self, sample_rate: int = 16000, frame_duration_ms: int = 30, smoothing_ms: float = 90.0):
+        if frame_duration_ms not in (10, 20, 30):
+            raise ValueError("WebRTC VAD frames must be 10, 20 or 30 ms")
+
+        self.sample_rate = sample_rate
+        self.frame_duration_ms = frame_duration_ms
+        self.frame_bytes = int(sample_rate * frame_duration_ms / 1000) * 2
+
+        # Staging buffer for the frame that straddles two chunks
+        self._pending = bytearray(self.frame_bytes)
+        self._pending_view = memoryview(self._pending)
+        self._pending_len = 0
+
+        # Exponential smoothing of per-frame decisions
+        self.smoothing = min(1.0, frame_duration_ms / max(smoothing_ms, frame_duration_ms))
+        self.speech_probability = 0.0
+
+    def frames(self, audio_data: bytes) -> Iterator[memoryview]:
+        """Yield every complete frame available after appending audio_data"""
+        data = memoryview(audio_data).cast('B')
+        offset = 0
+
+        # Complete the frame carried over from the previous chunk
+        if self._pending_len:
+            needed = self.frame_bytes - self._pending_len
+            take = min(needed, len(data))
+            self._pending_view[self._pending_len:self._pending_len + take] = data[:take]
+            self._pending_len += take
+            offset = take
+            if self._pending_len < self.frame_bytes:
+                return
+            self._pending_len = 0
+            yield self._pending_view
+
+        # Whole frames straight from the incoming chunk
+        end = offset + ((len(data) - offset) // self.frame_bytes) * self.frame_bytes
+        while offset < end:
+            yield data[offset:offset + self.frame_bytes]
+            offset += self.frame_bytes
+
+        # Carry the remainder over
+        remainder = len(data) - offset
+        if remainder:
+            self._pending_view[:remainder] = data[offset:]
+            self._pending_len = remainder
+
+    def update(self, is_speech: bool) -> float:
+        """Fold one frame decision into the smoothed speech probability"""
+        target = 1.0 if is_speech else 0.0
+        self.speech_probability += (target - self.speech_probability) * self.smoothing
+        return self.speech_probability
+
+    @property
+    def pending_bytes(self) -> int:
+        return self._pending_len
+
+    def reset(self):
+        """Drop carried-over audio and smoothing state"""
+        self._pending_len = 0
+        self.speech_probability = 0.0
+
+
+class SpeechSegmenter:
+    """
+    Utterance state machine on top of per-chunk VAD decisions.
+
+    Speech starts on the first speech chunk and ends once silence has lasted
+    longer than `silence_duration` seconds. Time is passed in, so the same
+    logic runs on wall-clock time live and on stream time offline.
+    """
+
+    ONSET = "onset"
+    OFFSET = "offset"
+
+    def __init__(self, silence_duration: float = 0.5):
+        self.silence_duration = silence_duration
+        self.is_speaking = False
+        self.silence_start = None
+
+    def update(self, is_speech: bool, now: float) -> Optional[str]:
+        """Returns ONSET / OFFSET on a transition, otherwise None"""
+        if is_speech:
+            self.silence_start = None
+            if not self.is_speaking:
+                self.is_speaking = True
+                return self.ONSET
+            return None
+
+        if self.is_speaking:
+            if self.silence_start is None:
+                self.silence_start = now
+            elif now - self.silence_start > self.silence_duration:
+                self.is_speaking = False
+                self.silence_start = None
+                return self.OFFSET
+        return None
+
+    def reset(self):
+        self.is_speaking = False
+        self.silence_start = None
 
 
 class EnhancedAudioProcessor:
@@ -89,11 +458,17 @@ class EnhancedAudioProcessor:
         vad_aggressiveness: int = 2,  # 0-3, higher = more aggressive filtering
         enable_noise_gate: bool = True,
         noise_gate_threshold_db: float = -40.0,
-        fallback_rms_threshold: int = 800
+        noise_gate_mode: str = "block",
+        fallback_rms_threshold: int = 800,
+        vad_frame_ms: int = 30,
+        speech_probability_threshold: float = 0.5
     ):
         self.sample_rate = sample_rate
         self.fallback_rms_threshold = fallback_rms_threshold
 
+        # Energy detector used whenever WebRTC VAD can't handle the frame
+        self.rms_detector = RMSVoiceDetector(base_threshold=fallback_rms_threshold)
+
         # WebRTC VAD (works only with 8kHz, 16kHz, 32kHz, 48kHz and frame sizes of 10, 20, or 30 ms)
         self.vad = None
         if WEBRTCVAD_AVAILABLE and sample_rate in [8000, 16000, 32000, 48000]:
@@ -104,14 +479,26 @@ class EnhancedAudioProcessor:
                 print(f"[AUDIO] Failed to initialize WebRTC VAD: {e}")
                 self.vad = None
 
+        # Re-framer so mic chunks of any size can be fed to WebRTC VAD
+        self.vad_framer = VADFrameBuffer(sample_rate=sample_rate, frame_duration_ms=vad_frame_ms)
+        self.speech_probability_threshold = speech_probability_threshold
+        self.last_is_speech = False
+        self.last_confidence = 0.0
+
         # Noise gate
         self.noise_gate = None
         if enable_noise_gate:
             self.noise_gate = NoiseGate(
                 threshold_db=noise_gate_threshold_db,
-                sample_rate=sample_rate
+                sample_rate=sample_rate,
+                mode=noise_gate_mode
             )
-            print(f"[AUDIO] Noise gate enabled (threshold: {noise_gate_threshold_db} dB)")
+            print(f"[AUDIO] Noise gate enabled (threshold: {noise_gate_threshold_db} dB, mode: {noise_gate_mode})")
+
+        # Scratch buffers for the fused analyze() pass, grown on demand
+        self._work = np.empty(0, dtype=np.float32)
+        self._pcm_out = np.empty(0, dtype=np.int16)
+        self._last_analyze_time = time.time()
 
         # Metrics tracking
         self.last_process_time = time.time()
@@ -128,51 +515,118 @@ class EnhancedAudioProcessor:
 
     def detect_speech(self, audio_data: bytes, frame_duration_ms: int = 30) -> Tuple[bool, float]:
         """
-        Detect speech in audio using WebRTC VAD or fallback RMS method
+        Detect speech in audio using WebRTC VAD or fallback RMS method.
+
+        Chunks that are not exactly one VAD frame are re-framed through
+        vad_framer; the per-frame decisions are smoothed into a probability.
 
         Returns:
             Tuple of (is_speech: bool, confidence: float)
         """
-        start_time = time.time()
+        return self._detect_speech(audio_data, frame_duration_ms, rms=None)
 
+    def _detect_speech(self, audio_data: bytes, frame_duration_ms: int, rms: Optional[float]) -> Tuple[bool, float]:
+        """detect_speech, optionally reusing an RMS the caller already computed"""
         # Try WebRTC VAD first
         if self.vad is not None:
             try:
-                # WebRTC VAD requires specific frame durations (10, 20, or 30 ms)
-                # Ensure audio_data matches the expected length
-                expected_length = int(self.sample_rate * frame_duration_ms / 1000) * 2  # 2 bytes per sample
-
-                if len(audio_data) == expected_length:
-                    is_speech = self.vad.is_speech(audio_data, self.sample_rate)
-                    confidence = 1.0 if is_speech else 0.0
-
-                    # Update metrics
-                    latency_ms = (time.time() - start_time) * 1000
-                    self.total_frames_processed += 1
-                    if is_speech:
-                        self.speech_frames += 1
-
-                    return is_speech, confidence
+                is_speech, confidence = self._detect_speech_webrtc(audio_data, frame_duration_ms)
+                self.total_frames_processed += 1
+                if is_speech:
+                    self.speech_frames += 1
+                self.last_is_speech, self.last_confidence = is_speech, confidence
+                return is_speech, confidence
             except Exception as e:
                 print(f"[AUDIO] WebRTC VAD error: {e}, falling back to RMS")
+                self.vad_framer.reset()
 
         # Fallback to RMS-based detection
-        is_speech, rms = self._detect_speech_rms(audio_data)
-        confidence = min(rms / (self.fallback_rms_threshold * 2), 1.0) if is_speech else 0.0
+        if rms is None:
+            is_speech, rms = self._detect_speech_rms(audio_data)
+        else:
+            is_speech, rms = self.rms_detector.classify(rms)
+        confidence = min(rms / (self.rms_detector.threshold * 2), 1.0) if is_speech else 0.0
 
+        self.last_is_speech, self.last_confidence = is_speech, confidence
         return is_speech, confidence
 
-    def _detect_speech_rms(self, audio_data: bytes) -> Tuple[bool, int]:
-        """Fallback RMS-based speech detection"""
-        count = len(audio_data) // 2
-        if count > 0:
-            shorts = struct.unpack(f"<{count}h", audio_data)
-            sum_squares = sum(s**2 for s in shorts)
-            rms = int(np.sqrt(sum_squares / count))
+    def analyze(self, audio_data: bytes, frame_duration_ms: int = 30) -> ChunkAnalysis:
+        """
+        Single pass over a mic chunk: noise gate, level metrics and VAD.
+
+        The chunk is decoded once into a reusable float32 buffer; gain, RMS,
+        peak and clipping come from that pass and the VAD runs on the gated
+        PCM. Replaces preprocess_audio + detect_speech + calculate_metrics.
+        """
+        samples = np.frombuffer(audio_data, dtype=np.int16)
+        count = samples.shape[0]
+        if count > self._work.shape[0]:
+            self._work = np.empty(count, dtype=np.float32)
+            self._pcm_out = np.empty(count, dtype=np.int16)
+        work = self._work[:count]
+
+        # Decode once (int16 scale); levels are reported normalized to [-1, 1)
+        np.copyto(work, samples, casting='unsafe')
+        if count:
+            in_rms = float(np.sqrt(np.dot(work, work) / count)) / 32768.0
+            in_peak = max(int(samples.max()), -int(samples.min())) / 32768.0
         else:
-            rms = 0
+            in_rms = in_peak = 0.0
+
+        # Gate gain, applied in place only when it changes the signal
+        gain = 1.0
+        data = audio_data
+        rms, peak = in_rms, in_peak
+        if self.noise_gate and self.noise_gate.mode == "sample":
+            np.multiply(work, np.float32(1.0 / 32768.0), out=work)
+            gain = self.noise_gate.apply(work)
+            if count:
+                rms = float(np.sqrt(np.dot(work, work) / count))
+                peak = float(max(work.max(), -work.min()))
+            data = self._encode_pcm(work, 32768.0, count)
+        elif self.noise_gate:
+            gain = self.noise_gate.update_envelope(in_rms)
+            if gain != 1.0:
+                data = self._encode_pcm(work, gain, count)
+            rms = in_rms * gain
+            peak = in_peak * gain
+
+        is_speech, confidence = self._detect_speech(data, frame_duration_ms, rms=rms * 32768.0)
+
+        now = time.time()
+        latency_ms = (now - self._last_analyze_time) * 1000
+        self._last_analyze_time = now
+
+        return ChunkAnalysis(
+            data=data,
+            gain=gain,
+            rms_level=rms,
+            peak_level=peak,
+            clipping_detected=peak > 0.99,
+            is_speech=is_speech,
+            vad_confidence=confidence,
+            latency_ms=latency_ms
+        )
+
+    def _detect_speech_webrtc(self, audio_data: bytes, frame_duration_ms: int) -> Tuple[bool, float]:
+        """Run WebRTC VAD over every complete frame in the chunk"""
+        # A chunk that already is one frame of the requested size needs no re-framing
+        expected_length = int(self.sample_rate * frame_duration_ms / 1000) * 2  # 2 bytes per sample
+        if len(audio_data) == expected_length and self.vad_framer.pending_bytes == 0:
+            is_speech = self.vad.is_speech(audio_data, self.sample_rate)
+            return is_speech, (1.0 if is_speech else 0.0)
+
+        framer = self.vad_framer
+        for frame in framer.frames(audio_data):
+            framer.update(self.vad.is_speech(frame, self.sample_rate))
 
-        return rms > self.fallback_rms_threshold, rms
+        probability = framer.speech_probability
+        return probability >= self.speech_probability_threshold, probability
+
+    def _detect_speech_rms(self, audio_data: bytes) -> Tuple[bool, int]:
+        """Fallback RMS-based speech detection"""
+        is_speech, rms = self.rms_detector.process(audio_data)
+        return is_speech, int(rms)
 
     def calculate_metrics(self, audio_data: bytes) -> AudioMetrics:
         """
@@ -190,8 +644,9 @@ class EnhancedAudioProcessor:
         # Clipping detection
         clipping = peak > 0.99
 
-        # VAD confidence
-        is_speech, confidence = self.detect_speech(audio_data)
+        # VAD confidence from the last detect_speech call (re-running it would
+        # feed the same audio through the stateful re-framer twice)
+        confidence = self.last_confidence
 
         # Latency
         latency_ms = (time.time() - self.last_process_time) * 1000
@@ -205,6 +660,14 @@ class EnhancedAudioProcessor:
             clipping_detected=clipping
         )
 
+    def _encode_pcm(self, work: np.ndarray, scale: float, count: int) -> bytes:
+        """Scale normalized samples back to int16 PCM bytes via the reusable buffer"""
+        pcm = self._pcm_out[:count]
+        np.multiply(work, np.float32(scale), out=work)
+        work.clip(np.float32(-32768), np.float32(32767), out=work)
+        np.copyto(pcm, work, casting='unsafe')
+        return pcm.tobytes()
+
     def get_statistics(self) -> dict:
         """Get processing statistics"""
         if self.total_frames_processed > 0:
@@ -217,7 +680,9 @@ class EnhancedAudioProcessor:
             "speech_frames": self.speech_frames,
             "speech_ratio": speech_ratio,
             "vad_enabled": self.vad is not None,
-            "noise_gate_enabled": self.noise_gate is not None
+            "noise_gate_enabled": self.noise_gate is not None,
+            "noise_floor": self.rms_detector.noise_floor,
+            "rms_threshold": self.rms_detector.threshold
         }
 
 
@@ -284,67 +749,413 @@ class WakeWordDetector:
             self.porcupine = None
 
 
+class PolyphaseResampler:
+    """
+    Streaming rational-ratio resampler for int16 PCM (e.g. 24 kHz -> 16 kHz).
+
+    Windowed-sinc polyphase FIR evaluated for a whole chunk at once with one
+    gather and one row-wise dot product. Filter history and output phase are
+    carried across calls, so chunked output matches a single-shot pass.
+    """
+
+    def __init__(self, in_rate: int, out_rate: int, taps_per_phase: int = 32):
+        import math
+        g = math.gcd(in_rate, out_rate)
+        self.up = out_rate // g
+        self.down = in_rate // g
+        self.taps = taps_per_phase
+
+        # Prototype low-pass at the lower of the two Nyquist rates, on the upsampled grid
+        n = self.taps * self.up
+        cutoff = 1.0 / max(self.up, self.down)
+        t = np.arange(n) - (n - 1) / 2.0
+        h = self.up * cutoff * np.sinc(cutoff * t) * np.kaiser(n, 8.0)
+        # phases[p, k] = h[p + up*k]
+        self.phases = h.reshape(self.taps, self.up).T.astype(np.float32)
+        self._k = np.arange(self.taps)
+
+        self.reset()
+
+    def reset(self):
+        self._history = np.zeros(self.taps - 1, dtype=np.float32)
+        self._consumed = 0  # input samples seen before the current chunk
+        self._next_out = 0  # index of the next output sample
+
+    def process(self, audio_data: bytes) -> np.ndarray:
+        """Resample one chunk; returns int16 samples (may be empty)"""
+        x = np.frombuffer(audio_data, dtype=np.int16)
+        x_ext = np.concatenate((self._history, x.astype(np.float32)))
+        total_in = self._consumed + len(x)
+
+        # Output j uses input samples floor(j*down/up) - k
+        end_out = -(-total_in * self.up // self.down)
+        j = np.arange(self._next_out, end_out, dtype=np.int64)
+        bases = j * self.down // self.up
+        phases = j * self.down - bases * self.up
+        idx = (bases - self._consumed + self.taps - 1)[:, None] - self._k
+        y = np.einsum('ij,ij->i', x_ext[idx], self.phases[phases])
+
+        self._history = x_ext[len(x_ext) - (self.taps - 1):]
+        self._consumed = total_in
+        self._next_out = end_out
+        return np.clip(np.rint(y), -32768, 32767).astype(np.int16)
+
+
+class WavSink:
+    """
+    Streams 16-bit PCM into a WAV file.
+    Frames are appended with writeframesraw(); the RIFF/data sizes are patched on close().
+    """
+
+    extension = "wav"
+
+    def __init__(self, path: str, sample_rate: int, channels: int = 1, sample_width: int = 2):
+        import wave
+        self.path = path
+        self._wf = wave.open(path, 'wb')
+        self._wf.setnchannels(channels)
+        self._wf.setsampwidth(sample_width)
+        self._wf.setframerate(sample_rate)
+
+    def write(self, data: bytes):
+        self._wf.writeframesraw(data)
+
+    def close(self):
+        self._wf.close()
+
+
+class SoundFileSink:
+    """
+    Compressed sink (FLAC, or Opus in Ogg) through libsndfile.
+    Requires the optional `soundfile` package.
+    """
+
+    FORMATS = {
+        "flac": ("flac", "FLAC", "PCM_16"),
+        "opus": ("ogg", "OGG", "OPUS"),
+    }
+
+    def __init__(self, path: str, sample_rate: int, channels: int = 1, sample_width: int = 2, codec: str = "flac"):
+        import soundfile
+        self.path = path
+        _, container, subtype = self.FORMATS[codec]
+        self._file = soundfile.SoundFile(
+            path, 'w', samplerate=sample_rate, channels=channels, format=container, subtype=subtype
+        )
+
+    def write(self, data: bytes):
+        self._file.buffer_write(data, dtype='int16')
+
+    def close(self):
+        self._file.close()
+
+
 class AudioRecorder:
     """
     Records audio conversations to file
+
+    Frames are handed to a background writer thread through a bounded queue
+    and streamed straight to disk, so memory use does not grow with session
+    length. Files rotate once they exceed `max_file_mb` or
+    `max_file_seconds`. `format` selects the sink: "wav", or "flac"/"opus"
+    when `soundfile` is installed; `sink_factory(path, sample_rate,
+    channels, sample_width)` plugs in any other encoder.
+
+    With `dual_channel=True` the file is stereo: mic on the left, model
+    output (add_output_frame, resampled from `output_sample_rate`) on the
+    right. The mic stream is the timeline; each model chunk is placed at the
+    mic sample position matching the host time it was played. A JSONL
+    sidecar (`<name>.idx.jsonl`) records every chunk's track, sample
+    position, length and time, for offline latency/echo measurements.
     """
 
-    def __init__(self, sample_rate: int = 16000, output_dir: str = "recordings"):
+    _STOP = object()
+    # Model audio allowed to sit ahead of the mic timeline (e.g. while muted)
+    MAX_PENDING_SECONDS = 30.0
+
+    def __init__(
+        self,
+        sample_rate: int = 16000,
+        output_dir: str = "recordings",
+        format: str = "wav",
+        sink_factory=None,
+        max_file_mb: Optional[float] = None,
+        max_file_seconds: Optional[float] = None,
+        queue_frames: int = 256,
+        dual_channel: bool = False,
+        output_sample_rate: int = 24000
+    ):
         self.sample_rate = sample_rate
         self.output_dir = output_dir
+        self.dual_channel = dual_channel
+        self.output_sample_rate = output_sample_rate
+        self.channels = 2 if dual_channel else 1
+        self.sample_width = 2
+        self.max_file_bytes = int(max_file_mb * 1024 * 1024) if max_file_mb else None
+        self.max_file_seconds = max_file_seconds
+        self.queue_frames = queue_frames
         self.recording = False
-        self.frames = []
         self.start_time = None
+        self.files = []
+
+        self.sink_factory, self.extension = self._resolve_sink(format, sink_factory)
+
+        self._queue = None
+        self._thread = None
+        self._sink = None
+        self._base_name = None
+        self._index = None
+        self.index_path = None
+
+        # Dual-channel timeline state (writer thread only)
+        self._resampler = None
+        self._pending = None
+        self._pending_samples = 0
+        self._mic_pos = 0
+        self._model_end = 0
+        self._anchor = (0.0, 0)
+        self._t0 = 0.0
+
+        # Stats (written by the writer thread)
+        self.bytes_written = 0
+        self.frames_written = 0
+        self.dropped_frames = 0
+        self.late_output_samples = 0
+        self._file_bytes = 0
 
         import os
         os.makedirs(output_dir, exist_ok=True)
 
+    @staticmethod
+    def _resolve_sink(format: str, sink_factory):
+        if sink_factory is not None:
+            return sink_factory, getattr(sink_factory, "extension", format)
+        if format in SoundFileSink.FORMATS:
+            try:
+                import soundfile  # noqa: F401
+                extension = SoundFileSink.FORMATS[format][0]
+                return (lambda path, rate, channels, width: SoundFileSink(path, rate, channels, width, codec=format)), extension
+            except ImportError:
+                print(f"[RECORDER] soundfile not installed, recording {format} as wav instead")
+        elif format != "wav":
+            print(f"[RECORDER] Unknown format '{format}', recording wav")
+        return WavSink, WavSink.extension
+
     def start(self):
         """Start recording"""
+        if self.recording:
+            return
+
+        import datetime
+        import queue
+        import threading
+
+        self._base_name = f"recording_{datetime.datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        self.files = []
+        self.bytes_written = 0
+        self.frames_written = 0
+        self.dropped_frames = 0
+        self.late_output_samples = 0
+        self._open_next_file()
+
+        self._t0 = time.monotonic()
+        if self.dual_channel:
+            import collections
+            self._resampler = PolyphaseResampler(self.output_sample_rate, self.sample_rate)
+            self._pending = collections.deque()
+            self._pending_samples = 0
+            self._mic_pos = 0
+            self._model_end = 0
+            self._anchor = (self._t0, 0)
+            self.index_path = f"{self.output_dir}/{self._base_name}.idx.jsonl"
+            self._index = open(self.index_path, 'w')
+
+        self._queue = queue.Queue(maxsize=self.queue_frames)
+        self._thread = threading.Thread(target=self._writer, name="ada-recorder", daemon=True)
+        self._thread.start()
+
         self.recording = True
-        self.frames = []
         self.start_time = time.time()
-        print(f"[RECORDER] Started recording")
+        print(f"[RECORDER] Started recording to {self.files[0]}")
 
     def add_frame(self, audio_data: bytes):
-        """Add audio frame to recording"""
+        """Add mic audio frame to recording (never blocks the caller)"""
         if self.recording:
-            self.frames.append(audio_data)
+            self._enqueue("mic", audio_data)
+
+    def add_output_frame(self, audio_data: bytes):
+        """Add model audio as it is played (dual-channel only; any thread)"""
+        if self.recording and self.dual_channel:
+            self._enqueue("model", audio_data)
+
+    def _enqueue(self, track: str, audio_data: bytes, t: Optional[float] = None):
+        try:
+            self._queue.put_nowait((track, audio_data, time.monotonic() if t is None else t))
+        except Exception:
+            # Writer fell behind (slow disk); drop rather than stall the audio loop
+            self.dropped_frames += 1
 
     def stop(self) -> Optional[str]:
         """
-        Stop recording and save to file
+        Stop recording, flush the queue and finalize the file
 
         Returns:
-            Path to saved file, or None if recording was empty
+            Path to the first saved file (see `files` for rotated parts),
+            or None if recording was empty
         """
-        if not self.recording or not self.frames:
-            self.recording = False
+        if not self.recording:
             return None
 
         self.recording = False
-
-        # Generate filename with timestamp
-        import datetime
-        timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename = f"{self.output_dir}/recording_{timestamp}.wav"
-
-        # Save as WAV file
-        try:
-            import wave
-            with wave.open(filename, 'wb') as wf:
-                wf.setnchannels(1)  # Mono
-                wf.setsampwidth(2)  # 16-bit
-                wf.setframerate(self.sample_rate)
-                wf.writeframes(b''.join(self.frames))
-
-            duration = time.time() - self.start_time
-            print(f"[RECORDER] Saved recording to {filename} (duration: {duration:.1f}s, frames: {len(self.frames)})")
-            return filename
-        except Exception as e:
-            print(f"[RECORDER] Failed to save recording: {e}")
+        import queue
+        while self._thread.is_alive():
+            try:
+                self._queue.put(self._STOP, timeout=0.1)
+                break
+            except queue.Full:
+                continue
+        self._thread.join()
+        self._thread = None
+        self._queue = None
+
+        if self.bytes_written == 0:
+            import os
+            if self.dual_channel:
+                self.files.append(self.index_path)
+            for path in self.files:
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+            self.files = []
             return None
 
+        duration = time.time() - self.start_time
+        print(f"[RECORDER] Saved recording to {self.files[0]} (duration: {duration:.1f}s, frames: {self.frames_written}, "
+              f"files: {len(self.files)}, dropped: {self.dropped_frames})")
+        return self.files[0]
+
     def is_recording(self) -> bool:
         """Check if currently recording"""
         return self.recording
+
+    def get_stats(self) -> dict:
+        """Recorder statistics"""
+        return {
+            "recording": self.recording,
+            "files": list(self.files),
+            "index_path": self.index_path,
+            "bytes_written": self.bytes_written,
+            "frames_written": self.frames_written,
+            "dropped_frames": self.dropped_frames,
+            "late_output_samples": self.late_output_samples,
+            "queued_frames": self._queue.qsize() if self._queue else 0
+        }
+
+    def _open_next_file(self):
+        part = len(self.files) + 1
+        suffix = "" if part == 1 else f"_part{part}"
+        path = f"{self.output_dir}/{self._base_name}{suffix}.{self.extension}"
+        self._sink = self.sink_factory(path, self.sample_rate, self.channels, self.sample_width)
+        self._file_bytes = 0
+        self.files.append(path)
+
+    def _should_rotate(self) -> bool:
+        if self.max_file_bytes and self._file_bytes >= self.max_file_bytes:
+            return True
+        if self.max_file_seconds:
+            bytes_per_second = self.sample_rate * self.channels * self.sample_width
+            return self._file_bytes >= self.max_file_seconds * bytes_per_second
+        return False
+
+    def _write_block(self, data: bytes):
+        if self._should_rotate():
+            self._sink.close()
+            self._open_next_file()
+        self._sink.write(data)
+        self._file_bytes += len(data)
+        self.bytes_written += len(data)
+
+    def _writer(self):
+        """Writer thread: drain the queue into the current sink"""
+        try:
+            while True:
+                item = self._queue.get()
+                if item is self._STOP:
+                    break
+                track, data, t = item
+                if not self.dual_channel:
+                    self._write_block(data)
+                elif track == "mic":
+                    self._write_stereo(data, t)
+                else:
+                    self._place_output(data, t)
+                    continue
+                self.frames_written += 1
+        except Exception as e:
+            print(f"[RECORDER] Failed to write recording: {e}")
+        finally:
+            try:
+                self._sink.close()
+            except Exception as e:
+                print(f"[RECORDER] Failed to finalize recording: {e}")
+            self._sink = None
+            if self._index is not None:
+                self._index.close()
+
+    def _log_index(self, track: str, sample: int, samples: int, t: float):
+        self._index.write(
+            f'{{"track": "{track}", "part": {len(self.files)}, "sample": {sample}, '
+            f'"samples": {samples}, "t": {t - self._t0:.6f}}}\n'
+        )
+
+    def _place_output(self, data: bytes, t: float):
+        """Resample a model chunk and queue it at its timeline position"""
+        samples = self._resampler.process(data)
+        if not len(samples):
+            return
+        anchor_t, anchor_pos = self._anchor
+        pos = max(anchor_pos + int(round((t - anchor_t) * self.sample_rate)), self._model_end)
+        self._pending.append((pos, samples))
+        self._pending_samples += len(samples)
+        self._model_end = pos + len(samples)
+        self._log_index("model", pos, len(samples), t)
+
+        limit = int(self.MAX_PENDING_SECONDS * self.sample_rate)
+        while self._pending_samples > limit:
+            _, dropped = self._pending.popleft()
+            self._pending_samples -= len(dropped)
+            self.late_output_samples += len(dropped)
+
+    def _write_stereo(self, data: bytes, t: float):
+        """Interleave a mic chunk with whatever model audio overlaps it"""
+        mic = np.frombuffer(data, dtype=np.int16)
+        start, n = self._mic_pos, len(mic)
+        end = start + n
+
+        frame = np.zeros((n, 2), dtype=np.int16)
+        frame[:, 0] = mic
+        pending = self._pending
+        while pending:
+            pos, samples = pending[0]
+            seg_end = pos + len(samples)
+            if pos >= end:
+                break
+            lo, hi = max(pos, start), min(seg_end, end)
+            if pos < start:
+                # Part of this segment landed behind the timeline already
+                self.late_output_samples += min(start, seg_end) - pos
+            if hi > lo:
+                frame[lo - start:hi - start, 1] = samples[lo - pos:hi - pos]
+            pending.popleft()
+            self._pending_samples -= len(samples)
+            if seg_end > end:
+                # Keep the remainder for the next mic chunk
+                pending.appendleft((end, samples[end - pos:]))
+                self._pending_samples += seg_end - end
+                break
+
+        self._log_index("mic", start, n, t)
+        self._write_block(frame.tobytes())
+        self._mic_pos = end
+        self._anchor = (t, end)
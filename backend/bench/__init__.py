@@ -0,0 +1,3 @@
+"""
+Offline benchmarks for ADA V2 subsystems.
+"""
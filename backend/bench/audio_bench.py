@@ -0,0 +1,511 @@
+"""
+Audio Pipeline Benchmark for ADA V2
+Replays WAV files through the listen_audio processing chain without a mic or a Gemini session.
+
+The chain mirrors AudioLoop.listen_audio stage by stage, using the same
+components: EnhancedAudioProcessor.analyze -> periodic metrics -> out_queue.put
+-> AudioRecorder.add_frame -> WakeWordDetector.process -> SpeechSegmenter.
+Timing is measured per stage; a second pass under tracemalloc measures
+allocations (kept separate so tracing does not skew the timings).
+
+Ground truth comes from an optional `<file>.labels.json` next to each WAV:
+    {"speech": [[start_s, end_s], ...]}
+Files without labels only contribute timing and false-trigger counts if
+their labels are known to be empty; pass --no-speech for such files.
+
+Usage:
+    python bench/audio_bench.py                      # synthetic corpus
+    python bench/audio_bench.py a.wav b.wav --out results.json
+    python bench/audio_bench.py --baseline old.json  # compare against a previous run
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import wave
+from pathlib import Path
+from typing import List, Optional
+
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from audio_processor import (
+    AudioRecorder,
+    EnhancedAudioProcessor,
+    SpeechSegmenter,
+    WakeWordDetector,
+    WEBRTCVAD_AVAILABLE
+)
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 1024
+METRICS_EVERY = 10
+STAGES = ["analyze", "metrics", "send", "record", "wake_word", "segmenter"]
+
+
+class NullQueue:
+    """Stands in for the session out_queue; counts and discards messages"""
+
+    def __init__(self):
+        self.messages = 0
+        self.bytes = 0
+
+    async def put(self, item):
+        self.messages += 1
+        data = item.get("data") if isinstance(item, dict) else None
+        if data:
+            self.bytes += len(data)
+
+
+def load_wav(path: Path) -> bytes:
+    """Read a 16 kHz mono int16 WAV (other rates/channels are rejected)"""
+    with wave.open(str(path), 'rb') as wf:
+        if wf.getframerate() != SAMPLE_RATE or wf.getnchannels() != 1 or wf.getsampwidth() != 2:
+            raise ValueError(f"{path}: expected 16 kHz mono 16-bit, got {wf.getframerate()} Hz x{wf.getnchannels()} "
+                             f"{wf.getsampwidth() * 8}-bit")
+        return wf.readframes(wf.getnframes())
+
+
+def load_labels(path: Path, no_speech: bool = False) -> Optional[list]:
+    if no_speech:
+        return []
+    label_path = path.with_suffix(".labels.json")
+    if not label_path.exists():
+        return None
+    with open(label_path) as f:
+        return [tuple(seg) for seg in json.load(f).get("speech", [])]
+
+
+class AudioChain:
+    """One listen_audio pipeline instance"""
+
+    def __init__(self, noise_gate_mode: str = "sample", enable_noise_gate: bool = True,
+                 record_dir: Optional[str] = None, wake_word_key: Optional[str] = None):
+        self.processor = EnhancedAudioProcessor(
+            sample_rate=SAMPLE_RATE,
+            enable_noise_gate=enable_noise_gate,
+            noise_gate_mode=noise_gate_mode,
+            vad_aggressiveness=1
+        )
+        self.out_queue = NullQueue()
+        self.recorder = AudioRecorder(sample_rate=SAMPLE_RATE, output_dir=record_dir) if record_dir else None
+        self.wake_word_detector = WakeWordDetector(access_key=wake_word_key, keywords=["jarvis"]) if wake_word_key else None
+        self.segmenter = SpeechSegmenter(silence_duration=0.5)
+        self.metrics_counter = 0
+        self.last_metrics = None
+
+    def start(self):
+        if self.recorder:
+            self.recorder.start()
+
+    def stop(self):
+        if self.recorder:
+            self.recorder.stop()
+        if self.wake_word_detector:
+            self.wake_word_detector.cleanup()
+
+    async def run_chunk(self, data: bytes, stream_time: float, clock=None, timings=None):
+        """Process one chunk; `clock()` is called after each stage when timing"""
+        analysis = self.processor.analyze(data)
+        if clock:
+            timings[0] += clock()
+
+        self.metrics_counter += 1
+        if self.metrics_counter % METRICS_EVERY == 0:
+            self.last_metrics = analysis.to_metrics()
+        if clock:
+            timings[1] += clock()
+
+        await self.out_queue.put({"data": analysis.data, "mime_type": "audio/pcm"})
+        if clock:
+            timings[2] += clock()
+
+        if self.recorder and self.recorder.is_recording():
+            self.recorder.add_frame(analysis.data)
+        if clock:
+            timings[3] += clock()
+
+        if self.wake_word_detector and self.wake_word_detector.enabled:
+            self.wake_word_detector.process(analysis.data)
+        if clock:
+            timings[4] += clock()
+
+        event = self.segmenter.update(analysis.is_speech, stream_time)
+        if clock:
+            timings[5] += clock()
+        return analysis, event
+
+
+def split_chunks(pcm: bytes) -> List[bytes]:
+    step = CHUNK_SIZE * 2
+    return [pcm[i:i + step] for i in range(0, len(pcm) - step + 1, step)]
+
+
+class _StageClock:
+    """Returns the time since the previous call (perf_counter_ns)"""
+
+    def __init__(self):
+        self.last = time.perf_counter_ns()
+
+    def __call__(self) -> int:
+        now = time.perf_counter_ns()
+        elapsed, self.last = now - self.last, now
+        return elapsed
+
+
+async def time_chain(chunks: List[bytes], chain_kwargs: dict) -> dict:
+    """Pass 1: per-stage wall time and the decisions used for accuracy"""
+    chain = AudioChain(**chain_kwargs)
+    chain.start()
+    chunk_s = CHUNK_SIZE / SAMPLE_RATE
+    per_chunk = np.zeros((len(chunks), len(STAGES)), dtype=np.int64)
+    speech, speaking, events = [], [], []
+    try:
+        for i, data in enumerate(chunks):
+            timings = [0] * len(STAGES)
+            clock = _StageClock()
+            end_time = (i + 1) * chunk_s
+            analysis, event = await chain.run_chunk(data, end_time, clock, timings)
+            per_chunk[i] = timings
+            speech.append(analysis.is_speech)
+            speaking.append(chain.segmenter.is_speaking)
+            if event:
+                events.append((event, end_time, i))
+    finally:
+        chain.stop()
+
+    us = per_chunk / 1000.0
+    stages = {}
+    for j, name in enumerate(STAGES):
+        col = us[:, j]
+        stages[name] = {
+            "mean_us": float(col.mean()) if len(col) else 0.0,
+            "p50_us": float(np.percentile(col, 50)) if len(col) else 0.0,
+            "p95_us": float(np.percentile(col, 95)) if len(col) else 0.0,
+            "max_us": float(col.max()) if len(col) else 0.0
+        }
+    total = us.sum(axis=1)
+    stages["total"] = {
+        "mean_us": float(total.mean()) if len(total) else 0.0,
+        "p50_us": float(np.percentile(total, 50)) if len(total) else 0.0,
+        "p95_us": float(np.percentile(total, 95)) if len(total) else 0.0,
+        "max_us": float(total.max()) if len(total) else 0.0
+    }
+    return {
+        "stages": stages,
+        "speech": speech,
+        "speaking": speaking,
+        "events": events,
+        "vad_backend": "webrtc" if chain.processor.vad is not None else "rms",
+        "messages_sent": chain.out_queue.messages
+    }
+
+
+async def measure_allocations(chunks: List[bytes], chain_kwargs: dict) -> dict:
+    """Pass 2: per-stage allocation high-water mark under tracemalloc"""
+    chain = AudioChain(**chain_kwargs)
+    chain.start()
+    chunk_s = CHUNK_SIZE / SAMPLE_RATE
+    peaks = np.zeros((len(chunks), len(STAGES)), dtype=np.int64)
+
+    def clock():
+        # Bytes allocated above the stage's starting point, then restart the window
+        current, peak = tracemalloc.get_traced_memory()
+        result = max(peak - clock.base, 0)
+        tracemalloc.reset_peak()
+        clock.base = current
+        return result
+
+    tracemalloc.start()
+    try:
+        for i, data in enumerate(chunks):
+            timings = [0] * len(STAGES)
+            clock.base = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+            await chain.run_chunk(data, (i + 1) * chunk_s, clock, timings)
+            peaks[i] = timings
+        retained = tracemalloc.get_traced_memory()[0]
+    finally:
+        tracemalloc.stop()
+        chain.stop()
+
+    result = {
+        name: {
+            "mean_peak_bytes": float(peaks[:, j].mean()) if len(peaks) else 0.0,
+            "max_peak_bytes": int(peaks[:, j].max()) if len(peaks) else 0
+        }
+        for j, name in enumerate(STAGES)
+    }
+    result["retained_bytes_after_run"] = int(retained)
+    return result
+
+
+def score_detection(speech: list, speaking: list, events: list, labels: Optional[list],
+                    duration_s: float, tolerance_s: float = 0.1) -> dict:
+    """Onset latency and false-trigger statistics against labelled speech"""
+    chunk_s = CHUNK_SIZE / SAMPLE_RATE
+    onsets = [t for kind, t, _ in events if kind == SpeechSegmenter.ONSET]
+    result = {
+        "onsets": len(onsets),
+        "chunk_speech_ratio": float(np.mean(speech)) if speech else 0.0
+    }
+    if labels is None:
+        return result
+
+    def in_speech(start, end):
+        return any(start < seg_end + tolerance_s and end > seg_start - tolerance_s for seg_start, seg_end in labels)
+
+    # Onset latency: labelled start -> first chunk end at which the segmenter reports speaking
+    latencies, missed = [], 0
+    for seg_start, seg_end in labels:
+        first = int(seg_start // chunk_s)
+        last = min(int(np.ceil(seg_end / chunk_s)), len(speaking))
+        hit = next((i for i in range(first, last) if speaking[i]), None)
+        if hit is None:
+            missed += 1
+        else:
+            latencies.append(max((hit + 1) * chunk_s - seg_start, 0.0) * 1000.0)
+
+    false_triggers = sum(1 for t in onsets if not in_speech(t - chunk_s, t))
+
+    # Chunk-level confusion against the labels
+    labelled = np.array([in_speech(i * chunk_s, (i + 1) * chunk_s) for i in range(len(speech))], dtype=bool)
+    detected = np.array(speech, dtype=bool)
+    non_speech_s = float((~labelled).sum()) * chunk_s
+
+    result.update({
+        "speech_segments": len(labels),
+        "missed_segments": missed,
+        "onset_latency_ms": {
+            "mean": float(np.mean(latencies)) if latencies else None,
+            "p50": float(np.percentile(latencies, 50)) if latencies else None,
+            "p95": float(np.percentile(latencies, 95)) if latencies else None,
+            "max": float(np.max(latencies)) if latencies else None
+        },
+        "false_triggers": false_triggers,
+        "false_triggers_per_min": false_triggers / (non_speech_s / 60.0) if non_speech_s > 0 else 0.0,
+        "chunk_false_positive_rate": float((detected & ~labelled).sum() / max((~labelled).sum(), 1)),
+        "chunk_miss_rate": float((~detected & labelled).sum() / max(labelled.sum(), 1))
+    })
+    return result
+
+
+async def bench_file(path: Path, labels: Optional[list], chain_kwargs: dict, allocations: bool = True) -> dict:
+    pcm = load_wav(path)
+    chunks = split_chunks(pcm)
+    duration_s = len(chunks) * CHUNK_SIZE / SAMPLE_RATE
+
+    timed = await time_chain(chunks, chain_kwargs)
+    result = {
+        "path": str(path),
+        "duration_s": duration_s,
+        "chunks": len(chunks),
+        "vad_backend": timed["vad_backend"],
+        "messages_sent": timed["messages_sent"],
+        "stages": timed["stages"],
+        "realtime_factor": (duration_s * 1e6) / max(timed["stages"]["total"]["mean_us"] * len(chunks), 1e-9),
+        "detection": score_detection(timed["speech"], timed["speaking"], timed["events"], labels, duration_s)
+    }
+    if allocations:
+        result["allocations"] = await measure_allocations(chunks, chain_kwargs)
+    return result
+
+
+def summarize(files: List[dict]) -> dict:
+    """Chunk-weighted averages across files"""
+    total_chunks = sum(f["chunks"] for f in files) or 1
+    stages = {
+        name: sum(f["stages"][name]["mean_us"] * f["chunks"] for f in files) / total_chunks
+        for name in STAGES + ["total"]
+    }
+    latencies = [f["detection"]["onset_latency_ms"]["mean"] for f in files
+                 if f["detection"].get("onset_latency_ms", {}).get("mean") is not None]
+    labelled = [f for f in files if "false_triggers" in f["detection"]]
+    non_speech_min = sum(f["detection"]["false_triggers"] / f["detection"]["false_triggers_per_min"]
+                         for f in labelled if f["detection"]["false_triggers_per_min"])
+    false_triggers = sum(f["detection"]["false_triggers"] for f in labelled)
+    return {
+        "stage_mean_us": stages,
+        "onset_latency_ms_mean": float(np.mean(latencies)) if latencies else None,
+        "missed_segments": sum(f["detection"].get("missed_segments", 0) for f in labelled),
+        "false_triggers": false_triggers,
+        "false_triggers_per_min": false_triggers / non_speech_min if non_speech_min else 0.0
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=Path(__file__).resolve().parent, timeout=5).stdout.strip() or None
+    except Exception:
+        return None
+
+
+def make_synthetic_corpus(out_dir: str, seconds: float = 20.0, seed: int = 0) -> List[Path]:
+    """
+    Writes labelled WAVs: voiced bursts in a quiet and a noisy room, and a
+    speech-free file with door-knock style transients for false triggers.
+    """
+    rng = np.random.default_rng(seed)
+    n = int(seconds * SAMPLE_RATE)
+    t = np.arange(n) / SAMPLE_RATE
+
+    def voiced(start, end, level):
+        # Harmonic stack at a drifting pitch with syllable-rate modulation
+        mask = (t >= start) & (t < end)
+        f0 = 120 + 20 * np.sin(2 * np.pi * 0.7 * t)
+        phase = 2 * np.pi * np.cumsum(f0) / SAMPLE_RATE
+        tone = sum(np.sin(k * phase) / k for k in range(1, 7))
+        envelope = 0.6 + 0.4 * np.sin(2 * np.pi * 4 * t)
+        return mask * tone * envelope * level
+
+    segments = []
+    cursor = 1.0
+    while cursor + 1.0 < seconds - 1.0:
+        length = float(rng.uniform(0.8, 2.5))
+        segments.append((cursor, min(cursor + length, seconds - 1.0)))
+        cursor += length + float(rng.uniform(1.0, 3.0))
+
+    files = []
+    for name, noise_level, speech_level in (("quiet_room", 60, 6000), ("noisy_room", 600, 6000)):
+        signal = rng.normal(0, noise_level, n)
+        for start, end in segments:
+            signal += voiced(start, end, speech_level)
+        files.append((name, signal, segments))
+
+    knocks = rng.normal(0, 60, n)
+    for start in np.arange(1.0, seconds - 1.0, 2.3):
+        i = int(start * SAMPLE_RATE)
+        decay = np.exp(-np.arange(800) / 120.0)
+        knocks[i:i + 800] += rng.normal(0, 9000, 800) * decay
+    files.append(("knocks_no_speech", knocks, []))
+
+    paths = []
+    for name, signal, labels in files:
+        path = Path(out_dir) / f"{name}.wav"
+        with wave.open(str(path), 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(SAMPLE_RATE)
+            wf.writeframes(np.clip(signal, -32768, 32767).astype(np.int16).tobytes())
+        with open(path.with_suffix(".labels.json"), 'w') as f:
+            json.dump({"speech": [[round(s, 3), round(e, 3)] for s, e in labels]}, f)
+        paths.append(path)
+    return paths
+
+
+async def run_benchmark(paths: List[Path], noise_gate_mode: str = "sample", enable_noise_gate: bool = True,
+                        record: bool = False, wake_word_key: Optional[str] = None, no_speech: bool = False,
+                        allocations: bool = True) -> dict:
+    """Benchmark every file and return the JSON-ready report"""
+    with tempfile.TemporaryDirectory() as record_dir:
+        chain_kwargs = {
+            "noise_gate_mode": noise_gate_mode,
+            "enable_noise_gate": enable_noise_gate,
+            "record_dir": record_dir if record else None,
+            "wake_word_key": wake_word_key
+        }
+        files = []
+        for path in paths:
+            path = Path(path)
+            files.append(await bench_file(path, load_labels(path, no_speech), chain_kwargs, allocations))
+
+    return {
+        "benchmark": "audio_pipeline",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "config": {
+            "chunk_size": CHUNK_SIZE,
+            "sample_rate": SAMPLE_RATE,
+            "noise_gate_mode": noise_gate_mode if enable_noise_gate else None,
+            "webrtcvad": WEBRTCVAD_AVAILABLE,
+            "record": record,
+            "wake_word": bool(wake_word_key)
+        },
+        "files": files,
+        "summary": summarize(files)
+    }
+
+
+def compare(report: dict, baseline: dict) -> List[str]:
+    """Human-readable stage deltas against a previous report"""
+    lines = [f"Compared with {baseline.get('commit') or 'baseline'} ({baseline.get('timestamp', '?')}):"]
+    old, new = baseline["summary"]["stage_mean_us"], report["summary"]["stage_mean_us"]
+    for name in STAGES + ["total"]:
+        if name in old and old[name] > 0:
+            change = (new[name] - old[name]) / old[name] * 100.0
+            lines.append(f"  {name:<10} {old[name]:9.1f} -> {new[name]:9.1f} us/chunk ({change:+.1f}%)")
+    for key in ("onset_latency_ms_mean", "false_triggers_per_min"):
+        if baseline["summary"].get(key) is not None and report["summary"].get(key) is not None:
+            lines.append(f"  {key:<24} {baseline['summary'][key]:.1f} -> {report['summary'][key]:.1f}")
+    return lines
+
+
+def print_report(report: dict):
+    for f in report["files"]:
+        print(f"\n{Path(f['path']).name}: {f['duration_s']:.1f}s, {f['chunks']} chunks, "
+              f"VAD={f['vad_backend']}, {f['realtime_factor']:.0f}x realtime")
+        for name in STAGES + ["total"]:
+            s = f["stages"][name]
+            alloc = f.get("allocations", {}).get(name)
+            alloc_text = f"  alloc {alloc['mean_peak_bytes']:8.0f} B" if alloc else ""
+            print(f"  {name:<10} {s['mean_us']:8.1f} us  p95 {s['p95_us']:8.1f} us{alloc_text}")
+        d = f["detection"]
+        if "false_triggers" in d:
+            latency = d["onset_latency_ms"]["mean"]
+            latency_text = f"{latency:.0f} ms" if latency is not None else "n/a"
+            print(f"  onset latency {latency_text}, missed {d['missed_segments']}/{d['speech_segments']}, "
+                  f"false triggers {d['false_triggers']} ({d['false_triggers_per_min']:.1f}/min)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay WAV files through the listen_audio chain")
+    parser.add_argument("wavs", nargs="*", help="16 kHz mono WAV files (default: synthetic corpus)")
+    parser.add_argument("--out", default="audio_bench_results.json", help="JSON output path")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--noise-gate-mode", default="sample", choices=["sample", "block"])
+    parser.add_argument("--no-noise-gate", action="store_true")
+    parser.add_argument("--record", action="store_true", help="Include AudioRecorder (temp dir)")
+    parser.add_argument("--wake-word-key", help="Porcupine access key to include wake word detection")
+    parser.add_argument("--no-speech", action="store_true", help="Treat unlabelled files as containing no speech")
+    parser.add_argument("--no-allocations", action="store_true", help="Skip the tracemalloc pass")
+    parser.add_argument("--seconds", type=float, default=20.0, help="Length of each synthetic file")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as corpus_dir:
+        paths = [Path(p) for p in args.wavs] or make_synthetic_corpus(corpus_dir, args.seconds)
+        report = asyncio.run(run_benchmark(
+            paths,
+            noise_gate_mode=args.noise_gate_mode,
+            enable_noise_gate=not args.no_noise_gate,
+            record=args.record,
+            wake_word_key=args.wake_word_key,
+            no_speech=args.no_speech,
+            allocations=not args.no_allocations
+        ))
+
+    print_report(report)
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.abspath(args.out)}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            print("\n" + "\n".join(compare(report, json.load(f))))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
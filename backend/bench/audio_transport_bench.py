@@ -0,0 +1,111 @@
+"""
+Audio Transport Benchmark for ADA V2
+Measures wire size and encode CPU of each 'audio_data' transport for model playback audio.
+
+The payloads mirror server.py's on_audio_data for each audio_transport
+setting:
+- json: the PCM bytes as a JSON int list (legacy)
+- binary: the PCM bytes as a Socket.IO binary attachment
+- peaks: 64 visualizer peak bytes from audio_processor.visualizer_peaks
+
+Each payload is encoded as a full Socket.IO EVENT packet (plain JSON when
+python-socketio is not installed), and the results are scaled to one
+second of 24 kHz playback.
+
+Usage:
+    python bench/audio_transport_bench.py
+    python bench/audio_transport_bench.py --iterations 500 --out audio_transport_bench.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from audio_processor import visualizer_peaks
+
+RECEIVE_SAMPLE_RATE = 24000
+
+TRANSPORTS = {
+    "json": lambda data: {'data': list(data)},
+    "binary": lambda data: {'data': bytes(data)},
+    "peaks": lambda data: {'peaks': visualizer_peaks(data)},
+}
+
+
+def encode_socketio_event(event: str, payload: dict) -> int:
+    """Wire size of a Socket.IO event, falling back to JSON if python-socketio is missing"""
+    try:
+        from socketio import packet
+    except ImportError:
+        return len(json.dumps([event, payload]).encode())
+    encoded = packet.Packet(packet.EVENT, data=[event, payload]).encode()
+    if isinstance(encoded, list):
+        return sum(len(part) for part in encoded)
+    return len(encoded)
+
+
+def playback_chunk(samples: int, amplitude: float = 4000.0, seed: int = 0) -> bytes:
+    """Noise standing in for model audio, as int16 PCM"""
+    rng = np.random.default_rng(seed)
+    return np.clip(rng.normal(0.0, amplitude, samples), -32768, 32767).astype(np.int16).tobytes()
+
+
+def run_benchmark(chunk_ms: int = 100, iterations: int = 200) -> dict:
+    config = {"chunk_ms": chunk_ms, "iterations": iterations, "sample_rate": RECEIVE_SAMPLE_RATE}
+    chunk = playback_chunk(RECEIVE_SAMPLE_RATE * chunk_ms // 1000)
+    chunks_per_second = 1000.0 / chunk_ms
+    results = []
+    for mode, build in TRANSPORTS.items():
+        size = encode_socketio_event('audio_data', build(chunk))
+        start = time.perf_counter()
+        for _ in range(iterations):
+            encode_socketio_event('audio_data', build(chunk))
+        encode_s = (time.perf_counter() - start) / iterations
+        results.append({
+            "transport": mode,
+            "bytes_per_event": size,
+            "bytes_per_sec": size * chunks_per_second,
+            "encode_us": encode_s * 1e6,
+            "cpu_percent": encode_s * chunks_per_second * 100.0
+        })
+    return {
+        "benchmark": "audio_transport",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the audio_data transports")
+    parser.add_argument("--chunk-ms", type=int, default=100, help="Playback chunk duration")
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--out", default="audio_transport_bench_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.chunk_ms, args.iterations)
+
+    print(f"\n{'transport':>10} {'bytes/event':>12} {'KiB/s':>9} {'encode us':>10} {'% core':>8}")
+    for r in report["results"]:
+        print(f"{r['transport']:>10} {r['bytes_per_event']:>12} {r['bytes_per_sec'] / 1024:>9.1f} "
+              f"{r['encode_us']:>10.1f} {r['cpu_percent']:>8.3f}")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,154 @@
+"""
+Chat History Benchmark for ADA V2
+Measures reading the most recent messages from large chat_history.jsonl files.
+
+Three reads are compared on each history size:
+- legacy: what ProjectManager.get_recent_chat_history used to do
+  (readlines() on the whole file, then [-limit:])
+- tail: ChatHistory.tail, reading backwards from EOF in 64 KB blocks
+- since: ChatHistory.since, seeking through the offset index to a point in time
+
+Peak Python allocations are measured with tracemalloc in a separate pass.
+Files are freshly written, so reads come from the page cache. The legacy
+read is skipped above --legacy-max-mb because it holds the whole file in memory.
+
+Usage:
+    python bench/chat_history_bench.py                      # 1 MB, 100 MB and 1 GB
+    python bench/chat_history_bench.py --sizes 1 10 --limit 50 --out chat_history_bench.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from chat_history import ChatHistory
+
+TEXTS = (
+    "Can you make the enclosure two millimetres wider?",
+    "Sure, I've widened the enclosure and regenerated the model. It's in the CAD window now.",
+    "Turn the desk lamp to fifty percent.",
+    "Done. The desk lamp is at fifty percent brightness.",
+    "What's the status of the print on the Prusa?"
+)
+
+
+def write_history(path: Path, size_mb: float, start_ts: float = 1.7e9) -> int:
+    """Write a chat log of about size_mb megabytes (one message per second); returns the message count"""
+    target = int(size_mb * 1024 * 1024)
+    written = 0
+    count = 0
+    with open(path, "wb") as f:
+        while written < target:
+            lines = []
+            for _ in range(10000):
+                entry = {"timestamp": start_ts + count, "sender": "User" if count % 2 == 0 else "JARVIS",
+                         "text": TEXTS[count % len(TEXTS)]}
+                lines.append(json.dumps(entry) + "\n")
+                count += 1
+            chunk = "".join(lines).encode("utf-8")
+            f.write(chunk)
+            written += len(chunk)
+    return count
+
+
+def legacy_recent(path: Path, limit: int) -> list:
+    with open(path, "r", encoding="utf-8") as f:
+        lines = f.readlines()
+    history = []
+    for line in lines[-limit:]:
+        try:
+            history.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return history
+
+
+def measure(fn, repeat: int) -> dict:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"ms": min(timings) * 1000.0, "peak_kb": peak / 1024.0, "records": len(result)}
+
+
+def run_size(size_mb: float, limit: int, legacy_max_mb: float, workdir: str) -> dict:
+    path = Path(workdir) / "chat_history.jsonl"
+    start_ts = 1.7e9
+    messages = write_history(path, size_mb, start_ts)
+    history = ChatHistory(path)
+    start = time.perf_counter()
+    history.rebuild_index()
+    index_s = time.perf_counter() - start
+
+    middle_ts = start_ts + messages // 2
+    repeat = 3 if size_mb >= 100 else 10
+    result = {
+        "size_mb": size_mb,
+        "messages": messages,
+        "file_bytes": path.stat().st_size,
+        "index_bytes": history.index.path.stat().st_size,
+        "index_build_ms": index_s * 1000.0,
+        "tail": measure(lambda: history.tail(limit), repeat),
+        "since": measure(lambda: history.since(middle_ts, limit), repeat),
+        "legacy": measure(lambda: legacy_recent(path, limit), 1 if size_mb >= 100 else repeat) if size_mb <= legacy_max_mb else None
+    }
+    assert result["tail"]["records"] == limit
+    os.remove(history.index.path)
+    os.remove(path)
+    return result
+
+
+def run_benchmark(sizes=(1, 100, 1024), limit: int = 10, legacy_max_mb: float = 1024) -> dict:
+    config = {"sizes_mb": list(sizes), "limit": limit, "legacy_max_mb": legacy_max_mb}
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [run_size(size, limit, legacy_max_mb, workdir) for size in sizes]
+    return {
+        "benchmark": "chat_history",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark reading recent chat history from large logs")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 100, 1024], help="History sizes in MB")
+    parser.add_argument("--limit", type=int, default=10, help="Messages to read (AudioLoop reconnect uses 10)")
+    parser.add_argument("--legacy-max-mb", type=float, default=1024, help="Skip the readlines() read above this size")
+    parser.add_argument("--out", default="chat_history_bench_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.sizes, args.limit, args.legacy_max_mb)
+
+    print(f"\n{'size MB':>8} {'messages':>10} {'legacy ms':>10} {'legacy KB':>10} {'tail ms':>8} {'tail KB':>8} {'since ms':>9} {'index KB':>9}")
+    for r in report["results"]:
+        legacy = r["legacy"]
+        legacy_ms = f"{legacy['ms']:.1f}" if legacy else "-"
+        legacy_kb = f"{legacy['peak_kb']:.0f}" if legacy else "-"
+        print(f"{r['size_mb']:>8g} {r['messages']:>10} {legacy_ms:>10} {legacy_kb:>10} {r['tail']['ms']:>8.3f} "
+              f"{r['tail']['peak_kb']:>8.0f} {r['since']['ms']:>9.3f} {r['index_bytes'] / 1024:>9.1f}")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""
+Chat Journal Benchmark for ADA V2
+Measures how long chat logging holds the event loop, and commit behaviour under each fsync policy.
+
+Paths compared on the same stream of messages:
+- legacy: ProjectManager.log_chat on the event loop (open, append, close per message)
+- journal-<policy>: ChatJournal.log on the loop, group commits in a worker thread
+  with fsync policy never / interval / batch
+
+Messages arrive in bursts (a transcription turn ending, a typed message)
+with a short pause between bursts. "blocked" is time spent inside the
+logging call on the loop; "drain" is the time from the last message until
+everything is on disk.
+
+Usage:
+    python bench/chat_journal_bench.py
+    python bench/chat_journal_bench.py --messages 20000 --burst 20 --segment-mb 1 --out chat_journal_bench.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from project_manager import ProjectManager
+from chat_journal import ChatJournal, FSYNC_NEVER, FSYNC_INTERVAL, FSYNC_BATCH
+
+TEXT = "Sure, I've widened the enclosure by two millimetres and regenerated the model."
+
+
+async def run_path(name: str, config: dict, workspace: str) -> dict:
+    project_manager = ProjectManager(workspace, chat_segment_mb=config["segment_mb"])
+    journal = None
+    if name != "legacy":
+        journal = ChatJournal(project_manager.chat_history, fsync=name.split("-", 1)[1])
+
+    blocked = []
+    start = time.perf_counter()
+    for i in range(config["messages"]):
+        sender = "User" if i % 2 == 0 else "JARVIS"
+        t0 = time.perf_counter()
+        if journal:
+            journal.log(*project_manager.chat_log_entry(sender, TEXT))
+        else:
+            project_manager.log_chat(sender, TEXT)
+        blocked.append(time.perf_counter() - t0)
+        if (i + 1) % config["burst"] == 0:
+            await asyncio.sleep(config["pause_ms"] / 1000.0)
+    produced = time.perf_counter()
+    if journal:
+        await journal.close()
+    drained = time.perf_counter()
+
+    history = project_manager.chat_history()
+    blocked.sort()
+    result = {
+        "path": name,
+        "messages": config["messages"],
+        "logged": sum(1 for path in history.segments() + [history.path] for _ in open(path, "rb")),
+        "segments": len(history.segments()),
+        "blocked_ms": sum(blocked) * 1000.0,
+        "p99_block_us": blocked[int(len(blocked) * 0.99)] * 1e6,
+        "max_block_us": blocked[-1] * 1e6,
+        "drain_ms": (drained - produced) * 1000.0,
+        "total_ms": (drained - start) * 1000.0
+    }
+    if journal:
+        metrics = journal.get_metrics()
+        result.update(commits=metrics["commits"], largest_commit=metrics["largest_commit"], fsyncs=metrics["fsyncs"])
+    return result
+
+
+def run_benchmark(messages: int = 5000, burst: int = 10, pause_ms: float = 1.0, segment_mb: float = None) -> dict:
+    config = {"messages": messages, "burst": burst, "pause_ms": pause_ms, "segment_mb": segment_mb}
+    results = []
+    for name in ("legacy", f"journal-{FSYNC_NEVER}", f"journal-{FSYNC_INTERVAL}", f"journal-{FSYNC_BATCH}"):
+        with tempfile.TemporaryDirectory() as workspace:
+            results.append(asyncio.run(run_path(name, config, workspace)))
+    return {
+        "benchmark": "chat_journal",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark chat log writes on the event loop")
+    parser.add_argument("--messages", type=int, default=5000)
+    parser.add_argument("--burst", type=int, default=10, help="Messages logged back to back before a pause")
+    parser.add_argument("--pause-ms", type=float, default=1.0)
+    parser.add_argument("--segment-mb", type=float, default=None, help="Roll segments past this size")
+    parser.add_argument("--out", default="chat_journal_bench_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.messages, args.burst, args.pause_ms, args.segment_mb)
+
+    print(f"\n{'path':>17} {'logged':>7} {'blocked ms':>11} {'p99 us':>8} {'max us':>8} {'drain ms':>9} {'commits':>8} {'fsyncs':>7}")
+    for r in report["results"]:
+        print(f"{r['path']:>17} {r['logged']:>7} {r['blocked_ms']:>11.2f} {r['p99_block_us']:>8.1f} {r['max_block_us']:>8.1f} "
+              f"{r['drain_ms']:>9.1f} {r.get('commits', '-'):>8} {r.get('fsyncs', '-'):>7}")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
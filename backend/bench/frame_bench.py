@@ -0,0 +1,134 @@
+"""
+Camera Frame Benchmark for ADA V2
+Measures frames/sec sent and encode time for camera frames from a synthetic video source.
+
+Two paths are compared on the same frames:
+- legacy: what AudioLoop._get_frame used to do for every frame
+  (BGR->RGB, PIL thumbnail to 1024, JPEG into a new BytesIO, base64)
+- pipeline: FramePipeline (downscaled change detection, cv2.imencode
+  straight from BGR, unchanged frames skipped)
+
+Frame timestamps are simulated at --fps so "fps sent" reflects the capture
+rate rather than how fast this machine can run the loop.
+
+Usage:
+    python bench/frame_bench.py
+    python bench/frame_bench.py --frames 300 --fps 1 --width 1920 --height 1080 --out frame_bench.json
+"""
+
+import argparse
+import base64
+import datetime
+import io
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+
+import cv2
+import PIL.Image
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from frame_pipeline import FramePipeline, SyntheticVideoSource
+
+
+def legacy_encode(frame_bgr) -> dict:
+    """The pre-pipeline AudioLoop._get_frame body"""
+    frame_rgb = cv2.cvtColor(frame_bgr, cv2.COLOR_BGR2RGB)
+    img = PIL.Image.fromarray(frame_rgb)
+    img.thumbnail([1024, 1024])
+    image_io = io.BytesIO()
+    img.save(image_io, format="jpeg")
+    image_io.seek(0)
+    return {"mime_type": "image/jpeg", "data": base64.b64encode(image_io.read()).decode()}
+
+
+def make_source(config: dict) -> SyntheticVideoSource:
+    frames = config["frames"]
+    # Motion during the second and fourth fifths of the clip
+    motion = ((frames // 5, 2 * frames // 5), (3 * frames // 5, 4 * frames // 5))
+    return SyntheticVideoSource(width=config["width"], height=config["height"],
+                                frames=frames, motion=motion)
+
+
+def run_path(name: str, config: dict) -> dict:
+    source = make_source(config)
+    pipeline = FramePipeline() if name == "pipeline" else None
+    interval = 1.0 / config["fps"]
+    sent = 0
+    sent_bytes = 0
+    encode_s = 0.0
+
+    cpu_start = time.process_time()
+    while True:
+        ok, frame = source.read()
+        if not ok:
+            break
+        if pipeline:
+            msg = pipeline.process(frame, now=source.index * interval)
+        else:
+            start = time.perf_counter()
+            msg = legacy_encode(frame)
+            encode_s += time.perf_counter() - start
+        if msg is not None:
+            sent += 1
+            sent_bytes += len(msg["data"])
+    cpu = time.process_time() - cpu_start
+
+    duration = config["frames"] * interval
+    if pipeline:
+        metrics = pipeline.get_metrics()
+        encode_ms = metrics["avg_encode_ms"]
+    else:
+        encode_ms = encode_s * 1000.0 / max(sent, 1)
+    return {
+        "path": name,
+        "frames": config["frames"],
+        "frames_sent": sent,
+        "fps_sent": sent / duration,
+        "avg_encode_ms": encode_ms,
+        "cpu_ms_per_frame": cpu * 1000.0 / config["frames"],
+        "wire_kb_per_sec": sent_bytes / 1024.0 / duration
+    }
+
+
+def run_benchmark(frames: int = 100, fps: float = 1.0, width: int = 1280, height: int = 720) -> dict:
+    config = {"frames": frames, "fps": fps, "width": width, "height": height}
+    return {
+        "benchmark": "camera_frames",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "opencv": cv2.__version__,
+        "config": config,
+        "results": [run_path("legacy", config), run_path("pipeline", config)]
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark camera frame encoding and change detection")
+    parser.add_argument("--frames", type=int, default=100, help="Frames in the synthetic clip")
+    parser.add_argument("--fps", type=float, default=1.0, help="Simulated capture rate")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--out", default="frame_bench_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.frames, args.fps, args.width, args.height)
+
+    print(f"\n{'path':>9} {'sent':>6} {'fps sent':>9} {'encode ms':>10} {'CPU ms/frame':>13} {'KB/s':>8}")
+    for r in report["results"]:
+        print(f"{r['path']:>9} {r['frames_sent']:>6} {r['fps_sent']:>9.2f} {r['avg_encode_ms']:>10.2f} "
+              f"{r['cpu_ms_per_frame']:>13.2f} {r['wire_kb_per_sec']:>8.1f}")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
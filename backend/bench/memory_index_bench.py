@@ -0,0 +1,143 @@
+"""
+Memory Index Benchmark for ADA V2
+Measures search_project_memory query latency as a project's chat history grows.
+
+Two searches are compared on each history size:
+- scan: the only option without an index, reading the chat log and
+  keeping messages that contain every query word
+- index: MemoryIndex.search (SQLite FTS5, BM25 over the newest matches)
+
+Queries mix rare words, common words and multi-word phrases. The index is
+built once per size (its build time and size on disk are reported); each
+query is run --repeat times and latencies are reported as p50/p99.
+
+Usage:
+    python bench/memory_index_bench.py                       # 10k, 100k and 1M messages
+    python bench/memory_index_bench.py --messages 10000 100000 --out memory_index_bench.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from memory_index import MemoryIndex
+
+TEXTS = (
+    "Can you make the enclosure two millimetres wider?",
+    "Sure, I've widened the enclosure and regenerated the model. It's in the CAD window now.",
+    "Turn the desk lamp to fifty percent.",
+    "Done. The desk lamp is at fifty percent brightness.",
+    "What's the status of the print on the Prusa?"
+)
+TOPICS = ("stepper", "nozzle", "filament", "bracket", "hinge", "octoprint", "thermistor", "raspberry", "gear", "heatsink")
+QUERIES = ("thermistor", "enclosure wider", "fifty percent lamp", "the", "hinge bracket", "part1234 gear", "nonexistentword")
+
+
+def messages(count: int, start_ts: float = 1.7e9):
+    rng = random.Random(count)
+    for i in range(count):
+        yield {"timestamp": start_ts + i, "sender": "User" if i % 2 == 0 else "JARVIS",
+               "text": f"{TEXTS[i % len(TEXTS)]} {rng.choice(TOPICS)} {rng.choice(TOPICS)} part{i % 5000}"}
+
+
+def scan_search(path: Path, query: str, limit: int) -> list:
+    words = query.lower().split()
+    found = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            entry = json.loads(line)
+            text = entry["text"].lower()
+            if all(w in text for w in words):
+                found.append(entry)
+    return found[-limit:]
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))]
+
+
+def run_size(count: int, repeat: int, scan_max: int, workdir: str) -> dict:
+    log_path = Path(workdir) / f"chat_{count}.jsonl"
+    with open(log_path, "w", encoding="utf-8") as f:
+        for entry in messages(count):
+            f.write(json.dumps(entry) + "\n")
+
+    index = MemoryIndex(Path(workdir) / f"index_{count}.sqlite")
+    start = time.perf_counter()
+    index.add_messages(messages(count))
+    build_s = time.perf_counter() - start
+
+    index_ms = []
+    scan_ms = []
+    for query in QUERIES:
+        index.search(query)  # first use of a word samples its frequency
+        for _ in range(repeat):
+            t0 = time.perf_counter()
+            index.search(query)
+            index_ms.append((time.perf_counter() - t0) * 1000.0)
+        if count <= scan_max:
+            t0 = time.perf_counter()
+            scan_search(log_path, query, 5)
+            scan_ms.append((time.perf_counter() - t0) * 1000.0)
+    index.close()
+
+    return {
+        "messages": count,
+        "build_s": build_s,
+        "log_mb": log_path.stat().st_size / 1e6,
+        "index_mb": sum(p.stat().st_size for p in Path(workdir).glob(f"index_{count}.sqlite*")) / 1e6,
+        "index_p50_ms": percentile(index_ms, 0.5),
+        "index_p99_ms": percentile(index_ms, 0.99),
+        "index_max_ms": max(index_ms),
+        "scan_avg_ms": sum(scan_ms) / len(scan_ms) if scan_ms else None
+    }
+
+
+def run_benchmark(sizes=(10000, 100000, 1000000), repeat: int = 20, scan_max: int = 1000000) -> dict:
+    config = {"messages": list(sizes), "repeat": repeat, "queries": list(QUERIES), "scan_max": scan_max}
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [run_size(count, repeat, scan_max, workdir) for count in sizes]
+    return {
+        "benchmark": "memory_index",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark project memory search latency")
+    parser.add_argument("--messages", type=int, nargs="+", default=[10000, 100000, 1000000], help="History sizes")
+    parser.add_argument("--repeat", type=int, default=20, help="Runs of each query")
+    parser.add_argument("--scan-max", type=int, default=1000000, help="Skip the log scan above this many messages")
+    parser.add_argument("--out", default="memory_index_bench_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.messages, args.repeat, args.scan_max)
+
+    print(f"\n{'messages':>9} {'build s':>8} {'log MB':>7} {'index MB':>9} {'p50 ms':>7} {'p99 ms':>7} {'max ms':>7} {'scan ms':>8}")
+    for r in report["results"]:
+        scan = f"{r['scan_avg_ms']:.0f}" if r["scan_avg_ms"] is not None else "-"
+        print(f"{r['messages']:>9} {r['build_s']:>8.1f} {r['log_mb']:>7.1f} {r['index_mb']:>9.1f} {r['index_p50_ms']:>7.2f} "
+              f"{r['index_p99_ms']:>7.2f} {r['index_max_ms']:>7.2f} {scan:>8}")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,138 @@
+"""
+Memory Ingest Benchmark for ADA V2
+Measures what an upload_memory costs the live session, before and after chunked ingestion.
+
+Two paths are compared on the same generated memory file:
+- legacy: the whole file in one session.send string (reported as its size in tokens)
+- ingest: MemoryIngest fed in UPLOAD_CHUNK_CHARS chunks, indexing into
+  MemoryIndex and producing a digest capped at --digest-tokens
+
+The memory file is a "Sender: text" conversation log with free-text notes
+in between, where --duplicate-share of the lines repeat earlier ones (as
+when overlapping exports are concatenated). "max chunk ms" is the longest
+single feed() call, i.e. the worst wait for a chunk's ack.
+
+Usage:
+    python bench/memory_ingest_bench.py
+    python bench/memory_ingest_bench.py --sizes 1 10 50 --digest-tokens 2000 --out memory_ingest_bench.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from memory_index import MemoryIndex
+from memory_ingest import MemoryIngest, UPLOAD_CHUNK_CHARS
+from project_context import estimate_tokens
+
+TOPICS = ("stepper", "nozzle", "filament", "bracket", "hinge", "octoprint", "thermistor", "raspberry", "gear", "heatsink")
+LINES = (
+    "User: Can you check the {a} on the {b} assembly?",
+    "ADA: The {a} looks fine, but the {b} needs recalibration before the next print.",
+    "User: Order a spare {a} and note the {b} part number {n}.",
+    "ADA: Noted part {n} for the {b}. I'll remind you when the {a} arrives.",
+)
+NOTE = "Workshop notes {n}: the {a} was replaced and the {b} re-tensioned. Next time check clearance first.\n"
+
+
+def make_memory(size_mb: float, duplicate_share: float, seed: int = 7) -> str:
+    rng = random.Random(seed)
+    target = int(size_mb * 1024 * 1024)
+    lines = []
+    written = 0
+    n = 0
+    while written < target:
+        if lines and rng.random() < duplicate_share:
+            line = rng.choice(lines)
+        elif n % 200 == 0:
+            line = NOTE.format(n=n, a=rng.choice(TOPICS), b=rng.choice(TOPICS))
+        else:
+            line = LINES[n % len(LINES)].format(a=rng.choice(TOPICS), b=rng.choice(TOPICS), n=n)
+        lines.append(line)
+        written += len(line) + 1
+        n += 1
+    return "\n".join(lines)
+
+
+def run_size(size_mb: float, duplicate_share: float, digest_tokens: int, workdir: str) -> dict:
+    text = make_memory(size_mb, duplicate_share)
+    index = MemoryIndex(Path(workdir) / f"index_{size_mb}.sqlite")
+    ingest = MemoryIngest(index, name="memory.txt", total_bytes=len(text.encode("utf-8")), digest_tokens=digest_tokens)
+
+    chunk_ms = []
+    start = time.perf_counter()
+    for offset in range(0, len(text), UPLOAD_CHUNK_CHARS):
+        t0 = time.perf_counter()
+        ingest.feed(text[offset:offset + UPLOAD_CHUNK_CHARS])
+        chunk_ms.append((time.perf_counter() - t0) * 1000.0)
+    digest = ingest.finish("when does the spare thermistor arrive")
+    total_s = time.perf_counter() - start
+
+    t0 = time.perf_counter()
+    hits = index.search("spare thermistor part")
+    search_ms = (time.perf_counter() - t0) * 1000.0
+    progress = ingest.progress()
+    index.close()
+    return {
+        "size_mb": size_mb,
+        "legacy_tokens": estimate_tokens(text),
+        "digest_tokens": estimate_tokens(digest),
+        "ingest_s": total_s,
+        "mb_per_s": size_mb / total_s,
+        "chunks": len(chunk_ms),
+        "max_chunk_ms": max(chunk_ms),
+        "messages": progress["messages"],
+        "passages": progress["passages"],
+        "duplicates": progress["duplicates"],
+        "search_ms": search_ms,
+        "search_hits": len(hits)
+    }
+
+
+def run_benchmark(sizes=(1, 10, 50), duplicate_share: float = 0.2, digest_tokens: int = 2000) -> dict:
+    config = {"sizes_mb": list(sizes), "duplicate_share": duplicate_share, "digest_tokens": digest_tokens,
+              "chunk_chars": UPLOAD_CHUNK_CHARS}
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [run_size(size, duplicate_share, digest_tokens, workdir) for size in sizes]
+    return {
+        "benchmark": "memory_ingest",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark chunked memory upload ingestion")
+    parser.add_argument("--sizes", type=float, nargs="+", default=[1, 10, 50], help="Memory file sizes in MB")
+    parser.add_argument("--duplicate-share", type=float, default=0.2, help="Fraction of repeated lines")
+    parser.add_argument("--digest-tokens", type=int, default=2000)
+    parser.add_argument("--out", default="memory_ingest_bench_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.sizes, args.duplicate_share, args.digest_tokens)
+
+    print(f"\n{'MB':>5} {'legacy tok':>11} {'digest tok':>11} {'ingest s':>9} {'MB/s':>6} {'max chunk ms':>13} {'messages':>9} {'dupes':>7} {'search ms':>10}")
+    for r in report["results"]:
+        print(f"{r['size_mb']:>5g} {r['legacy_tokens']:>11} {r['digest_tokens']:>11} {r['ingest_s']:>9.1f} {r['mb_per_s']:>6.1f} "
+              f"{r['max_chunk_ms']:>13.0f} {r['messages']:>9} {r['duplicates']:>7} {r['search_ms']:>10.2f}")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+Project Context Benchmark for ADA V2
+Measures building the switch_project context for projects of growing size.
+
+Two paths are compared on the same project tree:
+- legacy: what ProjectManager.get_project_context used to do
+  (os.walk, re-read every text file up to 10 KB including chat_history.jsonl,
+  concatenate everything)
+- indexed: ProjectContext manifest refresh + token-budgeted build, measured
+  cold (first switch), warm (nothing changed) and after touching one file
+
+The project holds generated sources, notes, JSON settings, STL models and a
+chat history of --chat-mb megabytes.
+
+Usage:
+    python bench/project_context_bench.py
+    python bench/project_context_bench.py --files 100 1000 5000 --budget 8000 --out project_context_bench.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from project_context import ProjectContext, estimate_tokens
+
+SOURCE = "def part_{i}(width, height):\n    \"\"\"Enclosure part {i}\"\"\"\n    return box(width, height, {i})\n\n" * 20
+NOTE = "# Print notes {i}\n\nLayer height 0.2 mm, PETG, brim on.\n\n## Issues\n\nWarping on the left corner.\n" * 10
+
+
+def make_project(root: Path, files: int, chat_mb: float):
+    (root / "cad").mkdir(parents=True)
+    (root / "notes").mkdir()
+    for i in range(files):
+        kind = i % 4
+        if kind == 0:
+            (root / f"part_{i}.py").write_text(SOURCE.format(i=i))
+        elif kind == 1:
+            (root / "notes" / f"note_{i}.md").write_text(NOTE.format(i=i))
+        elif kind == 2:
+            (root / f"settings_{i}.json").write_text(json.dumps({"part": i, "infill": 20, "material": "PETG"}))
+        else:
+            (root / "cad" / f"model_{i}.stl").write_bytes(b"\0" * 20000)
+    line = json.dumps({"timestamp": 1.7e9, "sender": "User", "text": "Make the enclosure wider"}) + "\n"
+    with open(root / "chat_history.jsonl", "w") as f:
+        f.write(line * int(chat_mb * 1024 * 1024 / len(line)))
+
+
+def legacy_context(project_path: Path, max_file_size: int = 10000) -> str:
+    context_lines = [f"=== Project Context: 'bench' ===", f"Project directory: {project_path}", ""]
+    all_files = []
+    for root, dirs, files in os.walk(project_path):
+        for f in files:
+            all_files.append(os.path.relpath(os.path.join(root, f), project_path))
+    context_lines.append(f"Files ({len(all_files)} total):")
+    for f in all_files:
+        context_lines.append(f"  - {f}")
+    context_lines.append("")
+    text_extensions = {'.txt', '.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.md', '.html', '.css', '.jsonl'}
+    for rel_path in all_files:
+        if os.path.splitext(rel_path)[1].lower() not in text_extensions:
+            continue
+        full_path = project_path / rel_path
+        file_size = full_path.stat().st_size
+        if file_size > max_file_size:
+            context_lines.append(f"--- {rel_path} (too large: {file_size} bytes, skipped) ---")
+            continue
+        with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
+            context_lines.append(f"--- {rel_path} ---")
+            context_lines.append(f.read())
+            context_lines.append("")
+    return "\n".join(context_lines)
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, (time.perf_counter() - start) * 1000.0
+
+
+def run_size(files: int, budget: int, chat_mb: float, workdir: str) -> dict:
+    root = Path(workdir) / f"project_{files}"
+    make_project(root, files, chat_mb)
+    query = "enclosure part warping notes"
+
+    legacy, legacy_ms = timed(lambda: legacy_context(root))
+
+    context = ProjectContext(root)
+
+    def build():
+        context.refresh()
+        return context.build("bench", budget, query)
+
+    cold, cold_ms = timed(build)
+    cold_reads = context.reads
+    _, warm_ms = timed(build)
+    warm_reads = context.reads - cold_reads
+    touched = root / "part_0.py"
+    touched.write_text(touched.read_text() + "\n# widened\n")
+    _, changed_ms = timed(build)
+    changed_reads = context.reads - cold_reads - warm_reads
+
+    return {
+        "files": files,
+        "legacy_ms": legacy_ms,
+        "legacy_tokens": estimate_tokens(legacy),
+        "cold_ms": cold_ms,
+        "warm_ms": warm_ms,
+        "changed_ms": changed_ms,
+        "cold_reads": cold_reads,
+        "warm_reads": warm_reads,
+        "changed_reads": changed_reads,
+        "context_tokens": estimate_tokens(cold)
+    }
+
+
+def run_benchmark(files=(100, 1000, 5000), budget: int = 8000, chat_mb: float = 1.0) -> dict:
+    config = {"files": list(files), "budget_tokens": budget, "chat_mb": chat_mb}
+    with tempfile.TemporaryDirectory() as workdir:
+        results = [run_size(count, budget, chat_mb, workdir) for count in files]
+    return {
+        "benchmark": "project_context",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark building the project context for switch_project")
+    parser.add_argument("--files", type=int, nargs="+", default=[100, 1000, 5000], help="Files per project")
+    parser.add_argument("--budget", type=int, default=8000, help="Context token budget")
+    parser.add_argument("--chat-mb", type=float, default=1.0, help="Size of the project's chat history")
+    parser.add_argument("--out", default="project_context_bench_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.files, args.budget, args.chat_mb)
+
+    print(f"\n{'files':>6} {'legacy ms':>10} {'legacy tok':>11} {'cold ms':>8} {'warm ms':>8} {'1 change ms':>12} {'reads':>12} {'tokens':>7}")
+    for r in report["results"]:
+        reads = f"{r['cold_reads']}/{r['warm_reads']}/{r['changed_reads']}"
+        print(f"{r['files']:>6} {r['legacy_ms']:>10.1f} {r['legacy_tokens']:>11} {r['cold_ms']:>8.1f} {r['warm_ms']:>8.1f} "
+              f"{r['changed_ms']:>12.1f} {reads:>12} {r['context_tokens']:>7}")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,160 @@
+"""
+Outbound Session Benchmark for ADA V2
+Measures messages/sec, CPU and added latency of mic audio sends at each coalescing window.
+
+A fake Live session does the per-message work the SDK does (base64 + JSON
+framing of a realtime_input message) instead of talking to the network.
+Mic chunks are produced at the real 64 ms cadence into an OutboundScheduler
+and drained by the same loop as AudioLoop.send_realtime; a scripted
+utterance triggers the onset/offset flushes that listen_audio performs.
+
+Usage:
+    python bench/session_bench.py
+    python bench/session_bench.py --windows 0 50 128 200 --seconds 10 --out session_bench.json
+"""
+
+import argparse
+import asyncio
+import base64
+import datetime
+import json
+import os
+import platform
+import sys
+import time
+from pathlib import Path
+from typing import List
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from session_scheduler import OutboundScheduler
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 1024
+CHUNK_BYTES = CHUNK_SIZE * 2
+DEFAULT_WINDOWS = [0, 20, 50, 100, 150, 200]
+
+
+class FakeSession:
+    """Stands in for the Live session; frames each message like the SDK would"""
+
+    def __init__(self):
+        self.messages = 0
+        self.wire_bytes = 0
+        self.send_cpu_s = 0.0
+
+    async def send(self, input=None, end_of_turn=False):
+        start = time.thread_time()
+        if isinstance(input, dict):
+            payload = {"realtime_input": {"media_chunks": [{
+                "mime_type": input["mime_type"],
+                "data": base64.b64encode(input["data"]).decode() if isinstance(input["data"], bytes) else input["data"]
+            }]}}
+        else:
+            payload = {"client_content": {"turns": [{"role": "user", "parts": [{"text": str(input)}]}],
+                                          "turn_complete": end_of_turn}}
+        self.wire_bytes += len(json.dumps(payload))
+        self.messages += 1
+        self.send_cpu_s += time.thread_time() - start
+        await asyncio.sleep(0)
+
+
+async def run_window(window_ms: float, seconds: float, speech=((1.0, 3.0),)) -> dict:
+    """Stream `seconds` of mic audio through the scheduler at one window setting"""
+    session = FakeSession()
+    scheduler = OutboundScheduler(audio_window_ms=window_ms, audio_bytes_per_ms=SAMPLE_RATE * 2 / 1000)
+    chunk_s = CHUNK_SIZE / SAMPLE_RATE
+    chunks = int(seconds / chunk_s)
+    chunk = bytes(CHUNK_BYTES)
+    edges = sorted({int(t / chunk_s) for segment in speech for t in segment})
+    flushes = []
+
+    async def sender():
+        # Same loop as AudioLoop.send_realtime
+        while True:
+            msg = await scheduler.get()
+            await session.send(input=msg, end_of_turn=False)
+
+    async def producer():
+        start = time.monotonic()
+        for i in range(chunks):
+            delay = start + (i + 1) * chunk_s - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            await scheduler.put({"data": chunk, "mime_type": "audio/pcm"})
+            if i in edges:
+                scheduler.flush_audio()
+                flushes.append(i)
+        # Let the last batch go out
+        while scheduler.qsize():
+            await asyncio.sleep(0.005)
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    sender_task = asyncio.ensure_future(sender())
+    try:
+        await producer()
+    finally:
+        sender_task.cancel()
+        try:
+            await sender_task
+        except asyncio.CancelledError:
+            pass
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    audio = scheduler.get_metrics()["audio"]
+    audio_seconds = chunks * chunk_s
+    return {
+        "window_ms": scheduler.audio_window_ms,
+        "audio_seconds": audio_seconds,
+        "messages": session.messages,
+        "messages_per_sec": session.messages / audio_seconds,
+        "chunks_per_message": audio["sent"] / max(session.messages, 1),
+        "wire_bytes_per_sec": session.wire_bytes / audio_seconds,
+        "cpu_percent": cpu / wall * 100.0,
+        "cpu_ms_per_audio_sec": cpu * 1000.0 / audio_seconds,
+        "send_cpu_ms_per_audio_sec": session.send_cpu_s * 1000.0 / audio_seconds,
+        "avg_added_latency_ms": audio["avg_wait_ms"],
+        "max_added_latency_ms": audio["max_wait_ms"],
+        "flushes": len(flushes)
+    }
+
+
+async def run_benchmark(windows: List[float], seconds: float) -> dict:
+    results = [await run_window(window, seconds) for window in windows]
+    return {
+        "benchmark": "session_send",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": {"chunk_size": CHUNK_SIZE, "sample_rate": SAMPLE_RATE, "seconds": seconds},
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark coalesced audio sends against a fake session")
+    parser.add_argument("--windows", type=float, nargs="+", default=DEFAULT_WINDOWS, help="Coalescing windows in ms (0 = off)")
+    parser.add_argument("--seconds", type=float, default=5.0, help="Audio streamed per setting")
+    parser.add_argument("--out", default="session_bench_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_benchmark(args.windows, args.seconds))
+
+    # "CPU ms/s" is the whole process per second of audio (mostly the 64 ms pacing
+    # loop); "send ms/s" is only the per-message framing work in the fake session
+    print(f"\n{'window':>8} {'msgs/s':>8} {'chunks/msg':>11} {'CPU %':>7} {'CPU ms/s':>9} {'send ms/s':>10} "
+          f"{'avg wait':>9} {'max wait':>9}")
+    for r in report["results"]:
+        print(f"{r['window_ms']:>6.0f}ms {r['messages_per_sec']:>8.1f} {r['chunks_per_message']:>11.2f} "
+              f"{r['cpu_percent']:>7.2f} {r['cpu_ms_per_audio_sec']:>9.2f} {r['send_cpu_ms_per_audio_sec']:>10.3f} "
+              f"{r['avg_added_latency_ms']:>7.1f}ms {r['max_added_latency_ms']:>7.1f}ms")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,186 @@
+"""
+Transcript Benchmark for ADA V2
+Measures transcription assembly throughput on long utterances and how long chat logging blocks the event loop.
+
+Two paths are compared on the same synthetic conversation:
+- legacy: what AudioLoop.receive_audio used to do per transcription event
+  (startswith against the whole previous transcript, chat_buffer["text"] += delta,
+  ProjectManager.log_chat on the event loop at every sender switch)
+- assembler: TranscriptStream deltas, TranscriptAssembler segments and
+  ChatJournal group commits in a worker thread
+
+Events arrive either cumulative (each repeats the whole turn so far, the
+worst case for the legacy path) or as chunks. Event-loop blocking is the
+time spent inside the per-event handling on the loop, including logging.
+
+Usage:
+    python bench/transcript_bench.py
+    python bench/transcript_bench.py --words 20000 --turns 40 --out transcript_bench.json
+"""
+
+import argparse
+import asyncio
+import datetime
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+if __package__ in (None, ""):
+    sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from project_manager import ProjectManager
+from transcript import TranscriptAssembler
+from chat_journal import ChatJournal
+
+WORDS = ("the", "printer", "bed", "needs", "leveling", "before", "we", "start", "another", "long", "print", "job")
+
+
+def utterance_events(words: int, per_event: int, cumulative: bool):
+    """Transcription event texts for one utterance of `words` words"""
+    chunks = []
+    for i in range(0, words, per_event):
+        chunks.append(" ".join(WORDS[j % len(WORDS)] for j in range(i, min(words, i + per_event))) + " ")
+    if not cumulative:
+        return chunks
+    events = []
+    text = ""
+    for chunk in chunks:
+        text += chunk
+        events.append(text)
+    return events
+
+
+class LegacyTranscriber:
+    """The pre-assembler receive_audio transcription body"""
+
+    def __init__(self, project_manager):
+        self.project_manager = project_manager
+        self.chat_buffer = {"sender": None, "text": ""}
+        self.last = {"User": "", "JARVIS": ""}
+
+    def handle(self, sender, transcript):
+        if transcript != self.last[sender]:
+            delta = transcript
+            if transcript.startswith(self.last[sender]):
+                delta = transcript[len(self.last[sender]):]
+            self.last[sender] = transcript
+            if delta:
+                if self.chat_buffer["sender"] != sender:
+                    if self.chat_buffer["sender"] and self.chat_buffer["text"].strip():
+                        self.project_manager.log_chat(self.chat_buffer["sender"], self.chat_buffer["text"])
+                    self.chat_buffer = {"sender": sender, "text": delta}
+                else:
+                    self.chat_buffer["text"] += delta
+
+    def flush(self):
+        if self.chat_buffer["sender"] and self.chat_buffer["text"].strip():
+            self.project_manager.log_chat(self.chat_buffer["sender"], self.chat_buffer["text"])
+            self.chat_buffer = {"sender": None, "text": ""}
+        self.last = {"User": "", "JARVIS": ""}
+
+
+class AssemblerTranscriber:
+    """What receive_audio does now"""
+
+    def __init__(self, project_manager):
+        self.project_manager = project_manager
+        self.chat_log = ChatJournal(project_manager.chat_history)
+        self.transcript = TranscriptAssembler(
+            lambda sender, text: self.chat_log.log(*project_manager.chat_log_entry(sender, text)))
+
+    def handle(self, sender, transcript):
+        stream = self.transcript.input if sender == "User" else self.transcript.output
+        delta = stream.delta(transcript)
+        if delta:
+            self.transcript.add(sender, delta)
+
+    def flush(self):
+        self.transcript.flush()
+
+
+async def run_path(name: str, config: dict, workspace: str) -> dict:
+    project_manager = ProjectManager(workspace)
+    transcriber = LegacyTranscriber(project_manager) if name == "legacy" else AssemblerTranscriber(project_manager)
+    # A turn is a short user question followed by a long model monologue
+    user_events = utterance_events(12, 4, config["cumulative"])
+    model_events = utterance_events(config["words"], config["words_per_event"], config["cumulative"])
+
+    events = 0
+    blocked = []
+    start = time.perf_counter()
+    for _ in range(config["turns"]):
+        for sender, texts in (("User", user_events), ("JARVIS", model_events)):
+            for text in texts:
+                t0 = time.perf_counter()
+                transcriber.handle(sender, text)
+                blocked.append(time.perf_counter() - t0)
+                events += 1
+                await asyncio.sleep(0)
+        t0 = time.perf_counter()
+        transcriber.flush()
+        blocked.append(time.perf_counter() - t0)
+        await asyncio.sleep(0)
+    loop_s = time.perf_counter() - start
+    if name != "legacy":
+        await transcriber.chat_log.close()
+    total_s = time.perf_counter() - start
+
+    log_file = project_manager.get_current_project_path() / "chat_history.jsonl"
+    with open(log_file, encoding="utf-8") as f:
+        messages = sum(1 for _ in f)
+    blocked.sort()
+    return {
+        "path": name,
+        "events": events,
+        "messages_logged": messages,
+        "events_per_sec": events / loop_s,
+        "loop_blocked_ms": sum(blocked) * 1000.0,
+        "max_block_ms": blocked[-1] * 1000.0,
+        "p99_block_ms": blocked[int(len(blocked) * 0.99)] * 1000.0,
+        "total_ms": total_s * 1000.0
+    }
+
+
+def run_benchmark(words: int = 5000, words_per_event: int = 5, turns: int = 20, cumulative: bool = True) -> dict:
+    config = {"words": words, "words_per_event": words_per_event, "turns": turns, "cumulative": cumulative}
+    results = []
+    for name in ("legacy", "assembler"):
+        with tempfile.TemporaryDirectory() as workspace:
+            results.append(asyncio.run(run_path(name, config, workspace)))
+    return {
+        "benchmark": "transcript",
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "config": config,
+        "results": results
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark transcription assembly and chat logging")
+    parser.add_argument("--words", type=int, default=5000, help="Words in each model monologue")
+    parser.add_argument("--words-per-event", type=int, default=5)
+    parser.add_argument("--turns", type=int, default=20)
+    parser.add_argument("--chunks", action="store_true", help="Chunk-based events instead of cumulative text")
+    parser.add_argument("--out", default="transcript_bench_results.json", help="JSON output path")
+    args = parser.parse_args(argv)
+
+    report = run_benchmark(args.words, args.words_per_event, args.turns, cumulative=not args.chunks)
+
+    print(f"\n{'path':>10} {'events':>7} {'logged':>7} {'events/s':>10} {'blocked ms':>11} {'p99 ms':>8} {'max ms':>8}")
+    for r in report["results"]:
+        print(f"{r['path']:>10} {r['events']:>7} {r['messages_logged']:>7} {r['events_per_sec']:>10.0f} "
+              f"{r['loop_blocked_ms']:>11.2f} {r['p99_block_ms']:>8.3f} {r['max_block_ms']:>8.3f}")
+
+    with open(args.out, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults written to {os.path.abspath(args.out)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
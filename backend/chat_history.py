@@ -0,0 +1,346 @@
+"""
+Chat History for ADA V2
+Reads chat_history.jsonl from the end and keeps a sidecar offset index for lookups by time.
+"""
+
+import bisect
+import json
+import os
+import re
+import struct
+import threading
+from pathlib import Path
+from typing import Iterator, List, Optional
+
+BLOCK_SIZE = 64 * 1024
+
+
+def iter_lines_reverse(path, block_size: int = BLOCK_SIZE, end: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Yield the lines of a file last to first, reading `block_size` bytes at a
+    time backwards from `end` (default EOF). Only as much of the file is read
+    as the caller consumes. A final line without a newline is yielded too.
+    """
+    with open(path, "rb") as f:
+        position = f.seek(0, os.SEEK_END) if end is None else end
+        remainder = b""
+        while position > 0:
+            size = min(block_size, position)
+            position -= size
+            f.seek(position)
+            block = f.read(size) + remainder
+            lines = block.split(b"\n")
+            # The first piece may continue in the previous block
+            remainder = lines[0]
+            for line in reversed(lines[1:]):
+                if line:
+                    yield line
+        if remainder:
+            yield remainder
+
+
+def read_last_records(path, limit: int, block_size: int = BLOCK_SIZE) -> List[dict]:
+    """The last `limit` parseable JSON records of a JSONL file, oldest first"""
+    records = []
+    if limit <= 0:
+        return records
+    for line in iter_lines_reverse(path, block_size):
+        try:
+            records.append(json.loads(line))
+        except (json.JSONDecodeError, UnicodeDecodeError):
+            continue
+        if len(records) >= limit:
+            break
+    records.reverse()
+    return records
+
+
+class OffsetIndex:
+    """
+    Sidecar index of (timestamp, byte offset) pairs, one per `stride` bytes
+    of log, stored as fixed 16-byte records so it can be appended to
+    without rewriting. It is a hint, not a source of truth: entries only
+    need to point at line starts whose records are no newer than the
+    timestamp, so a missing or short index just means scanning more.
+    """
+
+    RECORD = struct.Struct("<dQ")
+
+    def __init__(self, path, stride: int = BLOCK_SIZE):
+        self.path = Path(path)
+        self.stride = stride
+        self._entries = None  # loaded lazily: list of (timestamp, offset)
+
+    def load(self) -> list:
+        if self._entries is None:
+            try:
+                data = self.path.read_bytes()
+            except FileNotFoundError:
+                data = b""
+            usable = len(data) - len(data) % self.RECORD.size
+            self._entries = list(self.RECORD.iter_unpack(data[:usable]))
+        return self._entries
+
+    @property
+    def last_offset(self) -> int:
+        entries = self.load()
+        return entries[-1][1] if entries else -1
+
+    def add(self, entries: list):
+        """Append (timestamp, offset) pairs (offsets increasing)"""
+        if not entries:
+            return
+        with open(self.path, "ab") as f:
+            f.write(b"".join(self.RECORD.pack(ts, offset) for ts, offset in entries))
+        self.load().extend(entries)
+
+    def reset(self):
+        try:
+            self.path.unlink()
+        except FileNotFoundError:
+            pass
+        self._entries = []
+
+    def offset_before(self, timestamp: float) -> int:
+        """Offset of the last indexed line older than `timestamp` (0 if none)"""
+        entries = self.load()
+        i = bisect.bisect_left(entries, (timestamp, -1))
+        return entries[i - 1][1] if i else 0
+
+
+class ChatHistory:
+    """
+    One project's chat log plus its offset index (chat_history.jsonl.idx).
+    append() is the only writer and keeps the index current; tail() and
+    since() read without loading the file.
+
+    With `segment_bytes` set, the active file is sealed once it reaches that
+    size: it is renamed to chat_history.000001.jsonl (then .000002, ...)
+    with its index, and a new chat_history.jsonl is started. Readers cover
+    sealed segments and the active file as one log.
+
+    append() opens and closes the file each time unless open() was called,
+    in which case the handle stays open until close(); flush() pushes
+    buffered writes to the OS and optionally fsyncs.
+
+    The chat journal writes from a worker thread while the event loop and
+    the search index read, so writes, rolls and reads share a lock.
+    records() only holds it while opening the files, not while streaming.
+    """
+
+    def __init__(self, path, stride: int = BLOCK_SIZE, segment_bytes: Optional[int] = None):
+        self.path = Path(path)
+        self.stride = stride
+        self.segment_bytes = segment_bytes
+        self.index = OffsetIndex(self._index_path(self.path), stride)
+        self._file = None
+        self.rolls = 0
+        self._lock = threading.RLock()
+
+    @staticmethod
+    def _index_path(path: Path) -> Path:
+        return path.with_name(path.name + ".idx")
+
+    def segments(self) -> List[Path]:
+        """Sealed segments, oldest first"""
+        pattern = re.compile(re.escape(self.path.stem) + r"\.(\d+)" + re.escape(self.path.suffix) + "$")
+        numbered = []
+        try:
+            for candidate in self.path.parent.iterdir():
+                match = pattern.match(candidate.name)
+                if match:
+                    numbered.append((int(match.group(1)), candidate))
+        except FileNotFoundError:
+            return []
+        return [path for _, path in sorted(numbered)]
+
+    def open(self):
+        with self._lock:
+            if self._file is None:
+                self._file = open(self.path, "ab")
+
+    @property
+    def is_open(self) -> bool:
+        return self._file is not None
+
+    def flush(self, fsync: bool = False):
+        with self._lock:
+            if self._file is not None:
+                self._file.flush()
+                if fsync:
+                    os.fsync(self._file.fileno())
+
+    def close(self, fsync: bool = False):
+        with self._lock:
+            if self._file is not None:
+                self.flush(fsync)
+                self._file.close()
+                self._file = None
+
+    def append(self, entries: List[dict]):
+        """Append records as JSON lines in one write, indexing a line every `stride` bytes"""
+        if not entries:
+            return
+        with self._lock:
+            self._append(entries)
+
+    def _append(self, entries: List[dict]):
+        f = self._file or open(self.path, "ab")
+        try:
+            offset = f.tell()
+            if self._index_stale(offset):
+                self.index.reset()
+            next_indexed = self.index.last_offset + self.stride if self.index.last_offset >= 0 else 0
+            lines = []
+            new_index = []
+            for entry in entries:
+                if offset >= next_indexed:
+                    new_index.append((float(entry.get("timestamp", 0.0)), offset))
+                    next_indexed = offset + self.stride
+                line = (json.dumps(entry) + "\n").encode("utf-8")
+                lines.append(line)
+                offset += len(line)
+            f.write(b"".join(lines))
+        finally:
+            if f is not self._file:
+                f.close()
+        self.index.add(new_index)
+        if self.segment_bytes and offset >= self.segment_bytes:
+            self.roll()
+
+    def roll(self):
+        """Seal the active file as the next numbered segment and start a new one"""
+        with self._lock:
+            self._roll()
+
+    def _roll(self):
+        was_open = self.is_open
+        self.close()
+        segments = self.segments()
+        number = int(segments[-1].name.split(".")[-2]) + 1 if segments else 1
+        sealed = self.path.with_name(f"{self.path.stem}.{number:06d}{self.path.suffix}")
+        os.replace(self.path, sealed)
+        if self.index.path.exists():
+            os.replace(self.index.path, self._index_path(sealed))
+        self.index = OffsetIndex(self.index.path, self.stride)
+        self.rolls += 1
+        if was_open:
+            self.open()
+
+    def _index_stale(self, size: int) -> bool:
+        """An index pointing past the end of the log belongs to a log that was replaced or truncated"""
+        return 0 < self.index.last_offset >= size
+
+    def _files(self) -> List[Path]:
+        """Sealed segments then the active file, oldest first"""
+        files = self.segments()
+        if self.path.exists():
+            files.append(self.path)
+        return files
+
+    def tail(self, limit: int) -> List[dict]:
+        with self._lock:
+            return self._tail(limit)
+
+    def _tail(self, limit: int) -> List[dict]:
+        records = []
+        for path in reversed(self._files()):
+            if len(records) >= limit:
+                break
+            try:
+                records = read_last_records(path, limit - len(records)) + records
+            except FileNotFoundError:
+                continue  # sealed by a concurrent roll; its records are in the next segment name
+        return records
+
+    def since(self, timestamp: float, limit: Optional[int] = None) -> List[dict]:
+        """Records with timestamp >= `timestamp`, oldest first (at most `limit`)"""
+        with self._lock:
+            return self._since(timestamp, limit)
+
+    def _since(self, timestamp: float, limit: Optional[int]) -> List[dict]:
+        files = self._files()
+        # Skip whole segments when the next one already starts before `timestamp`
+        first = 0
+        for i in range(1, len(files)):
+            index = OffsetIndex(self._index_path(files[i]), self.stride).load()
+            if index and index[0][1] == 0 and index[0][0] < timestamp:
+                first = i
+        records = []
+        for path in files[first:]:
+            if path == self.path:
+                # Only append() repairs a stale index; readers just ignore it
+                start = 0 if self._index_stale(path.stat().st_size) else self.index.offset_before(timestamp)
+            else:
+                start = OffsetIndex(self._index_path(path), self.stride).offset_before(timestamp)
+            records.extend(self._scan(path, start, timestamp, None if limit is None else limit - len(records)))
+            if limit is not None and len(records) >= limit:
+                break
+        return records
+
+    def records(self) -> Iterator[dict]:
+        """Every record, oldest first, streamed rather than loaded (e.g. to build a search index)"""
+        # Open handles survive a roll renaming the files, and the active file
+        # is only read up to its size now, so appends during the stream are
+        # neither split nor half read
+        with self._lock:
+            self.flush()
+            handles = []
+            for path in self._files():
+                try:
+                    f = open(path, "rb")
+                except FileNotFoundError:
+                    continue
+                handles.append((f, os.fstat(f.fileno()).st_size))
+        try:
+            for f, size in handles:
+                remaining = size
+                for line in f:
+                    remaining -= len(line)
+                    if remaining < 0:
+                        break
+                    try:
+                        yield json.loads(line)
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        continue
+        finally:
+            for f, _ in handles:
+                f.close()
+
+    @staticmethod
+    def _scan(path: Path, start: int, timestamp: float, limit: Optional[int]) -> List[dict]:
+        records = []
+        with open(path, "rb") as f:
+            f.seek(start)
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except (json.JSONDecodeError, UnicodeDecodeError):
+                    continue
+                if entry.get("timestamp", 0.0) < timestamp:
+                    continue
+                records.append(entry)
+                if limit is not None and len(records) >= limit:
+                    break
+        return records
+
+    def rebuild_index(self):
+        """Index the active file from scratch (e.g. one written before the index existed)"""
+        with self._lock:
+            self._rebuild_index()
+
+    def _rebuild_index(self):
+        self.index.reset()
+        new_index = []
+        next_indexed = 0
+        offset = 0
+        with open(self.path, "rb") as f:
+            for line in f:
+                if offset >= next_indexed:
+                    try:
+                        new_index.append((float(json.loads(line).get("timestamp", 0.0)), offset))
+                        next_indexed = offset + self.stride
+                    except (json.JSONDecodeError, UnicodeDecodeError):
+                        pass
+                offset += len(line)
+        self.index.add(new_index)
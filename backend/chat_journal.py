@@ -0,0 +1,214 @@
+"""
+Chat Journal for ADA V2
+Group-committed chat log writes with one open handle per project, off the event loop.
+"""
+
+import asyncio
+import time
+from collections import deque
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+from chat_history import ChatHistory
+from log_config import get_logger
+
+log = get_logger("chat")
+
+# fsync policies
+FSYNC_NEVER = "never"        # flush to the OS only; a power cut can lose the last second or so
+FSYNC_BATCH = "batch"        # fsync after every group commit
+FSYNC_INTERVAL = "interval"  # fsync on a commit at least fsync_interval seconds after the last one
+
+
+class ChatJournal:
+    """
+    Append-only writer for project chat logs.
+
+    log(path, entry) only appends to an in-memory queue, so the event loop
+    pays a deque append. A background task hands everything queued so far
+    to a worker thread as one group commit: entries are written through a
+    persistent ChatHistory handle per log (open_history(path) supplies it,
+    with its offset index and segment rolling), flushed, and fsynced
+    according to the policy. Entries arriving during a commit form the next
+    one, so the batch size grows with load instead of the commit count.
+
+    A commit whose last entry belongs to a different log than the others
+    means the project switched; handles for every other log are flushed
+    and closed then, so at most one stays open in steady state.
+
+    on_written(path, entries), if given, is called in the worker thread
+    after each log's entries are written (the project manager indexes them
+    for search there).
+
+    The task starts with the first log() inside a running loop. Outside of
+    one (or after close) entries are committed synchronously.
+    """
+
+    def __init__(
+        self,
+        open_history: Callable[[Path], ChatHistory],
+        fsync: str = FSYNC_NEVER,
+        fsync_interval: float = 1.0,
+        max_batch: int = 256,
+        max_delay: float = 0.0,
+        on_written: Optional[Callable[[Path, List[dict]], None]] = None
+    ):
+        if fsync not in (FSYNC_NEVER, FSYNC_BATCH, FSYNC_INTERVAL):
+            raise ValueError(f"Unknown fsync policy: {fsync}")
+        self.open_history = open_history
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.on_written = on_written
+        self._pending = deque()
+        self._histories: Dict[Path, ChatHistory] = {}
+        self._wakeup: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._lock = asyncio.Lock()  # one commit in flight at a time keeps entries in order
+        self._closed = False
+        self._last_fsync = time.monotonic()
+        self.entries_written = 0
+        self.commits = 0
+        self.largest_commit = 0
+        self.fsyncs = 0
+        self.write_errors = 0
+        self._commit_ms = 0.0
+
+    def log(self, path, entry: dict):
+        if self._closed:
+            self._commit([(path, entry)])
+            self._release_all()
+            return
+        self._pending.append((path, entry))
+        if self._task is None or self._task.done():
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self._commit(self._take(len(self._pending)))
+                self._release_all()
+                return
+            self._wakeup = asyncio.Event()
+            self._task = loop.create_task(self._run(), name="chat-journal")
+        self._wakeup.set()
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def _take(self, limit: int) -> list:
+        batch = []
+        while self._pending and len(batch) < limit:
+            batch.append(self._pending.popleft())
+        return batch
+
+    def _should_fsync(self) -> bool:
+        if self.fsync == FSYNC_BATCH:
+            return True
+        return self.fsync == FSYNC_INTERVAL and time.monotonic() - self._last_fsync >= self.fsync_interval
+
+    def _history(self, path) -> ChatHistory:
+        path = Path(path)
+        history = self._histories.get(path)
+        if history is None:
+            history = self._histories[path] = self.open_history(path)
+            history.open()
+        return history
+
+    def _commit(self, batch: list):
+        """Write one group of entries (worker thread, or inline without a loop)"""
+        if not batch:
+            return
+        start = time.perf_counter()
+        by_path = {}
+        for path, entry in batch:
+            by_path.setdefault(Path(path), []).append(entry)
+
+        fsync = self._should_fsync()
+        for path, entries in by_path.items():
+            try:
+                history = self._history(path)
+                history.append(entries)
+                history.flush(fsync)
+                self.entries_written += len(entries)
+            except Exception as e:
+                self.write_errors += 1
+                log.error("Failed to write %d chat log entries to %s: %s", len(entries), path, e)
+                self._release(path)
+                continue
+            if self.on_written:
+                try:
+                    self.on_written(path, entries)
+                except Exception as e:
+                    log.error("Chat log write hook failed for %s: %s", path, e)
+        if fsync:
+            self.fsyncs += 1
+            self._last_fsync = time.monotonic()
+
+        # Entries for another log after this one: the project switched
+        current = Path(batch[-1][0])
+        for path in [p for p in self._histories if p != current]:
+            self._release(path)
+
+        self._commit_ms += (time.perf_counter() - start) * 1000.0
+        self.commits += 1
+        self.largest_commit = max(self.largest_commit, len(batch))
+
+    def _release(self, path: Path):
+        history = self._histories.pop(path, None)
+        if history is not None:
+            try:
+                history.close(fsync=self.fsync != FSYNC_NEVER)
+            except Exception as e:
+                log.error("Failed to close chat log %s: %s", path, e)
+
+    def _release_all(self):
+        for path in list(self._histories):
+            self._release(path)
+
+    async def _run(self):
+        while not self._closed:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            if self.max_delay and not self._closed and len(self._pending) < self.max_batch:
+                await asyncio.sleep(self.max_delay)
+            await self.flush()
+
+    async def flush(self):
+        """Commit everything queued so far"""
+        async with self._lock:
+            while self._pending:
+                await asyncio.to_thread(self._commit, self._take(self.max_batch))
+
+    async def close(self):
+        """Commit what is queued, close every handle and stop; later log() calls write synchronously"""
+        self._closed = True
+        if self._task is not None:
+            self._wakeup.set()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        await self.flush()
+        async with self._lock:
+            await asyncio.to_thread(self._release_all)
+
+    def close_sync(self):
+        """For shutdown paths without a running loop"""
+        self._closed = True
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        self._commit(self._take(len(self._pending)))
+        self._release_all()
+
+    def get_metrics(self) -> dict:
+        return {
+            "pending": self.pending,
+            "entries_written": self.entries_written,
+            "commits": self.commits,
+            "largest_commit": self.largest_commit,
+            "fsync": self.fsync,
+            "fsyncs": self.fsyncs,
+            "open_logs": len(self._histories),
+            "write_errors": self.write_errors,
+            "avg_commit_ms": self._commit_ms / self.commits if self.commits else 0.0
+        }
@@ -0,0 +1,464 @@
+"""
+Frame Pipeline for ADA V2
+Change detection and JPEG encoding for camera and screen frames, the latest browser frame slot,
+plus a synthetic video source for tests and benchmarks.
+"""
+
+import base64
+import collections
+import time
+from typing import Optional
+
+import cv2
+import numpy as np
+
+
+class ChangeDetector:
+    """
+    Cheap "did anything in view change" test.
+
+    Each frame is shrunk to a small grayscale thumbnail (INTER_AREA, so
+    sensor noise averages out) and diffed against the thumbnail of the last
+    frame that was accepted. A thumbnail pixel counts as changed when it
+    moved more than `pixel_threshold` grey levels, and the score is the
+    fraction of changed pixels, so a small object moving in a large still
+    scene is not averaged away. Comparing against the last *accepted* frame
+    means a slow drift still adds up to a change eventually.
+    """
+
+    def __init__(self, size=(64, 48), pixel_threshold: int = 12, area_threshold: float = 0.01):
+        self.size = size
+        self.pixel_threshold = pixel_threshold
+        self.area_threshold = area_threshold
+        width, height = size
+        self._small = np.empty((height, width, 3), dtype=np.uint8)
+        self._gray = np.empty((height, width), dtype=np.uint8)
+        self._diff = np.empty((height, width), dtype=np.uint8)
+        self._reference = None
+        self.last_score = 0.0
+
+    def update(self, frame_bgr: np.ndarray) -> bool:
+        """Returns True if the frame differs enough from the reference (and makes it the new reference)"""
+        cv2.resize(frame_bgr, self.size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+        if self._reference is None:
+            self._reference = self._gray.copy()
+            self.last_score = 1.0
+            return True
+
+        cv2.absdiff(self._gray, self._reference, dst=self._diff)
+        self.last_score = cv2.countNonZero(
+            cv2.threshold(self._diff, self.pixel_threshold, 255, cv2.THRESH_BINARY, dst=self._diff)[1]
+        ) / self._diff.size
+        if self.last_score < self.area_threshold:
+            return False
+        np.copyto(self._reference, self._gray)
+        return True
+
+    def reset(self):
+        self._reference = None
+        self.last_score = 0.0
+
+
+class JpegEncoder:
+    """
+    Encodes BGR frames straight to JPEG with cv2.imencode.
+
+    Frames larger than `max_size` on their long side are shrunk into a
+    buffer that is reused while the input shape stays the same, so the only
+    per-frame allocation is the encoded output itself.
+    """
+
+    def __init__(self, max_size: int = 1024, quality: int = 80):
+        self.max_size = max_size
+        self.quality = quality
+        self._params = [int(cv2.IMWRITE_JPEG_QUALITY), int(quality)]
+        self._input_shape = None
+        self._target = None
+        self._scaled = None
+
+    def _prepare(self, shape):
+        height, width = shape[:2]
+        scale = min(1.0, self.max_size / max(height, width))
+        if scale < 1.0:
+            self._target = (max(1, round(width * scale)), max(1, round(height * scale)))
+            self._scaled = np.empty((self._target[1], self._target[0]) + tuple(shape[2:]), dtype=np.uint8)
+        else:
+            self._target = None
+            self._scaled = None
+        self._input_shape = shape
+
+    def encode(self, frame_bgr: np.ndarray) -> np.ndarray:
+        """Returns the JPEG as a 1-D uint8 array (buffer protocol, no copy to bytes)"""
+        if frame_bgr.shape != self._input_shape:
+            self._prepare(frame_bgr.shape)
+        if self._target is not None:
+            cv2.resize(frame_bgr, self._target, dst=self._scaled, interpolation=cv2.INTER_AREA)
+            frame_bgr = self._scaled
+        ok, jpeg = cv2.imencode(".jpg", frame_bgr, self._params)
+        if not ok:
+            raise ValueError("JPEG encoding failed")
+        return jpeg
+
+
+class FramePipeline:
+    """
+    Camera frame -> realtime message stage used by AudioLoop.get_frames.
+
+    process() returns a {"mime_type": "image/jpeg", "data": <base64>} message
+    for frames that changed, or None for frames that were skipped. With
+    `keyframe_interval_s` an unchanged frame is still sent after that long,
+    so the model's view never goes completely stale.
+    """
+
+    FPS_WINDOW_S = 10.0
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        quality: int = 80,
+        change_threshold: float = 0.01,
+        detect_size=(64, 48),
+        keyframe_interval_s: Optional[float] = None,
+        detector=None
+    ):
+        self.detector = detector or ChangeDetector(size=detect_size, area_threshold=change_threshold)
+        self.encoder = JpegEncoder(max_size=max_size, quality=quality)
+        self.keyframe_interval_s = keyframe_interval_s
+
+        self.frames_in = 0
+        self.frames_sent = 0
+        self.frames_skipped = 0
+        self.bytes_sent = 0
+        self.encode_total_ms = 0.0
+        self.last_encode_ms = 0.0
+        self.detect_total_ms = 0.0
+        self._last_sent_at = None
+        self._sent_times = collections.deque()
+
+    def process(self, frame_bgr: np.ndarray, now: Optional[float] = None) -> Optional[dict]:
+        now = time.monotonic() if now is None else now
+        self.frames_in += 1
+
+        start = time.perf_counter()
+        changed = self.detector.update(frame_bgr)
+        self.detect_total_ms += (time.perf_counter() - start) * 1000.0
+
+        due = (self.keyframe_interval_s is not None and self._last_sent_at is not None
+               and now - self._last_sent_at >= self.keyframe_interval_s)
+        if not changed and not due:
+            self.frames_skipped += 1
+            return None
+        return self._encode(frame_bgr, now)
+
+    def _encode(self, frame_bgr: np.ndarray, now: float) -> dict:
+        start = time.perf_counter()
+        jpeg = self.encoder.encode(frame_bgr)
+        data = base64.b64encode(jpeg).decode()
+        self.last_encode_ms = (time.perf_counter() - start) * 1000.0
+        self.encode_total_ms += self.last_encode_ms
+
+        self.frames_sent += 1
+        self.bytes_sent += jpeg.size
+        self._last_sent_at = now
+        self._sent_times.append(now)
+        while self._sent_times and now - self._sent_times[0] > self.FPS_WINDOW_S:
+            self._sent_times.popleft()
+        return {"mime_type": "image/jpeg", "data": data}
+
+    def reset(self):
+        """Forget the reference frame so the next frame is always sent"""
+        self.detector.reset()
+
+    def get_metrics(self) -> dict:
+        if len(self._sent_times) > 1:
+            span = self._sent_times[-1] - self._sent_times[0]
+            fps_sent = (len(self._sent_times) - 1) / span if span > 0 else 0.0
+        else:
+            fps_sent = 0.0
+        return {
+            "frames_in": self.frames_in,
+            "frames_sent": self.frames_sent,
+            "frames_skipped": self.frames_skipped,
+            "fps_sent": fps_sent,
+            "bytes_sent": self.bytes_sent,
+            "avg_encode_ms": self.encode_total_ms / self.frames_sent if self.frames_sent else 0.0,
+            "last_encode_ms": self.last_encode_ms,
+            "avg_detect_ms": self.detect_total_ms / self.frames_in if self.frames_in else 0.0,
+            "last_change_score": self.detector.last_score
+        }
+
+
+class TileChangeDetector:
+    """
+    Dirty-tile change detection for screen content.
+
+    The frame is shrunk so that each of the `grid` tiles becomes a
+    `tile_px` square (INTER_AREA), diffed against the last accepted frame,
+    and the changed pixels are counted per tile. A tile is dirty when at
+    least `tile_min_pixels` of its pixels moved more than `pixel_threshold`
+    grey levels; the frame counts as changed when `min_dirty_tiles` tiles
+    are dirty, so a blinking caret or clock does not trigger a resend.
+    The rows of the grid follow the frame's aspect ratio.
+    """
+
+    def __init__(self, columns: int = 32, tile_px: int = 8, pixel_threshold: int = 16,
+                 tile_min_pixels: int = 2, min_dirty_tiles: int = 2):
+        self.columns = columns
+        self.tile_px = tile_px
+        self.pixel_threshold = pixel_threshold
+        self.tile_min_pixels = tile_min_pixels
+        self.min_dirty_tiles = min_dirty_tiles
+        self.rows = 0
+        self._input_shape = None
+        self._reference = None
+        self.dirty = None
+        self.last_score = 0.0
+
+    def _prepare(self, shape):
+        height, width = shape[:2]
+        self.rows = max(1, round(self.columns * height / width))
+        size = (self.columns * self.tile_px, self.rows * self.tile_px)
+        self._size = size
+        self._small = np.empty((size[1], size[0]) + tuple(shape[2:]), dtype=np.uint8)
+        self._gray = np.empty((size[1], size[0]), dtype=np.uint8)
+        self._diff = np.empty_like(self._gray)
+        self._counts = np.empty((self.rows, self.columns), dtype=np.intp)
+        self.dirty = np.zeros((self.rows, self.columns), dtype=bool)
+        self._reference = None
+        self._input_shape = shape
+
+    def update(self, frame_bgr: np.ndarray) -> bool:
+        """Returns True if enough tiles changed (and makes the frame the new reference)"""
+        if frame_bgr.shape != self._input_shape:
+            self._prepare(frame_bgr.shape)
+        cv2.resize(frame_bgr, self._size, dst=self._small, interpolation=cv2.INTER_AREA)
+        cv2.cvtColor(self._small, cv2.COLOR_BGR2GRAY, dst=self._gray)
+
+        if self._reference is None:
+            self._reference = self._gray.copy()
+            self.dirty[:] = True
+            self.last_score = 1.0
+            return True
+
+        cv2.absdiff(self._gray, self._reference, dst=self._diff)
+        cv2.threshold(self._diff, self.pixel_threshold, 1, cv2.THRESH_BINARY, dst=self._diff)
+        tiles = self._diff.reshape(self.rows, self.tile_px, self.columns, self.tile_px)
+        tiles.sum(axis=(1, 3), out=self._counts)
+        np.greater_equal(self._counts, self.tile_min_pixels, out=self.dirty)
+
+        dirty_tiles = int(np.count_nonzero(self.dirty))
+        self.last_score = dirty_tiles / self.dirty.size
+        if dirty_tiles < self.min_dirty_tiles:
+            return False
+        np.copyto(self._reference, self._gray)
+        return True
+
+    def reset(self):
+        self._reference = None
+        self.last_score = 0.0
+
+
+class AdaptiveRate:
+    """
+    Frame rate cap that backs off under outbound queue pressure (AIMD).
+
+    Each tick the caller reports whether the session is congested; the cap
+    is multiplied by `decrease` when it is and grows by `increase` fps when
+    it is not, within [min_fps, max_fps].
+    """
+
+    def __init__(self, max_fps: float = 2.0, min_fps: float = 0.2, increase: float = 0.25, decrease: float = 0.5):
+        self.max_fps = max_fps
+        self.min_fps = min_fps
+        self.increase = increase
+        self.decrease = decrease
+        self.fps = max_fps
+        self.backoffs = 0
+
+    @property
+    def interval(self) -> float:
+        return 1.0 / self.fps
+
+    def update(self, congested: bool) -> float:
+        """Adjust the cap; returns the seconds to wait before the next grab"""
+        if congested:
+            self.fps = max(self.min_fps, self.fps * self.decrease)
+            self.backoffs += 1
+        else:
+            self.fps = min(self.max_fps, self.fps + self.increase)
+        return self.interval
+
+
+class ScreenPipeline(FramePipeline):
+    """
+    Screen frame -> realtime message stage used by AudioLoop.get_screen.
+
+    Same as FramePipeline but with dirty-tile change detection and an
+    adaptive frame rate. congested() reads OutboundScheduler metrics: the
+    session is behind when the previous frame is still queued or was
+    superseded before it went out, or when mic audio is backing up.
+    """
+
+    AUDIO_BACKLOG = 4
+
+    def __init__(self, max_size: int = 1024, quality: int = 80, max_fps: float = 2.0, min_fps: float = 0.2,
+                 keyframe_interval_s: Optional[float] = None, detector=None):
+        super().__init__(max_size=max_size, quality=quality, keyframe_interval_s=keyframe_interval_s,
+                         detector=detector or TileChangeDetector())
+        self.rate = AdaptiveRate(max_fps=max_fps, min_fps=min_fps)
+        self._video_dropped = 0
+
+    def congested(self, queue_metrics: dict) -> bool:
+        video = queue_metrics["video"]
+        dropped = video["dropped"] - self._video_dropped
+        self._video_dropped = video["dropped"]
+        return video["depth"] > 0 or dropped > 0 or queue_metrics["audio"]["depth"] >= self.AUDIO_BACKLOG
+
+    def next_interval(self, queue_metrics: Optional[dict]) -> float:
+        """Seconds until the next grab, given the out_queue's current metrics"""
+        return self.rate.update(queue_metrics is not None and self.congested(queue_metrics))
+
+    def get_metrics(self) -> dict:
+        metrics = super().get_metrics()
+        metrics["fps_cap"] = self.rate.fps
+        metrics["backoffs"] = self.rate.backoffs
+        metrics["dirty_tiles"] = int(np.count_nonzero(self.detector.dirty)) if self.detector.dirty is not None else 0
+        return metrics
+
+
+class ScreenGrabber:
+    """
+    Grabs a monitor with an mss instance into a reused BGR buffer.
+
+    mss hands back BGRA; the alpha channel is dropped with cvtColor into a
+    buffer that lives as long as the monitor size does. mss instances are
+    tied to the thread that created them, so create and use this from one
+    thread.
+    """
+
+    def __init__(self, sct, monitor: int = 1):
+        self.sct = sct
+        self.monitor = sct.monitors[monitor] if monitor < len(sct.monitors) else sct.monitors[0]
+        self._frame = None
+
+    def grab(self) -> np.ndarray:
+        shot = self.sct.grab(self.monitor)
+        bgra = np.frombuffer(shot.raw, dtype=np.uint8).reshape(shot.height, shot.width, 4)
+        if self._frame is None or self._frame.shape[:2] != bgra.shape[:2]:
+            self._frame = np.empty((shot.height, shot.width, 3), dtype=np.uint8)
+        cv2.cvtColor(bgra, cv2.COLOR_BGRA2BGR, dst=self._frame)
+        return self._frame
+
+    def close(self):
+        self.sct.close()
+
+
+class LatestFrameSlot:
+    """
+    Holds the most recent browser camera frame as it arrived.
+
+    The browser streams JPEGs far faster than they are used (one per speech
+    onset or text turn), so set() only swaps a reference. The base64
+    payload is built the first time payload() is asked for a given frame and
+    reused until the next set(), so repeated piggybacks do not re-encode.
+    Frames that are already strings (e.g. base64 from an older client) are
+    passed through untouched.
+    """
+
+    def __init__(self, mime_type: str = "image/jpeg"):
+        self.mime_type = mime_type
+        self._data = None
+        self._payload = None
+        self.frames_in = 0
+        self.encodes = 0
+        self.encode_total_ms = 0.0
+
+    def set(self, data):
+        self._data = data
+        self._payload = None
+        if data is not None:
+            self.frames_in += 1
+
+    def set_payload(self, payload: Optional[dict]):
+        """Store an already-built realtime payload (or None to clear)"""
+        self._data = payload["data"] if payload else None
+        self._payload = payload
+
+    def clear(self):
+        self.set(None)
+
+    def payload(self) -> Optional[dict]:
+        if self._payload is None and self._data is not None:
+            data = self._data
+            if isinstance(data, (bytes, bytearray, memoryview)):
+                start = time.perf_counter()
+                data = base64.b64encode(data).decode()
+                self.encode_total_ms += (time.perf_counter() - start) * 1000.0
+                self.encodes += 1
+            self._payload = {"mime_type": self.mime_type, "data": data}
+        return self._payload
+
+    def get_metrics(self) -> dict:
+        return {
+            "frames_in": self.frames_in,
+            "encodes": self.encodes,
+            "frames_dropped_unencoded": self.frames_in - self.encodes,
+            "avg_encode_ms": self.encode_total_ms / self.encodes if self.encodes else 0.0
+        }
+
+
+class SyntheticVideoSource:
+    """
+    Stand-in for cv2.VideoCapture: a textured still scene with a square that
+    moves only during the given (start, end) frame ranges, plus optional
+    sensor noise. read() returns (True, frame) until `frames` are produced.
+    The returned array is reused between reads, as with a real capture.
+    """
+
+    NOISE_PATTERNS = 4
+
+    def __init__(self, width: int = 1280, height: int = 720, frames: int = 100,
+                 motion=((20, 40),), noise: float = 2.0, seed: int = 0):
+        self.width = width
+        self.height = height
+        self.frames = frames
+        self.motion = motion
+        self.noise = noise
+        self.index = 0
+        self._rng = np.random.default_rng(seed)
+
+        y, x = np.mgrid[0:height, 0:width]
+        self._scene = np.stack([(x * 255 // width), (y * 255 // height), ((x + y) * 127 // (width + height)) + 64],
+                               axis=-1).astype(np.uint8)
+        self._frame = np.empty_like(self._scene)
+        self._offset = 0
+        # Precomputed (positive, negative) noise pairs, applied with saturating adds
+        self._noise = []
+        for _ in range(self.NOISE_PATTERNS if noise else 0):
+            n = self._rng.normal(0.0, noise, self._scene.shape)
+            self._noise.append((np.clip(n, 0, 255).astype(np.uint8), np.clip(-n, 0, 255).astype(np.uint8)))
+
+    def isOpened(self) -> bool:
+        return True
+
+    def read(self):
+        if self.index >= self.frames:
+            return False, None
+        if any(start <= self.index < end for start, end in self.motion):
+            self._offset += max(4, self.width // 32)
+
+        np.copyto(self._frame, self._scene)
+        size = self.height // 4
+        x = self._offset % (self.width - size)
+        self._frame[self.height // 3:self.height // 3 + size, x:x + size] = (40, 40, 220)
+        if self._noise:
+            positive, negative = self._noise[self.index % len(self._noise)]
+            cv2.add(self._frame, positive, dst=self._frame)
+            cv2.subtract(self._frame, negative, dst=self._frame)
+        self.index += 1
+        return True, self._frame
+
+    def release(self):
+        pass
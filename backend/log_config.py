@@ -0,0 +1,133 @@
+"""
+Logging for ADA V2
+Per-subsystem loggers behind a queue, so hot paths never wait on stdout.
+"""
+
+import atexit
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from typing import Optional
+
+ROOT = "ada"
+DEFAULT_FORMAT = "text"
+
+
+def get_logger(subsystem: str) -> logging.Logger:
+    """
+    Logger for one subsystem ("audio", "vad", "tools", "cad", ...).
+
+    Pass values as arguments instead of f-strings:
+        log.debug("Speech detected (confidence %.2f)", confidence)
+    A record below the subsystem's level costs one cached level check and
+    is never formatted; an enabled one is formatted on the listener thread.
+    Arguments should be values that will not change afterwards (numbers,
+    strings, copies), since formatting happens later on another thread.
+    Structured fields go in extra={"fields": {...}} and appear in JSON output.
+    """
+    return logging.getLogger(f"{ROOT}.{subsystem}")
+
+
+class LazyQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler.prepare() formats the message on the calling thread; this
+    one only enqueues the record and leaves all formatting to the listener.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+class TextFormatter(logging.Formatter):
+    """[ADA DEBUG] [VAD] message - the tag style the prints used"""
+
+    def format(self, record):
+        tag = record.name.split(".", 1)[-1].upper()
+        text = f"[ADA {record.levelname}] [{tag}] {record.getMessage()}"
+        fields = getattr(record, "fields", None)
+        if fields:
+            text += " " + " ".join(f"{key}={value}" for key, value in fields.items())
+        if record.exc_info:
+            text += "\n" + self.formatException(record.exc_info)
+        return text
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line for log collectors"""
+
+    def format(self, record):
+        entry = {
+            "ts": record.created,
+            "level": record.levelname,
+            "subsystem": record.name.split(".", 1)[-1],
+            "msg": record.getMessage()
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def apply_levels(settings: dict):
+    """
+    Set levels from settings: "log_level" for everything under ada.* and
+    "log_levels" ({"vad": "DEBUG", "tools": "WARNING", ...}) per subsystem.
+    Can be called again when settings change.
+    """
+    def set_level(logger, level):
+        try:
+            logger.setLevel(str(level).upper())
+        except ValueError:
+            print(f"[ADA] [WARN] Unknown log level '{level}' for {logger.name}, ignoring.")
+
+    set_level(logging.getLogger(ROOT), settings.get("log_level", "INFO"))
+    # Drop overrides that are no longer in the settings
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith(ROOT + "."):
+            logging.getLogger(name).setLevel(logging.NOTSET)
+    for subsystem, level in (settings.get("log_levels") or {}).items():
+        set_level(logging.getLogger(f"{ROOT}.{subsystem}"), level)
+
+
+def configure_logging(settings: dict, stream=None):
+    """
+    Route ada.* records through a queue to a listener thread writing to
+    `stream` (stdout by default). Safe to call more than once; the previous
+    listener is stopped and flushed first.
+    """
+    global _listener
+    stop_logging()
+
+    sink = logging.StreamHandler(stream or sys.stdout)
+    sink.setFormatter(JsonFormatter() if settings.get("log_format", DEFAULT_FORMAT) == "json" else TextFormatter())
+
+    records = queue.SimpleQueue()
+    root = logging.getLogger(ROOT)
+    for handler in list(root.handlers):
+        if isinstance(handler, LazyQueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(LazyQueueHandler(records))
+    root.propagate = False
+    apply_levels(settings)
+
+    _listener = logging.handlers.QueueListener(records, sink, respect_handler_level=True)
+    _listener.start()
+    return _listener
+
+
+def stop_logging():
+    """Flush queued records and stop the listener thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(stop_logging)
@@ -0,0 +1,319 @@
+"""
+Memory Index for ADA V2
+SQLite FTS5 full-text index over a project's chat history and files, for targeted recall.
+"""
+
+import math
+import os
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from log_config import get_logger
+
+log = get_logger("memory")
+
+INDEX_NAME = ".memory_index.sqlite"
+FILE_EXTENSIONS = {'.txt', '.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.md', '.html', '.css'}
+MAX_FILE_BYTES = 1024 * 1024  # files are indexed up to this many bytes
+CHUNK_CHARS = 1200           # file text is split into passages of about this size
+CANDIDATES = 500             # matches ranked per query, newest first, so common terms stay fast
+IDF_WINDOW = 20000           # rows sampled to estimate how common a term is
+SNIPPET_WORDS = 24
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+QUERY_WORD = re.compile(r"\w+", re.UNICODE)
+MARKED = re.compile("\x01(.*?)\x02", re.DOTALL)
+
+SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages USING fts5(text, sender UNINDEXED, ts UNINDEXED, tokenize='porter unicode61');
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks USING fts5(text, path UNINDEXED, tokenize='porter unicode61');
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER);
+CREATE TABLE IF NOT EXISTS file_chunks (chunk INTEGER PRIMARY KEY, path TEXT NOT NULL);
+CREATE INDEX IF NOT EXISTS file_chunks_path ON file_chunks (path);
+CREATE TABLE IF NOT EXISTS memory_hashes (hash INTEGER PRIMARY KEY);
+"""
+
+
+def match_expression(query: str, any_term: bool = False) -> str:
+    """An FTS5 MATCH expression of the query's words, each quoted so user text can't be read as syntax"""
+    words = QUERY_WORD.findall(query.lower())
+    return (" OR " if any_term else " ").join(f'"{w}"' for w in words)
+
+
+def snippet(marked: str, words: int = SNIPPET_WORDS) -> str:
+    """About `words` words of highlighted text around its first match, matches in [brackets]"""
+    tokens = marked.split()
+    first = next((i for i, t in enumerate(tokens) if "\x01" in t), 0)
+    start = max(0, first - words // 3)
+    text = " ".join(tokens[start:start + words]).replace("\x01", "[").replace("\x02", "]")
+    # A match cut off by the window end
+    if text.count("[") > text.count("]"):
+        text += "]"
+    return ("..." if start > 0 else "") + text + ("..." if start + words < len(tokens) else "")
+
+
+def chunk_text(text: str, size: int = CHUNK_CHARS) -> List[str]:
+    """Split text into passages of about `size` characters, on paragraph then line boundaries"""
+    chunks = []
+    current = ""
+    for block in re.split(r"(\n\s*\n)", text):
+        while len(block) > size:
+            cut = block.rfind("\n", 0, size)
+            cut = cut if cut > 0 else size
+            if current:
+                chunks.append(current)
+                current = ""
+            chunks.append(block[:cut])
+            block = block[cut:]
+        if len(current) + len(block) > size and current:
+            chunks.append(current)
+            current = ""
+        current += block
+    if current.strip():
+        chunks.append(current)
+    return [c.strip() for c in chunks if c.strip()]
+
+
+class MemoryIndex:
+    """
+    Inverted index of one project's chat messages and text files.
+
+    Messages are added as they are written to the chat log; files are
+    re-indexed when their (mtime, size) changes, replacing their old
+    passages. search() ranks with BM25 over at most CANDIDATES of the most
+    recent matches per table, so latency stays flat as the log grows.
+    The connection is shared between threads behind a lock.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+        self.messages_indexed = 0
+        self.files_indexed = 0
+        self.searches = 0
+        self._search_ms = 0.0
+        self._idf_cache: Dict[tuple, float] = {}
+
+    @property
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT rowid FROM messages LIMIT 1").fetchone() is None
+
+    @property
+    def message_count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT count(*) FROM messages").fetchone()[0]
+
+    def add_messages(self, entries: Iterable[dict], batch: int = 10000) -> int:
+        """Index chat entries ({"timestamp", "sender", "text"}); returns how many were added"""
+        added = 0
+        rows = []
+        for entry in entries:
+            text = entry.get("text")
+            if text:
+                rows.append((text, entry.get("sender", ""), entry.get("timestamp", 0.0)))
+            if len(rows) >= batch:
+                added += self._insert_messages(rows)
+                rows = []
+        if rows:
+            added += self._insert_messages(rows)
+        return added
+
+    def _insert_messages(self, rows: list) -> int:
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO messages (text, sender, ts) VALUES (?, ?, ?)", rows)
+        self.messages_indexed += len(rows)
+        return len(rows)
+
+    def add_passages(self, source: str, passages: List[str]) -> int:
+        """Index free text that is not a project file (e.g. an uploaded memory), searchable as `source`"""
+        with self._lock, self._conn:
+            self._conn.executemany("INSERT INTO chunks (text, path) VALUES (?, ?)", [(p, source) for p in passages])
+        return len(passages)
+
+    def claim_hashes(self, hashes: List[int]) -> set:
+        """Record content hashes of uploaded memory; returns the ones not recorded before"""
+        unique = list(dict.fromkeys(hashes))
+        fresh = set()
+        with self._lock, self._conn:
+            for i in range(0, len(unique), 500):
+                part = unique[i:i + 500]
+                placeholders = ",".join("?" * len(part))
+                known = {row[0] for row in self._conn.execute(
+                    f"SELECT hash FROM memory_hashes WHERE hash IN ({placeholders})", part)}
+                new = [h for h in part if h not in known]
+                self._conn.executemany("INSERT INTO memory_hashes (hash) VALUES (?)", [(h,) for h in new])
+                fresh.update(new)
+        return fresh
+
+    def index_file(self, root, rel_path: str) -> bool:
+        """(Re)index one project file if it changed; returns whether it was indexed"""
+        full_path = Path(root) / rel_path
+        if os.path.splitext(rel_path)[1].lower() not in FILE_EXTENSIONS:
+            return False
+        try:
+            stat = full_path.stat()
+        except FileNotFoundError:
+            self.remove_file(rel_path)
+            return False
+        with self._lock:
+            known = self._conn.execute("SELECT mtime_ns, size FROM files WHERE path = ?", (rel_path,)).fetchone()
+        if known == (stat.st_mtime_ns, stat.st_size):
+            return False
+        try:
+            with open(full_path, "r", encoding="utf-8", errors="ignore") as f:
+                text = f.read(MAX_FILE_BYTES)
+        except OSError as e:
+            log.warning("Failed to read %s for indexing: %s", rel_path, e)
+            return False
+
+        with self._lock, self._conn:
+            self._delete_chunks(rel_path)
+            for chunk in chunk_text(text):
+                cursor = self._conn.execute("INSERT INTO chunks (text, path) VALUES (?, ?)", (chunk, rel_path))
+                self._conn.execute("INSERT INTO file_chunks (chunk, path) VALUES (?, ?)", (cursor.lastrowid, rel_path))
+            self._conn.execute("INSERT OR REPLACE INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+                               (rel_path, stat.st_mtime_ns, stat.st_size))
+        self.files_indexed += 1
+        return True
+
+    def _delete_chunks(self, rel_path: str):
+        chunks = [row[0] for row in self._conn.execute("SELECT chunk FROM file_chunks WHERE path = ?", (rel_path,))]
+        self._conn.executemany("DELETE FROM chunks WHERE rowid = ?", [(c,) for c in chunks])
+        self._conn.execute("DELETE FROM file_chunks WHERE path = ?", (rel_path,))
+
+    def remove_file(self, rel_path: str):
+        with self._lock, self._conn:
+            self._delete_chunks(rel_path)
+            self._conn.execute("DELETE FROM files WHERE path = ?", (rel_path,))
+
+    def sync_files(self, root, rel_paths: Iterable[str]) -> int:
+        """Bring indexed files in line with the project's current file list; returns files changed"""
+        current = set(rel_paths)
+        with self._lock:
+            known = [row[0] for row in self._conn.execute("SELECT path FROM files")]
+        changed = 0
+        for rel_path in known:
+            if rel_path not in current:
+                self.remove_file(rel_path)
+                changed += 1
+        for rel_path in sorted(current):
+            changed += self.index_file(root, rel_path)
+        return changed
+
+    def _newest_rowid(self, table: str) -> int:
+        row = self._conn.execute(f"SELECT rowid FROM {table} ORDER BY rowid DESC LIMIT 1").fetchone()
+        return row[0] if row else 0
+
+    def _idf(self, table: str, term: str, newest: int) -> float:
+        """
+        BM25 IDF of a term, estimated from the last IDF_WINDOW rows. FTS5's
+        own bm25() counts the term's documents over the whole table on every
+        query, which is what makes common words slow on large indexes.
+        """
+        key = (table, term, newest // IDF_WINDOW)
+        idf = self._idf_cache.get(key)
+        if idf is None:
+            low = max(0, newest - IDF_WINDOW)
+            docs = self._conn.execute(f"SELECT count(*) FROM {table} WHERE {table} MATCH ? AND rowid > ?",
+                                      (f'"{term}"', low)).fetchone()[0]
+            total = newest - low
+            idf = math.log((total - docs + 0.5) / (docs + 0.5) + 1.0)
+            if len(self._idf_cache) > 10000:
+                self._idf_cache.clear()
+            self._idf_cache[key] = idf
+        return idf
+
+    def _query(self, table: str, columns: str, expression: str, words: List[str], limit: int) -> list:
+        """The `limit` best of the newest CANDIDATES matches as (*columns, snippet, score), best first"""
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT {columns}, highlight({table}, 0, char(1), char(2)) FROM {table} WHERE {table} MATCH ? "
+                f"ORDER BY rowid DESC LIMIT {CANDIDATES}", (expression,)).fetchall()
+            if not rows:
+                return []
+            newest = self._newest_rowid(table)
+            idfs = {w: self._idf(table, w, newest) for w in words}
+
+        lengths = [len(row[-1].split()) for row in rows]
+        average = sum(lengths) / len(lengths)
+        owners = {}
+        scored = []
+        for row, length in zip(rows, lengths):
+            tf = dict.fromkeys(words, 0)
+            for hit in MARKED.findall(row[-1]):
+                word = owners.get(hit)
+                if word is None:
+                    # Matches are stemmed; credit the query word sharing the longest prefix
+                    lowered = hit.lower()
+                    word = owners[hit] = max(words, key=lambda w: len(os.path.commonprefix((w, lowered))))
+                tf[word] += 1
+            score = 0.0
+            for word, count in tf.items():
+                if count:
+                    score += idfs[word] * count * (BM25_K1 + 1) / (count + BM25_K1 * (1 - BM25_B + BM25_B * length / average))
+            scored.append((score, row))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [(*row[:-1], snippet(row[-1]), -score) for score, row in scored[:limit]]
+
+    def search(self, query: str, limit: int = 5, chat: bool = True, files: bool = True) -> List[Dict]:
+        """
+        Best matching passages for a query, best first. Every word must
+        match; if nothing does, any word may. Each result has kind ("chat"
+        or "file"), snippet, score (lower is better), and sender/timestamp
+        or path.
+        """
+        start = time.perf_counter()
+        words = list(dict.fromkeys(QUERY_WORD.findall(query.lower())))
+        results = []
+        for any_term in (False, True):
+            if not words or (any_term and len(words) < 2):
+                break
+            expression = match_expression(query, any_term)
+            if chat:
+                for sender, ts, text, score in self._query("messages", "sender, ts", expression, words, limit):
+                    results.append({"kind": "chat", "sender": sender, "timestamp": ts, "snippet": text, "score": score})
+            if files:
+                for path, text, score in self._query("chunks", "path", expression, words, limit):
+                    results.append({"kind": "file", "path": path, "snippet": text, "score": score})
+            if results:
+                break
+        results.sort(key=lambda r: r["score"])
+        self.searches += 1
+        self._search_ms += (time.perf_counter() - start) * 1000.0
+        return results[:limit]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def get_metrics(self) -> dict:
+        return {
+            "messages_indexed": self.messages_indexed,
+            "files_indexed": self.files_indexed,
+            "searches": self.searches,
+            "avg_search_ms": self._search_ms / self.searches if self.searches else 0.0
+        }
+
+
+def format_results(results: List[Dict]) -> str:
+    """Search results as text for the model"""
+    if not results:
+        return "No matching memories found in this project."
+    lines = []
+    for i, r in enumerate(results, 1):
+        if r["kind"] == "chat":
+            when = " " + time.strftime("%Y-%m-%d %H:%M", time.localtime(r["timestamp"])) if r["timestamp"] else ""
+            lines.append(f"{i}. [chat{when}] {r['sender']}: {r['snippet']}")
+        else:
+            lines.append(f"{i}. [file {r['path']}] {r['snippet']}")
+    return "\n".join(lines)
@@ -0,0 +1,325 @@
+"""
+Memory Ingest for ADA V2
+Streams uploaded memory files into the project's search index and condenses them into a bounded digest.
+"""
+
+import hashlib
+import json
+import math
+import re
+import time
+from collections import Counter, deque
+from datetime import datetime
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Set
+
+from log_config import get_logger
+from memory_index import MemoryIndex, chunk_text, CHUNK_CHARS
+from project_context import estimate_tokens, terms
+
+log = get_logger("memory")
+
+UPLOAD_CHUNK_CHARS = 256 * 1024  # what the frontend sends per upload_memory_chunk
+SECTION_MESSAGES = 50            # messages summarized together
+SECTION_GAP_S = 30 * 60          # a pause this long in timestamped logs starts a new section
+SECTION_KEYWORDS = 8
+SECTION_CANDIDATES = 30
+INSERT_BATCH = 2000
+RECENT_MESSAGES = 8              # the end of the log is quoted verbatim in the digest
+QUOTE_CHARS = 200
+DIGEST_TOKENS = 2000
+
+# "User: text", "[User] text", "[12:01] User: text"
+MESSAGE_LINE = re.compile(
+    r"^\s*(?:\[[^\]]{1,40}\]\s*)?"
+    r"(?:\[(?P<bracketed>[A-Za-z][\w.'-]*(?: [\w.'-]+){0,2})\]|(?P<sender>[A-Za-z][\w.'-]*(?: [\w.'-]+){0,2}):)"
+    r"\s+(?P<text>\S.*)$"
+)
+
+
+def content_hash(sender: str, text: str) -> int:
+    """Hash of a message ignoring case and whitespace, as a signed 64-bit SQLite integer"""
+    normalized = sender.lower().strip() + "\0" + " ".join(text.lower().split())
+    return int.from_bytes(hashlib.blake2b(normalized.encode("utf-8"), digest_size=8).digest(), "big", signed=True)
+
+
+def parse_timestamp(value) -> Optional[float]:
+    """Epoch seconds from a numeric or ISO 8601 timestamp (naive ones are local time), or None"""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value) if math.isfinite(value) else None
+    if isinstance(value, str) and value.strip():
+        try:
+            return float(value)
+        except ValueError:
+            pass
+        try:
+            return datetime.fromisoformat(value.strip().replace("Z", "+00:00")).timestamp()
+        except (ValueError, OverflowError, OSError):
+            return None
+    return None
+
+
+def parse_line(line: str) -> Optional[dict]:
+    """A chat message from one line of a memory file (JSONL chat log or "Sender: text"), or None"""
+    stripped = line.strip()
+    if stripped.startswith("{"):
+        try:
+            record = json.loads(stripped)
+        except json.JSONDecodeError:
+            record = None
+        if isinstance(record, dict) and record.get("text"):
+            return {"timestamp": parse_timestamp(record.get("timestamp")), "sender": str(record.get("sender", "")), "text": str(record["text"])}
+    match = MESSAGE_LINE.match(line)
+    if match:
+        return {"timestamp": None, "sender": match.group("bracketed") or match.group("sender"), "text": match.group("text").strip()}
+    return None
+
+
+@dataclass
+class Section:
+    """Summary of a run of consecutive messages"""
+    first: int
+    last: int = 0
+    start_ts: Optional[float] = None
+    end_ts: Optional[float] = None
+    words: Counter = field(default_factory=Counter)
+    candidates: List[tuple] = field(default_factory=list)
+    keywords: List[str] = field(default_factory=list)
+    quote: str = ""
+    _quote_score: int = -1
+
+    def add(self, number: int, entry: dict, entry_terms: Set[str]):
+        self.last = number
+        ts = entry.get("timestamp")
+        if ts:
+            self.start_ts = self.start_ts or ts
+            self.end_ts = ts
+        self.words.update(entry_terms)
+        # The most content-rich user line stands in for the section
+        score = len(entry_terms) + (5 if entry["sender"].lower() in ("user", "you") else 0)
+        if score > self._quote_score:
+            self._quote_score = score
+            self.quote = f"{entry['sender']}: {entry['text'][:QUOTE_CHARS]}"
+
+    def seal(self):
+        """Keep only the section's most frequent words; keywords are picked once the whole upload is seen"""
+        self.candidates = self.words.most_common(SECTION_CANDIDATES)
+        self.words = Counter()
+
+    def pick_keywords(self, section_df: Counter, sections: int):
+        """Frequent here, rare in other sections (tf-idf over sections)"""
+        def weight(item):
+            word, count = item
+            return count * math.log((1 + sections) / (1 + section_df[word]))
+        self.keywords = [word for word, _ in sorted(self.candidates, key=weight, reverse=True)[:SECTION_KEYWORDS]]
+
+    def describe(self) -> str:
+        span = f"messages {self.first}-{self.last}"
+        if self.start_ts:
+            span += ", " + time.strftime("%Y-%m-%d %H:%M", time.localtime(self.start_ts))
+        return f"- [{span}] topics: {', '.join(self.keywords)}. e.g. \"{self.quote}\""
+
+
+class MemoryIngest:
+    """
+    One memory upload, fed in chunks as they arrive.
+
+    Each chunk is split into lines; chat lines (JSONL records or
+    "Sender: text") become messages and anything else is gathered into
+    passages. Messages and passages already seen - earlier in this upload
+    or in a previous one - are skipped by content hash. The rest are
+    indexed in batches, so search_project_memory can find every detail,
+    and folded into per-section summaries (keywords and one representative
+    line per SECTION_MESSAGES messages). Memory use is bounded by the
+    section summaries and hashes, not the upload.
+
+    finish() returns a digest for the live session: the upload's size and
+    span, the sections most relevant to `query` (usually the recent
+    conversation) and most recent, and the last few messages, all within
+    `digest_tokens`.
+    """
+
+    def __init__(self, index: MemoryIndex, name: str = "memory.txt", total_bytes: Optional[int] = None,
+                 max_bytes: Optional[int] = None, digest_tokens: int = DIGEST_TOKENS):
+        self.index = index
+        self.name = name
+        self.total_bytes = total_bytes
+        self.max_bytes = max_bytes
+        self.digest_tokens = digest_tokens
+        self.bytes_received = 0
+        self.messages = 0
+        self.passages = 0
+        self.duplicates = 0
+        self.started = time.monotonic()
+        self.finished = False
+        self._partial = ""
+        self._text = []
+        self._text_chars = 0
+        self._pending: List[dict] = []
+        self._pending_passages: List[str] = []
+        self._seen: Set[int] = set()
+        self._sections: List[Section] = []
+        self._section_df = Counter()
+        self._recent = deque(maxlen=RECENT_MESSAGES)
+
+    def feed(self, text: str) -> Dict:
+        """Ingest the next chunk of the upload; returns progress"""
+        if self.finished:
+            raise ValueError("Upload already finished")
+        self.bytes_received += len(text.encode("utf-8"))
+        if self.max_bytes and self.bytes_received > self.max_bytes:
+            raise ValueError(f"Memory file is larger than {self.max_bytes // (1024 * 1024)} MB")
+        lines = (self._partial + text).split("\n")
+        self._partial = lines.pop()
+        for line in lines:
+            self._line(line)
+        self._flush(force=False)
+        return self.progress()
+
+    def _line(self, line: str):
+        entry = parse_line(line)
+        if entry is None:
+            if line.strip() or self._text:
+                self._text.append(line)
+                self._text_chars += len(line) + 1
+                if self._text_chars >= CHUNK_CHARS * 4:
+                    self._end_text()
+            return
+        self._end_text()
+        key = content_hash(entry["sender"], entry["text"])
+        if key in self._seen:
+            self.duplicates += 1
+            return
+        self._seen.add(key)
+        entry["hash"] = key
+        self._pending.append(entry)
+
+    def _end_text(self):
+        """Turn the text gathered since the last message into passages"""
+        if not self._text:
+            return
+        for passage in chunk_text("\n".join(self._text)):
+            key = content_hash("", passage)
+            if key in self._seen:
+                self.duplicates += 1
+                continue
+            self._seen.add(key)
+            self._pending_passages.append(passage)
+        self._text = []
+        self._text_chars = 0
+
+    def _flush(self, force: bool):
+        if self._pending and (force or len(self._pending) >= INSERT_BATCH):
+            batch, self._pending = self._pending, []
+            fresh = self.index.claim_hashes([entry["hash"] for entry in batch])
+            for entry in batch:
+                if entry["hash"] not in fresh:
+                    self.duplicates += 1
+                    continue
+                self._summarize(entry)
+            self.index.add_messages(entry for entry in batch if entry["hash"] in fresh)
+        if self._pending_passages and (force or len(self._pending_passages) >= 64):
+            batch, self._pending_passages = self._pending_passages, []
+            hashes = [content_hash("", p) for p in batch]
+            fresh = self.index.claim_hashes(hashes)
+            passages = [p for p, key in zip(batch, hashes) if key in fresh]
+            self.duplicates += len(batch) - len(passages)
+            self.index.add_passages(f"upload:{self.name}", passages)
+            self.passages += len(passages)
+
+    def _summarize(self, entry: dict):
+        self.messages += 1
+        entry_terms = terms(entry["text"])
+        section = self._sections[-1] if self._sections else None
+        ts = entry.get("timestamp")
+        if (section is None or self.messages - section.first >= SECTION_MESSAGES
+                or (ts and section.end_ts and ts - section.end_ts >= SECTION_GAP_S)):
+            if section is not None:
+                self._seal(section)
+            section = Section(first=self.messages)
+            self._sections.append(section)
+        section.add(self.messages, entry, entry_terms)
+        self._recent.append(entry)
+
+    def _seal(self, section: Section):
+        section.seal()
+        self._section_df.update(word for word, _ in section.candidates)
+
+    def progress(self) -> Dict:
+        return {
+            "name": self.name,
+            "bytes": self.bytes_received,
+            "total_bytes": self.total_bytes,
+            "percent": round(100.0 * self.bytes_received / self.total_bytes, 1) if self.total_bytes else None,
+            "messages": self.messages,
+            "passages": self.passages,
+            "duplicates": self.duplicates,
+            "elapsed_s": round(time.monotonic() - self.started, 2),
+            "finished": self.finished
+        }
+
+    def finish(self, query: str = "") -> str:
+        """Index what is left and return the digest for the session"""
+        if self._partial:
+            self._line(self._partial)
+            self._partial = ""
+        self._end_text()
+        self._flush(force=True)
+        if self._sections:
+            self._seal(self._sections[-1])
+        for section in self._sections:
+            section.pick_keywords(self._section_df, len(self._sections))
+        self.finished = True
+        self._seen.clear()
+        digest = self.digest(query)
+        log.info("Ingested memory %s: %d messages, %d passages, %d duplicates skipped, digest ~%d tokens",
+                 self.name, self.messages, self.passages, self.duplicates, estimate_tokens(digest))
+        return digest
+
+    def digest(self, query: str = "") -> str:
+        overview = (f"System Notification: The user has uploaded a long-term memory file ({self.name}, "
+                    f"{self.bytes_received / (1024 * 1024):.1f} MB): {self.messages} messages and {self.passages} "
+                    f"text passages, {self.duplicates} duplicates skipped.")
+        timestamps = [s.start_ts for s in self._sections if s.start_ts]
+        if timestamps:
+            overview += (" It covers " + time.strftime("%Y-%m-%d", time.localtime(min(timestamps))) + " to "
+                         + time.strftime("%Y-%m-%d", time.localtime(max(s.end_ts for s in self._sections if s.end_ts))) + ".")
+        overview += (" All of it is indexed: call search_project_memory to look up details instead of asking"
+                     " the user. A summary of the parts most relevant to the current conversation follows.")
+        lines = [overview]
+        used = estimate_tokens(overview)
+
+        recent, recent_cost = [], 0
+        if self._recent:
+            recent = ["", "The memory ends with:"] + [f"  {e['sender']}: {e['text'][:QUOTE_CHARS]}" for e in self._recent]
+            recent_cost = estimate_tokens("\n".join(recent))
+            if used + recent_cost > self.digest_tokens:
+                recent, recent_cost = [], 0
+
+        # Relevance to the query first, later (more recent) sections break ties
+        wanted = terms(query)
+        count = len(self._sections)
+        ranked = sorted(
+            range(count),
+            key=lambda i: (2.0 * len(wanted.intersection(self._sections[i].keywords)) / (len(wanted) or 1)
+                           + (i + 1) / count),
+            reverse=True
+        )
+        chosen = []
+        for i in ranked:
+            line = self._sections[i].describe()
+            cost = estimate_tokens(line) + 1
+            if used + cost + recent_cost > self.digest_tokens:
+                continue
+            chosen.append(i)
+            used += cost
+        if chosen:
+            lines.append("")
+            lines.append("Summary (in order):")
+            lines.extend(self._sections[i].describe() for i in sorted(chosen))
+            if len(chosen) < count:
+                lines.append(f"({count - len(chosen)} more sections are only in the index.)")
+        lines.extend(recent)
+        return "\n".join(lines)
@@ -0,0 +1,371 @@
+"""
+Performance Monitor for ADA V2
+Event-loop lag, slow callbacks, executor backlog, handler latency and an on-demand sampling profiler.
+"""
+
+import asyncio
+import bisect
+import collections
+import functools
+import inspect
+import os
+import sys
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+
+def _positional_limit(handler: Callable) -> Optional[int]:
+    """How many positional arguments `handler` accepts, or None when it takes any number"""
+    try:
+        parameters = inspect.signature(handler).parameters.values()
+    except (TypeError, ValueError):
+        return None
+    if any(p.kind == p.VAR_POSITIONAL for p in parameters):
+        return None
+    return sum(1 for p in parameters if p.kind in (p.POSITIONAL_ONLY, p.POSITIONAL_OR_KEYWORD))
+
+
+class LatencyHistogram:
+    """Fixed-bucket latency histogram in milliseconds; O(log buckets) per record"""
+
+    BOUNDS_MS = (0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000, 2000, 5000)
+
+    def __init__(self):
+        self.counts = [0] * (len(self.BOUNDS_MS) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def record(self, ms: float):
+        self.counts[bisect.bisect_left(self.BOUNDS_MS, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+
+    def percentile(self, q: float) -> float:
+        """Upper bound of the bucket holding the q-th quantile (max_ms for the overflow bucket)"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target and n:
+                return self.BOUNDS_MS[i] if i < len(self.BOUNDS_MS) else self.max_ms
+        return self.max_ms
+
+    def to_dict(self) -> dict:
+        buckets = {f"le_{bound:g}ms": n for bound, n in zip(self.BOUNDS_MS, self.counts)}
+        buckets["overflow"] = self.counts[-1]
+        return {
+            "count": self.count,
+            "avg_ms": self.total_ms / self.count if self.count else 0.0,
+            "p50_ms": self.percentile(0.5),
+            "p99_ms": self.percentile(0.99),
+            "max_ms": self.max_ms,
+            "buckets": buckets
+        }
+
+
+class LoopLagSampler:
+    """
+    Sleeps `interval` seconds at a time and records how late it wakes up.
+    Lag means something held the loop: a slow callback, blocking I/O, a
+    long synchronous handler.
+    """
+
+    def __init__(self, interval: float = 0.1):
+        self.interval = interval
+        self.histogram = LatencyHistogram()
+        self.last_ms = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        if self._task is None or self._task.done():
+            self._task = loop.create_task(self._run(), name="perf:loop-lag")
+
+    async def _run(self):
+        while True:
+            start = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            self.last_ms = max(0.0, (time.perf_counter() - start - self.interval) * 1000.0)
+            self.histogram.record(self.last_ms)
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def to_dict(self) -> dict:
+        stats = self.histogram.to_dict()
+        stats["last_ms"] = self.last_ms
+        stats["interval_ms"] = self.interval * 1000.0
+        return stats
+
+
+def describe_callback(handle) -> str:
+    """Coroutine name for a Task step, otherwise the callback's qualified name"""
+    callback = getattr(handle, "_callback", None)
+    owner = getattr(callback, "__self__", None)
+    if isinstance(owner, asyncio.Task):
+        coro = owner.get_coro()
+        return getattr(coro, "__qualname__", None) or owner.get_name()
+    return getattr(callback, "__qualname__", None) or repr(callback)
+
+
+class SlowCallbackMonitor:
+    """
+    Times every callback the loop runs and records the ones that take at
+    least loop.slow_callback_duration, keyed by coroutine/callback name.
+
+    asyncio only checks slow_callback_duration in debug mode, which also
+    tracks coroutine origins and is too heavy to leave on. This wraps
+    Handle._run with the same check and nothing else. It patches the class,
+    so it applies to every loop in the process while installed.
+    """
+
+    def __init__(self, recent: int = 50):
+        self.threshold_s = 0.1
+        self.by_name: Dict[str, dict] = {}
+        self.recent = collections.deque(maxlen=recent)
+        self.callbacks = 0
+        self._original_run = None
+
+    @property
+    def installed(self) -> bool:
+        return self._original_run is not None
+
+    def install(self, loop: asyncio.AbstractEventLoop):
+        self.threshold_s = loop.slow_callback_duration
+        if self.installed:
+            return
+        original_run = asyncio.Handle._run
+        monitor = self
+
+        @functools.wraps(original_run)
+        def _run(handle):
+            start = time.perf_counter()
+            try:
+                return original_run(handle)
+            finally:
+                elapsed = time.perf_counter() - start
+                monitor.callbacks += 1
+                if elapsed >= monitor.threshold_s:
+                    monitor.record(describe_callback(handle), elapsed * 1000.0)
+
+        self._original_run = original_run
+        asyncio.Handle._run = _run
+
+    def uninstall(self):
+        if self.installed:
+            asyncio.Handle._run = self._original_run
+            self._original_run = None
+
+    def record(self, name: str, ms: float):
+        entry = self.by_name.get(name)
+        if entry is None:
+            entry = self.by_name[name] = {"count": 0, "total_ms": 0.0, "max_ms": 0.0}
+        entry["count"] += 1
+        entry["total_ms"] += ms
+        entry["max_ms"] = max(entry["max_ms"], ms)
+        self.recent.append({"name": name, "ms": ms, "at": time.time()})
+
+    def to_dict(self) -> dict:
+        worst = sorted(self.by_name.items(), key=lambda item: item[1]["total_ms"], reverse=True)
+        return {
+            "installed": self.installed,
+            "threshold_ms": self.threshold_s * 1000.0,
+            "callbacks": self.callbacks,
+            "slow_callbacks": sum(entry["count"] for entry in self.by_name.values()),
+            "by_name": dict(worst[:20]),
+            "recent": list(self.recent)[-10:]
+        }
+
+
+def executor_stats(executor) -> dict:
+    """Backlog of a ThreadPoolExecutor (reads its private work queue and thread set)"""
+    work_queue = getattr(executor, "_work_queue", None)
+    return {
+        "queued": work_queue.qsize() if work_queue is not None else 0,
+        "threads": len(getattr(executor, "_threads", ())),
+        "max_workers": getattr(executor, "_max_workers", None)
+    }
+
+
+class SamplingProfiler:
+    """
+    Samples one thread's stack every `interval` seconds from a background
+    thread (sys._current_frames) and aggregates them. The output is a
+    folded-stack profile ("outer;inner count" per line) that flamegraph
+    tools read directly, plus the functions most often on top of the stack.
+    """
+
+    def __init__(self, thread_id: int, interval: float = 0.005, max_depth: int = 64):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.max_depth = max_depth
+
+    @staticmethod
+    def _frame_name(frame) -> str:
+        code = frame.f_code
+        return f"{getattr(code, 'co_qualname', code.co_name)} ({os.path.basename(code.co_filename)})"
+
+    def run(self, seconds: float) -> dict:
+        """Blocks for `seconds`; call it from a worker thread, never the thread being sampled"""
+        stacks = collections.Counter()
+        samples = 0
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                names = []
+                while frame is not None and len(names) < self.max_depth:
+                    names.append(self._frame_name(frame))
+                    frame = frame.f_back
+                stacks[";".join(reversed(names))] += 1
+                samples += 1
+            time.sleep(self.interval)
+
+        leaf = collections.Counter()
+        for stack, count in stacks.items():
+            leaf[stack.rsplit(";", 1)[-1]] += count
+        return {
+            "samples": samples,
+            "seconds": seconds,
+            "interval_ms": self.interval * 1000.0,
+            "top_functions": [{"function": name, "samples": n, "share": n / samples}
+                              for name, n in leaf.most_common(20)] if samples else [],
+            "folded": "\n".join(f"{stack} {count}" for stack, count in stacks.most_common())
+        }
+
+
+class PerfMonitor:
+    """
+    Instrumentation for the server's event loop. start() is called from
+    the running loop (the FastAPI lifespan); everything else is cheap to
+    call from handlers.
+    """
+
+    def __init__(self, lag_interval: float = 0.1, slow_callback_ms: float = 100.0, track_callbacks: bool = True):
+        self.lag = LoopLagSampler(lag_interval)
+        self.slow_callbacks = SlowCallbackMonitor()
+        self.slow_callback_ms = slow_callback_ms
+        self.track_callbacks = track_callbacks
+        self.handlers: Dict[str, LatencyHistogram] = {}
+        self.handler_errors: Dict[str, int] = {}
+        self.executors = {}
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.loop_thread_id: Optional[int] = None
+        self.started_at = None
+        self.profiling = False
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.loop = loop or asyncio.get_running_loop()
+        self.loop_thread_id = threading.get_ident()
+        self.loop.slow_callback_duration = self.slow_callback_ms / 1000.0
+        self.lag.start(self.loop)
+        if self.track_callbacks:
+            self.slow_callbacks.install(self.loop)
+        self.started_at = time.time()
+        print(f"[ADA DEBUG] [PERF] Monitoring event loop (slow callback >= {self.slow_callback_ms:g} ms)")
+
+    async def stop(self):
+        await self.lag.stop()
+        self.slow_callbacks.uninstall()
+
+    def register_executor(self, name: str, executor):
+        self.executors[name] = executor
+
+    def record_handler(self, name: str, ms: float, failed: bool = False):
+        histogram = self.handlers.get(name)
+        if histogram is None:
+            histogram = self.handlers[name] = LatencyHistogram()
+        histogram.record(ms)
+        if failed:
+            self.handler_errors[name] = self.handler_errors.get(name, 0) + 1
+
+    def timed(self, name: str, handler: Callable) -> Callable:
+        """
+        Wrap a sync or async handler so each call lands in the `name` histogram.
+
+        Extra positional arguments are dropped to fit the handler's signature:
+        python-socketio passes newer arguments (connect's auth, disconnect's
+        reason) and retries without them on TypeError, which would otherwise
+        run and record the handler twice.
+        """
+        limit = _positional_limit(handler)
+
+        if asyncio.iscoroutinefunction(handler):
+            @functools.wraps(handler)
+            async def async_wrapper(*args, **kwargs):
+                if limit is not None:
+                    args = args[:limit]
+                start = time.perf_counter()
+                failed = False
+                try:
+                    return await handler(*args, **kwargs)
+                except Exception:
+                    failed = True
+                    raise
+                finally:
+                    self.record_handler(name, (time.perf_counter() - start) * 1000.0, failed)
+            return async_wrapper
+
+        @functools.wraps(handler)
+        def wrapper(*args, **kwargs):
+            if limit is not None:
+                args = args[:limit]
+            start = time.perf_counter()
+            failed = False
+            try:
+                return handler(*args, **kwargs)
+            except Exception:
+                failed = True
+                raise
+            finally:
+                self.record_handler(name, (time.perf_counter() - start) * 1000.0, failed)
+        return wrapper
+
+    def instrument_socketio(self, sio, namespace: str = "/"):
+        """Time every event handler registered on `sio` so far"""
+        handlers = sio.handlers.get(namespace, {})
+        for event, handler in list(handlers.items()):
+            handlers[event] = self.timed(f"sio:{event}", handler)
+
+    def executor_snapshot(self) -> dict:
+        executors = {}
+        default = getattr(self.loop, "_default_executor", None) if self.loop else None
+        if default is not None:
+            executors["default"] = executor_stats(default)
+        for name, executor in self.executors.items():
+            executors[name] = executor_stats(executor)
+        return executors
+
+    def snapshot(self) -> dict:
+        return {
+            "uptime_s": time.time() - self.started_at if self.started_at else 0.0,
+            "loop_lag": self.lag.to_dict(),
+            "slow_callbacks": self.slow_callbacks.to_dict(),
+            "executors": self.executor_snapshot(),
+            "tasks": len(asyncio.all_tasks(self.loop)) if self.loop and self.loop.is_running() else 0,
+            "handlers": {
+                name: dict(histogram.to_dict(), errors=self.handler_errors.get(name, 0))
+                for name, histogram in sorted(self.handlers.items(), key=lambda item: item[1].total_ms, reverse=True)
+            }
+        }
+
+    async def profile(self, seconds: float = 5.0, interval: float = 0.005) -> dict:
+        """Sample the loop thread for `seconds` from a worker thread; one profile at a time"""
+        if self.loop_thread_id is None:
+            raise RuntimeError("Performance monitor is not running")
+        if self.profiling:
+            raise RuntimeError("A profile is already being recorded")
+        self.profiling = True
+        try:
+            profiler = SamplingProfiler(self.loop_thread_id, interval)
+            return await asyncio.to_thread(profiler.run, seconds)
+        finally:
+            self.profiling = False
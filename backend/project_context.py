@@ -0,0 +1,305 @@
+"""
+Project Context for ADA V2
+Incremental file manifest and token-budgeted context assembly for a project directory.
+"""
+
+import json
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, FrozenSet, List, Optional
+
+from log_config import get_logger
+
+log = get_logger("context")
+
+TEXT_EXTENSIONS = {'.txt', '.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.md', '.html', '.css', '.jsonl'}
+CHARS_PER_TOKEN = 4          # rough average for English text and code
+SUMMARY_READ_BYTES = 64 * 1024  # how much of a large text file is read to summarize it
+SUMMARY_CHARS = 300
+CHAT_MESSAGE_CHARS = 500
+CHAT_SHARE = 0.25            # at most this much of the budget goes to recent conversation
+LISTING_SHARE = 0.15         # and this much to the file listing
+
+OUTLINE_PATTERNS = {
+    '.py': re.compile(r"^\s*(?:async\s+def|def|class)\s+\w+.*$", re.MULTILINE),
+    '.js': re.compile(r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?(?:function|class|const\s+\w+\s*=\s*(?:async\s*)?\()\s*.*$", re.MULTILINE),
+    '.md': re.compile(r"^#{1,6}\s+.*$", re.MULTILINE),
+}
+OUTLINE_PATTERNS['.jsx'] = OUTLINE_PATTERNS['.ts'] = OUTLINE_PATTERNS['.tsx'] = OUTLINE_PATTERNS['.js']
+
+WORD = re.compile(r"[a-z0-9]{3,}")
+STOP_WORDS = frozenset(
+    "the and for you are but not with this that have from can what your all was were will "
+    "just into about there their then than them they its it's our out get got make let".split()
+)
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def terms(text: str) -> FrozenSet[str]:
+    """Lowercased words of three or more characters, without stop words"""
+    return frozenset(WORD.findall(text.lower())) - STOP_WORDS
+
+
+def is_ignored(name: str) -> bool:
+    """Chat logs and their offset indexes reach the session through the chat history instead; dotfiles (the memory index) are internal"""
+    return name.startswith(".") or (name.startswith("chat_history") and name.endswith((".jsonl", ".idx")))
+
+
+def summarize(rel_path: str, text: Optional[str], size: int) -> str:
+    """A short outline of a file: definitions, headings, top-level keys or its first lines"""
+    ext = os.path.splitext(rel_path)[1].lower()
+    if text is None:
+        return f"{ext.lstrip('.').upper() or 'binary'} file, {size} bytes"
+
+    lines = []
+    pattern = OUTLINE_PATTERNS.get(ext)
+    if pattern:
+        lines = [m.group(0).strip() for m in pattern.finditer(text)]
+    elif ext == '.json':
+        try:
+            data = json.loads(text)
+            if isinstance(data, dict):
+                lines = ["keys: " + ", ".join(str(k) for k in data)]
+            elif isinstance(data, list):
+                lines = [f"list of {len(data)} items"]
+        except json.JSONDecodeError:
+            pass
+    if not lines:
+        lines = [line.strip() for line in text.splitlines() if line.strip()][:3]
+
+    summary = "; ".join(lines)
+    if len(summary) > SUMMARY_CHARS:
+        summary = summary[:SUMMARY_CHARS].rstrip() + "..."
+    return summary or "(empty)"
+
+
+@dataclass
+class FileEntry:
+    path: str
+    mtime_ns: int
+    size: int
+    content: Optional[str]   # full text for text files up to max_file_size, otherwise None
+    summary: str
+    terms: FrozenSet[str]
+
+    @property
+    def tokens(self) -> int:
+        return estimate_tokens(self.content) if self.content is not None else 0
+
+
+class ProjectContext:
+    """
+    Manifest of a project directory and the context text built from it.
+
+    refresh() stats the tree and compares (mtime, size) against the
+    manifest; only new or changed files are read and summarized, and
+    deleted ones are dropped. build() ranks the manifest by relevance to a
+    query (usually the recent conversation) and recency, then fills a token
+    budget with full file contents, falling back to summaries and finally
+    to a count of what was left out. The last build is reused while
+    neither the manifest nor the inputs change.
+
+    The manifest is shared between threads (context building and memory
+    search), so refresh() and build() hold a lock and other readers take
+    a snapshot with paths().
+    """
+
+    def __init__(self, root, max_file_size: int = 10000):
+        self.root = Path(root)
+        self.max_file_size = max_file_size
+        self.entries: Dict[str, FileEntry] = {}
+        self.version = 0
+        self.reads = 0
+        self.last_changed = 0
+        self.refresh_ms = 0.0
+        self.build_ms = 0.0
+        self._built_key = None
+        self._built = ""
+        self._lock = threading.Lock()
+
+    def _walk(self, directory, prefix: str = ""):
+        try:
+            with os.scandir(directory) as it:
+                items = sorted(it, key=lambda e: e.name)
+        except FileNotFoundError:
+            return
+        for item in items:
+            if item.is_dir(follow_symlinks=False):
+                if not item.name.startswith("."):
+                    yield from self._walk(item.path, prefix + item.name + os.sep)
+            elif item.is_file() and not is_ignored(item.name):
+                yield prefix + item.name, item.stat()
+
+    def _load(self, rel_path: str, stat) -> FileEntry:
+        ext = os.path.splitext(rel_path)[1].lower()
+        content = None
+        text = None
+        if ext in TEXT_EXTENSIONS:
+            try:
+                with open(self.root / rel_path, 'r', encoding='utf-8', errors='ignore') as f:
+                    text = f.read() if stat.st_size <= self.max_file_size else f.read(SUMMARY_READ_BYTES)
+                self.reads += 1
+            except OSError as e:
+                log.warning("Failed to read %s: %s", rel_path, e)
+            if text is not None and stat.st_size <= self.max_file_size:
+                content = text
+        summary = summarize(rel_path, text, stat.st_size)
+        return FileEntry(
+            path=rel_path,
+            mtime_ns=stat.st_mtime_ns,
+            size=stat.st_size,
+            content=content,
+            summary=summary,
+            terms=terms(rel_path.replace(os.sep, " ") + " " + (content if content is not None else summary))
+        )
+
+    def refresh(self) -> int:
+        """Bring the manifest up to date; returns how many files were added, changed or removed"""
+        with self._lock:
+            return self._refresh()
+
+    def paths(self) -> List[str]:
+        """Snapshot of the manifest's paths, safe to iterate while another thread refreshes"""
+        with self._lock:
+            return list(self.entries)
+
+    def _refresh(self) -> int:
+        start = time.perf_counter()
+        seen = set()
+        changed = 0
+        for rel_path, stat in self._walk(self.root):
+            seen.add(rel_path)
+            entry = self.entries.get(rel_path)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                continue
+            self.entries[rel_path] = self._load(rel_path, stat)
+            changed += 1
+        for rel_path in [p for p in self.entries if p not in seen]:
+            del self.entries[rel_path]
+            changed += 1
+        if changed:
+            self.version += 1
+        self.last_changed = changed
+        self.refresh_ms = (time.perf_counter() - start) * 1000.0
+        return changed
+
+    def rank(self, query: str = "") -> List[FileEntry]:
+        """Entries most relevant to the query first, ties broken by most recently modified"""
+        wanted = terms(query) if query else frozenset()
+        by_recency = sorted(self.entries.values(), key=lambda e: e.mtime_ns, reverse=True)
+        scored = []
+        for position, entry in enumerate(by_recency):
+            relevance = len(wanted & entry.terms) / len(wanted) if wanted else 0.0
+            recency = 1.0 / (1.0 + position / 10.0)
+            scored.append((2.0 * relevance + recency, entry))
+        scored.sort(key=lambda item: item[0], reverse=True)
+        return [entry for _, entry in scored]
+
+    def build(self, title: str, budget_tokens: Optional[int] = None, query: str = "",
+              recent_chat: Optional[List[dict]] = None) -> str:
+        """Context text for the session; budget_tokens=None includes every file that fits max_file_size"""
+        with self._lock:
+            return self._build(title, budget_tokens, query, recent_chat)
+
+    def _build(self, title: str, budget_tokens: Optional[int], query: str, recent_chat: Optional[List[dict]]) -> str:
+        recent_chat = recent_chat or []
+        key = (self.version, title, budget_tokens, query,
+               tuple((m.get("timestamp"), m.get("text")) for m in recent_chat))
+        if key == self._built_key:
+            return self._built
+
+        start = time.perf_counter()
+        budget = budget_tokens if budget_tokens else float("inf")
+        lines = [f"=== Project Context: '{title}' ===", f"Project directory: {self.root}", ""]
+        used = estimate_tokens("\n".join(lines))
+        ranked = self.rank(query)
+
+        # Recent conversation, newest kept first when it does not all fit
+        if recent_chat:
+            chat_lines = []
+            chat_budget = budget * CHAT_SHARE
+            chat_used = 0
+            for message in reversed(recent_chat):
+                text = str(message.get("text", ""))[:CHAT_MESSAGE_CHARS]
+                line = f"  {message.get('sender', '?')}: {text}"
+                cost = estimate_tokens(line) + 1
+                if chat_used + cost > chat_budget:
+                    break
+                chat_lines.append(line)
+                chat_used += cost
+            if chat_lines:
+                lines.append("Recent conversation:")
+                lines.extend(reversed(chat_lines))
+                lines.append("")
+                used += chat_used
+
+        # File listing, most relevant first when it has to be cut
+        if not ranked:
+            lines.append("(No files in project yet)")
+        else:
+            lines.append(f"Files ({len(ranked)} total):")
+            listing_budget = budget * LISTING_SHARE
+            listing_used = 0
+            listed = 0
+            for entry in ranked:
+                line = f"  - {entry.path}"
+                cost = estimate_tokens(line) + 1
+                if listing_used + cost > listing_budget:
+                    break
+                lines.append(line)
+                listing_used += cost
+                listed += 1
+            if listed < len(ranked):
+                lines.append(f"  ... and {len(ranked) - listed} more")
+            used += listing_used
+        lines.append("")
+
+        # File contents, then summaries, in rank order
+        full = summarized = omitted = 0
+        for entry in ranked:
+            if entry.content is not None:
+                cost = entry.tokens + estimate_tokens(entry.path) + 4
+                if used + cost <= budget:
+                    lines.append(f"--- {entry.path} ---")
+                    lines.append(entry.content)
+                    lines.append("")
+                    used += cost
+                    full += 1
+                    continue
+            elif os.path.splitext(entry.path)[1].lower() not in TEXT_EXTENSIONS:
+                continue  # binary files are in the listing
+            line = f"--- {entry.path} (summary, {entry.size} bytes) --- {entry.summary}"
+            cost = estimate_tokens(line) + 1
+            if used + cost <= budget:
+                lines.append(line)
+                used += cost
+                summarized += 1
+            else:
+                omitted += 1
+        if omitted:
+            lines.append(f"({omitted} more files left out to fit {budget_tokens} tokens)")
+
+        self._built = "\n".join(lines)
+        self._built_key = key
+        self.build_ms = (time.perf_counter() - start) * 1000.0
+        log.debug("Built context for %s: %d full, %d summarized, %d omitted, ~%d tokens (refresh %.1f ms, %d changed)",
+                  title, full, summarized, omitted, used, self.refresh_ms, self.last_changed)
+        return self._built
+
+    def get_metrics(self) -> dict:
+        return {
+            "files": len(self.entries),
+            "version": self.version,
+            "reads": self.reads,
+            "last_changed": self.last_changed,
+            "refresh_ms": self.refresh_ms,
+            "build_ms": self.build_ms,
+            "context_tokens": estimate_tokens(self._built)
+        }
@@ -1,14 +1,31 @@
 import os
-import json
 import shutil
+import threading
 import time
 from pathlib import Path
 
+from chat_history import ChatHistory
+from memory_index import MemoryIndex, INDEX_NAME
+from project_context import ProjectContext
+
+# write_file re-indexes what it writes; files changed any other way reach the
+# search index on the next search after this many seconds
+MEMORY_RESYNC_S = 30.0
+
 class ProjectManager:
-    def __init__(self, workspace_root: str):
+    def __init__(self, workspace_root: str, chat_segment_mb: float = None, context_budget_tokens: int = None):
         self.workspace_root = Path(workspace_root)
         self.projects_dir = self.workspace_root / "projects"
         self.current_project = "temp"
+        self._chat_histories = {}
+        self._contexts = {}
+        self._memory_indexes = {}
+        self._memory_lock = threading.Lock()
+        self._memory_synced = {}  # project path -> (monotonic time, manifest version) of the last file sync
+        # Token budget for get_project_context (None = every file up to max_file_size)
+        self.context_budget_tokens = context_budget_tokens
+        # Chat logs roll into numbered segments past this size (None = one file)
+        self.chat_segment_bytes = int(chat_segment_mb * 1024 * 1024) if chat_segment_mb else None
         
         # Ensure projects root exists
         if not self.projects_dir.exists():
@@ -55,16 +72,99 @@ class ProjectManager:
     def get_current_project_path(self):
         return self.projects_dir / self.current_project
 
-    def log_chat(self, sender: str, text: str):
-        """Appends a chat message to the current project's history."""
+    def chat_log_entry(self, sender: str, text: str):
+        """Returns (log file, entry) for a chat message, bound to the current project now."""
         log_file = self.get_current_project_path() / "chat_history.jsonl"
         entry = {
             "timestamp": time.time(),
             "sender": sender,
             "text": text
         }
-        with open(log_file, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
+        return log_file, entry
+
+    def chat_history(self, log_file=None) -> ChatHistory:
+        """The ChatHistory (log + offset index) for a log file, default the current project's."""
+        log_file = Path(log_file or self.get_current_project_path() / "chat_history.jsonl")
+        history = self._chat_histories.get(log_file)
+        if history is None:
+            history = self._chat_histories[log_file] = ChatHistory(log_file, segment_bytes=self.chat_segment_bytes)
+        return history
+
+    def write_chat_entries(self, items):
+        """Appends (log file, entry) pairs, opening each file once per batch."""
+        by_file = {}
+        for log_file, entry in items:
+            by_file.setdefault(log_file, []).append(entry)
+        for log_file, entries in by_file.items():
+            self.chat_history(log_file).append(entries)
+            self.index_chat_entries(log_file, entries)
+
+    def memory_index(self, project_path=None) -> MemoryIndex:
+        """The search index of a project (default the current one), filled from its chat log when new."""
+        return self._open_memory_index(Path(project_path or self.get_current_project_path()))[0]
+
+    def _open_memory_index(self, project_path: Path):
+        with self._memory_lock:
+            index = self._memory_indexes.get(project_path)
+            if index is not None:
+                return index, False
+            index = self._memory_indexes[project_path] = MemoryIndex(project_path / INDEX_NAME)
+            backfilled = False
+            if index.is_empty:
+                history = self.chat_history(project_path / "chat_history.jsonl")
+                count = index.add_messages(history.records())
+                if count:
+                    print(f"[ProjectManager] Indexed {count} past chat messages for search")
+                backfilled = True
+            return index, backfilled
+
+    def index_chat_entries(self, log_file, entries):
+        """Adds freshly written chat entries to their project's search index."""
+        index, backfilled = self._open_memory_index(Path(log_file).parent)
+        # A new index was just filled from the log, which already has these
+        if not backfilled:
+            index.add_messages(entries)
+
+    def index_file(self, path):
+        """Re-indexes one file of the current project after it was written."""
+        project_path = self.get_current_project_path()
+        try:
+            rel_path = os.path.relpath(path, project_path)
+        except ValueError:
+            return False
+        if rel_path.startswith(".."):
+            return False
+        return self.memory_index(project_path).index_file(project_path, rel_path)
+
+    def search_memory(self, query: str, limit: int = 5):
+        """Best matching chat messages and file passages of the current project."""
+        project_path = self.get_current_project_path()
+        if not project_path.exists():
+            return []
+        index = self.memory_index(project_path)
+        self._sync_memory_files(project_path, index)
+        return index.search(query, limit)
+
+    def _sync_memory_files(self, project_path: Path, index: MemoryIndex):
+        """Re-indexes files changed outside write_file, found through the context manifest, at most every MEMORY_RESYNC_S."""
+        now = time.monotonic()
+        with self._memory_lock:
+            last = self._memory_synced.get(project_path)
+            if last is not None and now - last[0] < MEMORY_RESYNC_S:
+                return
+            # Claimed up front so concurrent searches do not walk the tree too
+            self._memory_synced[project_path] = (now, last[1] if last else None)
+        context = self.project_context()
+        context.refresh()
+        version = (id(context), context.version)
+        if last is None or last[1] != version:
+            index.sync_files(project_path, context.paths())
+        with self._memory_lock:
+            self._memory_synced[project_path] = (now, version)
+
+    def log_chat(self, sender: str, text: str):
+        """Appends a chat message to the current project's history."""
+        self.write_chat_entries([self.chat_log_entry(sender, text)])
 
     def save_cad_artifact(self, source_path: str, prompt: str):
         """Copies a generated CAD file to the project's 'cad' folder."""
@@ -88,78 +188,46 @@ class ProjectManager:
             print(f"[ProjectManager] [ERR] Failed to save artifact: {e}")
             return None
 
-    def get_project_context(self, max_file_size: int = 10000) -> str:
+    def project_context(self, max_file_size: int = 10000) -> ProjectContext:
+        """The cached file manifest of the current project."""
+        project_path = self.get_current_project_path()
+        context = self._contexts.get(project_path)
+        if context is None or context.max_file_size != max_file_size:
+            context = self._contexts[project_path] = ProjectContext(project_path, max_file_size)
+        return context
+
+    def get_project_context(self, max_file_size: int = 10000, budget_tokens: int = None, query: str = None) -> str:
         """
         Gathers context about the current project for the AI.
-        Lists all files and reads text file contents (up to max_file_size bytes).
+        Only files added or changed since the last call are read. Files most
+        relevant to the query (default: the recent conversation) and most
+        recently modified come first; the rest are summarized or counted
+        once the token budget is used up.
         """
         project_path = self.get_current_project_path()
         if not project_path.exists():
             return f"Project '{self.current_project}' does not exist."
 
-        context_lines = [f"=== Project Context: '{self.current_project}' ==="]
-        context_lines.append(f"Project directory: {project_path}")
-        context_lines.append("")
-
-        # List all files recursively
-        all_files = []
-        for root, dirs, files in os.walk(project_path):
-            for f in files:
-                rel_path = os.path.relpath(os.path.join(root, f), project_path)
-                all_files.append(rel_path)
-
-        if not all_files:
-            context_lines.append("(No files in project yet)")
-        else:
-            context_lines.append(f"Files ({len(all_files)} total):")
-            for f in all_files:
-                context_lines.append(f"  - {f}")
-
-        context_lines.append("")
-
-        # Read text files (skip binary and large files)
-        text_extensions = {'.txt', '.py', '.js', '.jsx', '.ts', '.tsx', '.json', '.md', '.html', '.css', '.jsonl'}
-        for rel_path in all_files:
-            ext = os.path.splitext(rel_path)[1].lower()
-            if ext not in text_extensions:
-                continue
-
-            full_path = project_path / rel_path
-            try:
-                file_size = full_path.stat().st_size
-                if file_size > max_file_size:
-                    context_lines.append(f"--- {rel_path} (too large: {file_size} bytes, skipped) ---")
-                    continue
-
-                with open(full_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read()
-                context_lines.append(f"--- {rel_path} ---")
-                context_lines.append(content)
-                context_lines.append("")
-            except Exception as e:
-                context_lines.append(f"--- {rel_path} (error reading: {e}) ---")
-
-        return "\n".join(context_lines)
+        context = self.project_context(max_file_size)
+        context.refresh()
+        recent = self.get_recent_chat_history(10)
+        if query is None:
+            query = " ".join(str(m.get("text", "")) for m in recent)
+        return context.build(self.current_project, budget_tokens or self.context_budget_tokens, query, recent)
 
     def get_recent_chat_history(self, limit: int = 50):
         """Returns the last 'limit' chat messages from history."""
-        log_file = self.get_current_project_path() / "chat_history.jsonl"
-        if not log_file.exists():
+        try:
+            # Reads backwards from the end of the file, only as far as needed
+            return self.chat_history().tail(limit)
+        except Exception as e:
+            print(f"[ProjectManager] [ERR] Failed to read chat history: {e}")
             return []
-            
+
+    def get_chat_history_since(self, timestamp: float, limit: int = None):
+        """Returns chat messages logged at or after 'timestamp' (uses the offset index)."""
         try:
-            with open(log_file, "r", encoding="utf-8") as f:
-                lines = f.readlines()
-                
-            # Parse last N lines
-            history = []
-            for line in lines[-limit:]:
-                try:
-                    entry = json.loads(line)
-                    history.append(entry)
-                except json.JSONDecodeError:
-                    continue
-            return history
+            return self.chat_history().since(timestamp, limit)
         except Exception as e:
             print(f"[ProjectManager] [ERR] Failed to read chat history: {e}")
             return []
@@ -23,9 +23,13 @@ from pathlib import Path
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 import ada
+from audio_processor import visualizer_peaks
 from authenticator import FaceAuthenticator
 from kasa_agent import KasaAgent
 from hue_agent import HueAgent
+from perf_monitor import PerfMonitor
+from memory_ingest import MemoryIngest, UPLOAD_CHUNK_CHARS
+from log_config import configure_logging, apply_levels, get_logger, stop_logging
 
 # Create a Socket.IO server
 sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins='*')
@@ -42,8 +46,9 @@ def signal_handler(sig, frame):
             audio_loop.stop() 
         except:
             pass
-    # Force kill
+    # Force kill (os._exit skips atexit, so flush queued log records first)
     print("[SERVER] Force exiting...")
+    stop_logging()
     os._exit(0)
 
 signal.signal(signal.SIGINT, signal_handler)
@@ -67,7 +72,8 @@ DEFAULT_SETTINGS = {
         "read_file": True,
         "create_project": True,
         "switch_project": True,
-        "list_projects": True
+        "list_projects": True,
+        "search_project_memory": True
     },
     "printers": [], # List of {host, port, name, type}
     "kasa_devices": [], # List of {ip, alias, model}
@@ -77,12 +83,31 @@ DEFAULT_SETTINGS = {
     # Enhanced Audio Settings
     "voice_name": "Fenrir",  # Selected Gemini voice (male, deep)
     "enable_noise_gate": False,  # Noise suppression (disabled by default - can cause audio issues)
+    "noise_gate_mode": "block",  # "sample" = per-sample attack/release envelope, "block" = legacy per-chunk gain
     "enable_wake_word": False,  # Wake word detection (requires API key)
     "wake_word_key": None,  # Porcupine API key
     "enable_recording": False,  # Audio recording capability
+    "recording_format": "wav",  # "wav", or "flac"/"opus" when the soundfile package is installed
+    "recording_rotate_minutes": None,  # Start a new recording file after this many minutes (None = never)
+    "recording_dual_channel": False,  # Stereo recordings: mic (left) + model output (right), with a .idx.jsonl timestamp sidecar
+    "capture_mode": "blocking",  # Microphone: "callback" (PortAudio callback + ring buffer) or "blocking" (stream.read per chunk)
+    "audio_batch_ms": 0,  # Coalesce mic chunks into one send per window (20-200 ms, 0 = one send per 64 ms chunk)
+    "audio_transport": "json",  # 'audio_data' event: "peaks" (64-byte visualizer peaks), "binary" (raw PCM attachment), "json" (legacy int list)
     # Memory Settings
     "memory_context_limit": 100,  # Number of past messages to load on reconnect (50-200 recommended)
     "max_memory_file_size_mb": 50,  # Max size for uploaded memory files in MB
+    "memory_digest_tokens": 2000,  # Uploaded memory is indexed in full; the live session gets a digest of at most this many tokens
+    "chat_fsync": "never",  # Chat log durability: "never" (OS flush only), "batch" (fsync every commit), "interval" (at most once a second)
+    "chat_segment_mb": 64,  # Roll chat_history.jsonl into numbered segments past this size (None = never)
+    "context_budget_tokens": 8000,  # Project context sent on switch_project: relevant files in full, the rest summarized (None = no limit)
+    # Performance Monitoring (/metrics, get_perf_stats)
+    "perf_slow_callback_ms": 100,  # Loop callbacks at least this long are recorded as slow
+    "perf_track_callbacks": True,  # Time every loop callback to find slow ones (~1 us each)
+    "perf_lag_interval_ms": 100,  # Loop lag sampling period
+    # Logging (ada.* loggers, written by a background thread)
+    "log_level": "INFO",  # Default level for every subsystem
+    "log_levels": {},  # Per-subsystem overrides, e.g. {"vad": "DEBUG", "tools": "DEBUG", "audio": "WARNING"}
+    "log_format": "text",  # "text" or "json" (one object per line)
 }
 
 SETTINGS = DEFAULT_SETTINGS.copy()
@@ -114,6 +139,8 @@ def save_settings():
 
 # Load on startup
 load_settings()
+configure_logging(SETTINGS)
+log = get_logger("server")
 
 authenticator = None
 kasa_agent = KasaAgent(known_devices=SETTINGS.get("kasa_devices"))
@@ -123,6 +150,13 @@ hue_agent = HueAgent(
 )
 # tool_permissions is now SETTINGS["tool_permissions"]
 
+perf_monitor = PerfMonitor(
+    lag_interval=SETTINGS.get("perf_lag_interval_ms", 100) / 1000.0,
+    slow_callback_ms=SETTINGS.get("perf_slow_callback_ms", 100),
+    track_callbacks=SETTINGS.get("perf_track_callbacks", True)
+)
+PROFILES_DIR = Path("profiles")
+
 from contextlib import asynccontextmanager
 
 @asynccontextmanager
@@ -139,11 +173,13 @@ async def lifespan(app: FastAPI):
     except Exception as e:
         print(f"[SERVER DEBUG] Error checking loop: {e}")
 
+    perf_monitor.start()
+
     print("[SERVER] Startup: Initializing Kasa Agent...")
     await kasa_agent.initialize()
     yield
-    # Shutdown code (if needed)
-    pass
+    # Shutdown code
+    await perf_monitor.stop()
 
 # Create FastAPI app with lifespan
 app = FastAPI(lifespan=lifespan)
@@ -153,6 +189,36 @@ app_socketio = socketio.ASGIApp(sio, app)
 async def status():
     return {"status": "running", "service": "JARVIS Backend"}
 
+def get_perf_snapshot():
+    stats = perf_monitor.snapshot()
+    stats["audio"] = audio_loop.get_audio_stats() if audio_loop else {}
+    return stats
+
+async def record_profile(seconds):
+    """Sample the event loop thread and save the folded stacks under profiles/"""
+    seconds = min(max(float(seconds), 0.1), 60.0)
+    profile = await perf_monitor.profile(seconds)
+    PROFILES_DIR.mkdir(exist_ok=True)
+    path = PROFILES_DIR / f"profile_{datetime.now().strftime('%Y%m%d_%H%M%S')}.folded"
+    await asyncio.to_thread(path.write_text, profile["folded"] + "\n", encoding="utf-8")
+    profile["path"] = str(path.resolve())
+    print(f"[SERVER] Profile saved: {profile['path']} ({profile['samples']} samples)")
+    return profile
+
+@app.get("/metrics")
+async def metrics():
+    return get_perf_snapshot()
+
+@app.get("/metrics/profile")
+async def metrics_profile(seconds: float = 5.0, folded: bool = False):
+    try:
+        profile = await record_profile(seconds)
+    except RuntimeError as e:
+        return {"error": str(e)}
+    if not folded:
+        profile.pop("folded")
+    return profile
+
 @sio.event
 async def connect(sid, environ):
     print(f"Client connected: {sid}")
@@ -196,6 +262,9 @@ async def connect(sid, environ):
 @sio.event
 async def disconnect(sid):
     print(f"Client disconnected: {sid}")
+    # What an abandoned upload already sent stays indexed
+    for upload_id in [u for u, (owner, _) in memory_uploads.items() if owner == sid]:
+        memory_uploads.pop(upload_id, None)
 
 @sio.event
 async def start_audio(sid, data=None):
@@ -233,21 +302,33 @@ async def start_audio(sid, data=None):
 
 
     # Callback to send audio data to frontend
+    audio_transport = SETTINGS.get("audio_transport", "json")
+    print(f"[SERVER] Audio transport mode: {audio_transport}")
+
     def on_audio_data(data_bytes):
         # We need to schedule this on the event loop
-        # This is high frequency, so we might want to downsample or batch if it's too much
-        asyncio.create_task(sio.emit('audio_data', {'data': list(data_bytes)}))
+        # This is the hottest event in the system: bytes payloads go out as
+        # Socket.IO binary attachments instead of JSON-encoded int lists
+        if audio_transport == "peaks":
+            payload = {'peaks': visualizer_peaks(data_bytes)}
+        elif audio_transport == "binary":
+            payload = {'data': bytes(data_bytes)}
+        else:
+            payload = {'data': list(data_bytes)}
+        asyncio.create_task(sio.emit('audio_data', payload))
 
     # Callback to send CAL data to frontend
     def on_cad_data(data):
-        info = f"{len(data.get('vertices', []))} vertices" if 'vertices' in data else f"{len(data.get('data', ''))} bytes (STL)"
-        print(f"Sending CAD data to frontend: {info}")
+        if 'vertices' in data:
+            log.debug("Sending CAD data to frontend: %d vertices", len(data['vertices']))
+        else:
+            log.debug("Sending CAD data to frontend: %d bytes (STL)", len(data.get('data', '')))
         asyncio.create_task(sio.emit('cad_data', data))
 
     # Callback to send Browser data to frontend
     def on_web_data(data):
         from json_sanitizer import sanitize_for_json
-        print(f"Sending Browser data to frontend: {len(data.get('log', ''))} chars logs")
+        log.debug("Sending Browser data to frontend: %d chars logs", len(data.get('log', '')))
         asyncio.create_task(sio.emit('browser_frame', sanitize_for_json(data)))
         
     # Callback to send Transcription data to frontend
@@ -258,7 +339,7 @@ async def start_audio(sid, data=None):
     # Callback to send Confirmation Request to frontend
     def on_tool_confirmation(data):
         # data = {"id": "uuid", "tool": "tool_name", "args": {...}}
-        print(f"Requesting confirmation for tool: {data.get('tool')}")
+        log.debug("Requesting confirmation for tool: %s", data.get('tool'))
         asyncio.create_task(sio.emit('tool_confirmation_request', data))
 
     # Callback to send CAD status to frontend
@@ -267,11 +348,11 @@ async def start_audio(sid, data=None):
         # - a string like "generating" (from ada.py handle_cad_request)
         # - a dict with {status, attempt, max_attempts, error} (from CadAgent)
         if isinstance(status, dict):
-            print(f"Sending CAD Status: {status.get('status')} (attempt {status.get('attempt')}/{status.get('max_attempts')})")
+            log.debug("Sending CAD Status: %s (attempt %s/%s)", status.get('status'), status.get('attempt'), status.get('max_attempts'))
             asyncio.create_task(sio.emit('cad_status', status))
         else:
             # Legacy: simple string
-            print(f"Sending CAD Status: {status}")
+            log.debug("Sending CAD Status: %s", status)
             asyncio.create_task(sio.emit('cad_status', {'status': status}))
 
     # Callback to send CAD thoughts to frontend (streaming)
@@ -324,9 +405,18 @@ async def start_audio(sid, data=None):
             # Enhanced audio settings
             voice_name=SETTINGS.get("voice_name", "Kore"),
             enable_noise_gate=SETTINGS.get("enable_noise_gate", True),
+            noise_gate_mode=SETTINGS.get("noise_gate_mode", "block"),
+            capture_mode=SETTINGS.get("capture_mode", "blocking"),
+            audio_batch_ms=SETTINGS.get("audio_batch_ms", 0),
+            chat_fsync=SETTINGS.get("chat_fsync", "never"),
+            chat_segment_mb=SETTINGS.get("chat_segment_mb", 64),
+            context_budget_tokens=SETTINGS.get("context_budget_tokens", 8000),
             enable_wake_word=SETTINGS.get("enable_wake_word", False),
             wake_word_key=SETTINGS.get("wake_word_key"),
-            enable_recording=SETTINGS.get("enable_recording", False)
+            enable_recording=SETTINGS.get("enable_recording", False),
+            recording_format=SETTINGS.get("recording_format", "wav"),
+            recording_rotate_minutes=SETTINGS.get("recording_rotate_minutes"),
+            recording_dual_channel=SETTINGS.get("recording_dual_channel", False)
         )
         print("AudioLoop initialized successfully.")
 
@@ -439,14 +529,15 @@ async def resume_audio(sid):
 
 @sio.event
 async def confirm_tool(sid, data):
-    # data: { "id": "...", "confirmed": True/False }
+    # data: { "id": "...", "confirmed": True/False, "decisions": {call_id: True/False} (batch prompts, optional) }
     request_id = data.get('id')
     confirmed = data.get('confirmed', False)
+    decisions = data.get('decisions')
     
-    print(f"[SERVER DEBUG] Received confirmation response for {request_id}: {confirmed}")
+    log.debug("Received confirmation response for %s: %s %s", request_id, confirmed, decisions or '')
     
     if audio_loop:
-        audio_loop.resolve_tool_confirmation(request_id, confirmed)
+        audio_loop.resolve_tool_confirmation(request_id, confirmed, decisions)
     else:
         print("Audio loop not active, cannot resolve confirmation.")
 
@@ -499,15 +590,16 @@ async def user_input(sid, data):
         
         # Log User Input to Project History
         if audio_loop and audio_loop.project_manager:
-            audio_loop.project_manager.log_chat("User", text)
+            audio_loop.log_chat("User", text)
             
         # Use the same 'send' method that worked for audio, as 'send_realtime_input' and 'send_client_content' seem unstable in this env
         # INJECT VIDEO FRAME IF AVAILABLE (VAD-style logic for Text Input)
-        if audio_loop and audio_loop._latest_image_payload:
+        frame_payload = audio_loop._latest_image_payload if audio_loop else None
+        if frame_payload:
             print(f"[SERVER DEBUG] Piggybacking video frame with text input.")
             try:
                 # Send frame first
-                await audio_loop.session.send(input=audio_loop._latest_image_payload, end_of_turn=False)
+                await audio_loop.session.send(input=frame_payload, end_of_turn=False)
             except Exception as e:
                 print(f"[SERVER DEBUG] Failed to send piggyback frame: {e}")
                 
@@ -525,9 +617,8 @@ async def video_frame(sid, data):
     # data should contain 'image' which is binary (blob) or base64 encoded
     image_data = data.get('image')
     if image_data and audio_loop:
-        # We don't await this because we don't want to block the socket handler
-        # But send_frame is async, so we create a task
-        asyncio.create_task(audio_loop.send_frame(image_data))
+        # Only swaps the stored frame; it is base64-encoded later, if and when it is sent
+        audio_loop.update_frame(image_data)
 
 @sio.event
 async def save_memory(sid, data):
@@ -567,8 +658,88 @@ async def save_memory(sid, data):
         print(f"Error saving memory: {e}")
         await sio.emit('error', {'msg': f"Failed to save memory: {str(e)}"})
 
+# Chunked memory uploads in progress: upload_id -> (sid, MemoryIngest)
+memory_uploads = {}
+
+async def new_memory_ingest(name, size=None):
+    # Opening a project's index for the first time fills it from the whole chat log
+    index = await asyncio.to_thread(audio_loop.project_manager.memory_index)
+    return MemoryIngest(
+        index,
+        name=Path(name or "memory.txt").name,
+        total_bytes=size or None,
+        max_bytes=int(SETTINGS.get("max_memory_file_size_mb", 50) * 1024 * 1024),
+        digest_tokens=SETTINGS.get("memory_digest_tokens", 2000)
+    )
+
+async def feed_memory(sid, upload_id, ingest, text):
+    progress = await asyncio.to_thread(ingest.feed, text)
+    await sio.emit('memory_progress', {"upload_id": upload_id, **progress}, room=sid)
+    return progress
+
+async def finish_memory_upload(sid, upload_id, ingest):
+    """Index the rest, then send the session a bounded digest instead of the file"""
+    recent = audio_loop.project_manager.get_recent_chat_history(10)
+    query = " ".join(str(m.get("text", "")) for m in recent)
+    digest = await asyncio.to_thread(ingest.finish, query)
+    progress = ingest.progress()
+    await sio.emit('memory_progress', {"upload_id": upload_id, **progress}, room=sid)
+    summary = f"{progress['messages']} messages, {progress['passages']} passages, {progress['duplicates']} duplicates skipped"
+
+    if not audio_loop.session:
+        log.warning("Memory indexed but no active session for the digest")
+        await sio.emit('status', {'msg': f"Memory Indexed ({summary}); searchable once A.D.A is started"})
+        return
+    log.info("Sending memory digest to model (%d chars)", len(digest))
+    await audio_loop.session.send(input=digest, end_of_turn=True)
+    await sio.emit('status', {'msg': f"Memory Loaded into Context ({summary})"})
+
+@sio.event
+async def upload_memory_start(sid, data):
+    """Starts a chunked memory upload; the ack carries the upload id or an error"""
+    if not audio_loop:
+        await sio.emit('error', {'msg': "System not ready (Audio Loop inactive)"})
+        return {"error": "System not ready"}
+    max_mb = SETTINGS.get("max_memory_file_size_mb", 50)
+    size = int(data.get('size') or 0)
+    if size > max_mb * 1024 * 1024:
+        await sio.emit('error', {'msg': f"Memory file is larger than {max_mb} MB"})
+        return {"error": "File too large"}
+
+    import uuid
+    upload_id = uuid.uuid4().hex
+    memory_uploads[upload_id] = (sid, await new_memory_ingest(data.get('name'), size))
+    log.info("Memory upload %s started: %s (%d bytes)", upload_id, data.get('name'), size)
+    return {"upload_id": upload_id, "chunk_chars": UPLOAD_CHUNK_CHARS}
+
+@sio.event
+async def upload_memory_chunk(sid, data):
+    """One chunk of a memory upload; the chunk with final=True finishes it"""
+    upload_id = data.get('upload_id')
+    upload = memory_uploads.get(upload_id)
+    # Only the client that started an upload can feed it
+    if upload is None or upload[0] != sid:
+        return {"error": "Unknown upload"}
+    ingest = upload[1]
+    chunk = data.get('data', '')
+    try:
+        # The size announced in upload_memory_start is the client's word; what arrives is checked here
+        if ingest.max_bytes and ingest.bytes_received + len(chunk.encode('utf-8')) > ingest.max_bytes:
+            raise ValueError(f"Memory file is larger than {SETTINGS.get('max_memory_file_size_mb', 50)} MB")
+        progress = await feed_memory(sid, upload_id, ingest, chunk)
+        if data.get('final'):
+            memory_uploads.pop(upload_id, None)
+            await finish_memory_upload(sid, upload_id, ingest)
+    except Exception as e:
+        memory_uploads.pop(upload_id, None)
+        log.error("Memory upload %s failed: %s", upload_id, e)
+        await sio.emit('error', {'msg': f"Failed to upload memory: {str(e)}"})
+        return {"error": str(e)}
+    return {"ok": True, "bytes": progress["bytes"]}
+
 @sio.event
 async def upload_memory(sid, data):
+    """Whole-file upload (older clients); runs through the same chunked pipeline"""
     print(f"Received memory upload request")
     try:
         memory_text = data.get('memory', '')
@@ -580,19 +751,11 @@ async def upload_memory(sid, data):
              print("[SERVER DEBUG] [Error] Audio loop is None. Cannot load memory.")
              await sio.emit('error', {'msg': "System not ready (Audio Loop inactive)"})
              return
-        
-        if not audio_loop.session:
-             print("[SERVER DEBUG] [Error] Session is None. Cannot load memory.")
-             await sio.emit('error', {'msg': "System not ready (No active session)"})
-             return
 
-        # Send to model
-        print("Sending memory context to model...")
-        context_msg = f"System Notification: The user has uploaded a long-term memory file. Please load the following context into your understanding. The format is a text log of previous conversations:\n\n{memory_text}"
-        
-        await audio_loop.session.send(input=context_msg, end_of_turn=True)
-        print("Memory context sent successfully.")
-        await sio.emit('status', {'msg': 'Memory Loaded into Context'})
+        ingest = await new_memory_ingest(data.get('name'), len(memory_text.encode('utf-8')))
+        for i in range(0, len(memory_text), UPLOAD_CHUNK_CHARS):
+            await feed_memory(sid, None, ingest, memory_text[i:i + UPLOAD_CHUNK_CHARS])
+        await finish_memory_upload(sid, None, ingest)
 
     except Exception as e:
         print(f"Error uploading memory: {e}")
@@ -1053,6 +1216,12 @@ async def update_settings(sid, data):
         SETTINGS["camera_flipped"] = data["camera_flipped"]
         print(f"[SERVER] Camera flip set to: {data['camera_flipped']}")
 
+    if "log_level" in data or "log_levels" in data:
+        for key in ("log_level", "log_levels"):
+            if key in data:
+                SETTINGS[key] = data[key]
+        apply_levels(SETTINGS)
+
     save_settings()
     # Broadcast new full settings
     await sio.emit('settings', SETTINGS)
@@ -1123,6 +1292,26 @@ async def get_available_voices(sid):
     """Get list of available Gemini voices"""
     await sio.emit('available_voices', ada.AVAILABLE_VOICES)
 
+@sio.event
+async def get_perf_stats(sid):
+    """Get event loop lag, slow callbacks, executor backlog and handler latencies"""
+    await sio.emit('perf_stats', get_perf_snapshot(), room=sid)
+
+@sio.event
+async def profile_backend(sid, data=None):
+    """Record a sampling profile of the event loop thread ({seconds}) and save it under profiles/"""
+    seconds = (data or {}).get("seconds", 5.0)
+    try:
+        profile = await record_profile(seconds)
+    except RuntimeError as e:
+        await sio.emit('perf_profile', {'error': str(e)}, room=sid)
+        return
+    profile.pop("folded")
+    await sio.emit('perf_profile', profile, room=sid)
+
+# Per-handler latency histograms for every event above
+perf_monitor.instrument_socketio(sio)
+
 if __name__ == "__main__":
     uvicorn.run(
         "server:app_socketio", 
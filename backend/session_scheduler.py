@@ -0,0 +1,257 @@
+"""
+Outbound Scheduler for ADA V2
+Priority lanes for everything AudioLoop sends to the Live session.
+"""
+
+import asyncio
+import collections
+import time
+from typing import Optional
+
+
+class LaneStats:
+    """Counters and wait-time tracking for one lane"""
+
+    def __init__(self):
+        self.enqueued = 0
+        self.sent = 0
+        self.messages = 0
+        self.dropped = 0
+        self.max_depth = 0
+        self.wait_total_ms = 0.0
+        self.wait_max_ms = 0.0
+        self.last_wait_ms = 0.0
+
+    def record_wait(self, wait_ms: float):
+        self.sent += 1
+        self.last_wait_ms = wait_ms
+        self.wait_total_ms += wait_ms
+        if wait_ms > self.wait_max_ms:
+            self.wait_max_ms = wait_ms
+
+    def to_dict(self, depth: int) -> dict:
+        return {
+            "depth": depth,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "sent": self.sent,
+            "messages": self.messages,
+            "dropped": self.dropped,
+            "avg_wait_ms": self.wait_total_ms / self.sent if self.sent else 0.0,
+            "max_wait_ms": self.wait_max_ms,
+            "last_wait_ms": self.last_wait_ms
+        }
+
+
+class OutboundScheduler:
+    """
+    Drop-in replacement for the out_queue asyncio.Queue with three lanes.
+
+    - audio: realtime mic PCM. Always served first. Bounded; when full the
+      oldest chunk is dropped so the capture loop is never back-pressured.
+    - control: text and other non-media messages. Served after audio, never
+      dropped (put() waits if the lane is full).
+    - video: camera/screen frames. Only the latest frame is kept, and a
+      frame older than `video_max_age_s` when its turn comes is discarded.
+
+    Messages are classified by their "mime_type" unless a lane is given.
+
+    With `audio_window_ms` (20-200, 0 = off) consecutive PCM chunks are
+    coalesced into one message: a batch is released once it holds a
+    window's worth of audio, once its oldest chunk has waited that long, or
+    immediately after flush_audio() (called on speech onset/offset). Other
+    lanes are served while a batch is filling.
+    """
+
+    MIN_WINDOW_MS = 20.0
+    MAX_WINDOW_MS = 200.0
+
+    AUDIO = "audio"
+    CONTROL = "control"
+    VIDEO = "video"
+    LANES = (AUDIO, CONTROL, VIDEO)
+
+    def __init__(
+        self,
+        audio_maxsize: int = 32,
+        control_maxsize: int = 16,
+        video_max_age_s: float = 2.0,
+        audio_window_ms: float = 0.0,
+        audio_bytes_per_ms: float = 32.0
+    ):
+        self.audio_maxsize = audio_maxsize
+        self.control_maxsize = control_maxsize
+        self.video_max_age_s = video_max_age_s
+        self.audio_bytes_per_ms = audio_bytes_per_ms
+        self.audio_window_ms = 0.0
+        self.set_audio_window(audio_window_ms)
+
+        self._audio_bytes = 0
+        self._flush = False
+
+        # Entries are (enqueue_time, message)
+        self._lanes = {lane: collections.deque() for lane in self.LANES}
+        self._stats = {lane: LaneStats() for lane in self.LANES}
+        self._ready = asyncio.Event()
+        self._control_space = asyncio.Event()
+        self._control_space.set()
+
+    @classmethod
+    def classify(cls, msg) -> str:
+        if isinstance(msg, dict):
+            mime_type = msg.get("mime_type", "")
+            if mime_type.startswith("audio/"):
+                return cls.AUDIO
+            if mime_type.startswith("image/") or mime_type.startswith("video/"):
+                return cls.VIDEO
+        return cls.CONTROL
+
+    async def put(self, msg, lane: Optional[str] = None):
+        """Queue a message; only waits when the control lane is full"""
+        lane = lane or self.classify(msg)
+        while lane == self.CONTROL and len(self._lanes[lane]) >= self.control_maxsize:
+            self._control_space.clear()
+            await self._control_space.wait()
+        self._append(lane, msg)
+
+    def put_nowait(self, msg, lane: Optional[str] = None):
+        """Queue a message without waiting; raises asyncio.QueueFull for a full control lane"""
+        lane = lane or self.classify(msg)
+        if lane == self.CONTROL and len(self._lanes[lane]) >= self.control_maxsize:
+            raise asyncio.QueueFull
+        self._append(lane, msg)
+
+    def set_audio_window(self, window_ms: float):
+        """Set the coalescing window; 0 disables, other values clamp to 20-200 ms"""
+        if window_ms:
+            window_ms = min(max(float(window_ms), self.MIN_WINDOW_MS), self.MAX_WINDOW_MS)
+        self.audio_window_ms = window_ms or 0.0
+
+    def flush_audio(self):
+        """Release the audio batch being filled without waiting for the window"""
+        if self._lanes[self.AUDIO]:
+            self._flush = True
+            self._ready.set()
+
+    async def get(self):
+        """Next message by priority: audio, then control, then fresh video"""
+        while True:
+            msg, timeout = self._next()
+            if msg is not None:
+                return msg
+            self._ready.clear()
+            if timeout is None:
+                await self._ready.wait()
+            else:
+                # An audio batch is filling; wake at its deadline at the latest
+                timer = asyncio.get_running_loop().call_later(timeout, self._ready.set)
+                await self._ready.wait()
+                timer.cancel()
+
+    def get_nowait(self):
+        msg = self.get_nowait_or_none()
+        if msg is None:
+            raise asyncio.QueueEmpty
+        return msg
+
+    def get_nowait_or_none(self):
+        return self._next()[0]
+
+    def _next(self):
+        """Returns (message or None, seconds until an audio batch is due or None)"""
+        now = time.monotonic()
+        timeout = None
+        for lane in self.LANES:
+            queue = self._lanes[lane]
+            if lane == self.AUDIO and queue and self.audio_window_ms:
+                batch, timeout = self._take_audio_batch(now)
+                if batch is not None:
+                    return batch, None
+                continue
+            while queue:
+                enqueued_at, msg = queue.popleft()
+                if lane == self.VIDEO and now - enqueued_at > self.video_max_age_s:
+                    self._stats[lane].dropped += 1
+                    continue
+                if lane == self.CONTROL:
+                    self._control_space.set()
+                elif lane == self.AUDIO:
+                    self._audio_bytes -= self._size(msg)
+                self._stats[lane].record_wait((now - enqueued_at) * 1000.0)
+                self._stats[lane].messages += 1
+                return msg, None
+        return None, timeout
+
+    def _take_audio_batch(self, now: float):
+        """Pop one coalesced audio message if it is due, else (None, seconds to wait)"""
+        queue = self._lanes[self.AUDIO]
+        window = self.audio_window_ms
+        age_ms = (now - queue[0][0]) * 1000.0
+        if not (self._flush or self._audio_bytes / self.audio_bytes_per_ms >= window or age_ms >= window):
+            return None, (window - age_ms) / 1000.0
+
+        stats = self._stats[self.AUDIO]
+        target = window * self.audio_bytes_per_ms
+        parts = []
+        size = 0
+        while queue and (not parts or size < target):
+            enqueued_at, msg = queue.popleft()
+            parts.append(msg)
+            size += self._size(msg)
+            stats.record_wait((now - enqueued_at) * 1000.0)
+        self._audio_bytes -= size
+        if not queue:
+            self._flush = False
+        stats.messages += 1
+
+        if len(parts) == 1:
+            return parts[0], None
+        return {"data": b"".join(part["data"] for part in parts), "mime_type": parts[0]["mime_type"]}, None
+
+    @staticmethod
+    def _size(msg) -> int:
+        data = msg.get("data") if isinstance(msg, dict) else None
+        return len(data) if data else 0
+
+    def qsize(self) -> int:
+        return sum(len(queue) for queue in self._lanes.values())
+
+    def empty(self) -> bool:
+        return self.qsize() == 0
+
+    def clear(self, lane: Optional[str] = None) -> int:
+        """Drop queued messages (one lane or all); returns the count dropped"""
+        count = 0
+        for name in ([lane] if lane else self.LANES):
+            count += len(self._lanes[name])
+            self._stats[name].dropped += len(self._lanes[name])
+            self._lanes[name].clear()
+            if name == self.AUDIO:
+                self._audio_bytes = 0
+                self._flush = False
+        self._control_space.set()
+        return count
+
+    def get_metrics(self) -> dict:
+        """Per-lane depth, drops and wait times"""
+        return {lane: self._stats[lane].to_dict(len(self._lanes[lane])) for lane in self.LANES}
+
+    def _append(self, lane: str, msg):
+        queue = self._lanes[lane]
+        stats = self._stats[lane]
+        if lane == self.VIDEO and queue:
+            # A newer frame supersedes whatever has not been sent yet
+            stats.dropped += len(queue)
+            queue.clear()
+        elif lane == self.AUDIO:
+            if len(queue) >= self.audio_maxsize:
+                _, dropped = queue.popleft()
+                self._audio_bytes -= self._size(dropped)
+                stats.dropped += 1
+            self._audio_bytes += self._size(msg)
+
+        queue.append((time.monotonic(), msg))
+        stats.enqueued += 1
+        if len(queue) > stats.max_depth:
+            stats.max_depth = len(queue)
+        self._ready.set()
@@ -0,0 +1,275 @@
+"""
+Tool Dispatch for ADA V2
+Registry of tool handlers and the dispatcher receive_audio hands function calls to.
+"""
+
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from google.genai import types
+
+from log_config import get_logger
+
+log = get_logger("tools")
+
+# Confirmation policies
+CONFIRM_ALWAYS = "always"          # always ask the user
+CONFIRM_NEVER = "never"            # never ask
+CONFIRM_PERMISSION = "permission"  # ask unless the user turned it off in tool_permissions (default: ask)
+
+
+@dataclass
+class ToolSpec:
+    """
+    How one tool is run.
+
+    handler(args) returns the result text for the FunctionResponse, or None
+    when the tool reports back some other way (e.g. a System Notification).
+
+    blocking=True tools are quick and run inline in the receive loop, their
+    responses batched with the rest of the tool_call. blocking=False tools
+    run in a tracked background task that sends their FunctionResponses
+    when they finish, so model audio keeps flowing meanwhile. A call that
+    needs user confirmation always goes to the background, since waiting
+    on the user must not hold up the receive loop.
+
+    Calls in one tool_call run concurrently, except that calls sharing a
+    `group` (e.g. tools that switch or write into the current project) run
+    one after another in the order the model sent them.
+    """
+    name: str
+    handler: Callable[[dict], Awaitable[Optional[str]]]
+    blocking: bool = True
+    timeout: Optional[float] = 10.0
+    confirm: str = CONFIRM_PERMISSION
+    group: Optional[str] = None
+
+
+@dataclass
+class ToolStats:
+    calls: int = 0
+    denied: int = 0
+    timeouts: int = 0
+    errors: int = 0
+    total_ms: float = 0.0
+    max_ms: float = 0.0
+
+    def record(self, elapsed_ms: float):
+        self.calls += 1
+        self.total_ms += elapsed_ms
+        if elapsed_ms > self.max_ms:
+            self.max_ms = elapsed_ms
+
+    def to_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "denied": self.denied,
+            "timeouts": self.timeouts,
+            "errors": self.errors,
+            "avg_ms": self.total_ms / self.calls if self.calls else 0.0,
+            "max_ms": self.max_ms
+        }
+
+
+class ToolDispatcher:
+    """
+    Runs function calls from the Live session against a registry of ToolSpecs.
+
+    send_responses(list[FunctionResponse]) delivers responses to the session.
+    request_confirmation(calls) asks the user about every call in a batch
+    that needs it at once - `calls` is a list of {"call_id", "tool", "args"}
+    - and returns one True/False per call; if it is None, calls that would
+    need confirmation just run. `permissions` is the live tool_permissions
+    dict (shared, so updates apply immediately).
+
+    Responses sent together are in the order the calls arrived; background
+    calls are answered as they finish rather than all at once.
+    """
+
+    DENIED = "User denied the request to use this tool."
+
+    def __init__(
+        self,
+        send_responses: Callable[[List[types.FunctionResponse]], Awaitable[None]],
+        request_confirmation: Optional[Callable[[List[dict]], Awaitable[List[bool]]]] = None,
+        permissions: Optional[Dict[str, bool]] = None
+    ):
+        self.send_responses = send_responses
+        self.request_confirmation = request_confirmation
+        self.permissions = permissions if permissions is not None else {}
+        self.specs: Dict[str, ToolSpec] = {}
+        self._stats: Dict[str, ToolStats] = {}
+        self._tasks = set()
+        self.batches = 0
+        self.max_batch = 0
+        self.confirmation_prompts = 0
+
+    def register(self, spec: ToolSpec):
+        self.specs[spec.name] = spec
+        self._stats.setdefault(spec.name, ToolStats())
+
+    def __contains__(self, name: str) -> bool:
+        return name in self.specs
+
+    def needs_confirmation(self, spec: ToolSpec) -> bool:
+        if spec.confirm == CONFIRM_NEVER or self.request_confirmation is None:
+            return False
+        if spec.confirm == CONFIRM_ALWAYS:
+            return True
+        return self.permissions.get(spec.name, True)
+
+    async def dispatch(self, function_calls) -> List[types.FunctionResponse]:
+        """
+        Handle one tool_call message. Blocking tools that need no
+        confirmation run here, concurrently, and their responses are sent as
+        one batch and returned. The rest of the batch goes to one background
+        task: a single confirmation prompt (denials are answered right away),
+        then concurrent execution, each call or group answered as soon as it
+        finishes.
+        """
+        inline = []
+        deferred = []
+        for index, fc in enumerate(function_calls):
+            spec = self.specs.get(fc.name)
+            if spec is None:
+                log.warning("No handler registered for '%s', ignoring", fc.name)
+                continue
+            if spec.blocking and not self.needs_confirmation(spec):
+                inline.append((index, spec, fc))
+            else:
+                deferred.append((index, spec, fc))
+
+        self.batches += 1
+        self.max_batch = max(self.max_batch, len(inline) + len(deferred))
+        if deferred:
+            self.spawn(self._run_deferred(deferred), name="tools:" + ",".join(fc.name for _, _, fc in deferred))
+
+        responses = await self._run_concurrently(inline)
+        if responses:
+            await self.send_responses(responses)
+        return responses
+
+    async def _run_deferred(self, items):
+        asking = [item for item in items if self.needs_confirmation(item[1])]
+        if asking:
+            self.confirmation_prompts += 1
+            decisions = await self.request_confirmation([
+                {"call_id": fc.id, "tool": spec.name, "args": dict(fc.args or {})} for _, spec, fc in asking
+            ])
+            denied = []
+            for (index, spec, fc), confirmed in zip(asking, decisions):
+                if not confirmed:
+                    log.info("Tool call '%s' denied by user", spec.name)
+                    self._stats[spec.name].denied += 1
+                    denied.append((index, self.make_response(fc, self.DENIED)))
+            if denied:
+                await self._send([response for _, response in denied])
+            denied_indices = {index for index, _ in denied}
+            items = [item for item in items if item[0] not in denied_indices]
+
+        # Each chain is answered as soon as it finishes, so a quick call is not
+        # held up behind a long one (a CAD generation can take minutes)
+        pending = {asyncio.ensure_future(self._run_chain(chain)) for chain in self._chains(items)}
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                results = sorted((result for task in done for result in task.result()), key=lambda result: result[0])
+                responses = [response for _, response in results if response is not None]
+                if responses:
+                    await self._send(responses)
+        finally:
+            # cancel_all() (session closing) lands here: the handlers still running go too
+            for task in pending:
+                task.cancel()
+            if pending:
+                await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _send(self, responses: List[types.FunctionResponse]):
+        try:
+            await self.send_responses(responses)
+        except Exception as e:
+            log.error("Failed to send tool responses: %s", e)
+
+    @staticmethod
+    def _chains(items) -> List[list]:
+        """Split (index, spec, fc) items into chains: one per group, in call order, and one per ungrouped call"""
+        chains = {}
+        for item in items:
+            key = item[1].group or ("call", item[0])
+            chains.setdefault(key, []).append(item)
+        return list(chains.values())
+
+    async def _run_chain(self, chain) -> List[tuple]:
+        return [(index, await self._execute(spec, fc)) for index, spec, fc in chain]
+
+    async def _run_concurrently(self, items) -> List[types.FunctionResponse]:
+        """Run (index, spec, fc) items with asyncio.gather; grouped calls run in order. Returns responses by index."""
+        results = []
+        for chain_results in await asyncio.gather(*(self._run_chain(chain) for chain in self._chains(items))):
+            results.extend(chain_results)
+        results.sort(key=lambda result: result[0])
+        return [response for _, response in results if response is not None]
+
+    async def _execute(self, spec: ToolSpec, fc) -> Optional[types.FunctionResponse]:
+        """Run one call with the spec's timeout and build the FunctionResponse"""
+        stats = self._stats[spec.name]
+        args = dict(fc.args or {})
+        log.debug("Tool call '%s'", spec.name, extra={"fields": {"args": args}})
+
+        start = time.perf_counter()
+        try:
+            if spec.timeout is None:
+                result = await spec.handler(args)
+            else:
+                result = await asyncio.wait_for(spec.handler(args), timeout=spec.timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            result = f"Tool '{spec.name}' timed out after {spec.timeout:g} seconds."
+            log.warning(result)
+        except Exception as e:
+            stats.errors += 1
+            result = f"Tool '{spec.name}' failed: {e}"
+            log.error(result)
+        finally:
+            stats.record((time.perf_counter() - start) * 1000.0)
+
+        if result is None:
+            return None
+        return self.make_response(fc, result)
+
+    @staticmethod
+    def make_response(fc, result: str) -> types.FunctionResponse:
+        return types.FunctionResponse(id=fc.id, name=fc.name, response={"result": result})
+
+    def spawn(self, coro, name: Optional[str] = None) -> asyncio.Task:
+        """Start a tracked background task; failures are logged, not lost"""
+        task = asyncio.get_running_loop().create_task(coro, name=name)
+        self._tasks.add(task)
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log.error("Background task %s failed: %r", task.get_name(), task.exception())
+
+    @property
+    def pending(self) -> int:
+        return len(self._tasks)
+
+    async def cancel_all(self):
+        tasks = list(self._tasks)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def get_metrics(self) -> dict:
+        return {
+            "pending": self.pending,
+            "batches": self.batches,
+            "max_batch": self.max_batch,
+            "confirmation_prompts": self.confirmation_prompts,
+            "tools": {name: stats.to_dict() for name, stats in self._stats.items() if stats.calls or stats.denied}
+        }
@@ -65,11 +65,31 @@ read_file_tool = {
     }
 }
 
+search_project_memory_tool = {
+    "name": "search_project_memory",
+    "description": "Searches the current project's past conversations and files for a topic and returns the best matching snippets. Use this when the user refers to something discussed or decided earlier, or asks what was done before, instead of asking them to repeat it.",
+    "parameters": {
+        "type": "OBJECT",
+        "properties": {
+            "query": {
+                "type": "STRING",
+                "description": "Keywords to search for, e.g. 'enclosure wall thickness'."
+            },
+            "limit": {
+                "type": "INTEGER",
+                "description": "Maximum number of snippets to return (default 5)."
+            }
+        },
+        "required": ["query"]
+    }
+}
+
 tools_list = [{"function_declarations": [
     generate_cad_prototype_tool,
     write_file_tool,
     read_directory_tool,
-    read_file_tool
+    read_file_tool,
+    search_project_memory_tool
 ]}]
 
 
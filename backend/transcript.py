@@ -0,0 +1,87 @@
+"""
+Transcript Assembly for ADA V2
+Turns Live API transcription events into deltas and chat log messages without re-scanning the whole turn.
+"""
+
+from typing import Callable, List, Optional
+
+
+class TranscriptStream:
+    """
+    Delta tracking for one transcription stream (input or output).
+
+    Gemini may send cumulative text (each event repeats the whole turn so
+    far) or chunks. Comparing each event against the whole previous text
+    with startswith is O(turn length) per event, so a long monologue costs
+    O(n^2). Here an event counts as a continuation when it is at least as
+    long as the previous one and the previous text's last ANCHOR characters
+    appear at the same offset - a fixed-size check - and only the new tail
+    is sliced off. Texts no longer than ANCHOR are compared exactly.
+    """
+
+    ANCHOR = 64
+
+    def __init__(self):
+        self._last = ""
+
+    def delta(self, transcript: str) -> str:
+        """New text in this event; "" for an exact repeat"""
+        last = self._last
+        last_len = len(last)
+        self._last = transcript
+        if len(transcript) < last_len:
+            return transcript
+        start = max(0, last_len - self.ANCHOR)
+        if transcript[start:last_len] != last[start:]:
+            return transcript
+        return transcript[last_len:]
+
+    def reset(self):
+        self._last = ""
+
+
+class TranscriptAssembler:
+    """
+    Collects transcription deltas into chat messages, one per run of a
+    speaker. Deltas are kept in a list and joined once when the message is
+    emitted, so appending is O(1) regardless of how long the speaker goes on.
+
+    on_message(sender, text) receives each finished message: when the
+    speaker changes and on flush().
+    """
+
+    def __init__(self, on_message: Callable[[str, str], None]):
+        self.on_message = on_message
+        self.input = TranscriptStream()
+        self.output = TranscriptStream()
+        self.sender: Optional[str] = None
+        self._segments: List[str] = []
+        self.messages = 0
+        self.segments = 0
+
+    def add(self, sender: str, delta: str):
+        if sender != self.sender:
+            self._emit()
+            self.sender = sender
+        self._segments.append(delta)
+        self.segments += 1
+
+    @property
+    def text(self) -> str:
+        """Text buffered for the current speaker"""
+        return "".join(self._segments)
+
+    def _emit(self):
+        if self.sender and self._segments:
+            text = "".join(self._segments)
+            if text.strip():
+                self.messages += 1
+                self.on_message(self.sender, text)
+        self.sender = None
+        self._segments = []
+
+    def flush(self):
+        """End of turn: emit the buffered message and reset delta tracking"""
+        self._emit()
+        self.input.reset()
+        self.output.reset()
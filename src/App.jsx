@@ -54,7 +54,7 @@ function App() {
     const [cadRetryInfo, setCadRetryInfo] = useState({ attempt: 1, maxAttempts: 3, error: null }); // Retry status
     const [browserData, setBrowserData] = useState({ image: null, logs: [] });
     // showMemoryPrompt removed - memory is now actively saved to project
-    const [confirmationRequest, setConfirmationRequest] = useState(null); // { id, tool, args }
+    const [confirmationRequest, setConfirmationRequest] = useState(null); // { id, tool, args, calls: [{ call_id, tool, args }] }
     const [kasaDevices, setKasaDevices] = useState([]);
     const [showKasaWindow, setShowKasaWindow] = useState(false);
     const [showPrinterWindow, setShowPrinterWindow] = useState(false);
@@ -336,7 +336,15 @@ function App() {
             }
         });
         socket.on('audio_data', (data) => {
-            setAiAudioData(data.data);
+            // Binary payloads arrive as ArrayBuffer; 'peaks' is the compact visualizer stream
+            const payload = data.peaks ?? data.data;
+            if (payload instanceof ArrayBuffer) {
+                setAiAudioData(Array.from(new Uint8Array(payload)));
+            } else if (ArrayBuffer.isView(payload)) {
+                setAiAudioData(Array.from(new Uint8Array(payload.buffer, payload.byteOffset, payload.byteLength)));
+            } else {
+                setAiAudioData(payload);
+            }
         });
         socket.on('auth_status', (data) => {
             console.log("Auth Status:", data);
@@ -1128,34 +1136,42 @@ function App() {
         }
     };
 
-    const handleFileUpload = (e) => {
+    const handleFileUpload = async (e) => {
         const file = e.target.files[0];
         if (!file) return;
 
-        const reader = new FileReader();
-        reader.onload = (event) => {
-            try {
-                const textContent = event.target.result;
-                // Just send the text content directly
-                if (typeof textContent === 'string' && textContent.length > 0) {
-                    socket.emit('upload_memory', { memory: textContent });
-                    addMessage('System', 'Uploading memory...');
-                } else {
-                    addMessage('System', 'Empty or invalid memory file');
-                }
-            } catch (err) {
-                console.error("Error reading file:", err);
-                addMessage('System', 'Error reading memory file');
+        try {
+            const textContent = await file.text();
+            if (!textContent) {
+                addMessage('System', 'Empty or invalid memory file');
+                return;
             }
-        };
-        reader.readAsText(file);
+            // Streamed in chunks; the backend indexes everything and sends the model a bounded digest
+            const start = await socket.timeout(10000).emitWithAck('upload_memory_start', { name: file.name, size: file.size });
+            if (start.error) return; // reported through 'error'
+            addMessage('System', 'Uploading memory...');
+            const chunkChars = start.chunk_chars || 262144;
+            for (let offset = 0; offset < textContent.length; offset += chunkChars) {
+                // Wait for each chunk's ack so a large file never floods the socket
+                const ack = await socket.timeout(60000).emitWithAck('upload_memory_chunk', {
+                    upload_id: start.upload_id,
+                    data: textContent.slice(offset, offset + chunkChars),
+                    final: offset + chunkChars >= textContent.length
+                });
+                if (ack.error) return;
+            }
+        } catch (err) {
+            console.error("Error uploading memory:", err);
+            addMessage('System', 'Error uploading memory file');
+        }
     };
 
     // handleCancelClose removed - no longer using memory prompt
 
-    const handleConfirmTool = () => {
+    const handleConfirmTool = (decisions) => {
         if (confirmationRequest) {
-            socket.emit('confirm_tool', { id: confirmationRequest.id, confirmed: true });
+            // decisions: { call_id: bool } when a batch of calls was partially approved
+            socket.emit('confirm_tool', { id: confirmationRequest.id, confirmed: true, decisions: decisions || null });
             setConfirmationRequest(null);
         }
     };
@@ -1,8 +1,37 @@
-import React from 'react';
+import React, { useEffect, useState } from 'react';
 
 const ConfirmationPopup = ({ request, onConfirm, onDeny }) => {
+    // Batched tool calls: one prompt, each call can be approved or left out
+    const calls = request?.calls && request.calls.length > 0
+        ? request.calls
+        : request ? [{ call_id: null, tool: request.tool, args: request.args }] : [];
+    const isBatch = calls.length > 1;
+    const [approved, setApproved] = useState({});
+
+    useEffect(() => {
+        const initial = {};
+        calls.forEach((call) => { initial[call.call_id] = true; });
+        setApproved(initial);
+    }, [request]);
+
     if (!request) return null;
 
+    const toggleCall = (callId) => {
+        setApproved(prev => ({ ...prev, [callId]: !prev[callId] }));
+    };
+
+    const approvedCount = calls.filter(call => approved[call.call_id]).length;
+
+    const handleConfirm = () => {
+        if (!isBatch) {
+            onConfirm();
+            return;
+        }
+        const decisions = {};
+        calls.forEach((call) => { decisions[call.call_id] = !!approved[call.call_id]; });
+        onConfirm(decisions);
+    };
+
     return (
         <div className="fixed inset-0 z-[200] flex items-center justify-center bg-black/60 backdrop-blur-sm animate-fade-in">
             <div className="relative w-full max-w-lg p-8 bg-black/90 border border-cyan-500/30 rounded-3xl shadow-[0_0_50px_rgba(34,211,238,0.15)] backdrop-blur-2xl transform transition-all scale-100">
@@ -26,31 +55,43 @@ const ConfirmationPopup = ({ request, onConfirm, onDeny }) => {
                 {/* Content */}
                 <div className="mb-8 space-y-4 relative z-10">
                     <p className="text-gray-300 leading-relaxed text-sm">
-                        The system is requesting permission to execute an autonomous function. Please review the parameters below.
+                        {isBatch
+                            ? `The system is requesting permission to execute ${calls.length} functions. Untick any you do not want to run.`
+                            : 'The system is requesting permission to execute an autonomous function. Please review the parameters below.'}
                     </p>
 
-                    <div className="space-y-2">
-                        <div className="bg-cyan-950/30 border border-cyan-800/50 rounded-xl overflow-hidden">
-                            <div className="bg-cyan-900/40 px-4 py-2 border-b border-cyan-800/50 flex justify-between items-center">
-                                <span className="text-xs text-cyan-400 font-bold uppercase tracking-wider">Function</span>
-                                <span className="text-xs text-white/50 font-mono">system.call</span>
-                            </div>
-                            <div className="p-4">
-                                <div className="text-white font-mono text-lg font-medium">{request.tool}</div>
-                            </div>
-                        </div>
-
-                        <div className="bg-cyan-950/30 border border-cyan-800/50 rounded-xl overflow-hidden">
-                            <div className="bg-cyan-900/40 px-4 py-2 border-b border-cyan-800/50 flex justify-between items-center">
-                                <span className="text-xs text-cyan-400 font-bold uppercase tracking-wider">Parameters</span>
-                                <span className="text-xs text-white/50 font-mono">json.payload</span>
-                            </div>
-                            <div className="p-4 bg-black/20">
-                                <pre className="text-xs text-gray-300 font-mono overflow-x-auto whitespace-pre-wrap leading-relaxed">
-                                    {JSON.stringify(request.args, null, 2)}
-                                </pre>
+                    <div className="space-y-2 max-h-[45vh] overflow-y-auto">
+                        {calls.map((call, index) => (
+                            <div key={call.call_id || index} className={`bg-cyan-950/30 border rounded-xl overflow-hidden transition-opacity ${isBatch && !approved[call.call_id] ? 'border-red-800/50 opacity-50' : 'border-cyan-800/50'}`}>
+                                <div className="bg-cyan-900/40 px-4 py-2 border-b border-cyan-800/50 flex justify-between items-center">
+                                    <span className="text-xs text-cyan-400 font-bold uppercase tracking-wider">
+                                        {isBatch ? `Function ${index + 1} of ${calls.length}` : 'Function'}
+                                    </span>
+                                    {isBatch ? (
+                                        <label className="flex items-center gap-2 text-xs text-white/70 font-mono cursor-pointer">
+                                            <input
+                                                type="checkbox"
+                                                checked={!!approved[call.call_id]}
+                                                onChange={() => toggleCall(call.call_id)}
+                                                className="accent-cyan-500"
+                                            />
+                                            allow
+                                        </label>
+                                    ) : (
+                                        <span className="text-xs text-white/50 font-mono">system.call</span>
+                                    )}
+                                </div>
+                                <div className="p-4">
+                                    <div className="text-white font-mono text-lg font-medium">{call.tool}</div>
+                                </div>
+                                <div className="px-4 pb-4 bg-black/20">
+                                    <div className="text-xs text-cyan-400 font-bold uppercase tracking-wider pt-3 pb-2">Parameters</div>
+                                    <pre className="text-xs text-gray-300 font-mono overflow-x-auto whitespace-pre-wrap leading-relaxed">
+                                        {JSON.stringify(call.args, null, 2)}
+                                    </pre>
+                                </div>
                             </div>
-                        </div>
+                        ))}
                     </div>
                 </div>
 
@@ -60,13 +101,15 @@ const ConfirmationPopup = ({ request, onConfirm, onDeny }) => {
                         onClick={onDeny}
                         className="flex-1 px-4 py-3.5 rounded-xl border border-red-500/30 bg-red-950/40 text-red-400 hover:bg-red-900/60 hover:border-red-500 hover:text-red-300 transition-all duration-200 font-bold tracking-wider uppercase text-xs"
                     >
-                        Deny Request
+                        {isBatch ? 'Deny All' : 'Deny Request'}
                     </button>
                     <button
-                        onClick={onConfirm}
+                        onClick={handleConfirm}
                         className="flex-1 px-4 py-3.5 rounded-xl border border-cyan-500/30 bg-cyan-950/40 text-cyan-400 hover:bg-cyan-900/60 hover:border-cyan-400 hover:text-cyan-300 transition-all duration-200 font-bold tracking-wider uppercase text-xs shadow-[0_0_20px_rgba(34,211,238,0.1)] hover:shadow-[0_0_30px_rgba(34,211,238,0.25)] relative overflow-hidden group"
                     >
-                        <span className="relative z-10">Authorize Execution</span>
+                        <span className="relative z-10">
+                            {isBatch ? `Authorize ${approvedCount} of ${calls.length}` : 'Authorize Execution'}
+                        </span>
                         <div className="absolute inset-0 bg-cyan-400/10 translate-y-full group-hover:translate-y-0 transition-transform duration-300"></div>
                     </button>
                 </div>
@@ -11,6 +11,7 @@ const TOOLS = [
     { id: 'create_project', label: 'Create Project' },
     { id: 'switch_project', label: 'Switch Project' },
     { id: 'list_projects', label: 'List Projects' },
+    { id: 'search_project_memory', label: 'Search Memory' },
     { id: 'list_smart_devices', label: 'List Devices' },
     { id: 'control_light', label: 'Control Light' },
     { id: 'discover_printers', label: 'Discover Printers' },
@@ -48,6 +49,7 @@ const SettingsWindow = ({
     const [isRecording, setIsRecording] = useState(false);
     const [audioMetrics, setAudioMetrics] = useState(null);
     const [isTesting, setIsTesting] = useState(false);
+    const [memoryProgress, setMemoryProgress] = useState(null);
 
     useEffect(() => {
         // Request initial data
@@ -85,16 +87,22 @@ const SettingsWindow = ({
             setAudioMetrics(metrics);
         };
 
+        const handleMemoryProgress = (progress) => {
+            setMemoryProgress(progress);
+        };
+
         socket.on('settings', handleSettings);
         socket.on('available_voices', handleAvailableVoices);
         socket.on('recording_status', handleRecordingStatus);
         socket.on('audio_metrics', handleAudioMetrics);
+        socket.on('memory_progress', handleMemoryProgress);
 
         return () => {
             socket.off('settings', handleSettings);
             socket.off('available_voices', handleAvailableVoices);
             socket.off('recording_status', handleRecordingStatus);
             socket.off('audio_metrics', handleAudioMetrics);
+            socket.off('memory_progress', handleMemoryProgress);
         };
     }, [socket]);
 
@@ -427,10 +435,23 @@ const SettingsWindow = ({
                     <label className="text-[10px] text-cyan-500/60 uppercase">Upload Memory Text</label>
                     <input
                         type="file"
-                        accept=".txt"
+                        accept=".txt,.jsonl,.md,.log"
                         onChange={handleFileUpload}
                         className="text-xs text-cyan-100 bg-gray-900 border border-cyan-800 rounded p-2 file:mr-2 file:py-1 file:px-2 file:rounded-full file:border-0 file:text-[10px] file:font-semibold file:bg-cyan-900 file:text-cyan-400 hover:file:bg-cyan-800 cursor-pointer"
                     />
+                    {memoryProgress && (
+                        <div className="flex flex-col gap-1">
+                            <div className="h-1 bg-gray-800 rounded overflow-hidden">
+                                <div
+                                    className="h-full bg-cyan-500 transition-all"
+                                    style={{ width: `${memoryProgress.finished ? 100 : (memoryProgress.percent ?? 0)}%` }}
+                                />
+                            </div>
+                            <span className="text-[10px] text-cyan-500/60">
+                                {memoryProgress.finished ? 'Indexed' : 'Indexing'} {memoryProgress.name}: {memoryProgress.messages} messages, {memoryProgress.duplicates} duplicates skipped
+                            </span>
+                        </div>
+                    )}
                 </div>
             </div>
         </div>
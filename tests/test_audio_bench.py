@@ -0,0 +1,81 @@
+"""
+Tests for the offline audio pipeline benchmark.
+Runs the harness on a short synthetic corpus.
+"""
+import pytest
+import asyncio
+import json
+
+try:
+    import numpy as np
+    from bench.audio_bench import make_synthetic_corpus, run_benchmark, compare, main, STAGES
+    HAS_AUDIO = True
+except ImportError as e:
+    HAS_AUDIO = False
+    IMPORT_ERROR = str(e)
+
+pytestmark = pytest.mark.skipif(not HAS_AUDIO, reason=f"Audio dependencies not installed: {IMPORT_ERROR if not HAS_AUDIO else ''}")
+
+
+@pytest.fixture(scope="module")
+def corpus(tmp_path_factory):
+    return make_synthetic_corpus(str(tmp_path_factory.mktemp("corpus")), seconds=8.0)
+
+
+@pytest.fixture(scope="module")
+def report(corpus):
+    return asyncio.run(run_benchmark(corpus, allocations=False))
+
+
+class TestAudioBench:
+    """Tests for the benchmark report."""
+
+    def test_corpus_labels(self, corpus):
+        """Test every synthetic file ships with a labels sidecar."""
+        for path in corpus:
+            labels = json.loads(path.with_suffix(".labels.json").read_text())
+            assert "speech" in labels
+
+    def test_stage_timings(self, report):
+        """Test every listen_audio stage is timed."""
+        for f in report["files"]:
+            for name in STAGES + ["total"]:
+                assert f["stages"][name]["mean_us"] >= 0
+            assert f["stages"]["total"]["mean_us"] >= f["stages"]["analyze"]["mean_us"]
+            assert f["messages_sent"] == f["chunks"]
+
+    def test_detects_labelled_speech(self, report):
+        """Test voiced bursts in a quiet room are found with bounded latency."""
+        quiet = next(f for f in report["files"] if f["path"].endswith("quiet_room.wav"))
+        detection = quiet["detection"]
+        assert detection["missed_segments"] == 0
+        assert detection["onset_latency_ms"]["mean"] < 200
+
+    def test_counts_false_triggers(self, report):
+        """Test transients in a speech-free file are reported as false triggers."""
+        knocks = next(f for f in report["files"] if f["path"].endswith("knocks_no_speech.wav"))
+        detection = knocks["detection"]
+        assert detection["speech_segments"] == 0
+        assert detection["false_triggers"] == detection["onsets"]
+        assert detection["false_triggers_per_min"] >= 0
+
+    def test_allocations_pass(self, corpus):
+        """Test the tracemalloc pass reports per-stage figures."""
+        result = asyncio.run(run_benchmark(corpus[:1]))
+        allocations = result["files"][0]["allocations"]
+        for name in STAGES:
+            assert allocations[name]["mean_peak_bytes"] >= 0
+        print(f"\nanalyze() allocation high-water: {allocations['analyze']['mean_peak_bytes']:.0f} B/chunk")
+
+    def test_cli_writes_json_and_compares(self, corpus, report, tmp_path, capsys):
+        """Test the CLI writes a report and prints deltas against a baseline."""
+        baseline = tmp_path / "baseline.json"
+        baseline.write_text(json.dumps(report))
+        out = tmp_path / "results.json"
+        assert main([str(p) for p in corpus] + ["--out", str(out), "--baseline", str(baseline), "--no-allocations"]) == 0
+
+        written = json.loads(out.read_text())
+        assert written["benchmark"] == "audio_pipeline"
+        assert set(written["summary"]["stage_mean_us"]) == set(STAGES + ["total"])
+        assert "Compared with" in capsys.readouterr().out
+        assert len(compare(written, report)) > len(STAGES)
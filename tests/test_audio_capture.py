@@ -0,0 +1,212 @@
+"""
+Tests for callback-mode microphone capture.
+Replays a WAV file through a fake PyAudio stream.
+"""
+import pytest
+import asyncio
+import concurrent.futures
+import functools
+import time
+import wave
+
+import numpy as np
+
+from audio_capture import RingBuffer, CallbackCapture, WavReplayStream
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 1024
+CHUNK_BYTES = CHUNK_SIZE * 2
+
+
+@pytest.fixture
+def wav_path(tmp_path):
+    """Two seconds of a 440 Hz tone with a ramp, so ordering errors show up"""
+    t = np.arange(SAMPLE_RATE * 2) / SAMPLE_RATE
+    samples = (np.sin(2 * np.pi * 440 * t) * 8000 + np.linspace(-2000, 2000, t.size)).astype(np.int16)
+    path = tmp_path / "mic.wav"
+    with wave.open(str(path), 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(SAMPLE_RATE)
+        wf.writeframes(samples.tobytes())
+    return path, samples.tobytes()
+
+
+class CountingExecutor(concurrent.futures.ThreadPoolExecutor):
+    """Default executor that counts submissions"""
+
+    def __init__(self):
+        super().__init__(max_workers=4)
+        self.submissions = 0
+
+    def submit(self, *args, **kwargs):
+        self.submissions += 1
+        return super().submit(*args, **kwargs)
+
+
+async def read_all(capture, expected_chunks):
+    chunks = []
+    for _ in range(expected_chunks):
+        data = await asyncio.wait_for(capture.read(), timeout=5.0)
+        if data is None:
+            break
+        chunks.append(data)
+    return chunks
+
+
+class TestRingBuffer:
+    """Tests for the SPSC ring buffer."""
+
+    def test_round_trip(self):
+        """Test data comes out in order."""
+        ring = RingBuffer(16)
+        assert ring.write(b"abcdef")
+        assert ring.available == 6
+        assert ring.read(4) == b"abcd"
+        assert ring.available == 2
+
+    def test_wraparound(self):
+        """Test reads and writes across the end of the buffer."""
+        ring = RingBuffer(8)
+        ring.write(b"123456")
+        ring.read(6)
+        assert ring.write(b"abcdef")  # wraps at index 8
+        assert ring.read(6) == b"abcdef"
+
+    def test_overflow_drops_block(self):
+        """Test a block that does not fit is dropped and counted."""
+        ring = RingBuffer(8)
+        assert ring.write(b"123456")
+        assert not ring.write(b"abc")
+        assert ring.overflows == 1
+        assert ring.dropped_bytes == 3
+        assert ring.read(6) == b"123456"
+
+    def test_skip(self):
+        """Test discarding buffered data."""
+        ring = RingBuffer(8)
+        ring.write(b"1234")
+        ring.skip()
+        assert ring.available == 0
+
+
+class TestCallbackCapture:
+    """Tests for CallbackCapture driven by a replayed WAV file."""
+
+    @pytest.mark.asyncio
+    async def test_replays_wav_exactly(self, wav_path):
+        """Test every chunk arrives intact and in order."""
+        path, pcm = wav_path
+        capture = CallbackCapture(
+            functools.partial(WavReplayStream, path, CHUNK_SIZE, speed=8.0),
+            chunk_size=CHUNK_SIZE
+        )
+        capture.start()
+        try:
+            chunks = await read_all(capture, len(pcm) // CHUNK_BYTES)
+        finally:
+            capture.stop()
+
+        assert b"".join(chunks) == pcm[:len(chunks) * CHUNK_BYTES]
+        assert len(chunks) == len(pcm) // CHUNK_BYTES
+        assert capture.ring.overflows == 0
+
+    @pytest.mark.asyncio
+    async def test_uneven_callback_blocks(self, wav_path):
+        """Test callbacks smaller than a chunk are reassembled."""
+        path, pcm = wav_path
+        capture = CallbackCapture(
+            functools.partial(WavReplayStream, path, 300, speed=0),
+            chunk_size=CHUNK_SIZE
+        )
+        capture.start()
+        try:
+            chunks = await read_all(capture, 10)
+        finally:
+            capture.stop()
+        assert b"".join(chunks) == pcm[:10 * CHUNK_BYTES]
+
+    @pytest.mark.asyncio
+    async def test_overflow_when_consumer_stalls(self, wav_path):
+        """Test a stalled consumer drops blocks instead of blocking PortAudio."""
+        path, _ = wav_path
+        capture = CallbackCapture(
+            functools.partial(WavReplayStream, path, CHUNK_SIZE, speed=0),
+            chunk_size=CHUNK_SIZE,
+            capacity_chunks=4
+        )
+        capture.start()
+        capture.stream.finished.wait(5.0)
+        metrics = capture.get_metrics()
+        capture.stop()
+        assert metrics["overflows"] > 0
+        assert metrics["max_fill_bytes"] == 4 * CHUNK_BYTES
+
+    @pytest.mark.asyncio
+    async def test_stop_releases_reader(self, wav_path):
+        """Test a parked read() returns None after stop()."""
+        path, _ = wav_path
+        capture = CallbackCapture(
+            functools.partial(WavReplayStream, path, CHUNK_SIZE, speed=0.01),
+            chunk_size=CHUNK_SIZE * 4
+        )
+        capture.start()
+        reader = asyncio.ensure_future(capture.read())
+        await asyncio.sleep(0.05)
+        capture.stop()
+        assert await asyncio.wait_for(reader, timeout=1.0) is None
+
+    @pytest.mark.asyncio
+    async def test_no_executor_submissions(self, wav_path):
+        """Compare executor use and latency against to_thread(stream.read)."""
+        path, _ = wav_path
+        loop = asyncio.get_running_loop()
+        chunks = 20
+
+        executor = CountingExecutor()
+        loop.set_default_executor(executor)
+
+        # Blocking mode, as listen_audio did before
+        stream = WavReplayStream(path, CHUNK_SIZE, speed=8.0)
+        start = time.perf_counter()
+        for _ in range(chunks):
+            await asyncio.to_thread(stream.read, CHUNK_SIZE, exception_on_overflow=False)
+        blocking_time = time.perf_counter() - start
+        blocking_submissions = executor.submissions
+
+        executor.submissions = 0
+        capture = CallbackCapture(
+            functools.partial(WavReplayStream, path, CHUNK_SIZE, speed=8.0),
+            chunk_size=CHUNK_SIZE
+        )
+        capture.start()
+        start = time.perf_counter()
+        try:
+            await read_all(capture, chunks)
+        finally:
+            capture.stop()
+        callback_time = time.perf_counter() - start
+        metrics = capture.get_metrics()
+
+        print(f"\nBlocking: {blocking_submissions} executor submissions, {blocking_time * 1000:.0f} ms")
+        print(f"Callback: {executor.submissions} executor submissions, {callback_time * 1000:.0f} ms, "
+              f"{metrics['wakeups']} wakeups, avg latency {metrics['avg_latency_ms']:.2f} ms")
+
+        assert blocking_submissions == chunks
+        assert executor.submissions == 0
+        assert metrics["wakeups"] <= chunks
+        assert metrics["avg_latency_ms"] < 20.0
+
+
+class TestWavReplayStream:
+    """Tests for the fake input stream."""
+
+    def test_blocking_read_pads_with_silence(self, wav_path):
+        """Test reads past the end return silence."""
+        path, pcm = wav_path
+        stream = WavReplayStream(path, CHUNK_SIZE, speed=0)
+        stream.position = len(pcm) - 10
+        data = stream.read(CHUNK_SIZE)
+        assert len(data) == CHUNK_BYTES
+        assert data[:10] == pcm[-10:]
+        assert data[10:] == bytes(CHUNK_BYTES - 10)
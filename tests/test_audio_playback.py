@@ -0,0 +1,214 @@
+"""
+Tests for the jitter-buffer playback engine.
+Uses a fake output stream that consumes audio in (scaled) real time.
+"""
+import pytest
+import asyncio
+import threading
+import time
+
+from audio_playback import JitterBufferPlayer
+
+SAMPLE_RATE = 24000
+CHUNK_BYTES = 2400  # 50 ms of 24 kHz int16 mono
+
+
+class FakeOutputStream:
+    """Blocking write() that takes the chunk's duration times `speed`."""
+
+    def __init__(self, speed: float = 0.2):
+        self.speed = speed
+        self.writes = []
+        self.write_times = []
+        self.lock = threading.Lock()
+
+    def write(self, data):
+        time.sleep(len(data) / (SAMPLE_RATE * 2) * self.speed)
+        with self.lock:
+            self.writes.append(bytes(data))
+            self.write_times.append(time.monotonic())
+
+
+def wait_for(predicate, timeout: float = 2.0) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.005)
+    return predicate()
+
+
+@pytest.fixture
+def stream():
+    return FakeOutputStream()
+
+
+@pytest.fixture
+def make_player(stream):
+    players = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("min_prebuffer_ms", 100.0)
+        kwargs.setdefault("initial_jitter_ms", 0.0)
+        kwargs.setdefault("speaking_hangover_s", 0.2)
+        player = JitterBufferPlayer(stream, sample_rate=SAMPLE_RATE, **kwargs)
+        player.start()
+        players.append(player)
+        return player
+
+    yield factory
+    for player in players:
+        player.stop()
+
+
+class TestPrebuffer:
+    """Tests for prebuffering and playback start."""
+
+    def test_waits_for_prebuffer_target(self, make_player, stream):
+        """Test playback starts only when the target duration is queued."""
+        player = make_player(min_prebuffer_ms=100.0, max_prebuffer_ms=5000.0)
+        # Push the target (and the start deadline) far out
+        player.jitter_ms = 1000.0
+
+        player.put(bytes(CHUNK_BYTES))
+        time.sleep(0.05)
+        assert stream.writes == []
+
+        for _ in range(80):
+            player.put(bytes(CHUNK_BYTES))
+        assert wait_for(lambda: len(stream.writes) > 0)
+        print(f"Prebuffer target: {player.prebuffer_target_ms:.0f} ms")
+
+    def test_short_reply_starts_after_deadline(self, make_player, stream):
+        """Test a reply shorter than the target still plays."""
+        player = make_player(min_prebuffer_ms=100.0)
+        player.put(bytes(CHUNK_BYTES))
+        assert wait_for(lambda: len(stream.writes) == 1)
+        metrics = player.get_metrics()
+        assert metrics["last_ttfa_ms"] >= 90.0
+        print(f"Time to first audio: {metrics['last_ttfa_ms']:.1f} ms")
+
+    def test_end_of_turn_flushes_immediately(self, make_player, stream):
+        """Test a completed turn does not wait for the prebuffer."""
+        player = make_player(min_prebuffer_ms=500.0)
+        player.put(bytes(CHUNK_BYTES))
+        player.end_of_turn()
+        assert wait_for(lambda: len(stream.writes) == 1, timeout=0.3)
+
+    def test_preserves_order(self, make_player, stream):
+        """Test chunks are written in arrival order."""
+        player = make_player(min_prebuffer_ms=20.0)
+        chunks = [bytes([i]) * CHUNK_BYTES for i in range(10)]
+        for chunk in chunks:
+            player.put(chunk)
+        assert wait_for(lambda: len(stream.writes) == 10)
+        assert stream.writes == chunks
+
+
+class TestJitterAndUnderruns:
+    """Tests for jitter estimation and underrun accounting."""
+
+    def test_jitter_grows_with_late_arrivals(self, make_player):
+        """Test late chunks raise the prebuffer target."""
+        player = make_player(min_prebuffer_ms=20.0)
+        before = player.prebuffer_target_ms
+        for _ in range(8):
+            player.put(bytes(240))  # 5 ms of audio every 30 ms
+            time.sleep(0.03)
+        assert player.jitter_ms > 5.0
+        assert player.prebuffer_target_ms > before
+
+    def test_underrun_counted_mid_turn(self, make_player, stream):
+        """Test running dry before the turn ends counts an underrun."""
+        player = make_player(min_prebuffer_ms=20.0, speaking_hangover_s=1.0)
+        player.put(bytes(CHUNK_BYTES))
+        assert wait_for(lambda: len(stream.writes) == 1)
+        time.sleep(0.05)
+        player.put(bytes(CHUNK_BYTES))
+        assert wait_for(lambda: len(stream.writes) == 2)
+        assert player.get_metrics()["underruns"] == 1
+
+    def test_no_underrun_after_end_of_turn(self, make_player, stream):
+        """Test draining after end_of_turn is not an underrun."""
+        player = make_player(min_prebuffer_ms=20.0)
+        player.put(bytes(CHUNK_BYTES))
+        player.end_of_turn()
+        assert wait_for(lambda: len(stream.writes) == 1)
+        time.sleep(0.05)
+        player.put(bytes(CHUNK_BYTES))
+        assert wait_for(lambda: len(stream.writes) == 2)
+        assert player.get_metrics()["underruns"] == 0
+
+    def test_clear_drops_queue(self, make_player, stream):
+        """Test clear() discards queued audio."""
+        player = make_player(min_prebuffer_ms=5000.0, max_prebuffer_ms=5000.0)
+        for _ in range(5):
+            player.put(bytes(CHUNK_BYTES))
+        assert player.clear() == 5
+        time.sleep(0.05)
+        assert stream.writes == []
+        assert player.get_metrics()["chunks_dropped"] == 5
+
+
+class TestSpeakingState:
+    """Tests for the event-driven speaking state."""
+
+    @pytest.mark.asyncio
+    async def test_speaking_event(self, stream):
+        """Test speaking is set on playback and cleared after the turn drains."""
+        changes = []
+        player = JitterBufferPlayer(
+            stream,
+            sample_rate=SAMPLE_RATE,
+            min_prebuffer_ms=20.0,
+            initial_jitter_ms=0.0,
+            on_speaking_change=changes.append,
+            loop=asyncio.get_running_loop()
+        )
+        player.start()
+        try:
+            player.put(bytes(CHUNK_BYTES))
+            await asyncio.wait_for(player.speaking.wait(), timeout=1.0)
+            player.end_of_turn()
+
+            deadline = time.monotonic() + 1.0
+            while player.speaking.is_set() and time.monotonic() < deadline:
+                await asyncio.sleep(0.01)
+            assert not player.speaking.is_set()
+            assert changes == [True, False]
+        finally:
+            player.stop()
+
+    def test_hangover_without_end_of_turn(self, make_player):
+        """Test speaking clears after the hangover when no end_of_turn arrives."""
+        changes = []
+        player = make_player(min_prebuffer_ms=20.0, speaking_hangover_s=0.1)
+        player.on_speaking_change = changes.append
+        player.put(bytes(CHUNK_BYTES))
+        assert wait_for(lambda: changes == [True, False], timeout=1.0)
+
+
+class TestStop:
+    """Tests for shutting the writer thread down."""
+
+    def test_stop_reports_writer_still_in_write(self):
+        """Test stop() returns False while stream.write is stuck, so the caller keeps the stream open."""
+        release = threading.Event()
+
+        class StuckStream(FakeOutputStream):
+            def write(self, data):
+                release.wait(2.0)
+                super().write(data)
+
+        player = JitterBufferPlayer(StuckStream(), sample_rate=SAMPLE_RATE, min_prebuffer_ms=20.0, initial_jitter_ms=0.0)
+        player.start()
+        player.put(bytes(CHUNK_BYTES))
+        player.end_of_turn()
+        time.sleep(0.05)
+        assert player.stop(timeout=0.05) is False
+        release.set()
+        assert player.stop() is True
+
+    def test_stop_idle(self, make_player):
+        """Test an idle writer exits at once."""
+        assert make_player().stop() is True
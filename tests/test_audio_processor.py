@@ -0,0 +1,445 @@
+"""
+Tests for the Enhanced Audio Processing module.
+Uses synthetic PCM so no microphone is needed.
+"""
+import pytest
+import struct
+import time
+import tracemalloc
+
+try:
+    import numpy as np
+    from audio_processor import EnhancedAudioProcessor, NoiseGate, OnePoleSmoother, RMSVoiceDetector, SpeechSegmenter, VADFrameBuffer, visualizer_peaks
+    HAS_AUDIO = True
+except ImportError as e:
+    HAS_AUDIO = False
+    IMPORT_ERROR = str(e)
+
+pytestmark = pytest.mark.skipif(not HAS_AUDIO, reason=f"Audio dependencies not installed: {IMPORT_ERROR if not HAS_AUDIO else ''}")
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 1024
+
+
+def make_tone(amplitude: float, samples: int = CHUNK_SIZE, freq: float = 220.0) -> bytes:
+    """Sine tone as int16 PCM bytes."""
+    t = np.arange(samples) / SAMPLE_RATE
+    return (amplitude * np.sin(2 * np.pi * freq * t)).astype(np.int16).tobytes()
+
+
+def make_noise(amplitude: float, samples: int = CHUNK_SIZE, seed: int = 0) -> bytes:
+    """Gaussian noise as int16 PCM bytes."""
+    rng = np.random.default_rng(seed)
+    return np.clip(rng.normal(0, amplitude, samples), -32768, 32767).astype(np.int16).tobytes()
+
+
+def timed(fn) -> float:
+    """Wall time of one call in seconds."""
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def legacy_detect_speech_rms(audio_data: bytes, threshold: int = 800):
+    """The original struct.unpack implementation, kept as a benchmark baseline."""
+    count = len(audio_data) // 2
+    if count > 0:
+        shorts = struct.unpack(f"<{count}h", audio_data)
+        sum_squares = sum(s**2 for s in shorts)
+        rms = int(np.sqrt(sum_squares / count))
+    else:
+        rms = 0
+    return rms > threshold, rms
+
+
+class TestRMSVoiceDetector:
+    """Tests for the vectorized fallback VAD."""
+
+    def test_rms_matches_legacy(self):
+        """Test vectorized RMS agrees with the struct-based computation."""
+        detector = RMSVoiceDetector()
+        for amplitude in (0, 100, 3000, 20000):
+            chunk = make_tone(amplitude)
+            _, legacy_rms = legacy_detect_speech_rms(chunk)
+            assert abs(detector.frame_rms(chunk) - legacy_rms) <= 1.0
+
+    def test_empty_frame(self):
+        """Test empty input is silence."""
+        detector = RMSVoiceDetector()
+        assert detector.process(b"") == (False, 0.0)
+
+    def test_accepts_memoryview(self):
+        """Test frames can be passed as zero-copy views."""
+        detector = RMSVoiceDetector()
+        chunk = make_tone(5000)
+        assert detector.frame_rms(memoryview(chunk)) == detector.frame_rms(chunk)
+
+    def test_speech_over_quiet_room(self):
+        """Test loud tone is speech and low noise is not."""
+        detector = RMSVoiceDetector(base_threshold=800)
+        assert detector.process(make_noise(50))[0] is False
+        assert detector.process(make_tone(8000))[0] is True
+
+    def test_noise_floor_adapts_upward(self):
+        """Test a steady noisy background raises the threshold above it."""
+        detector = RMSVoiceDetector(base_threshold=800)
+        for seed in range(200):
+            detector.process(make_noise(600, seed=seed))
+
+        assert detector.threshold > 1000
+        assert detector.process(make_noise(600, seed=999))[0] is False
+        print(f"Noise floor: {detector.noise_floor:.0f}, threshold: {detector.threshold:.0f}")
+
+    def test_threshold_is_bounded(self):
+        """Test threshold stays within configured limits."""
+        detector = RMSVoiceDetector(base_threshold=800)
+        for _ in range(500):
+            detector.process(make_tone(0))
+        assert detector.threshold == pytest.approx(400)
+
+        for _ in range(500):
+            detector.update_noise_floor(50000, False)
+        assert detector.threshold == pytest.approx(3200)
+
+    def test_processor_uses_detector(self):
+        """Test EnhancedAudioProcessor fallback reports detector state."""
+        processor = EnhancedAudioProcessor(sample_rate=SAMPLE_RATE, enable_noise_gate=False)
+        is_speech, confidence = processor.detect_speech(make_tone(10000))
+        assert is_speech
+        assert 0.0 < confidence <= 1.0
+        stats = processor.get_statistics()
+        assert "noise_floor" in stats and "rms_threshold" in stats
+
+    def test_benchmark_vs_legacy(self):
+        """Benchmark per-frame cost against the struct.unpack path."""
+        detector = RMSVoiceDetector()
+        frames = [make_noise(2000, seed=i) for i in range(50)]
+        iterations = 400
+
+        start = time.perf_counter()
+        for i in range(iterations):
+            legacy_detect_speech_rms(frames[i % len(frames)])
+        legacy_us = (time.perf_counter() - start) / iterations * 1e6
+
+        start = time.perf_counter()
+        for i in range(iterations):
+            detector.process(frames[i % len(frames)])
+        vector_us = (time.perf_counter() - start) / iterations * 1e6
+
+        print(f"RMS VAD per 1024-sample frame: legacy {legacy_us:.1f} us, vectorized {vector_us:.1f} us ({legacy_us / vector_us:.0f}x)")
+        assert vector_us < legacy_us
+
+
+class EnergyVad:
+    """Stand-in for webrtcvad.Vad that records the frames it is given."""
+
+    def __init__(self, threshold: float = 1000.0):
+        self.threshold = threshold
+        self.frame_lengths = []
+
+    def is_speech(self, frame, sample_rate):
+        self.frame_lengths.append(len(frame))
+        samples = np.frombuffer(frame, dtype=np.int16).astype(np.float32)
+        return bool(np.sqrt(np.mean(samples ** 2)) > self.threshold)
+
+
+class TestVADFrameBuffer:
+    """Tests for re-framing mic chunks into WebRTC VAD frames."""
+
+    def test_rejects_invalid_frame_duration(self):
+        """Test only 10/20/30 ms frames are allowed."""
+        with pytest.raises(ValueError):
+            VADFrameBuffer(frame_duration_ms=25)
+
+    def test_frames_cover_stream_in_order(self):
+        """Test frames reproduce the input stream with the remainder carried over."""
+        framer = VADFrameBuffer(sample_rate=SAMPLE_RATE, frame_duration_ms=30)
+        stream = make_noise(3000, samples=CHUNK_SIZE * 7)
+        chunks = [stream[i:i + CHUNK_SIZE * 2] for i in range(0, len(stream), CHUNK_SIZE * 2)]
+
+        out = bytearray()
+        for chunk in chunks:
+            for frame in framer.frames(chunk):
+                assert len(frame) == framer.frame_bytes
+                out += frame
+
+        assert len(out) == (len(stream) // framer.frame_bytes) * framer.frame_bytes
+        assert bytes(out) == stream[:len(out)]
+        assert framer.pending_bytes == len(stream) - len(out)
+
+    def test_small_chunks_accumulate(self):
+        """Test chunks shorter than a frame are buffered until a frame is complete."""
+        framer = VADFrameBuffer(sample_rate=SAMPLE_RATE, frame_duration_ms=10)
+        chunk = make_tone(4000, samples=30)
+        counts = [len(list(framer.frames(chunk))) for _ in range(5)]
+        assert counts == [0, 0, 0, 0, 0]
+        assert len(list(framer.frames(chunk))) == 1
+        assert framer.pending_bytes == 6 * 60 - framer.frame_bytes
+
+    def test_whole_frames_are_views(self):
+        """Test aligned frames are zero-copy slices of the input chunk."""
+        framer = VADFrameBuffer(sample_rate=SAMPLE_RATE, frame_duration_ms=30)
+        chunk = bytearray(make_tone(4000, samples=480 * 2))
+        frames = list(framer.frames(chunk))
+        assert len(frames) == 2
+        chunk[0:2] = b"\x01\x02"
+        assert bytes(frames[0][:2]) == b"\x01\x02"
+
+    def test_probability_smoothing(self):
+        """Test smoothed probability rises on speech frames and decays on silence."""
+        framer = VADFrameBuffer(smoothing_ms=90)
+        for _ in range(10):
+            framer.update(True)
+        high = framer.speech_probability
+        framer.update(False)
+        assert high > 0.9
+        assert 0.5 < framer.speech_probability < high
+
+    def test_processor_runs_vad_on_chunk_size_reads(self):
+        """Test 1024-sample reads reach the VAD as valid 30 ms frames."""
+        processor = EnhancedAudioProcessor(sample_rate=SAMPLE_RATE, enable_noise_gate=False)
+        processor.vad = EnergyVad()
+
+        results = [processor.detect_speech(make_tone(8000)) for _ in range(6)]
+        assert set(processor.vad.frame_lengths) == {960}
+        assert len(processor.vad.frame_lengths) == (6 * CHUNK_SIZE * 2) // 960
+        assert results[-1][0] is True
+        assert results[-1][1] > 0.9
+
+        for _ in range(6):
+            is_speech, _ = processor.detect_speech(make_tone(0))
+        assert is_speech is False
+
+
+class TestFusedAnalysis:
+    """Tests for the single-pass analyze() kernel."""
+
+    def test_gate_output_matches_noise_gate(self):
+        """Test analyze() gates exactly like NoiseGate.process."""
+        processor = EnhancedAudioProcessor(sample_rate=SAMPLE_RATE, enable_noise_gate=True, noise_gate_threshold_db=-40.0)
+        reference = NoiseGate(threshold_db=-40.0, sample_rate=SAMPLE_RATE)
+
+        for i, amplitude in enumerate((50, 6000, 6000, 20, 20, 9000)):
+            chunk = make_noise(amplitude, seed=i)
+            analysis = processor.analyze(chunk)
+            assert analysis.data == reference.process(chunk)
+            assert analysis.gain == pytest.approx(reference.envelope)
+
+    def test_levels_match_calculate_metrics(self):
+        """Test RMS/peak/clipping agree with calculate_metrics."""
+        processor = EnhancedAudioProcessor(sample_rate=SAMPLE_RATE, enable_noise_gate=False)
+        chunk = make_tone(32767)
+        analysis = processor.analyze(chunk)
+        metrics = processor.calculate_metrics(chunk)
+
+        assert analysis.data is chunk
+        assert analysis.rms_level == pytest.approx(metrics.rms_level, rel=1e-4)
+        assert analysis.peak_level == pytest.approx(metrics.peak_level, rel=1e-4)
+        assert analysis.clipping_detected == metrics.clipping_detected == True
+        assert analysis.vad_confidence == metrics.vad_confidence
+
+    def test_metrics_payload(self):
+        """Test to_metrics() has the keys the frontend expects."""
+        processor = EnhancedAudioProcessor(sample_rate=SAMPLE_RATE, enable_noise_gate=False)
+        payload = processor.analyze(make_tone(5000)).to_metrics()
+        assert set(payload) == {'rms', 'peak', 'latency_ms', 'vad_confidence', 'clipping', 'is_speech'}
+
+    def test_rms_fallback_reuses_levels(self):
+        """Test the RMS fallback classifies from the fused RMS."""
+        processor = EnhancedAudioProcessor(sample_rate=SAMPLE_RATE, enable_noise_gate=False)
+        processor.vad = None
+        assert processor.analyze(make_tone(10000)).is_speech is True
+        assert processor.rms_detector.last_rms == pytest.approx(10000 / np.sqrt(2), rel=0.01)
+
+    def test_benchmark_vs_separate_passes(self):
+        """Benchmark analyze() against the gate + VAD + metrics chain."""
+        frames = [make_noise(3000, seed=i) for i in range(50)]
+        iterations = 500
+
+        legacy = EnhancedAudioProcessor(sample_rate=SAMPLE_RATE, enable_noise_gate=True)
+        fused = EnhancedAudioProcessor(sample_rate=SAMPLE_RATE, enable_noise_gate=True)
+
+        def run_legacy():
+            for i in range(iterations):
+                processed = legacy.preprocess_audio(frames[i % len(frames)])
+                legacy.detect_speech(processed)
+                if i % 10 == 0:
+                    legacy.calculate_metrics(processed)
+
+        def run_fused():
+            for i in range(iterations):
+                fused.analyze(frames[i % len(frames)])
+
+        # Best of three to keep the comparison stable on busy machines
+        legacy_us = min(timed(run_legacy) for _ in range(3)) / iterations * 1e6
+        fused_us = min(timed(run_fused) for _ in range(3)) / iterations * 1e6
+
+        print(f"Per-chunk analysis: separate passes {legacy_us:.1f} us, fused {fused_us:.1f} us")
+        assert fused_us < legacy_us
+
+
+class TestSampleNoiseGate:
+    """Tests for the per-sample envelope noise gate."""
+
+    def test_one_pole_matches_recursion(self):
+        """Test the closed-form smoother equals the sample-by-sample recursion."""
+        smoother = OnePoleSmoother(5.0, SAMPLE_RATE)
+        x = np.random.default_rng(1).random(1000)
+        out = np.empty_like(x)
+        smoother.filter(x[:600], out[:600])
+        smoother.filter(x[600:], out[600:])
+
+        expected = np.empty_like(x)
+        y, a = 0.0, smoother.coeff
+        for i, v in enumerate(x):
+            y = a * y + (1 - a) * v
+            expected[i] = y
+        np.testing.assert_allclose(out, expected, rtol=1e-9, atol=1e-12)
+
+    @pytest.mark.parametrize("sample_rate", [8000, SAMPLE_RATE, 48000])
+    def test_smoother_short_time_constant_stays_finite(self, sample_rate):
+        """Test a 0.1 ms constant (under a sample at 8 kHz) neither overflows nor drifts from the recursion."""
+        smoother = OnePoleSmoother(0.1, sample_rate)
+        x = np.random.default_rng(2).random(1000) * 32768.0 ** 2
+        out = np.empty_like(x)
+        smoother.filter(x, out)
+        assert np.all(np.isfinite(out))
+
+        expected = np.empty_like(x)
+        y, a = 0.0, smoother.coeff
+        for i, v in enumerate(x):
+            y = a * y + (1 - a) * v
+            expected[i] = y
+        np.testing.assert_allclose(out, expected, rtol=1e-9)
+
+    def test_rejects_unknown_mode(self):
+        """Test invalid gate modes are rejected."""
+        with pytest.raises(ValueError):
+            NoiseGate(mode="fancy")
+
+    def test_opens_within_chunk_and_releases_slowly(self):
+        """Test gain rises within the attack time and decays over the release time."""
+        gate = NoiseGate(threshold_db=-40.0, attack_ms=5.0, release_ms=150.0, sample_rate=SAMPLE_RATE, mode="sample")
+        loud = np.frombuffer(gate.process(make_tone(10000)), dtype=np.int16)
+        # Tail of the first loud chunk passes nearly unchanged
+        assert np.abs(loud[-200:]).max() > 0.9 * 10000
+        assert gate.is_open
+
+        quiet_tail = make_tone(100, samples=CHUNK_SIZE)
+        gate.process(quiet_tail)
+        after_one = gate.envelope
+        assert 0.5 < after_one < 1.0
+
+        for _ in range(10):
+            gate.process(quiet_tail)
+        assert gate.envelope < 0.05
+        assert not gate.is_open
+
+    def test_silence_is_attenuated(self):
+        """Test noise below threshold is suppressed."""
+        gate = NoiseGate(threshold_db=-30.0, sample_rate=SAMPLE_RATE, mode="sample")
+        out = np.frombuffer(gate.process(make_noise(100)), dtype=np.int16)
+        assert np.abs(out).max() < 10
+
+    def test_no_allocations_per_chunk(self):
+        """Test the sample gate reuses its buffers once warmed up."""
+        gate = NoiseGate(sample_rate=SAMPLE_RATE, mode="sample")
+        chunk = make_noise(3000)
+        gate.process_into(chunk)
+
+        tracemalloc.start()
+        try:
+            for _ in range(50):
+                gate.process_into(chunk)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        print(f"Peak traced memory over 50 chunks: {peak} bytes")
+        # Only small Python objects (views, floats); no float64 copy of the chunk
+        assert peak < CHUNK_SIZE * 8
+
+    def test_processor_sample_mode(self):
+        """Test analyze() uses the per-sample gate and reports post-gate levels."""
+        processor = EnhancedAudioProcessor(sample_rate=SAMPLE_RATE, enable_noise_gate=True, noise_gate_mode="sample")
+        reference = NoiseGate(threshold_db=-40.0, sample_rate=SAMPLE_RATE, mode="sample")
+        chunk = make_tone(8000)
+        analysis = processor.analyze(chunk)
+        assert analysis.data == reference.process(chunk)
+        expected_rms = np.sqrt(np.mean((np.frombuffer(analysis.data, dtype=np.int16) / 32768.0) ** 2))
+        assert analysis.rms_level == pytest.approx(expected_rms, rel=1e-3)
+
+    def test_benchmark_vs_block_gate(self):
+        """Benchmark per-sample gate throughput against the block gate."""
+        frames = [make_noise(3000, seed=i) for i in range(50)]
+        iterations = 500
+        results = {}
+        for mode in NoiseGate.MODES:
+            gate = NoiseGate(sample_rate=SAMPLE_RATE, mode=mode)
+            start = time.perf_counter()
+            for i in range(iterations):
+                gate.process(frames[i % len(frames)])
+            elapsed = time.perf_counter() - start
+            results[mode] = iterations * CHUNK_SIZE / elapsed
+
+        for mode, rate in results.items():
+            print(f"NoiseGate[{mode}]: {rate / 1e6:.1f} Msamples/s ({rate / SAMPLE_RATE:.0f}x realtime)")
+        # Must comfortably outrun the 16 kHz mic
+        assert results["sample"] > SAMPLE_RATE * 100
+
+
+class TestAudioTransport:
+    """Tests for the 'audio_data' playback event payloads."""
+
+    def test_visualizer_peaks(self):
+        """Test peaks are 64 bytes scaled to 0-255."""
+        peaks = visualizer_peaks(make_tone(32767, samples=2400))
+        assert len(peaks) == 64
+        assert max(peaks) == 255
+        assert visualizer_peaks(make_tone(0, samples=2400)) == bytes(64)
+        assert visualizer_peaks(b"") == bytes(64)
+
+    def test_peaks_track_loudness(self):
+        """Test louder audio produces larger peaks."""
+        quiet = visualizer_peaks(make_tone(2000, samples=2400))
+        loud = visualizer_peaks(make_tone(20000, samples=2400))
+        assert sum(loud) > sum(quiet) * 5
+
+    def test_payload_sizes(self):
+        """Test wire size per 100 ms of 24 kHz playback: binary well under JSON, peaks a fixed handful of bytes."""
+        from bench.audio_transport_bench import TRANSPORTS, encode_socketio_event
+        chunk = make_noise(4000, samples=2400)
+        sizes = {mode: encode_socketio_event('audio_data', build(chunk)) for mode, build in TRANSPORTS.items()}
+        assert sizes["binary"] < sizes["json"] / 3
+        assert sizes["peaks"] < sizes["binary"] / 20
+        assert sizes["binary"] >= len(chunk)
+
+
+class TestAudioTransportBench:
+    def test_audio_transport_bench(self):
+        from bench.audio_transport_bench import run_benchmark
+        report = run_benchmark(iterations=2)
+        assert [r["transport"] for r in report["results"]] == ["json", "binary", "peaks"]
+        assert all(r["encode_us"] > 0 for r in report["results"])
+
+
+class TestSpeechSegmenter:
+    """Tests for the listen_audio utterance state machine."""
+
+    def test_onset_and_offset(self):
+        """Test onset on first speech and offset after the silence hangover."""
+        segmenter = SpeechSegmenter(silence_duration=0.5)
+        assert segmenter.update(False, 0.0) is None
+        assert segmenter.update(True, 0.1) == SpeechSegmenter.ONSET
+        assert segmenter.update(True, 0.2) is None
+        assert segmenter.update(False, 0.3) is None  # silence starts
+        assert segmenter.update(False, 0.7) is None
+        assert segmenter.update(False, 0.9) == SpeechSegmenter.OFFSET
+        assert not segmenter.is_speaking
+
+    def test_short_pause_keeps_utterance(self):
+        """Test speech resuming within the hangover does not re-trigger."""
+        segmenter = SpeechSegmenter(silence_duration=0.5)
+        segmenter.update(True, 0.0)
+        segmenter.update(False, 0.1)
+        assert segmenter.update(True, 0.4) is None
+        assert segmenter.silence_start is None
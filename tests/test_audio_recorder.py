@@ -0,0 +1,311 @@
+"""
+Tests for the streaming AudioRecorder.
+Uses synthetic PCM and a temporary output directory.
+"""
+import pytest
+import os
+import threading
+import time
+import tracemalloc
+import wave
+
+try:
+    import numpy as np
+    from audio_processor import AudioRecorder, PolyphaseResampler, WavSink
+    HAS_AUDIO = True
+except ImportError as e:
+    HAS_AUDIO = False
+    IMPORT_ERROR = str(e)
+
+pytestmark = pytest.mark.skipif(not HAS_AUDIO, reason=f"Audio dependencies not installed: {IMPORT_ERROR if not HAS_AUDIO else ''}")
+
+SAMPLE_RATE = 16000
+CHUNK_SIZE = 1024
+CHUNK_BYTES = CHUNK_SIZE * 2
+
+
+def make_chunks(count: int, seed: int = 0) -> list:
+    rng = np.random.default_rng(seed)
+    return [rng.integers(-8000, 8000, CHUNK_SIZE, dtype=np.int16).tobytes() for _ in range(count)]
+
+
+def read_wav(path):
+    with wave.open(path, 'rb') as wf:
+        return wf.getnchannels(), wf.getframerate(), wf.getnframes(), wf.readframes(wf.getnframes())
+
+
+@pytest.fixture
+def recorder(tmp_path):
+    rec = AudioRecorder(sample_rate=SAMPLE_RATE, output_dir=str(tmp_path))
+    yield rec
+    if rec.is_recording():
+        rec.stop()
+
+
+class TestStreamingRecorder:
+    """Tests for incremental WAV writing."""
+
+    def test_round_trip(self, recorder):
+        """Test recorded audio matches the input and the header is patched."""
+        chunks = make_chunks(50)
+        recorder.start()
+        for chunk in chunks:
+            recorder.add_frame(chunk)
+        path = recorder.stop()
+
+        channels, rate, nframes, pcm = read_wav(path)
+        assert (channels, rate) == (1, SAMPLE_RATE)
+        assert nframes == 50 * CHUNK_SIZE
+        assert pcm == b"".join(chunks)
+
+    def test_file_opened_at_start(self, recorder):
+        """Test the file exists and fills while recording."""
+        recorder.start()
+        path = recorder.files[0]
+        assert os.path.exists(path)
+        for chunk in make_chunks(20):
+            recorder.add_frame(chunk)
+        deadline = time.monotonic() + 2.0
+        while recorder.bytes_written < 20 * CHUNK_BYTES and time.monotonic() < deadline:
+            time.sleep(0.01)
+        # Most of it is on disk already (minus the file object's write buffer)
+        assert os.path.getsize(path) > 10 * CHUNK_BYTES
+        recorder.stop()
+
+    def test_empty_recording(self, recorder, tmp_path):
+        """Test an empty recording returns None and leaves no file."""
+        recorder.start()
+        assert recorder.stop() is None
+        assert os.listdir(tmp_path) == []
+
+    def test_rotate_by_size(self, tmp_path):
+        """Test files roll over at the size limit."""
+        recorder = AudioRecorder(sample_rate=SAMPLE_RATE, output_dir=str(tmp_path), max_file_mb=10 * CHUNK_BYTES / (1024 * 1024))
+        chunks = make_chunks(25)
+        recorder.start()
+        for chunk in chunks:
+            recorder.add_frame(chunk)
+        first = recorder.stop()
+
+        assert first == recorder.files[0]
+        assert len(recorder.files) == 3
+        assert [read_wav(p)[2] for p in recorder.files] == [10 * CHUNK_SIZE, 10 * CHUNK_SIZE, 5 * CHUNK_SIZE]
+        assert b"".join(read_wav(p)[3] for p in recorder.files) == b"".join(chunks)
+
+    def test_rotate_by_duration(self, tmp_path):
+        """Test files roll over at the duration limit."""
+        recorder = AudioRecorder(sample_rate=SAMPLE_RATE, output_dir=str(tmp_path), max_file_seconds=1.0)
+        recorder.start()
+        for chunk in make_chunks(40):  # ~2.56 s
+            recorder.add_frame(chunk)
+        recorder.stop()
+        assert len(recorder.files) == 3
+        assert recorder.files[1].endswith("_part2.wav")
+
+    def test_custom_sink(self, tmp_path):
+        """Test a pluggable encoder receives every frame."""
+        written = []
+
+        class ListSink:
+            extension = "raw"
+
+            def __init__(self, path, sample_rate, channels, sample_width):
+                open(path, 'wb').close()
+
+            def write(self, data):
+                written.append(data)
+
+            def close(self):
+                written.append(None)
+
+        recorder = AudioRecorder(sample_rate=SAMPLE_RATE, output_dir=str(tmp_path), sink_factory=ListSink)
+        chunks = make_chunks(5)
+        recorder.start()
+        for chunk in chunks:
+            recorder.add_frame(chunk)
+        path = recorder.stop()
+        assert path.endswith(".raw")
+        assert written == chunks + [None]
+
+    def test_compressed_format_falls_back_to_wav(self, tmp_path):
+        """Test flac without soundfile records wav instead of failing."""
+        try:
+            import soundfile  # noqa: F401
+            pytest.skip("soundfile installed")
+        except ImportError:
+            pass
+        recorder = AudioRecorder(sample_rate=SAMPLE_RATE, output_dir=str(tmp_path), format="flac")
+        assert recorder.extension == "wav"
+
+    def test_slow_disk_drops_instead_of_blocking(self, tmp_path):
+        """Test add_frame never blocks when the writer falls behind."""
+        release = threading.Event()
+
+        class SlowSink(WavSink):
+            def write(self, data):
+                release.wait()
+                super().write(data)
+
+        recorder = AudioRecorder(sample_rate=SAMPLE_RATE, output_dir=str(tmp_path), sink_factory=SlowSink, queue_frames=8)
+        recorder.start()
+        start = time.perf_counter()
+        for chunk in make_chunks(20):
+            recorder.add_frame(chunk)
+        elapsed = time.perf_counter() - start
+        release.set()
+        recorder.stop()
+
+        assert elapsed < 0.1
+        assert recorder.dropped_frames > 0
+        assert recorder.frames_written + recorder.dropped_frames == 20
+
+    def test_memory_constant(self, recorder):
+        """Test memory does not grow with recording length."""
+        chunk = make_chunks(1)[0]
+        recorder.start()
+        tracemalloc.start()
+        try:
+            for _ in range(2000):  # ~2 minutes, 4 MB of PCM
+                # A fresh object per frame, as listen_audio produces
+                recorder.add_frame(bytes(bytearray(chunk)))
+                if recorder._queue.qsize() > 64:
+                    time.sleep(0.001)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        recorder.stop()
+
+        print(f"\nPeak traced memory while recording 4 MB: {peak / 1024:.0f} KiB")
+        assert recorder.frames_written == 2000
+        assert peak < 1024 * 1024
+
+
+class TestPolyphaseResampler:
+    """Tests for the streaming resampler."""
+
+    def test_output_length(self):
+        """Test 24 kHz -> 16 kHz produces two samples per three."""
+        resampler = PolyphaseResampler(24000, 16000)
+        out = resampler.process(np.zeros(2400, dtype=np.int16).tobytes())
+        assert len(out) == 1600
+
+    def test_chunked_matches_single_pass(self):
+        """Test chunk boundaries do not change the output."""
+        rng = np.random.default_rng(1)
+        x = rng.integers(-10000, 10000, 24000, dtype=np.int16)
+        whole = PolyphaseResampler(24000, 16000).process(x.tobytes())
+
+        resampler = PolyphaseResampler(24000, 16000)
+        sizes = [1, 479, 2400, 1000, 7, 20113]
+        pieces, pos = [], 0
+        for size in sizes:
+            pieces.append(resampler.process(x[pos:pos + size].tobytes()))
+            pos += size
+        assert np.array_equal(np.concatenate(pieces), whole)
+
+    def test_preserves_tone(self):
+        """Test a 1 kHz tone survives with its frequency and level."""
+        t = np.arange(24000) / 24000
+        x = (10000 * np.sin(2 * np.pi * 1000 * t)).astype(np.int16)
+        y = PolyphaseResampler(24000, 16000).process(x.tobytes()).astype(np.float64)[100:-100]
+
+        spectrum = np.abs(np.fft.rfft(y * np.hanning(len(y))))
+        peak_hz = np.argmax(spectrum) * 16000 / len(y)
+        rms = np.sqrt(np.mean(y ** 2))
+        assert abs(peak_hz - 1000) < 20
+        assert abs(rms - 10000 / np.sqrt(2)) < 200
+
+    def test_rejects_alias(self):
+        """Test content above the new Nyquist is attenuated."""
+        t = np.arange(24000) / 24000
+        x = (10000 * np.sin(2 * np.pi * 10000 * t)).astype(np.int16)
+        y = PolyphaseResampler(24000, 16000).process(x.tobytes()).astype(np.float64)[100:-100]
+        assert np.sqrt(np.mean(y ** 2)) < 10000 / np.sqrt(2) * 0.05
+
+    def test_throughput(self):
+        """Benchmark resampling against real time."""
+        resampler = PolyphaseResampler(24000, 16000)
+        chunk = np.zeros(2400, dtype=np.int16).tobytes()  # 100 ms
+        elapsed = min(timed_chunks(resampler, chunk, 100) for _ in range(3))
+        print(f"\nResample 24k->16k: {elapsed / 100 * 1e6:.0f} us per 100 ms chunk ({10 / elapsed:.0f}x realtime)")
+        assert 10 / elapsed > 100
+
+
+def timed_chunks(resampler, chunk, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        resampler.process(chunk)
+    return time.perf_counter() - start
+
+
+class TestDualChannelRecorder:
+    """Tests for the stereo mic + model recording."""
+
+    def make_recorder(self, tmp_path):
+        return AudioRecorder(sample_rate=SAMPLE_RATE, output_dir=str(tmp_path), dual_channel=True, output_sample_rate=24000)
+
+    def test_mono_recorder_ignores_output(self, recorder):
+        """Test add_output_frame is a no-op without dual_channel."""
+        recorder.start()
+        recorder.add_output_frame(bytes(4800))
+        recorder.add_frame(bytes(CHUNK_BYTES))
+        path = recorder.stop()
+        assert read_wav(path)[0] == 1
+
+    def test_stereo_layout_and_alignment(self, tmp_path):
+        """Test mic on the left and model audio placed by play time on the right."""
+        recorder = self.make_recorder(tmp_path)
+        mic = make_chunks(20)
+        model = np.full(2400, 5000, dtype=np.int16).tobytes()  # 100 ms at 24 kHz
+
+        recorder.start()
+        t0 = recorder._t0
+        # Drive the timeline with explicit timestamps: mic chunk i ends at (i+1)*64 ms
+        for i in range(5):
+            recorder._enqueue("mic", mic[i], t0 + (i + 1) * 0.064)
+        recorder._enqueue("model", model, t0 + 5 * 0.064 + 0.010)  # played 10 ms after mic chunk 5 ended
+        for i in range(5, 20):
+            recorder._enqueue("mic", mic[i], t0 + (i + 1) * 0.064)
+        path = recorder.stop()
+
+        channels, rate, nframes, pcm = read_wav(path)
+        assert (channels, rate) == (2, SAMPLE_RATE)
+        stereo = np.frombuffer(pcm, dtype=np.int16).reshape(-1, 2)
+        assert np.array_equal(stereo[:, 0], np.frombuffer(b"".join(mic), dtype=np.int16))
+
+        right = stereo[:, 1]
+        onset = int(np.argmax(np.abs(right) > 2500))
+        expected = 5 * CHUNK_SIZE + 160  # 10 ms at 16 kHz
+        assert abs(onset - expected) <= 16  # within 1 ms (filter delay)
+        assert abs(int(np.sum(np.abs(right) > 2500)) - 1600) <= 16
+
+    def test_sidecar_index(self, tmp_path):
+        """Test every chunk is listed with its track, position and time."""
+        import json
+        recorder = self.make_recorder(tmp_path)
+        recorder.start()
+        for chunk in make_chunks(3):
+            recorder.add_frame(chunk)
+        recorder.add_output_frame(bytes(4800))
+        recorder.add_frame(make_chunks(1)[0])
+        recorder.stop()
+
+        with open(recorder.index_path) as f:
+            entries = [json.loads(line) for line in f]
+        mic = [e for e in entries if e["track"] == "mic"]
+        model = [e for e in entries if e["track"] == "model"]
+        assert [e["sample"] for e in mic] == [0, CHUNK_SIZE, 2 * CHUNK_SIZE, 3 * CHUNK_SIZE]
+        assert len(model) == 1 and model[0]["samples"] == 1600
+        assert all(e["t"] >= 0 for e in entries)
+        assert model[0]["t"] >= mic[2]["t"]
+
+    def test_output_ahead_of_mic_is_bounded(self, tmp_path):
+        """Test model audio with no mic timeline does not grow without bound."""
+        recorder = self.make_recorder(tmp_path)
+        recorder.MAX_PENDING_SECONDS = 1.0
+        recorder.start()
+        for _ in range(30):  # 3 s of model audio, no mic (e.g. muted)
+            recorder.add_output_frame(bytes(4800))
+        recorder.add_frame(bytes(CHUNK_BYTES))
+        recorder.stop()
+        assert recorder.late_output_samples >= 1.9 * SAMPLE_RATE
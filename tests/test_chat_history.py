@@ -0,0 +1,192 @@
+"""
+Tests for the tail-seeking chat history reader and its offset index.
+"""
+
+import pytest
+import json
+import threading
+
+from chat_history import iter_lines_reverse, read_last_records, ChatHistory
+from project_manager import ProjectManager
+
+
+def write_lines(path, lines):
+    path.write_bytes("".join(lines).encode("utf-8"))
+
+
+def entries(count, start_ts=1000.0):
+    return [{"timestamp": start_ts + i, "sender": "User" if i % 2 == 0 else "JARVIS", "text": f"message {i}"}
+            for i in range(count)]
+
+
+class TestReverseReader:
+    @pytest.mark.parametrize("block_size", [1, 7, 64, 65536])
+    def test_lines_last_to_first(self, tmp_path, block_size):
+        path = tmp_path / "log.jsonl"
+        lines = [f"line {i}\n" for i in range(50)]
+        write_lines(path, lines)
+        result = [line.decode() + "\n" for line in iter_lines_reverse(path, block_size)]
+        assert result == lines[::-1]
+
+    def test_final_line_without_newline(self, tmp_path):
+        path = tmp_path / "log.jsonl"
+        write_lines(path, ["a\n", "b\n", "c"])
+        assert list(iter_lines_reverse(path, 2)) == [b"c", b"b", b"a"]
+
+    def test_empty_file(self, tmp_path):
+        path = tmp_path / "log.jsonl"
+        path.write_bytes(b"")
+        assert list(iter_lines_reverse(path)) == []
+
+    def test_last_records_skip_corrupt_lines(self, tmp_path):
+        path = tmp_path / "log.jsonl"
+        records = entries(5)
+        lines = [json.dumps(r) + "\n" for r in records]
+        lines.insert(3, "{not json\n")
+        lines.append('{"timestamp": 9')  # torn final write
+        write_lines(path, lines)
+        assert read_last_records(path, 3, block_size=16) == records[2:]
+        assert read_last_records(path, 100) == records
+        assert read_last_records(path, 0) == []
+
+
+class TestChatHistory:
+    def test_append_and_tail(self, tmp_path):
+        history = ChatHistory(tmp_path / "chat_history.jsonl")
+        history.append(entries(3))
+        history.append(entries(3, start_ts=2000.0))
+        assert [r["timestamp"] for r in history.tail(4)] == [1002.0, 2000.0, 2001.0, 2002.0]
+
+    def test_missing_file(self, tmp_path):
+        history = ChatHistory(tmp_path / "chat_history.jsonl")
+        assert history.tail(10) == []
+        assert history.since(0) == []
+
+    def test_index_stride(self, tmp_path):
+        history = ChatHistory(tmp_path / "chat_history.jsonl", stride=256)
+        for batch in range(10):
+            history.append(entries(10, start_ts=1000.0 + batch * 10))
+        size = history.path.stat().st_size
+        index = history.index.load()
+        assert index[0] == (1000.0, 0)
+        assert len(index) >= size // 256 // 2
+        # Every indexed offset starts a line with that timestamp
+        with open(history.path, "rb") as f:
+            for ts, offset in index:
+                f.seek(offset)
+                assert json.loads(f.readline())["timestamp"] == ts
+
+    def test_since_uses_index(self, tmp_path):
+        history = ChatHistory(tmp_path / "chat_history.jsonl", stride=256)
+        history.append(entries(200))
+        assert history.index.offset_before(1150.0) > 0
+        result = history.since(1150.0, limit=5)
+        assert [r["timestamp"] for r in result] == [1150.0, 1151.0, 1152.0, 1153.0, 1154.0]
+        assert len(history.since(1190.0)) == 10
+
+    def test_index_persists(self, tmp_path):
+        path = tmp_path / "chat_history.jsonl"
+        ChatHistory(path, stride=256).append(entries(100))
+        reopened = ChatHistory(path, stride=256)
+        assert len(reopened.index.load()) > 1
+        assert reopened.since(1090.0)[0]["timestamp"] == 1090.0
+
+    def test_stale_index_after_truncation(self, tmp_path):
+        path = tmp_path / "chat_history.jsonl"
+        ChatHistory(path, stride=256).append(entries(100))
+        path.write_bytes(b"")
+        history = ChatHistory(path, stride=256)
+        assert history.since(0) == []
+        history.append(entries(3, start_ts=5000.0))
+        assert history.index.load() == [(5000.0, 0)]
+        assert [r["timestamp"] for r in history.since(5001.0)] == [5001.0, 5002.0]
+
+    def test_rebuild_index(self, tmp_path):
+        path = tmp_path / "chat_history.jsonl"
+        write_lines(path, [json.dumps(r) + "\n" for r in entries(100)])
+        history = ChatHistory(path, stride=512)
+        history.rebuild_index()
+        assert len(history.index.load()) > 1
+        assert history.since(1099.0)[0]["text"] == "message 99"
+
+
+class TestSegments:
+    def test_roll_at_size(self, tmp_path):
+        history = ChatHistory(tmp_path / "chat_history.jsonl", stride=256, segment_bytes=1024)
+        for batch in range(10):
+            history.append(entries(5, start_ts=1000.0 + batch * 5))
+        segments = history.segments()
+        assert len(segments) == history.rolls >= 2
+        assert segments[0].name == "chat_history.000001.jsonl"
+        assert (tmp_path / "chat_history.000001.jsonl.idx").exists()
+        assert all(path.stat().st_size >= 1024 for path in segments)
+
+    def test_tail_and_since_span_segments(self, tmp_path):
+        history = ChatHistory(tmp_path / "chat_history.jsonl", stride=256, segment_bytes=1024)
+        for batch in range(10):
+            history.append(entries(5, start_ts=1000.0 + batch * 5))
+        assert [r["timestamp"] for r in history.tail(50)] == [1000.0 + i for i in range(50)]
+        assert [r["timestamp"] for r in history.tail(3)] == [1047.0, 1048.0, 1049.0]
+        assert [r["timestamp"] for r in history.since(1001.0, limit=3)] == [1001.0, 1002.0, 1003.0]
+        assert len(history.since(1020.0)) == 30
+
+    def test_persistent_handle(self, tmp_path):
+        history = ChatHistory(tmp_path / "chat_history.jsonl", segment_bytes=512)
+        history.open()
+        for batch in range(10):
+            history.append(entries(3, start_ts=1000.0 + batch * 3))
+        history.flush()
+        assert history.is_open
+        assert len(history.tail(30)) == 30
+        history.close()
+        assert not history.is_open
+
+    def test_reads_during_writes_and_rolls(self, tmp_path):
+        """Test tail() and records() from one thread while another appends and rolls segments."""
+        history = ChatHistory(tmp_path / "chat_history.jsonl", stride=256, segment_bytes=512)
+        history.open()
+        history.append(entries(1))
+        done = threading.Event()
+
+        def writer():
+            for batch in range(1, 2000):
+                history.append(entries(1, start_ts=1000.0 + batch))
+                history.flush()
+            done.set()
+
+        thread = threading.Thread(target=writer)
+        thread.start()
+        try:
+            while not done.is_set():
+                tail = [r["timestamp"] for r in history.tail(5)]
+                assert tail == [tail[0] + i for i in range(len(tail))]
+                streamed = [r["timestamp"] for r in history.records()]
+                assert streamed == [1000.0 + i for i in range(len(streamed))]
+        finally:
+            thread.join()
+            history.close()
+        assert history.rolls >= 100
+        assert len(list(history.records())) == 2000
+
+
+class TestProjectManagerHistory:
+    def test_recent_history(self, tmp_path):
+        project_manager = ProjectManager(str(tmp_path))
+        for i in range(20):
+            project_manager.log_chat("User", f"message {i}")
+        recent = project_manager.get_recent_chat_history(limit=10)
+        assert [r["text"] for r in recent] == [f"message {i}" for i in range(10, 20)]
+
+    def test_history_since(self, tmp_path):
+        project_manager = ProjectManager(str(tmp_path))
+        project_manager.write_chat_entries([(project_manager.chat_history().path, e) for e in entries(50)])
+        assert [r["text"] for r in project_manager.get_chat_history_since(1048.0)] == ["message 48", "message 49"]
+
+
+class TestChatHistoryBench:
+    def test_chat_history_bench(self):
+        from bench.chat_history_bench import run_benchmark
+        report = run_benchmark(sizes=(0.5,), limit=10)
+        result = report["results"][0]
+        assert result["tail"]["records"] == result["legacy"]["records"] == 10
+        assert result["since"]["records"] == 10
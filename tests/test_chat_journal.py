@@ -0,0 +1,141 @@
+"""
+Tests for the group-committed chat journal.
+"""
+
+import pytest
+import asyncio
+import json
+
+from chat_history import ChatHistory
+from chat_journal import ChatJournal, FSYNC_BATCH, FSYNC_INTERVAL
+from project_manager import ProjectManager
+
+
+def read_texts(path):
+    return [json.loads(line)["text"] for line in path.read_text().splitlines()]
+
+
+def entry(text, ts=1000.0):
+    return {"timestamp": ts, "sender": "User", "text": text}
+
+
+@pytest.fixture
+def histories():
+    opened = {}
+
+    def open_history(path):
+        opened[path] = ChatHistory(path)
+        return opened[path]
+    open_history.opened = opened
+    return open_history
+
+
+class TestChatJournal:
+    @pytest.mark.asyncio
+    async def test_group_commit_in_order(self, tmp_path, histories):
+        journal = ChatJournal(histories)
+        log_file = tmp_path / "chat_history.jsonl"
+        for i in range(10):
+            journal.log(log_file, entry(f"m{i}"))
+        assert journal.pending == 10
+        await journal.flush()
+        assert read_texts(log_file) == [f"m{i}" for i in range(10)]
+        assert journal.get_metrics()["commits"] == 1
+        assert histories.opened[log_file].is_open
+        await journal.close()
+        assert not histories.opened[log_file].is_open
+
+    @pytest.mark.asyncio
+    async def test_background_task_commits(self, tmp_path, histories):
+        journal = ChatJournal(histories)
+        log_file = tmp_path / "chat_history.jsonl"
+        journal.log(log_file, entry("hello"))
+        for _ in range(50):
+            await asyncio.sleep(0.01)
+            if journal.get_metrics()["entries_written"]:
+                break
+        assert read_texts(log_file) == ["hello"]
+        await journal.close()
+
+    @pytest.mark.asyncio
+    async def test_max_batch(self, tmp_path, histories):
+        journal = ChatJournal(histories, max_batch=4)
+        log_file = tmp_path / "chat_history.jsonl"
+        for i in range(10):
+            journal.log(log_file, entry(f"m{i}"))
+        await journal.flush()
+        metrics = journal.get_metrics()
+        assert metrics["commits"] == 3
+        assert metrics["largest_commit"] == 4
+        await journal.close()
+
+    @pytest.mark.asyncio
+    async def test_project_switch_releases_previous_log(self, tmp_path, histories):
+        journal = ChatJournal(histories)
+        first = tmp_path / "a.jsonl"
+        second = tmp_path / "b.jsonl"
+        journal.log(first, entry("in a"))
+        journal.log(second, entry("in b"))
+        await journal.flush()
+        assert not histories.opened[first].is_open
+        assert histories.opened[second].is_open
+        assert journal.get_metrics()["open_logs"] == 1
+        assert read_texts(first) == ["in a"]
+        await journal.close()
+
+    @pytest.mark.asyncio
+    async def test_fsync_policies(self, tmp_path, histories):
+        batch = ChatJournal(histories, fsync=FSYNC_BATCH)
+        batch.log(tmp_path / "a.jsonl", entry("x"))
+        await batch.flush()
+        batch.log(tmp_path / "a.jsonl", entry("y"))
+        await batch.close()
+        assert batch.get_metrics()["fsyncs"] == 2
+
+        interval = ChatJournal(histories, fsync=FSYNC_INTERVAL, fsync_interval=60.0)
+        interval.log(tmp_path / "b.jsonl", entry("x"))
+        await interval.close()
+        assert interval.get_metrics()["fsyncs"] == 0
+
+    def test_unknown_fsync_policy(self, histories):
+        with pytest.raises(ValueError):
+            ChatJournal(histories, fsync="sometimes")
+
+    @pytest.mark.asyncio
+    async def test_write_errors_are_counted(self, tmp_path):
+        def broken(path):
+            raise OSError("disk full")
+        journal = ChatJournal(broken)
+        journal.log(tmp_path / "a.jsonl", entry("x"))
+        await journal.close()
+        assert journal.get_metrics()["write_errors"] == 1
+
+    def test_without_loop_writes_synchronously(self, tmp_path, histories):
+        journal = ChatJournal(histories)
+        log_file = tmp_path / "chat_history.jsonl"
+        journal.log(log_file, entry("x"))
+        assert read_texts(log_file) == ["x"]
+        assert not histories.opened[log_file].is_open
+
+    @pytest.mark.asyncio
+    async def test_project_manager_journal(self, tmp_path):
+        project_manager = ProjectManager(str(tmp_path))
+        journal = ChatJournal(project_manager.chat_history)
+        journal.log(*project_manager.chat_log_entry("User", "Hello"))
+        project_manager.create_project("other")
+        project_manager.switch_project("other")
+        journal.log(*project_manager.chat_log_entry("JARVIS", "Switched"))
+        await journal.close()
+
+        assert read_texts(tmp_path / "projects" / "temp" / "chat_history.jsonl") == ["Hello"]
+        assert read_texts(tmp_path / "projects" / "other" / "chat_history.jsonl") == ["Switched"]
+        assert [r["text"] for r in project_manager.get_recent_chat_history(5)] == ["Switched"]
+
+
+class TestChatJournalBench:
+    def test_chat_journal_bench(self):
+        from bench.chat_journal_bench import run_benchmark
+        report = run_benchmark(messages=200, burst=10, pause_ms=0.5, segment_mb=0.005)
+        for result in report["results"]:
+            assert result["logged"] == 200
+            assert result["segments"] >= 1
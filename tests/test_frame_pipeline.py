@@ -0,0 +1,399 @@
+"""
+Tests for the camera and screen frame pipelines.
+Uses synthetic video and desktop frames instead of a camera or display.
+"""
+import pytest
+import asyncio
+import base64
+import time
+
+import cv2
+import numpy as np
+
+from frame_pipeline import (
+    ChangeDetector,
+    JpegEncoder,
+    FramePipeline,
+    SyntheticVideoSource,
+    TileChangeDetector,
+    AdaptiveRate,
+    ScreenPipeline,
+    ScreenGrabber,
+    LatestFrameSlot
+)
+from session_scheduler import OutboundScheduler
+
+
+def decode(msg: dict) -> np.ndarray:
+    jpeg = np.frombuffer(base64.b64decode(msg["data"]), dtype=np.uint8)
+    return cv2.imdecode(jpeg, cv2.IMREAD_COLOR)
+
+
+def desktop(text: str = "", width: int = 1920, height: int = 1080) -> np.ndarray:
+    """A flat desktop with one window; `text` is typed into the window"""
+    frame = np.full((height, width, 3), (90, 60, 30), dtype=np.uint8)
+    cv2.rectangle(frame, (200, 150), (1400, 900), (245, 245, 245), thickness=-1)
+    cv2.rectangle(frame, (200, 150), (1400, 190), (200, 120, 40), thickness=-1)
+    if text:
+        cv2.putText(frame, text, (230, 260), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (20, 20, 20), 2)
+    return frame
+
+
+class TestChangeDetector:
+    """Tests for downscaled change detection."""
+
+    def test_first_frame_is_a_change(self):
+        """Test there is always something to send initially."""
+        _, frame = SyntheticVideoSource(frames=1).read()
+        assert ChangeDetector().update(frame)
+
+    def test_noise_is_not_a_change(self):
+        """Test sensor noise on a still scene does not trigger."""
+        source = SyntheticVideoSource(frames=10, motion=(), noise=4.0)
+        detector = ChangeDetector()
+        results = [detector.update(source.read()[1]) for _ in range(10)]
+        assert results == [True] + [False] * 9
+
+    def test_small_object_motion_is_a_change(self):
+        """Test a moving object is detected even though most of the frame is still."""
+        source = SyntheticVideoSource(frames=4, motion=((1, 4),))
+        detector = ChangeDetector()
+        detector.update(source.read()[1])
+        assert any(detector.update(source.read()[1]) for _ in range(3))
+
+    def test_reset(self):
+        """Test reset() makes the next frame a change again."""
+        source = SyntheticVideoSource(frames=2, motion=())
+        detector = ChangeDetector()
+        detector.update(source.read()[1])
+        detector.reset()
+        assert detector.update(source.read()[1])
+
+
+class TestJpegEncoder:
+    """Tests for cv2 JPEG encoding."""
+
+    def test_limits_long_side(self):
+        """Test frames are shrunk to max_size, keeping the aspect ratio."""
+        _, frame = SyntheticVideoSource(width=1920, height=1080, frames=1).read()
+        jpeg = JpegEncoder(max_size=1024).encode(frame)
+        assert cv2.imdecode(jpeg, cv2.IMREAD_COLOR).shape == (576, 1024, 3)
+
+    def test_small_frames_untouched(self):
+        """Test frames already within max_size keep their size."""
+        _, frame = SyntheticVideoSource(width=640, height=480, frames=1).read()
+        jpeg = JpegEncoder(max_size=1024).encode(frame)
+        assert cv2.imdecode(jpeg, cv2.IMREAD_COLOR).shape == (480, 640, 3)
+
+    def test_reuses_scale_buffer(self):
+        """Test the resize buffer is reused while the input shape is unchanged."""
+        source = SyntheticVideoSource(width=1920, height=1080, frames=2)
+        encoder = JpegEncoder()
+        encoder.encode(source.read()[1])
+        buffer = encoder._scaled
+        encoder.encode(source.read()[1])
+        assert encoder._scaled is buffer
+
+    def test_colours_preserved(self):
+        """Test BGR input comes out as the same colours (no channel swap)."""
+        frame = np.zeros((64, 64, 3), dtype=np.uint8)
+        frame[:] = (200, 30, 30)  # blue in BGR
+        out = cv2.imdecode(JpegEncoder().encode(frame), cv2.IMREAD_COLOR)
+        assert abs(int(out[32, 32, 0]) - 200) < 10
+        assert int(out[32, 32, 2]) < 60
+
+
+class TestFramePipeline:
+    """Tests for the full camera frame stage."""
+
+    def run(self, pipeline, source, fps=1.0):
+        sent = []
+        while True:
+            ok, frame = source.read()
+            if not ok:
+                return sent
+            msg = pipeline.process(frame, now=source.index / fps)
+            if msg is not None:
+                sent.append((source.index, msg))
+
+    def test_skips_unchanged_frames(self):
+        """Test only the first frame and frames during motion are sent."""
+        pipeline = FramePipeline()
+        sent = self.run(pipeline, SyntheticVideoSource(frames=60, motion=((20, 30),)))
+        indices = [index for index, _ in sent]
+        assert indices[0] == 1
+        assert all(20 < index <= 31 for index in indices[1:])
+        assert len(indices) >= 5
+
+        metrics = pipeline.get_metrics()
+        assert metrics["frames_in"] == 60
+        assert metrics["frames_sent"] == len(sent)
+        assert metrics["frames_skipped"] == 60 - len(sent)
+        assert metrics["avg_encode_ms"] > 0
+
+    def test_message_format(self):
+        """Test messages are base64 JPEG realtime inputs the session accepts."""
+        pipeline = FramePipeline()
+        _, msg = self.run(pipeline, SyntheticVideoSource(frames=1))[0]
+        assert msg["mime_type"] == "image/jpeg"
+        assert decode(msg).shape == (576, 1024, 3)
+
+    def test_keyframe_interval(self):
+        """Test an unchanged frame is still sent once the keyframe interval passes."""
+        pipeline = FramePipeline(keyframe_interval_s=10.0)
+        sent = self.run(pipeline, SyntheticVideoSource(frames=35, motion=()))
+        assert [index for index, _ in sent] == [1, 11, 21, 31]
+
+    def test_fps_sent(self):
+        """Test fps_sent reflects the rate of frames actually sent."""
+        pipeline = FramePipeline(keyframe_interval_s=0.5)
+        self.run(pipeline, SyntheticVideoSource(frames=40, motion=()), fps=4.0)
+        assert pipeline.get_metrics()["fps_sent"] == pytest.approx(2.0, rel=0.05)
+
+    def test_frame_bench(self):
+        """Benchmark fps sent and encode time: legacy PIL path vs pipeline."""
+        from bench.frame_bench import run_benchmark
+        report = run_benchmark(frames=50, fps=1.0, width=1280, height=720)
+        legacy, pipeline = report["results"]
+        for r in report["results"]:
+            print(f"\n{r['path']}: {r['fps_sent']:.2f} fps sent, encode {r['avg_encode_ms']:.2f} ms, "
+                  f"CPU {r['cpu_ms_per_frame']:.2f} ms/frame")
+        assert legacy["frames_sent"] == 50
+        assert pipeline["frames_sent"] < legacy["frames_sent"] / 2
+        assert pipeline["cpu_ms_per_frame"] < legacy["cpu_ms_per_frame"]
+
+
+class TestTileChangeDetector:
+    """Tests for dirty-tile screen diffing."""
+
+    def test_identical_frames(self):
+        """Test a static screen is not a change."""
+        detector = TileChangeDetector()
+        assert detector.update(desktop())
+        assert not detector.update(desktop())
+        assert detector.last_score == 0.0
+
+    def test_grid_follows_aspect_ratio(self):
+        """Test the grid rows match the frame's aspect ratio."""
+        detector = TileChangeDetector(columns=32)
+        detector.update(desktop())
+        assert detector.dirty.shape == (18, 32)
+
+    def test_typing_marks_local_tiles(self):
+        """Test typed text dirties only the tiles it covers."""
+        detector = TileChangeDetector()
+        detector.update(desktop())
+        assert detector.update(desktop("Hello world, this is a test"))
+        rows, columns = np.nonzero(detector.dirty)
+        # Text sits around y=260 and x=230..600 on a 60 px tile grid
+        assert set(rows) <= {3, 4}
+        assert columns.min() >= 3 and columns.max() <= 11
+
+    def test_tiny_change_ignored(self):
+        """Test a single changed tile (caret blink) is below the threshold."""
+        detector = TileChangeDetector(min_dirty_tiles=2)
+        frame = desktop()
+        detector.update(frame)
+        caret = frame.copy()
+        caret[240:270, 700:703] = 0
+        assert not detector.update(caret)
+        assert 0 < np.count_nonzero(detector.dirty) < 2
+
+    def test_changes_accumulate_against_reference(self):
+        """Test small changes that were skipped still add up."""
+        detector = TileChangeDetector(min_dirty_tiles=3)
+        detector.update(desktop())
+        assert not detector.update(desktop("Hi"))
+        assert detector.update(desktop("Hi there, typing a longer line"))
+
+
+class TestAdaptiveRate:
+    """Tests for the AIMD frame rate cap."""
+
+    def test_backs_off_and_recovers(self):
+        """Test congestion halves the rate and quiet ticks bring it back."""
+        rate = AdaptiveRate(max_fps=2.0, min_fps=0.2, increase=0.5, decrease=0.5)
+        assert rate.update(True) == pytest.approx(1.0)
+        assert rate.update(True) == pytest.approx(2.0)
+        assert rate.fps == pytest.approx(0.5)
+        rate.update(False)
+        rate.update(False)
+        rate.update(False)
+        assert rate.fps == pytest.approx(2.0)
+        assert rate.backoffs == 2
+
+    def test_clamped(self):
+        """Test the rate stays within [min_fps, max_fps]."""
+        rate = AdaptiveRate(max_fps=2.0, min_fps=0.2)
+        for _ in range(20):
+            rate.update(True)
+        assert rate.fps == pytest.approx(0.2)
+        for _ in range(20):
+            rate.update(False)
+        assert rate.fps == pytest.approx(2.0)
+
+
+class FakeShot:
+    def __init__(self, bgra):
+        self.raw = bytearray(bgra.tobytes())
+        self.height, self.width = bgra.shape[:2]
+
+
+class FakeMss:
+    """Stands in for an mss instance; grab() returns the next queued frame"""
+
+    def __init__(self, frames):
+        self.monitors = [{"left": 0, "top": 0, "width": 1920, "height": 1080}] * 2
+        self.frames = list(frames)
+        self.closed = False
+
+    def grab(self, monitor):
+        return FakeShot(cv2.cvtColor(self.frames.pop(0), cv2.COLOR_BGR2BGRA))
+
+    def close(self):
+        self.closed = True
+
+
+class TestScreenPipeline:
+    """Headless tests for the screen producer."""
+
+    def test_grabber_reuses_buffer(self):
+        """Test grabs land in one BGR buffer with the alpha channel dropped."""
+        grabber = ScreenGrabber(FakeMss([desktop(), desktop("x")]))
+        first = grabber.grab()
+        assert first.shape == (1080, 1920, 3)
+        np.testing.assert_array_equal(first, desktop())
+        assert grabber.grab() is first
+
+    def test_sends_only_meaningful_changes(self):
+        """Test a typing session sends the first frame and frames with new text only."""
+        texts = ["", "", "", "Hello", "Hello", "Hello", "Hello world", "Hello world", "Hello world"]
+        grabber = ScreenGrabber(FakeMss([desktop(text) for text in texts]))
+        pipeline = ScreenPipeline()
+        sent = [i for i in range(len(texts)) if pipeline.process(grabber.grab(), now=float(i)) is not None]
+        assert sent == [0, 3, 6]
+        metrics = pipeline.get_metrics()
+        assert metrics["frames_skipped"] == 6
+        assert metrics["dirty_tiles"] == 0
+
+    def test_screen_frames_capped_at_1024(self):
+        """Test full-HD grabs are encoded at 1024 px wide."""
+        pipeline = ScreenPipeline(max_size=1024)
+        assert decode(pipeline.process(desktop())).shape == (576, 1024, 3)
+
+    @pytest.mark.asyncio
+    async def test_rate_follows_queue_pressure(self):
+        """Test the cap drops while frames sit unsent in out_queue and recovers once drained."""
+        pipeline = ScreenPipeline(max_fps=2.0, min_fps=0.2)
+        queue = OutboundScheduler()
+
+        # Session stalled: each frame is still queued (or superseded) at the next tick
+        for i in range(3):
+            frame = pipeline.process(desktop("stalled " * (i + 1)))
+            assert frame is not None
+            await queue.put(frame)
+            pipeline.next_interval(queue.get_metrics())
+        assert pipeline.rate.fps == pytest.approx(0.25)
+
+        # Session drains every frame before the next tick
+        for i in range(10):
+            frame = pipeline.process(desktop("draining " * (i + 1)))
+            assert frame is not None
+            await queue.put(frame)
+            assert await queue.get() is frame
+            pipeline.next_interval(queue.get_metrics())
+        assert pipeline.rate.fps == pytest.approx(2.0)
+        # The first drained put still superseded the stalled frame, which counts as pressure
+        assert pipeline.get_metrics()["backoffs"] == 4
+
+    @pytest.mark.asyncio
+    async def test_audio_backlog_is_pressure(self):
+        """Test queued mic audio also slows screen frames."""
+        pipeline = ScreenPipeline(max_fps=2.0)
+        queue = OutboundScheduler()
+        for _ in range(ScreenPipeline.AUDIO_BACKLOG):
+            await queue.put({"data": bytes(2048), "mime_type": "audio/pcm"})
+        assert pipeline.next_interval(queue.get_metrics()) == pytest.approx(1.0)
+        assert pipeline.next_interval(None) == pytest.approx(1 / 1.25)
+
+
+class TestLatestFrameSlot:
+    """Tests for the lazily encoded browser frame slot."""
+
+    def test_set_does_not_encode(self):
+        """Test storing frames is just a reference swap."""
+        slot = LatestFrameSlot()
+        for i in range(30):
+            slot.set(bytes([i]) * 1000)
+        assert slot.encodes == 0
+        assert slot.get_metrics()["frames_dropped_unencoded"] == 30
+
+    def test_payload_encoded_once_per_frame(self):
+        """Test repeated piggybacks reuse the encoded payload until a new frame arrives."""
+        slot = LatestFrameSlot()
+        slot.set(b"\xff\xd8jpeg-1")
+        first = slot.payload()
+        assert first == {"mime_type": "image/jpeg", "data": base64.b64encode(b"\xff\xd8jpeg-1").decode()}
+        assert slot.payload() is first
+        assert slot.encodes == 1
+
+        slot.set(b"\xff\xd8jpeg-2")
+        assert base64.b64decode(slot.payload()["data"]) == b"\xff\xd8jpeg-2"
+        assert slot.encodes == 2
+
+    def test_empty_and_clear(self):
+        """Test there is no payload before the first frame or after clear()."""
+        slot = LatestFrameSlot()
+        assert slot.payload() is None
+        slot.set(b"x")
+        slot.clear()
+        assert slot.payload() is None
+
+    def test_string_frames_passed_through(self):
+        """Test already-base64 frames are used as-is."""
+        slot = LatestFrameSlot()
+        slot.set("aGVsbG8=")
+        assert slot.payload() == {"mime_type": "image/jpeg", "data": "aGVsbG8="}
+        assert slot.encodes == 0
+
+    def test_set_payload(self):
+        """Test a prebuilt payload can be stored directly (old _latest_image_payload assignment)."""
+        slot = LatestFrameSlot()
+        payload = {"mime_type": "image/jpeg", "data": "abc"}
+        slot.set_payload(payload)
+        assert slot.payload() is payload
+        slot.set_payload(None)
+        assert slot.payload() is None
+
+    def test_cpu_under_browser_stream(self):
+        """Compare CPU for a 30 fps browser stream: encode every frame vs encode on send."""
+        rng = np.random.default_rng(0)
+        frames = [rng.integers(0, 256, 60_000, dtype=np.uint8).tobytes() for _ in range(8)]
+        total, onsets = 300, {50, 150, 290}  # 10 s at 30 fps, a few onsets
+
+        def eager():
+            latest = None
+            for i in range(total):
+                latest = {"mime_type": "image/jpeg", "data": base64.b64encode(frames[i % 8]).decode()}
+                if i in onsets:
+                    assert latest
+            return latest
+
+        def lazy():
+            slot = LatestFrameSlot()
+            for i in range(total):
+                slot.set(frames[i % 8])
+                if i in onsets:
+                    assert slot.payload()
+                    assert slot.payload()  # text turn piggybacking the same frame
+            return slot
+
+        start = time.thread_time()
+        eager()
+        eager_s = time.thread_time() - start
+        start = time.thread_time()
+        slot = lazy()
+        lazy_s = time.thread_time() - start
+        print(f"\n30 fps browser frames: eager {eager_s * 1000:.1f} ms, lazy {lazy_s * 1000:.1f} ms CPU")
+        assert slot.encodes == 3
+        assert lazy_s < eager_s / 5
@@ -0,0 +1,89 @@
+"""
+Tests for the queued, per-subsystem logging setup.
+"""
+
+import pytest
+import io
+import json
+import logging
+import queue
+
+from log_config import get_logger, configure_logging, apply_levels, stop_logging, LazyQueueHandler
+
+
+class FormatProbe:
+    """Counts how often it is formatted"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __str__(self):
+        self.calls += 1
+        return "probe"
+
+
+@pytest.fixture
+def sink():
+    stream = io.StringIO()
+    yield stream
+    stop_logging()
+    apply_levels({})
+
+
+class TestLogConfig:
+    def test_text_output(self, sink):
+        configure_logging({"log_level": "DEBUG"}, stream=sink)
+        get_logger("vad").debug("Speech detected (confidence %.2f)", 0.87)
+        stop_logging()
+        assert sink.getvalue() == "[ADA DEBUG] [VAD] Speech detected (confidence 0.87)\n"
+
+    def test_disabled_records_are_never_formatted(self, sink):
+        configure_logging({"log_level": "INFO"}, stream=sink)
+        probe = FormatProbe()
+        get_logger("audio").debug("chunk %s", probe)
+        stop_logging()
+        assert probe.calls == 0
+        assert sink.getvalue() == ""
+
+    def test_queue_handler_leaves_formatting_to_listener(self):
+        records = queue.SimpleQueue()
+        handler = LazyQueueHandler(records)
+        probe = FormatProbe()
+        record = logging.LogRecord("ada.audio", logging.INFO, __file__, 1, "chunk %s", (probe,), None)
+        handler.emit(record)
+        assert probe.calls == 0
+        assert records.get_nowait().args == (probe,)
+
+    def test_per_subsystem_levels(self, sink):
+        configure_logging({"log_level": "WARNING", "log_levels": {"tools": "DEBUG"}}, stream=sink)
+        get_logger("tools").debug("tool call")
+        get_logger("audio").info("playback started")
+        stop_logging()
+        assert "tool call" in sink.getvalue()
+        assert "playback started" not in sink.getvalue()
+
+    def test_apply_levels_drops_removed_overrides(self, sink):
+        configure_logging({"log_level": "INFO", "log_levels": {"vad": "DEBUG"}}, stream=sink)
+        assert get_logger("vad").isEnabledFor(logging.DEBUG)
+        apply_levels({"log_level": "INFO"})
+        assert not get_logger("vad").isEnabledFor(logging.DEBUG)
+
+    def test_unknown_level_is_ignored(self, sink):
+        configure_logging({"log_level": "INFO", "log_levels": {"vad": "LOUD"}}, stream=sink)
+        assert get_logger("vad").getEffectiveLevel() == logging.INFO
+
+    def test_json_output_with_fields(self, sink):
+        configure_logging({"log_level": "DEBUG", "log_format": "json"}, stream=sink)
+        get_logger("tools").debug("Tool call '%s'", "read_file", extra={"fields": {"args": {"path": "a.txt"}}})
+        stop_logging()
+        entry = json.loads(sink.getvalue())
+        assert entry["subsystem"] == "tools"
+        assert entry["msg"] == "Tool call 'read_file'"
+        assert entry["args"] == {"path": "a.txt"}
+
+    def test_reconfigure_replaces_handler(self, sink):
+        configure_logging({"log_level": "DEBUG"}, stream=io.StringIO())
+        configure_logging({"log_level": "DEBUG"}, stream=sink)
+        get_logger("server").info("once")
+        stop_logging()
+        assert sink.getvalue().count("once") == 1
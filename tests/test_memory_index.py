@@ -0,0 +1,177 @@
+"""
+Tests for the project memory search index.
+"""
+
+import pytest
+import json
+import os
+
+from memory_index import MemoryIndex, INDEX_NAME, chunk_text, match_expression, snippet, format_results
+from chat_journal import ChatJournal
+from project_manager import ProjectManager
+
+
+def messages(*texts, start_ts=1000.0):
+    return [{"timestamp": start_ts + i, "sender": "User", "text": t} for i, t in enumerate(texts)]
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = MemoryIndex(tmp_path / INDEX_NAME)
+    yield index
+    index.close()
+
+
+class TestHelpers:
+    def test_match_expression_quotes_words(self):
+        assert match_expression('lid AND "hinge*"') == '"lid" "and" "hinge"'
+        assert match_expression("lid hinge", any_term=True) == '"lid" OR "hinge"'
+        assert match_expression("?!") == ""
+
+    def test_chunk_text(self):
+        text = "\n\n".join(f"paragraph {i} " + "word " * 50 for i in range(20))
+        chunks = chunk_text(text, size=600)
+        assert all(len(c) <= 600 for c in chunks)
+        assert "".join(chunks).replace(" ", "").replace("\n", "") == text.replace(" ", "").replace("\n", "")
+
+    def test_chunk_text_long_line(self):
+        chunks = chunk_text("x" * 2500, size=1000)
+        assert [len(c) for c in chunks] == [1000, 1000, 500]
+
+    def test_snippet(self):
+        marked = " ".join(["word"] * 30 + ["\x01lamp\x02"] + ["word"] * 30)
+        text = snippet(marked, words=10)
+        assert text.startswith("...") and text.endswith("...")
+        assert "[lamp]" in text
+
+
+class TestSearch:
+    def test_all_words_ranked(self, index):
+        index.add_messages(messages(
+            "Turn the desk lamp on",
+            "The enclosure needs a hinge",
+            "Make the enclosure lid wider, the hinge too",
+            "What's for dinner"
+        ))
+        results = index.search("enclosure hinge")
+        assert [r["snippet"] for r in results] == [
+            "The [enclosure] needs a [hinge]",
+            "Make the [enclosure] lid wider, the [hinge] too"
+        ]
+        assert results[0]["kind"] == "chat"
+        assert results[0]["timestamp"] == 1001.0
+
+    def test_falls_back_to_any_word(self, index):
+        index.add_messages(messages("The enclosure needs a hinge", "Desk lamp at fifty percent"))
+        results = index.search("lamp spaceship")
+        assert len(results) == 1
+        assert "[lamp]" in results[0]["snippet"]
+
+    def test_stemming(self, index):
+        index.add_messages(messages("Printing the brackets now"))
+        assert len(index.search("bracket print")) == 1
+
+    def test_no_match(self, index):
+        index.add_messages(messages("hello"))
+        assert index.search("spaceship") == []
+        assert index.search("") == []
+
+    def test_limit_and_newest_candidates(self, index, monkeypatch):
+        import memory_index
+        monkeypatch.setattr(memory_index, "CANDIDATES", 10)
+        index.add_messages(messages(*[f"lamp message {i}" for i in range(100)]))
+        results = index.search("lamp", limit=3)
+        assert len(results) == 3
+        assert all(r["timestamp"] >= 1090.0 for r in results)
+
+    def test_files(self, index, tmp_path):
+        root = tmp_path / "project"
+        root.mkdir()
+        (root / "notes.md").write_text("# Lid\n\nThe hinge uses M3 screws.\n")
+        (root / "model.stl").write_bytes(b"\0" * 10)
+        assert index.sync_files(root, ["notes.md", "model.stl"]) == 1
+        assert index.sync_files(root, ["notes.md", "model.stl"]) == 0
+        result = index.search("hinge screws")[0]
+        assert result["kind"] == "file" and result["path"] == "notes.md"
+
+        stat = (root / "notes.md").stat()
+        (root / "notes.md").write_text("# Lid\n\nThe hinge uses M4 bolts now.\n")
+        os.utime(root / "notes.md", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+        assert index.index_file(root, "notes.md")
+        assert index.search("screws") == []
+        assert len(index.search("bolts")) == 1
+
+        (root / "notes.md").unlink()
+        assert index.sync_files(root, ["model.stl"]) == 1
+        assert index.search("bolts") == []
+
+    def test_format_results(self):
+        assert format_results([]) == "No matching memories found in this project."
+        text = format_results([{"kind": "file", "path": "a.md", "snippet": "[x]", "score": -1.0}])
+        assert text == "1. [file a.md] [x]"
+
+
+class TestProjectManagerMemory:
+    def test_log_chat_is_searchable(self, tmp_path):
+        project_manager = ProjectManager(str(tmp_path))
+        project_manager.log_chat("User", "Print the hinge in PETG")
+        project_manager.log_chat("JARVIS", "Sending the hinge to the Prusa")
+        results = project_manager.search_memory("hinge petg")
+        assert len(results) == 1
+        assert results[0]["sender"] == "User"
+
+    def test_existing_log_is_backfilled_once(self, tmp_path):
+        project_manager = ProjectManager(str(tmp_path))
+        project_manager.create_project("lamp")
+        project_path = project_manager.projects_dir / "lamp"
+        with open(project_path / "chat_history.jsonl", "w") as f:
+            for entry in messages("Old talk about the thermistor", "More old talk"):
+                f.write(json.dumps(entry) + "\n")
+        project_manager.switch_project("lamp")
+        project_manager.log_chat("User", "New thermistor question")
+        assert len(project_manager.search_memory("thermistor", limit=10)) == 2
+        assert project_manager.memory_index().message_count == 3
+
+    def test_files_are_searchable_and_index_is_hidden(self, tmp_path):
+        project_manager = ProjectManager(str(tmp_path))
+        project_path = project_manager.get_current_project_path()
+        (project_path / "plan.md").write_text("Use a 40 mm heatsink on the driver board.\n")
+        assert project_manager.search_memory("heatsink")[0]["path"] == "plan.md"
+        assert (project_path / INDEX_NAME).exists()
+        assert INDEX_NAME not in project_manager.get_project_context()
+
+    def test_files_resync_is_throttled(self, tmp_path, monkeypatch):
+        import project_manager as project_manager_module
+        project_manager = ProjectManager(str(tmp_path))
+        project_path = project_manager.get_current_project_path()
+        assert project_manager.search_memory("heatsink") == []
+        # Changed outside write_file: not walked for again until MEMORY_RESYNC_S passes
+        (project_path / "plan.md").write_text("Use a 40 mm heatsink on the driver board.\n")
+        assert project_manager.search_memory("heatsink") == []
+        # What write_file saves is indexed through its hook right away
+        (project_path / "wiring.md").write_text("Route the fan cable past the heatsink.\n")
+        project_manager.index_file(project_path / "wiring.md")
+        assert [r["path"] for r in project_manager.search_memory("heatsink")] == ["wiring.md"]
+        monkeypatch.setattr(project_manager_module, "MEMORY_RESYNC_S", 0.0)
+        assert sorted(r["path"] for r in project_manager.search_memory("heatsink")) == ["plan.md", "wiring.md"]
+
+    def test_index_file_outside_project(self, tmp_path):
+        project_manager = ProjectManager(str(tmp_path))
+        assert project_manager.index_file(tmp_path / "elsewhere.md") is False
+
+    @pytest.mark.asyncio
+    async def test_journal_indexes_written_entries(self, tmp_path):
+        project_manager = ProjectManager(str(tmp_path))
+        journal = ChatJournal(project_manager.chat_history, on_written=project_manager.index_chat_entries)
+        journal.log(*project_manager.chat_log_entry("User", "Calibrate the extruder"))
+        await journal.close()
+        assert len(project_manager.search_memory("extruder")) == 1
+
+
+class TestMemoryIndexBench:
+    def test_memory_index_bench(self):
+        from bench.memory_index_bench import run_benchmark
+        report = run_benchmark(sizes=(500,), repeat=2)
+        result = report["results"][0]
+        assert result["messages"] == 500
+        assert result["scan_avg_ms"] is not None
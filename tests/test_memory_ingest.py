@@ -0,0 +1,163 @@
+"""
+Tests for chunked memory upload ingestion.
+"""
+
+import pytest
+import json
+from datetime import datetime, timedelta
+
+from memory_index import MemoryIndex, INDEX_NAME
+from memory_ingest import MemoryIngest, parse_line, parse_timestamp, content_hash
+from project_context import estimate_tokens
+
+
+@pytest.fixture
+def index(tmp_path):
+    index = MemoryIndex(tmp_path / INDEX_NAME)
+    yield index
+    index.close()
+
+
+def feed_in_chunks(ingest, text, size):
+    for offset in range(0, len(text), size):
+        ingest.feed(text[offset:offset + size])
+
+
+class TestParsing:
+    def test_sender_lines(self):
+        assert parse_line("User: make it wider") == {"timestamp": None, "sender": "User", "text": "make it wider"}
+        assert parse_line("[ADA] Done.")["sender"] == "ADA"
+        assert parse_line("[2024-05-01 10:00] User: hello")["text"] == "hello"
+
+    def test_jsonl_records(self):
+        line = json.dumps({"timestamp": 5.0, "sender": "JARVIS", "text": "On it"})
+        assert parse_line(line) == {"timestamp": 5.0, "sender": "JARVIS", "text": "On it"}
+
+    def test_timestamps(self):
+        assert parse_timestamp(5) == 5.0
+        assert parse_timestamp("1700000000.5") == 1700000000.5
+        assert parse_timestamp("2024-01-01T10:00:00+00:00") == 1704103200.0
+        assert parse_timestamp("2024-01-01T10:00:00Z") == 1704103200.0
+        assert parse_timestamp("2024-01-01T10:00:00") == datetime(2024, 1, 1, 10).timestamp()
+        assert parse_timestamp("yesterday") is None
+        assert parse_timestamp(None) is None
+        assert parse_timestamp(True) is None
+        line = json.dumps({"timestamp": "2024-01-01T10:00:00Z", "sender": "User", "text": "hi"})
+        assert parse_line(line)["timestamp"] == 1704103200.0
+
+    def test_free_text(self):
+        assert parse_line("Just some notes without a speaker") is None
+        assert parse_line("") is None
+
+    def test_hash_ignores_case_and_spacing(self):
+        assert content_hash("User", "Make it  wider") == content_hash("user", "make it wider")
+        assert content_hash("User", "a") != content_hash("ADA", "a")
+
+
+class TestMemoryIngest:
+    def test_chunk_boundaries_do_not_split_messages(self, index):
+        text = "\n".join(f"User: message number {i} about the hinge" for i in range(100))
+        ingest = MemoryIngest(index)
+        feed_in_chunks(ingest, text, 37)
+        ingest.finish()
+        assert ingest.messages == 100
+        assert index.message_count == 100
+        assert len(index.search("message number 42 hinge")) >= 1
+
+    def test_duplicates_skipped_within_and_across_uploads(self, index):
+        text = "User: print the lid\nADA: Printing the lid\nuser:  Print the LID\n"
+        first = MemoryIngest(index)
+        first.feed(text)
+        first.finish()
+        assert (first.messages, first.duplicates) == (2, 1)
+
+        second = MemoryIngest(index)
+        second.feed(text + "User: and the base\n")
+        second.finish()
+        assert (second.messages, second.duplicates) == (1, 3)
+        assert index.message_count == 3
+
+    def test_free_text_becomes_passages(self, index):
+        text = "Workshop notes\nThe thermistor wiring was redone.\n\nUser: thanks\n"
+        ingest = MemoryIngest(index, name="notes.txt")
+        ingest.feed(text)
+        ingest.finish()
+        assert ingest.passages == 1
+        result = index.search("thermistor wiring")[0]
+        assert result["kind"] == "file" and result["path"] == "upload:notes.txt"
+
+    def test_plain_text_digest_has_no_recent_messages(self, index):
+        ingest = MemoryIngest(index, name="notes.txt")
+        ingest.feed("Workshop notes\nThe thermistor wiring was redone.\n")
+        digest = ingest.finish()
+        assert ingest.messages == 0
+        assert "The memory ends with:" not in digest
+        assert digest.endswith("follows.")
+
+    def test_size_limit(self, index):
+        ingest = MemoryIngest(index, max_bytes=100)
+        with pytest.raises(ValueError):
+            ingest.feed("User: " + "x" * 200)
+
+    def test_progress(self, index):
+        ingest = MemoryIngest(index, name="m.txt", total_bytes=40)
+        progress = ingest.feed("User: hello\nADA: hi\n")
+        assert progress["bytes"] == 20 and progress["percent"] == 50.0
+        assert not progress["finished"]
+        ingest.finish()
+        assert ingest.progress()["finished"]
+        with pytest.raises(ValueError):
+            ingest.feed("more")
+
+
+class TestDigest:
+    def make_log(self):
+        lines = []
+        for i in range(2000):
+            topic = "thermistor calibration" if 600 <= i < 650 else "lamp brightness"
+            lines.append(f"User: question {i} about {topic}")
+            lines.append(f"ADA: answer {i} about {topic}")
+        lines.append("User: the very last thing we said")
+        return "\n".join(lines)
+
+    def test_digest_is_bounded(self, index):
+        ingest = MemoryIngest(index, digest_tokens=500)
+        feed_in_chunks(ingest, self.make_log(), 4096)
+        digest = ingest.finish()
+        assert estimate_tokens(digest) <= 500
+        assert "4001 messages" in digest
+        assert "search_project_memory" in digest
+        assert "User: the very last thing we said" in digest
+
+    def test_relevant_sections_are_chosen(self, index):
+        ingest = MemoryIngest(index, digest_tokens=600)
+        feed_in_chunks(ingest, self.make_log(), 4096)
+        digest = ingest.finish("how did the thermistor calibration go")
+        assert "thermistor" in digest.split("Summary (in order):")[1]
+        assert "more sections are only in the index" in digest
+
+    def test_timestamped_log_covers_dates(self, index):
+        lines = [json.dumps({"timestamp": 1.7e9 + i * 60, "sender": "User", "text": f"note {i}"}) for i in range(10)]
+        ingest = MemoryIngest(index)
+        ingest.feed("\n".join(lines))
+        assert " It covers " in ingest.finish()
+
+    def test_string_timestamps(self, index):
+        start = datetime(2024, 1, 1, 10)
+        lines = [json.dumps({"timestamp": (start + timedelta(minutes=i)).isoformat(), "sender": "User",
+                             "text": f"note {i} about the hinge"}) for i in range(120)]
+        ingest = MemoryIngest(index)
+        ingest.feed("\n".join(lines))
+        digest = ingest.finish()
+        assert "120 messages" in digest
+        assert " It covers 2024-01-01 to 2024-01-01." in digest
+        assert "2024-01-01 10:00" in digest
+
+
+class TestMemoryIngestBench:
+    def test_memory_ingest_bench(self):
+        from bench.memory_ingest_bench import run_benchmark
+        report = run_benchmark(sizes=(0.2,), digest_tokens=1000)
+        result = report["results"][0]
+        assert result["digest_tokens"] <= 1000 < result["legacy_tokens"]
+        assert result["search_hits"] > 0
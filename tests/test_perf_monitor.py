@@ -0,0 +1,188 @@
+"""
+Tests for the event loop performance monitor.
+"""
+
+import pytest
+import asyncio
+import concurrent.futures
+import threading
+import time
+
+from perf_monitor import LatencyHistogram, LoopLagSampler, SlowCallbackMonitor, SamplingProfiler, PerfMonitor, executor_stats
+
+
+class TestLatencyHistogram:
+    def test_record_and_percentiles(self):
+        histogram = LatencyHistogram()
+        for _ in range(98):
+            histogram.record(0.3)
+        histogram.record(40)
+        histogram.record(9000)
+        stats = histogram.to_dict()
+        assert stats["count"] == 100
+        assert stats["p50_ms"] == 0.5
+        assert stats["p99_ms"] == 50
+        assert stats["max_ms"] == 9000
+        assert stats["buckets"]["overflow"] == 1
+
+    def test_empty(self):
+        assert LatencyHistogram().to_dict()["p99_ms"] == 0.0
+
+
+class TestLoopLagSampler:
+    @pytest.mark.asyncio
+    async def test_detects_blocked_loop(self):
+        sampler = LoopLagSampler(interval=0.01)
+        sampler.start(asyncio.get_running_loop())
+        await asyncio.sleep(0.03)
+        time.sleep(0.1)  # hold the loop
+        await asyncio.sleep(0.03)
+        await sampler.stop()
+        assert sampler.histogram.max_ms >= 50
+
+
+class TestSlowCallbackMonitor:
+    @pytest.mark.asyncio
+    async def test_records_slow_coroutine(self):
+        loop = asyncio.get_running_loop()
+        loop.slow_callback_duration = 0.02
+        monitor = SlowCallbackMonitor()
+        monitor.install(loop)
+
+        async def blocking_handler():
+            time.sleep(0.05)
+
+        try:
+            await asyncio.create_task(blocking_handler())
+            await asyncio.sleep(0)
+        finally:
+            monitor.uninstall()
+            loop.slow_callback_duration = 0.1
+
+        stats = monitor.to_dict()
+        assert stats["slow_callbacks"] >= 1
+        assert any("blocking_handler" in name for name in stats["by_name"])
+        assert not monitor.installed
+
+    @pytest.mark.asyncio
+    async def test_uninstall_restores_handle(self):
+        original = asyncio.Handle._run
+        monitor = SlowCallbackMonitor()
+        monitor.install(asyncio.get_running_loop())
+        assert asyncio.Handle._run is not original
+        monitor.uninstall()
+        assert asyncio.Handle._run is original
+
+
+class TestSamplingProfiler:
+    def test_samples_busy_thread(self):
+        stop = threading.Event()
+
+        def spin_for_profiler():
+            while not stop.is_set():
+                sum(range(1000))
+
+        thread = threading.Thread(target=spin_for_profiler)
+        thread.start()
+        try:
+            profile = SamplingProfiler(thread.ident, interval=0.002).run(0.2)
+        finally:
+            stop.set()
+            thread.join()
+        assert profile["samples"] > 10
+        assert "spin_for_profiler" in profile["folded"]
+
+
+class TestPerfMonitor:
+    @pytest.mark.asyncio
+    async def test_timed_handlers(self):
+        monitor = PerfMonitor()
+
+        async def handler(sid):
+            await asyncio.sleep(0.01)
+            return sid
+
+        def failing(sid):
+            raise ValueError(sid)
+
+        timed = monitor.timed("sio:handler", handler)
+        assert asyncio.iscoroutinefunction(timed)
+        assert await timed("abc") == "abc"
+        with pytest.raises(ValueError):
+            monitor.timed("sio:failing", failing)("abc")
+
+        stats = monitor.snapshot()["handlers"]
+        assert stats["sio:handler"]["count"] == 1
+        assert stats["sio:handler"]["max_ms"] >= 5
+        assert stats["sio:failing"]["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_instrument_socketio(self):
+        socketio = pytest.importorskip("socketio")
+        sio = socketio.AsyncServer(async_mode="asgi")
+        calls = []
+
+        @sio.event
+        async def ping(sid, data=None):
+            calls.append(data)
+
+        monitor = PerfMonitor()
+        monitor.instrument_socketio(sio)
+        await sio._trigger_event("ping", "/", "sid", {"x": 1})
+        assert calls == [{"x": 1}]
+        assert monitor.snapshot()["handlers"]["sio:ping"]["count"] == 1
+
+    @pytest.mark.asyncio
+    async def test_instrument_socketio_legacy_signatures(self):
+        """Handlers that take fewer arguments than socketio passes run and count once."""
+        socketio = pytest.importorskip("socketio")
+        sio = socketio.AsyncServer(async_mode="asgi")
+        calls = []
+
+        @sio.event
+        async def connect(sid, environ):
+            calls.append(("connect", sid))
+
+        @sio.event
+        def disconnect(sid):
+            calls.append(("disconnect", sid))
+
+        monitor = PerfMonitor()
+        monitor.instrument_socketio(sio)
+        await sio._trigger_event("connect", "/", "sid", {}, {"token": "x"})
+        await sio._trigger_event("disconnect", "/", "sid", "client disconnect")
+        assert calls == [("connect", "sid"), ("disconnect", "sid")]
+        handlers = monitor.snapshot()["handlers"]
+        for event in ("connect", "disconnect"):
+            assert handlers[f"sio:{event}"]["count"] == 1
+            assert handlers[f"sio:{event}"]["errors"] == 0
+
+    @pytest.mark.asyncio
+    async def test_start_snapshot_and_profile(self):
+        monitor = PerfMonitor(lag_interval=0.01, slow_callback_ms=50)
+        monitor.start()
+        try:
+            assert asyncio.get_running_loop().slow_callback_duration == 0.05
+            await asyncio.sleep(0.05)
+            profile = await monitor.profile(0.1, interval=0.005)
+            snapshot = monitor.snapshot()
+        finally:
+            await monitor.stop()
+        assert snapshot["loop_lag"]["count"] > 0
+        assert snapshot["slow_callbacks"]["installed"]
+        assert "default" in snapshot["executors"]  # to_thread created the default executor
+        assert profile["samples"] > 0
+
+    def test_executor_stats(self):
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=1)
+        gate = threading.Event()
+        try:
+            executor.submit(gate.wait)
+            executor.submit(gate.wait)
+            time.sleep(0.05)
+            stats = executor_stats(executor)
+            assert stats["queued"] == 1
+            assert stats["threads"] == 1
+        finally:
+            gate.set()
+            executor.shutdown()
@@ -0,0 +1,181 @@
+"""
+Tests for the incremental, token-budgeted project context.
+"""
+
+import pytest
+import os
+import json
+import threading
+
+from project_context import ProjectContext, estimate_tokens, summarize
+from project_manager import ProjectManager
+
+
+@pytest.fixture
+def project(tmp_path):
+    root = tmp_path / "project"
+    (root / "cad").mkdir(parents=True)
+    (root / "enclosure.py").write_text("class Enclosure:\n    def widen(self, mm):\n        pass\n")
+    (root / "notes.md").write_text("# Printing\n\nUse PETG for the lamp shade.\n")
+    (root / "cad" / "lid.stl").write_bytes(b"\0" * 100)
+    (root / "chat_history.jsonl").write_text(json.dumps({"timestamp": 1.0, "sender": "User", "text": "hi"}) + "\n")
+    return root
+
+
+def touch(path, text):
+    """Rewrite a file and move its mtime forward so the change is seen on coarse clocks"""
+    stat = path.stat()
+    path.write_text(text)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10_000_000))
+
+
+class TestManifest:
+    def test_chat_logs_are_not_files(self, project):
+        context = ProjectContext(project)
+        context.refresh()
+        assert sorted(context.entries) == sorted(["enclosure.py", "notes.md", os.path.join("cad", "lid.stl")])
+
+    def test_unchanged_files_are_not_reread(self, project):
+        context = ProjectContext(project)
+        assert context.refresh() == 3
+        assert context.reads == 2
+        version = context.version
+        assert context.refresh() == 0
+        assert context.reads == 2
+        assert context.version == version
+
+    def test_only_changed_files_are_reread(self, project):
+        context = ProjectContext(project)
+        context.refresh()
+        touch(project / "notes.md", "# Printing\n\nUse PLA now.\n")
+        (project / "enclosure.py").unlink()
+        (project / "new.txt").write_text("new file")
+        assert context.refresh() == 3
+        assert context.reads == 4
+        assert "enclosure.py" not in context.entries
+        assert "PLA" in context.entries["notes.md"].content
+
+    def test_shared_between_threads(self, project):
+        """Test paths() and build() while another thread keeps changing the manifest."""
+        context = ProjectContext(project)
+        context.refresh()
+        stop = threading.Event()
+
+        def churn():
+            n = 0
+            while not stop.is_set():
+                (project / f"scratch{n % 50}.txt").write_text(str(n))
+                context.refresh()
+                if n % 50 == 49:
+                    for path in project.glob("scratch*.txt"):
+                        path.unlink()
+                n += 1
+
+        thread = threading.Thread(target=churn)
+        thread.start()
+        try:
+            for i in range(200):
+                assert "notes.md" in context.paths()
+                assert "notes.md" in context.build("lamp", query=str(i))
+        finally:
+            stop.set()
+            thread.join()
+
+    def test_missing_root(self, tmp_path):
+        context = ProjectContext(tmp_path / "gone")
+        assert context.refresh() == 0
+        assert context.entries == {}
+
+
+class TestSummaries:
+    def test_python_outline(self):
+        assert summarize("a.py", "import os\n\nclass A:\n    def b(self):\n        pass\n", 50) == "class A:; def b(self):"
+
+    def test_markdown_headings(self):
+        assert summarize("a.md", "# Title\ntext\n## Section\n", 30) == "# Title; ## Section"
+
+    def test_json_keys(self):
+        assert summarize("a.json", '{"infill": 20, "material": "PETG"}', 30) == "keys: infill, material"
+
+    def test_binary(self):
+        assert summarize("lid.stl", None, 100) == "STL file, 100 bytes"
+
+
+class TestBuild:
+    def test_unbudgeted_includes_everything(self, project):
+        context = ProjectContext(project)
+        context.refresh()
+        text = context.build("demo")
+        assert "=== Project Context: 'demo' ===" in text
+        assert "--- enclosure.py ---" in text
+        assert "Use PETG for the lamp shade." in text
+        assert "chat_history" not in text
+
+    def test_large_files_are_summarized(self, project):
+        (project / "big.py").write_text("def helper():\n    pass\n" * 1000)
+        context = ProjectContext(project, max_file_size=1000)
+        context.refresh()
+        text = context.build("demo")
+        assert "--- big.py (summary," in text
+        assert "def helper():" in text
+
+    def test_budget_is_respected(self, project):
+        for i in range(50):
+            (project / f"part_{i}.py").write_text(f"def part_{i}():\n    return {i}\n" * 40)
+        context = ProjectContext(project)
+        context.refresh()
+        text = context.build("demo", budget_tokens=1000)
+        assert estimate_tokens(text) <= 1100
+        assert "more files left out to fit 1000 tokens" in text
+
+    def test_relevant_files_first(self, project):
+        for i in range(30):
+            (project / f"filler_{i}.txt").write_text("unrelated words " * 50)
+        context = ProjectContext(project)
+        context.refresh()
+        text = context.build("demo", budget_tokens=500, query="what material for the lamp shade?")
+        assert "Use PETG for the lamp shade." in text
+
+    def test_recent_chat_is_included(self, project):
+        context = ProjectContext(project)
+        context.refresh()
+        chat = [{"timestamp": 1.0, "sender": "User", "text": "widen the enclosure"}]
+        text = context.build("demo", recent_chat=chat)
+        assert "Recent conversation:\n  User: widen the enclosure" in text
+
+    def test_build_is_reused_until_something_changes(self, project):
+        context = ProjectContext(project)
+        context.refresh()
+        first = context.build("demo", 2000)
+        assert context.build("demo", 2000) is first
+        touch(project / "notes.md", "# Printing\n\nUse ASA.\n")
+        context.refresh()
+        assert "Use ASA." in context.build("demo", 2000)
+
+
+class TestProjectManagerContext:
+    def test_get_project_context(self, tmp_path):
+        project_manager = ProjectManager(str(tmp_path), context_budget_tokens=2000)
+        project_path = project_manager.get_current_project_path()
+        (project_path / "readme.md").write_text("# Lamp\n")
+        project_manager.log_chat("User", "Tell me about the lamp")
+        text = project_manager.get_project_context()
+        assert "=== Project Context: 'temp' ===" in text
+        assert "--- readme.md ---" in text
+        assert "User: Tell me about the lamp" in text
+        assert project_manager.project_context().get_metrics()["files"] == 1
+
+    def test_missing_project(self, tmp_path):
+        project_manager = ProjectManager(str(tmp_path))
+        project_manager.current_project = "nope"
+        assert project_manager.get_project_context() == "Project 'nope' does not exist."
+
+
+class TestProjectContextBench:
+    def test_project_context_bench(self):
+        from bench.project_context_bench import run_benchmark
+        report = run_benchmark(files=(40,), budget=2000, chat_mb=0.01)
+        result = report["results"][0]
+        assert result["warm_reads"] == 0
+        assert result["changed_reads"] == 1
+        assert result["context_tokens"] <= 2200
@@ -20,6 +20,22 @@ MODULES = {
     "web": "test_web_agent.py",
     "auth": "test_authenticator.py",
     "tools": "test_ada_tools.py",
+    "audio": "test_audio_processor.py",
+    "playback": "test_audio_playback.py",
+    "capture": "test_audio_capture.py",
+    "recorder": "test_audio_recorder.py",
+    "bench": "test_audio_bench.py",
+    "scheduler": "test_session_scheduler.py",
+    "frames": "test_frame_pipeline.py",
+    "dispatch": "test_tool_dispatch.py",
+    "transcript": "test_transcript.py",
+    "perf": "test_perf_monitor.py",
+    "logging": "test_log_config.py",
+    "history": "test_chat_history.py",
+    "journal": "test_chat_journal.py",
+    "context": "test_project_context.py",
+    "memory": "test_memory_index.py",
+    "ingest": "test_memory_ingest.py",
 }
 
 TESTS_DIR = Path(__file__).parent
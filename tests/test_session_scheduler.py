@@ -0,0 +1,224 @@
+"""
+Tests for the outbound session scheduler.
+"""
+import pytest
+import asyncio
+import time
+
+from session_scheduler import OutboundScheduler
+
+
+def audio(n: int = 0) -> dict:
+    return {"data": bytes([n]) * 2048, "mime_type": "audio/pcm"}
+
+
+def frame(n: int = 0) -> dict:
+    return {"data": f"jpeg-{n}", "mime_type": "image/jpeg"}
+
+
+class TestLanes:
+    """Tests for classification and priority."""
+
+    def test_classify(self):
+        """Test messages map to lanes by mime type."""
+        assert OutboundScheduler.classify(audio()) == "audio"
+        assert OutboundScheduler.classify(frame()) == "video"
+        assert OutboundScheduler.classify("hello") == "control"
+
+    @pytest.mark.asyncio
+    async def test_audio_goes_first(self):
+        """Test audio queued after a frame is still sent before it."""
+        scheduler = OutboundScheduler()
+        await scheduler.put(frame())
+        await scheduler.put("note")
+        await scheduler.put(audio(1))
+        await scheduler.put(audio(2))
+
+        order = [await scheduler.get() for _ in range(4)]
+        assert order == [audio(1), audio(2), "note", frame()]
+
+    @pytest.mark.asyncio
+    async def test_get_waits_for_put(self):
+        """Test get() parks until something is queued."""
+        scheduler = OutboundScheduler()
+        getter = asyncio.ensure_future(scheduler.get())
+        await asyncio.sleep(0.01)
+        assert not getter.done()
+        await scheduler.put(audio(3))
+        assert await asyncio.wait_for(getter, timeout=1.0) == audio(3)
+
+
+class TestDropping:
+    """Tests for overflow and stale-frame handling."""
+
+    @pytest.mark.asyncio
+    async def test_audio_never_blocks(self):
+        """Test a full audio lane drops the oldest chunk instead of blocking."""
+        scheduler = OutboundScheduler(audio_maxsize=4)
+        for i in range(10):
+            await asyncio.wait_for(scheduler.put(audio(i)), timeout=0.1)
+        assert scheduler.qsize() == 4
+        assert [await scheduler.get() for _ in range(4)] == [audio(i) for i in range(6, 10)]
+        assert scheduler.get_metrics()["audio"]["dropped"] == 6
+
+    @pytest.mark.asyncio
+    async def test_latest_frame_wins(self):
+        """Test a newer frame replaces one still waiting."""
+        scheduler = OutboundScheduler()
+        await scheduler.put(frame(1))
+        await scheduler.put(frame(2))
+        assert await scheduler.get() == frame(2)
+        assert scheduler.get_metrics()["video"]["dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_stale_frame_dropped(self):
+        """Test a frame older than the age limit is discarded."""
+        scheduler = OutboundScheduler(video_max_age_s=0.02)
+        await scheduler.put(frame(1))
+        await asyncio.sleep(0.05)
+        await scheduler.put(audio(1))
+        assert await scheduler.get() == audio(1)
+        assert scheduler.get_nowait_or_none() is None
+        assert scheduler.get_metrics()["video"]["dropped"] == 1
+
+    @pytest.mark.asyncio
+    async def test_control_backpressure(self):
+        """Test a full control lane makes put() wait rather than drop."""
+        scheduler = OutboundScheduler(control_maxsize=2)
+        await scheduler.put("a")
+        await scheduler.put("b")
+        with pytest.raises(asyncio.QueueFull):
+            scheduler.put_nowait("c")
+        putter = asyncio.ensure_future(scheduler.put("c"))
+        await asyncio.sleep(0.01)
+        assert not putter.done()
+        assert await scheduler.get() == "a"
+        await asyncio.wait_for(putter, timeout=1.0)
+        assert [await scheduler.get() for _ in range(2)] == ["b", "c"]
+
+
+class TestMetrics:
+    """Tests for per-lane metrics."""
+
+    @pytest.mark.asyncio
+    async def test_depth_and_wait(self):
+        """Test depth, max depth and wait times are tracked per lane."""
+        scheduler = OutboundScheduler()
+        for i in range(3):
+            await scheduler.put(audio(i))
+        await asyncio.sleep(0.02)
+        metrics = scheduler.get_metrics()["audio"]
+        assert metrics["depth"] == 3
+        assert metrics["max_depth"] == 3
+
+        for _ in range(3):
+            await scheduler.get()
+        metrics = scheduler.get_metrics()["audio"]
+        assert metrics["depth"] == 0
+        assert metrics["sent"] == 3
+        assert metrics["avg_wait_ms"] >= 15.0
+
+    @pytest.mark.asyncio
+    async def test_audio_latency_behind_frames(self):
+        """Compare mic chunk wait behind large frames: FIFO queue vs scheduler."""
+        async def run(queue):
+            waits = []
+
+            async def producer():
+                for i in range(40):
+                    await queue.put({"data": b"x" * 2048, "mime_type": "audio/pcm", "t": time.monotonic()})
+                    if i % 5 == 0:
+                        await queue.put({"data": "y" * 100_000, "mime_type": "image/jpeg", "t": time.monotonic()})
+                    await asyncio.sleep(0.002)
+
+            async def sender():
+                sent = 0
+                while sent < 40:
+                    msg = await queue.get()
+                    if msg["mime_type"] == "audio/pcm":
+                        waits.append(time.monotonic() - msg["t"])
+                        sent += 1
+                        await asyncio.sleep(0.0005)
+                    else:
+                        await asyncio.sleep(0.01)  # a 100 KB upload
+
+            await asyncio.gather(producer(), sender())
+            return max(waits) * 1000.0
+
+        fifo_ms = await run(asyncio.Queue(maxsize=10))
+        lanes_ms = await run(OutboundScheduler())
+        print(f"\nWorst mic chunk wait: FIFO {fifo_ms:.1f} ms, scheduler {lanes_ms:.1f} ms")
+        assert lanes_ms < fifo_ms
+
+
+class TestAudioCoalescing:
+    """Tests for batching consecutive mic chunks."""
+
+    @pytest.mark.asyncio
+    async def test_off_by_default(self):
+        """Test each chunk is its own message without a window."""
+        scheduler = OutboundScheduler()
+        await scheduler.put(audio(1))
+        await scheduler.put(audio(2))
+        assert await scheduler.get() == audio(1)
+
+    def test_window_clamped(self):
+        """Test the window is limited to 20-200 ms."""
+        assert OutboundScheduler(audio_window_ms=5).audio_window_ms == 20.0
+        assert OutboundScheduler(audio_window_ms=500).audio_window_ms == 200.0
+        assert OutboundScheduler(audio_window_ms=0).audio_window_ms == 0.0
+
+    @pytest.mark.asyncio
+    async def test_merges_up_to_window(self):
+        """Test chunks are merged once a window's worth is buffered."""
+        scheduler = OutboundScheduler(audio_window_ms=128)  # two 64 ms chunks
+        for i in range(4):
+            await scheduler.put(audio(i))
+        first = await asyncio.wait_for(scheduler.get(), timeout=0.05)
+        second = await asyncio.wait_for(scheduler.get(), timeout=0.05)
+        assert first == {"data": audio(0)["data"] + audio(1)["data"], "mime_type": "audio/pcm"}
+        assert second["data"] == audio(2)["data"] + audio(3)["data"]
+        metrics = scheduler.get_metrics()["audio"]
+        assert metrics["sent"] == 4
+        assert metrics["messages"] == 2
+
+    @pytest.mark.asyncio
+    async def test_partial_batch_released_at_deadline(self):
+        """Test a lone chunk goes out after waiting one window."""
+        scheduler = OutboundScheduler(audio_window_ms=100)
+        await scheduler.put(audio(1))
+        start = time.monotonic()
+        assert await asyncio.wait_for(scheduler.get(), timeout=1.0) == audio(1)
+        assert 0.08 <= time.monotonic() - start < 0.5
+
+    @pytest.mark.asyncio
+    async def test_flush_releases_immediately(self):
+        """Test flush_audio() (speech onset/offset) skips the window."""
+        scheduler = OutboundScheduler(audio_window_ms=200)
+        await scheduler.put(audio(1))
+        getter = asyncio.ensure_future(scheduler.get())
+        await asyncio.sleep(0.01)
+        assert not getter.done()
+        scheduler.flush_audio()
+        assert await asyncio.wait_for(getter, timeout=0.05) == audio(1)
+
+    @pytest.mark.asyncio
+    async def test_other_lanes_served_while_filling(self):
+        """Test a frame is not held behind an audio batch that is not due."""
+        scheduler = OutboundScheduler(audio_window_ms=200)
+        await scheduler.put(audio(1))
+        await scheduler.put(frame(1))
+        assert await asyncio.wait_for(scheduler.get(), timeout=0.05) == frame(1)
+
+    @pytest.mark.asyncio
+    async def test_session_bench(self):
+        """Benchmark messages/sec and send CPU with and without coalescing."""
+        from bench.session_bench import run_benchmark
+        report = await run_benchmark([0, 200], seconds=1.0)
+        off, on = report["results"]
+        for r in report["results"]:
+            print(f"\nwindow {r['window_ms']:.0f} ms: {r['messages_per_sec']:.1f} msgs/s, "
+                  f"send CPU {r['send_cpu_ms_per_audio_sec']:.3f} ms/s, max wait {r['max_added_latency_ms']:.0f} ms")
+        assert off["messages_per_sec"] > 14
+        assert on["messages_per_sec"] < off["messages_per_sec"] / 2
+        assert on["max_added_latency_ms"] < 260
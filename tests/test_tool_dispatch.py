@@ -0,0 +1,403 @@
+"""
+Tests for the registry-based tool dispatcher.
+"""
+import pytest
+import asyncio
+import time
+
+from google.genai import types
+
+from tool_dispatch import ToolDispatcher, ToolSpec, CONFIRM_ALWAYS, CONFIRM_NEVER
+
+
+def call(name: str, call_id: str = "1", **args) -> types.FunctionCall:
+    return types.FunctionCall(id=call_id, name=name, args=args)
+
+
+class Session:
+    """Collects send_tool_response batches"""
+
+    def __init__(self):
+        self.batches = []
+        self.sent = asyncio.Event()
+
+    async def send(self, responses):
+        self.batches.append([(r.id, r.name, r.response["result"]) for r in responses])
+        self.sent.set()
+
+    @property
+    def responses(self):
+        return [response for batch in self.batches for response in batch]
+
+    async def wait(self, count: int, timeout: float = 1.0):
+        async def _wait():
+            while len(self.batches) < count:
+                self.sent.clear()
+                await self.sent.wait()
+        await asyncio.wait_for(_wait(), timeout)
+
+    async def wait_responses(self, count: int, timeout: float = 1.0):
+        async def _wait():
+            while len(self.responses) < count:
+                self.sent.clear()
+                await self.sent.wait()
+        await asyncio.wait_for(_wait(), timeout)
+
+
+class Confirmer:
+    """Answers batch confirmation prompts with a fixed decision (or per tool), optionally after a delay"""
+
+    def __init__(self, answer=True, delay: float = 0.0):
+        self.answer = answer
+        self.delay = delay
+        self.prompts = []
+
+    @property
+    def asked(self):
+        return [(c["tool"], c["args"]) for prompt in self.prompts for c in prompt]
+
+    async def __call__(self, calls):
+        self.prompts.append(calls)
+        await asyncio.sleep(self.delay)
+        if isinstance(self.answer, dict):
+            return [self.answer.get(c["tool"], False) for c in calls]
+        return [self.answer] * len(calls)
+
+
+async def echo(args):
+    return f"echo {args.get('text', '')}"
+
+
+async def slow(args):
+    await asyncio.sleep(args.get("seconds", 0.2))
+    return "slow done"
+
+
+def make(confirm=None, permissions=None, *specs):
+    session = Session()
+    dispatcher = ToolDispatcher(session.send, request_confirmation=confirm, permissions=permissions)
+    for spec in specs:
+        dispatcher.register(spec)
+    return dispatcher, session
+
+
+class TestDispatch:
+    """Tests for inline and background execution."""
+
+    @pytest.mark.asyncio
+    async def test_blocking_tools_batched_inline(self):
+        """Test quick tools answer in one batch before dispatch() returns."""
+        dispatcher, session = make(None, None, ToolSpec("echo", echo))
+        responses = await dispatcher.dispatch([call("echo", "a", text="x"), call("echo", "b", text="y")])
+        assert [r.id for r in responses] == ["a", "b"]
+        assert session.batches == [[("a", "echo", "echo x"), ("b", "echo", "echo y")]]
+
+    @pytest.mark.asyncio
+    async def test_background_tool_does_not_block(self):
+        """Test a slow tool returns control immediately and responds when done."""
+        dispatcher, session = make(None, None, ToolSpec("slow", slow, blocking=False))
+        start = time.monotonic()
+        await dispatcher.dispatch([call("slow", "s")])
+        assert time.monotonic() - start < 0.05
+        assert dispatcher.pending == 1
+        assert session.batches == []
+
+        await session.wait(1)
+        assert session.batches == [[("s", "slow", "slow done")]]
+        await asyncio.sleep(0)
+        assert dispatcher.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_mixed_batch(self):
+        """Test inline responses go out without waiting for background ones."""
+        dispatcher, session = make(None, None, ToolSpec("echo", echo), ToolSpec("slow", slow, blocking=False))
+        await dispatcher.dispatch([call("slow", "s"), call("echo", "e", text="hi")])
+        assert session.batches == [[("e", "echo", "echo hi")]]
+        await session.wait(2)
+        assert session.batches[1] == [("s", "slow", "slow done")]
+
+    @pytest.mark.asyncio
+    async def test_unknown_tool_ignored(self):
+        """Test calls without a registered handler are skipped."""
+        dispatcher, session = make(None, None, ToolSpec("echo", echo))
+        assert await dispatcher.dispatch([call("nope")]) == []
+        assert session.batches == []
+
+    @pytest.mark.asyncio
+    async def test_no_response_tools(self):
+        """Test handlers returning None send nothing (they report another way)."""
+        async def notify(args):
+            return None
+        dispatcher, session = make(None, None, ToolSpec("notify", notify))
+        assert await dispatcher.dispatch([call("notify")]) == []
+        assert session.batches == []
+
+    @pytest.mark.asyncio
+    async def test_receive_loop_keeps_flowing(self):
+        """Test model audio keeps being handled while a 0.3 s tool runs."""
+        dispatcher, session = make(None, None, ToolSpec("slow", slow, blocking=False))
+        handled = []
+
+        async def receive_loop():
+            for i in range(30):
+                if i == 5:
+                    await dispatcher.dispatch([call("slow", "s", seconds=0.3)])
+                handled.append(time.monotonic())
+                await asyncio.sleep(0.01)
+
+        await receive_loop()
+        gaps = [b - a for a, b in zip(handled, handled[1:])]
+        assert max(gaps) < 0.1
+        await session.wait(1)
+
+
+class TestConfirmation:
+    """Tests for confirmation policies."""
+
+    @pytest.mark.asyncio
+    async def test_permission_default_asks(self):
+        """Test tools ask by default and run once confirmed."""
+        confirmer = Confirmer(True)
+        dispatcher, session = make(confirmer, {}, ToolSpec("echo", echo))
+        await dispatcher.dispatch([call("echo", "a", text="x")])
+        await session.wait(1)
+        assert confirmer.asked == [("echo", {"text": "x"})]
+        assert session.batches == [[("a", "echo", "echo x")]]
+
+    @pytest.mark.asyncio
+    async def test_denied(self):
+        """Test a denied call gets the denial response and the handler never runs."""
+        ran = []
+
+        async def handler(args):
+            ran.append(args)
+            return "ran"
+        dispatcher, session = make(Confirmer(False), {}, ToolSpec("tool", handler))
+        await dispatcher.dispatch([call("tool", "a")])
+        await session.wait(1)
+        assert session.batches == [[("a", "tool", ToolDispatcher.DENIED)]]
+        assert ran == []
+        assert dispatcher.get_metrics()["tools"]["tool"]["denied"] == 1
+
+    @pytest.mark.asyncio
+    async def test_permission_turned_off(self):
+        """Test tool_permissions False skips the prompt and runs inline."""
+        confirmer = Confirmer(True)
+        permissions = {}
+        dispatcher, session = make(confirmer, permissions, ToolSpec("echo", echo))
+        permissions["echo"] = False  # shared dict, like AudioLoop.update_permissions
+        responses = await dispatcher.dispatch([call("echo", "a", text="x")])
+        assert len(responses) == 1
+        assert confirmer.asked == []
+
+    @pytest.mark.asyncio
+    async def test_always_and_never(self):
+        """Test fixed policies ignore tool_permissions."""
+        confirmer = Confirmer(True)
+        permissions = {"always": False, "never": True}
+        dispatcher, session = make(confirmer, permissions,
+                                   ToolSpec("always", echo, confirm=CONFIRM_ALWAYS),
+                                   ToolSpec("never", echo, confirm=CONFIRM_NEVER))
+        await dispatcher.dispatch([call("always", "a"), call("never", "n")])
+        await session.wait(2)
+        assert [name for name, _ in confirmer.asked] == ["always"]
+
+    @pytest.mark.asyncio
+    async def test_waiting_for_user_does_not_block(self):
+        """Test a pending confirmation does not hold up dispatch()."""
+        dispatcher, session = make(Confirmer(True, delay=0.3), {}, ToolSpec("echo", echo))
+        start = time.monotonic()
+        await dispatcher.dispatch([call("echo", "a")])
+        assert time.monotonic() - start < 0.05
+        await session.wait(1)
+
+    @pytest.mark.asyncio
+    async def test_no_confirmation_callback(self):
+        """Test tools just run when no confirmation UI is attached."""
+        dispatcher, session = make(None, {}, ToolSpec("echo", echo))
+        assert len(await dispatcher.dispatch([call("echo")])) == 1
+
+
+class TestFailures:
+    """Tests for timeouts, errors and task tracking."""
+
+    @pytest.mark.asyncio
+    async def test_timeout(self):
+        """Test a tool over its timeout is cancelled and answered with an error."""
+        dispatcher, session = make(None, None, ToolSpec("slow", slow, blocking=False, timeout=0.05))
+        await dispatcher.dispatch([call("slow", "s", seconds=5)])
+        await session.wait(1)
+        assert session.batches == [[("s", "slow", "Tool 'slow' timed out after 0.05 seconds.")]]
+        assert dispatcher.get_metrics()["tools"]["slow"]["timeouts"] == 1
+
+    @pytest.mark.asyncio
+    async def test_handler_error(self):
+        """Test an exception becomes an error response instead of killing the receive loop."""
+        async def broken(args):
+            raise RuntimeError("printer offline")
+        dispatcher, session = make(None, None, ToolSpec("broken", broken))
+        responses = await dispatcher.dispatch([call("broken", "b")])
+        assert responses[0].response["result"] == "Tool 'broken' failed: printer offline"
+        assert dispatcher.get_metrics()["tools"]["broken"]["errors"] == 1
+
+    @pytest.mark.asyncio
+    async def test_spawn_and_cancel_all(self):
+        """Test fire-and-forget tasks are tracked until done or cancelled."""
+        dispatcher, _ = make()
+        dispatcher.spawn(asyncio.sleep(10))
+        dispatcher.spawn(asyncio.sleep(10))
+        assert dispatcher.pending == 2
+        await dispatcher.cancel_all()
+        await asyncio.sleep(0)
+        assert dispatcher.pending == 0
+
+    @pytest.mark.asyncio
+    async def test_cancel_all_stops_deferred_calls(self):
+        """Test cancelling a session's calls stops pending chains and sends nothing for them."""
+        cancelled = asyncio.Event()
+
+        async def generate_cad(args):
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+            return "model ready"
+        dispatcher, session = make(Confirmer(True), {},
+                                   ToolSpec("generate_cad", generate_cad, blocking=False, timeout=None, group="project"),
+                                   ToolSpec("iterate_cad", echo, blocking=False, group="project"))
+        await dispatcher.dispatch([call("generate_cad", "g"), call("iterate_cad", "i")])
+        await asyncio.sleep(0.05)
+        assert dispatcher.pending == 1
+        await dispatcher.cancel_all()
+        assert cancelled.is_set()
+        assert dispatcher.pending == 0
+        await asyncio.sleep(0.05)
+        assert session.batches == []
+
+    @pytest.mark.asyncio
+    async def test_metrics(self):
+        """Test per-tool call counts and latency."""
+        dispatcher, session = make(None, None, ToolSpec("echo", echo))
+        await dispatcher.dispatch([call("echo"), call("echo")])
+        metrics = dispatcher.get_metrics()
+        assert metrics["pending"] == 0
+        assert metrics["tools"]["echo"]["calls"] == 2
+        assert metrics["tools"]["echo"]["max_ms"] >= 0.0
+
+
+class TestConcurrentBatches:
+    """Tests for running several function calls from one tool_call together."""
+
+    @pytest.mark.asyncio
+    async def test_background_calls_run_concurrently(self):
+        """Test two lights and a printer status take one round trip, not three."""
+        dispatcher, session = make(None, None,
+                                   ToolSpec("control_light", slow, blocking=False),
+                                   ToolSpec("get_print_status", slow, blocking=False))
+        start = time.monotonic()
+        await dispatcher.dispatch([call("control_light", "l1", seconds=0.2),
+                                   call("control_light", "l2", seconds=0.2),
+                                   call("get_print_status", "p1", seconds=0.2)])
+        await session.wait_responses(3)
+        assert time.monotonic() - start < 0.4
+        assert sorted(r[0] for r in session.responses) == ["l1", "l2", "p1"]
+
+    @pytest.mark.asyncio
+    async def test_responses_keep_call_order(self):
+        """Test responses follow the order of the calls, not completion order."""
+        async def sleepy(args):
+            await asyncio.sleep(args["seconds"])
+            return args["label"]
+        dispatcher, session = make(None, None, ToolSpec("sleepy", sleepy))
+        responses = await dispatcher.dispatch([call("sleepy", "a", seconds=0.06, label="a"),
+                                               call("sleepy", "b", seconds=0.0, label="b"),
+                                               call("sleepy", "c", seconds=0.03, label="c")])
+        assert [r.id for r in responses] == ["a", "b", "c"]
+
+    @pytest.mark.asyncio
+    async def test_per_call_timeouts(self):
+        """Test one call timing out does not hold back or fail the others."""
+        dispatcher, session = make(None, None,
+                                   ToolSpec("fast", slow, blocking=False, timeout=1.0),
+                                   ToolSpec("stuck", slow, blocking=False, timeout=0.05))
+        start = time.monotonic()
+        await dispatcher.dispatch([call("stuck", "s", seconds=5), call("fast", "f", seconds=0.01)])
+        await session.wait(2)
+        assert time.monotonic() - start < 0.5
+        assert session.batches == [[("f", "fast", "slow done")],
+                                   [("s", "stuck", "Tool 'stuck' timed out after 0.05 seconds.")]]
+
+    @pytest.mark.asyncio
+    async def test_group_runs_in_order(self):
+        """Test calls sharing a group run one after another, in call order."""
+        log = []
+
+        def recorder(name):
+            async def handler(args):
+                log.append(f"{name} start")
+                await asyncio.sleep(0.02)
+                log.append(f"{name} end")
+                return name
+            return handler
+        dispatcher, session = make(None, None,
+                                   ToolSpec("create_project", recorder("create"), group="project"),
+                                   ToolSpec("write_file", recorder("write"), group="project"),
+                                   ToolSpec("list_smart_devices", recorder("lights")))
+        await dispatcher.dispatch([call("create_project", "c"), call("list_smart_devices", "l"),
+                                   call("write_file", "w")])
+        assert log.index("create end") < log.index("write start")
+        # The ungrouped call overlapped with the project chain
+        assert log.index("lights start") < log.index("create end")
+
+    @pytest.mark.asyncio
+    async def test_one_prompt_per_batch(self):
+        """Test every call needing confirmation is asked about in a single prompt."""
+        confirmer = Confirmer(True)
+        dispatcher, session = make(confirmer, {"list_projects": False},
+                                   ToolSpec("control_light", echo, blocking=False),
+                                   ToolSpec("get_print_status", echo, blocking=False),
+                                   ToolSpec("list_projects", echo))
+        await dispatcher.dispatch([call("control_light", "l1"), call("control_light", "l2"),
+                                   call("get_print_status", "p1"), call("list_projects", "lp")])
+        await session.wait_responses(4)
+        assert len(confirmer.prompts) == 1
+        assert [c["call_id"] for c in confirmer.prompts[0]] == ["l1", "l2", "p1"]
+        assert dispatcher.get_metrics()["confirmation_prompts"] == 1
+        # Auto-allowed call answered inline, confirmed ones afterwards
+        assert [r[0] for r in session.batches[0]] == ["lp"]
+        assert sorted(r[0] for r in session.responses[1:]) == ["l1", "l2", "p1"]
+
+    @pytest.mark.asyncio
+    async def test_partial_approval(self):
+        """Test per-call decisions: denied calls get the denial, approved ones run, order kept."""
+        ran = []
+
+        async def handler(args):
+            ran.append(args["n"])
+            return f"ran {args['n']}"
+        confirmer = Confirmer({"light": True, "print": False})
+        dispatcher, session = make(confirmer, {},
+                                   ToolSpec("light", handler, blocking=False),
+                                   ToolSpec("print", handler, blocking=False))
+        await dispatcher.dispatch([call("print", "p", n=1), call("light", "l", n=2)])
+        await session.wait(2)
+        assert ran == [2]
+        # The denial is answered right after the prompt, before the approved call runs
+        assert session.batches == [[("p", "print", ToolDispatcher.DENIED)], [("l", "light", "ran 2")]]
+
+    @pytest.mark.asyncio
+    async def test_fast_call_not_held_by_slow_group(self):
+        """Test a quick call's response goes out before a long grouped call finishes."""
+        confirmer = Confirmer(True)
+        dispatcher, session = make(confirmer, {},
+                                   ToolSpec("iterate_cad", slow, blocking=False, timeout=None, group="project"),
+                                   ToolSpec("list_projects", echo))
+        start = time.monotonic()
+        await dispatcher.dispatch([call("iterate_cad", "cad", seconds=0.3), call("list_projects", "lp")])
+        await session.wait(1)
+        assert time.monotonic() - start < 0.2
+        assert session.batches[0] == [("lp", "list_projects", "echo ")]
+        await session.wait(2)
+        assert session.batches[1] == [("cad", "iterate_cad", "slow done")]
+        assert len(confirmer.prompts) == 1
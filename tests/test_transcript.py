@@ -0,0 +1,89 @@
+"""
+Tests for transcript assembly.
+"""
+
+import pytest
+
+from transcript import TranscriptStream, TranscriptAssembler
+
+
+class TestTranscriptStream:
+    """Delta computation for cumulative and chunked events"""
+
+    def test_cumulative_events(self):
+        stream = TranscriptStream()
+        assert stream.delta("Hello") == "Hello"
+        assert stream.delta("Hello there") == " there"
+        assert stream.delta("Hello there, ADA") == ", ADA"
+
+    def test_exact_repeat_is_empty(self):
+        stream = TranscriptStream()
+        stream.delta("Hello there")
+        assert stream.delta("Hello there") == ""
+
+    def test_chunked_events(self):
+        stream = TranscriptStream()
+        assert stream.delta("Hello") == "Hello"
+        assert stream.delta(" there") == " there"
+        assert stream.delta(" friend") == " friend"
+
+    def test_long_cumulative_text(self):
+        """Past ANCHOR characters only the tail is compared, deltas are still exact"""
+        stream = TranscriptStream()
+        text = ""
+        deltas = []
+        for i in range(200):
+            chunk = f"word{i} "
+            text += chunk
+            deltas.append(stream.delta(text))
+        assert "".join(deltas) == text
+
+    def test_mismatched_long_text_is_a_chunk(self):
+        stream = TranscriptStream()
+        stream.delta("a" * 200)
+        assert stream.delta("b" * 250) == "b" * 250
+
+    def test_reset(self):
+        stream = TranscriptStream()
+        stream.delta("Hello")
+        stream.reset()
+        assert stream.delta("Hello") == "Hello"
+
+
+class TestTranscriptAssembler:
+    """One message per speaker run"""
+
+    def test_sender_switch_emits_message(self):
+        messages = []
+        assembler = TranscriptAssembler(lambda sender, text: messages.append((sender, text)))
+        assembler.add("User", "Make a ")
+        assembler.add("User", "cube")
+        assert messages == []
+        assert assembler.text == "Make a cube"
+        assembler.add("JARVIS", "On it.")
+        assert messages == [("User", "Make a cube")]
+        assembler.flush()
+        assert messages == [("User", "Make a cube"), ("JARVIS", "On it.")]
+        assert assembler.messages == 2
+
+    def test_whitespace_only_not_emitted(self):
+        messages = []
+        assembler = TranscriptAssembler(lambda sender, text: messages.append((sender, text)))
+        assembler.add("User", "  ")
+        assembler.flush()
+        assert messages == []
+
+    def test_flush_resets_streams(self):
+        assembler = TranscriptAssembler(lambda sender, text: None)
+        assembler.input.delta("Hello")
+        assembler.flush()
+        assert assembler.input.delta("Hello") == "Hello"
+
+
+class TestTranscriptBench:
+    def test_transcript_bench(self):
+        from bench.transcript_bench import run_benchmark
+        report = run_benchmark(words=500, turns=3)
+        legacy, assembler = report["results"]
+        assert legacy["events"] == assembler["events"]
+        assert legacy["messages_logged"] == assembler["messages_logged"] == 6